@@ -0,0 +1,7 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+# The version is kept free of any imports such that "cpd version" does not need to load heavy modules.
+__version__ = "0.0.2"
@@ -0,0 +1,233 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import itertools
+import statistics
+import time
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from .ninja import NinjaLogEntry, find_longest_path, read_build_graph, read_ninja_log
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class BuildSummary(BaseModel):
+    """Key figures of the shape of a build, which are kept over time to spot regressions."""
+
+    timestamp: float
+    # number of build statements executed by the build
+    statements: int
+    wall_ms: int
+    critical_path_ms: int
+    # total duration of all executed statements
+    busy_ms: int
+    cores: int
+
+    @property
+    def parallelism(self) -> float:
+        """Return the average number of concurrently executed statements."""
+        return self.busy_ms / self.wall_ms if self.wall_ms > 0 else 0.0
+
+
+class IdleGap(BaseModel):
+    """An interval of the build in which not all cores executed build statements."""
+
+    start_ms: int
+    end_ms: int
+    # unused cores integrated over the interval
+    idle_core_ms: int
+
+
+class SplitCandidate(BaseModel):
+    """A build statement on the critical path and the wall time saved by splitting it in halves."""
+
+    output: str
+    duration_ms: int
+    savings_ms: int
+
+
+class BuildReport(BaseModel):
+    """Critical path, achieved parallelism and idle cores of the last build compared with previous builds."""
+
+    summary: BuildSummary
+    critical_path: list[NinjaLogEntry]
+    # average number of concurrently executed statements in consecutive slices of the wall time
+    parallelism: list[float]
+    idle_gaps: list[IdleGap]
+    split_candidates: list[SplitCandidate]
+    # previous build executing the same number of statements with the median wall time
+    baseline: BuildSummary | None
+    regressions: list[str]
+
+
+def report_build(build_dir: Path, build_start_ns: int, cores: int, limit: int = 5) -> BuildReport | None:
+    """Analyze the statements executed by the last build from the Ninja log and record its summary.
+
+    The statements of the last build are identified by outputs modified after the start of the build.
+    Returns None if the build did not execute any statement.
+    """
+    entries = [
+        entry
+        for entry in read_ninja_log(build_dir).values()
+        if entry.mtime_ns >= build_start_ns - _MTIME_GRANULARITY_NS
+    ]
+    if not entries:
+        return None
+    origin_ms = min(entry.start_ms for entry in entries)
+    wall_ms = max(entry.end_ms for entry in entries) - origin_ms
+    busy_ms = sum(entry.duration_ms for entry in entries)
+    graph = read_build_graph(build_dir)
+    durations = {entry.output: entry.duration_ms for entry in entries}
+    critical_path = find_longest_path(graph, durations)
+    summary = BuildSummary(
+        timestamp=time.time(),
+        statements=len(entries),
+        wall_ms=wall_ms,
+        critical_path_ms=sum(durations[output] for output in critical_path),
+        busy_ms=busy_ms,
+        cores=cores,
+    )
+    history = _load_history(build_dir)
+    _store_history(build_dir, [*history, summary][-_HISTORY_SIZE:])
+    baseline = _find_baseline(history, summary)
+    by_output = {entry.output: entry for entry in entries}
+    return BuildReport(
+        summary=summary,
+        critical_path=[by_output[output] for output in critical_path],
+        parallelism=_compute_parallelism(entries, origin_ms, wall_ms),
+        idle_gaps=sorted(_find_idle_gaps(entries, origin_ms, cores), key=lambda gap: -gap.idle_core_ms)[:limit],
+        split_candidates=_find_split_candidates(graph, durations, critical_path, summary)[:limit],
+        baseline=baseline,
+        regressions=_find_regressions(summary, baseline) if baseline is not None else [],
+    )
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# File system timestamps may lag behind the system clock by up to a scheduler tick
+_MTIME_GRANULARITY_NS = 10_000_000
+
+_HISTORY_SIZE = 100
+
+# Number of previous comparable builds the baseline is chosen from
+_BASELINE_BUILDS = 10
+
+_PARALLELISM_SLICES = 20
+
+# Relative change of a figure compared with the baseline reported as regression
+_REGRESSION_THRESHOLD = 0.2
+
+# Absolute changes below this duration are considered noise
+_REGRESSION_NOISE_MS = 200
+
+# Only compilations can be split, i.e. by moving parts of a source file into a new source file
+_SPLITTABLE_SUFFIX = ".o"
+
+
+def _compute_parallelism(entries: list[NinjaLogEntry], origin_ms: int, wall_ms: int) -> list[float]:
+    if wall_ms == 0:
+        return []
+    slice_ms = wall_ms / _PARALLELISM_SLICES
+    busy = [0.0] * _PARALLELISM_SLICES
+    for entry in entries:
+        start, end = entry.start_ms - origin_ms, entry.end_ms - origin_ms
+        for idx in range(int(start // slice_ms), min(int(end // slice_ms), _PARALLELISM_SLICES - 1) + 1):
+            overlap = min(end, (idx + 1) * slice_ms) - max(start, idx * slice_ms)
+            busy[idx] += max(overlap, 0.0)
+    return [round(slice_busy / slice_ms, 2) for slice_busy in busy]
+
+
+def _find_idle_gaps(entries: list[NinjaLogEntry], origin_ms: int, cores: int) -> list[IdleGap]:
+    events = sorted(
+        [(entry.start_ms - origin_ms, 1) for entry in entries] + [(entry.end_ms - origin_ms, -1) for entry in entries],
+    )
+    gaps = []
+    running = 0
+    gap: IdleGap | None = None
+    for (current_ms, delta), (next_ms, _) in itertools.pairwise(events):
+        running += delta
+        if next_ms == current_ms:
+            continue
+        if running < cores:
+            if gap is None:
+                gap = IdleGap(start_ms=current_ms, end_ms=current_ms, idle_core_ms=0)
+            gap.end_ms = next_ms
+            gap.idle_core_ms += (cores - running) * (next_ms - current_ms)
+        elif gap is not None:
+            gaps.append(gap)
+            gap = None
+    if gap is not None:
+        gaps.append(gap)
+    return gaps
+
+
+def _find_split_candidates(
+    graph: dict[str, list[str]],
+    durations: dict[str, int],
+    critical_path: list[str],
+    summary: BuildSummary,
+) -> list[SplitCandidate]:
+    # the wall time is bounded by the critical path and by the work distributed over all cores
+    work_bound_ms = summary.busy_ms / max(summary.cores, 1)
+    estimated_ms = max(summary.critical_path_ms, work_bound_ms)
+    candidates = []
+    for output in critical_path:
+        if not output.endswith(_SPLITTABLE_SUFFIX):
+            continue
+        # the halves are compiled in parallel, such that the statement takes half of its duration
+        split_durations = {**durations, output: durations[output] // 2}
+        split_critical_ms = sum(split_durations[path] for path in find_longest_path(graph, split_durations))
+        savings_ms = round(estimated_ms - max(split_critical_ms, work_bound_ms))
+        if savings_ms > 0:
+            candidates.append(SplitCandidate(output=output, duration_ms=durations[output], savings_ms=savings_ms))
+    return sorted(candidates, key=lambda candidate: -candidate.savings_ms)
+
+
+def _find_baseline(history: list[BuildSummary], summary: BuildSummary) -> BuildSummary | None:
+    comparable = [previous for previous in history if previous.statements == summary.statements]
+    if not comparable:
+        return None
+    recent = comparable[-_BASELINE_BUILDS:]
+    wall_ms = statistics.median_low(previous.wall_ms for previous in recent)
+    return next(previous for previous in recent if previous.wall_ms == wall_ms)
+
+
+def _find_regressions(summary: BuildSummary, baseline: BuildSummary) -> list[str]:
+    regressions = []
+    for figure, current_ms, baseline_ms in [
+        ("wall time", summary.wall_ms, baseline.wall_ms),
+        ("critical path", summary.critical_path_ms, baseline.critical_path_ms),
+    ]:
+        if current_ms - baseline_ms > max(baseline_ms * _REGRESSION_THRESHOLD, _REGRESSION_NOISE_MS):
+            regressions.append(f"{figure} {current_ms} ms (baseline: {baseline_ms} ms)")
+    if summary.wall_ms > _REGRESSION_NOISE_MS and summary.parallelism < baseline.parallelism * (
+        1 - _REGRESSION_THRESHOLD
+    ):
+        regressions.append(f"parallelism {summary.parallelism:.1f} (baseline: {baseline.parallelism:.1f})")
+    return regressions
+
+
+def _load_history(build_dir: Path) -> list[BuildSummary]:
+    history_file = _compose_history_file(build_dir)
+    if not history_file.exists():
+        return []
+    return [BuildSummary.model_validate_json(line) for line in history_file.read_text().splitlines() if line]
+
+
+def _store_history(build_dir: Path, history: list[BuildSummary]) -> None:
+    history_file = _compose_history_file(build_dir)
+    tmp_history_file = history_file.with_suffix(".tmp")
+    tmp_history_file.write_text("".join(f"{summary.model_dump_json()}\n" for summary in history))
+    tmp_history_file.replace(history_file)
+
+
+def _compose_history_file(build_dir: Path) -> Path:
+    return build_dir / "build_history.jsonl"
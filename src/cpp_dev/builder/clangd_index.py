@@ -0,0 +1,194 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import hashlib
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+from pathlib import Path
+from typing import IO, Any
+
+from cpp_dev.common.utils import assert_is_not_none, ensure_dir_exists
+
+from .compilation_database import read_compilation_database
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def get_clangd_executable() -> str:
+    """Return the path to the clangd executable."""
+    clangd = shutil.which("clangd")
+    if clangd is None:
+        raise RuntimeError("The clangd executable was not found.")
+    return clangd
+
+
+def compose_project_key(project_dir: Path) -> str:
+    """Compose the key identifying a project across its git worktrees (or its directory outside of git)."""
+    git = shutil.which("git")
+    identity = str(project_dir.resolve())
+    if git is not None:
+        result = subprocess.run(  # noqa: S603
+            [git, "-C", str(project_dir), "rev-parse", "--path-format=absolute", "--git-common-dir"],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        if result.returncode == 0:
+            identity = result.stdout.strip()
+    return hashlib.sha256(identity.encode()).hexdigest()[:16]
+
+
+def prebuild_clangd_index(project_dir: Path, build_dir: Path, index_dir: Path, jobs: int | None = None) -> None:
+    """Prebuild the clangd background index of a project into a directory shared across its worktrees.
+
+    The index directory of clangd within the project (.cache/clangd/index) is linked to the shared directory.
+    clangd names the index shards by the paths of the indexed files, such that the shards of headers of the
+    locked packages and the system are shared by all worktrees while each worktree indexes its own sources.
+    clangd is run as language server indexing all entries of the compilation database in parallel until
+    it reports the background indexing to be finished.
+    """
+    commands = read_compilation_database(build_dir)
+    if not commands:
+        raise RuntimeError(f"The compilation database in {build_dir} does not contain any source files.")
+    _link_index_dir(project_dir, index_dir)
+    args = [get_clangd_executable(), "--background-index", f"-j={jobs or os.cpu_count() or 1}", "--log=error"]
+    with subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, cwd=project_dir) as process:  # noqa: S603
+        client = _LanguageClient(process)
+        try:
+            client.request(
+                "initialize",
+                {
+                    "processId": os.getpid(),
+                    "rootUri": project_dir.as_uri(),
+                    "capabilities": {"window": {"workDoneProgress": True}},
+                },
+            )
+            client.notify("initialized", {})
+            # opening a single file lets clangd load the compilation database and enqueue all of its entries
+            source_file = Path(commands[0].file)
+            client.notify(
+                "textDocument/didOpen",
+                {
+                    "textDocument": {
+                        "uri": source_file.as_uri(),
+                        "languageId": "cpp",
+                        "version": 1,
+                        "text": source_file.read_text(),
+                    },
+                },
+            )
+            client.wait_for_progress_end(_BACKGROUND_INDEX_PROGRESS)
+            client.request("shutdown", None)
+            client.notify("exit", None)
+            process.wait(timeout=_SHUTDOWN_TIMEOUT)
+        finally:
+            if process.poll() is None:
+                process.kill()
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_BACKGROUND_INDEX_PROGRESS = "backgroundIndexProgress"
+
+# clangd does not report any progress if all index shards are up to date
+_IDLE_TIMEOUT = 10.0
+
+_SHUTDOWN_TIMEOUT = 10.0
+
+
+def _link_index_dir(project_dir: Path, index_dir: Path) -> None:
+    ensure_dir_exists(index_dir)
+    link = project_dir / ".cache" / "clangd" / "index"
+    if link.is_symlink():
+        if link.resolve() == index_dir.resolve():
+            return
+        link.unlink()
+    elif link.is_dir():
+        # shards indexed before are moved into the shared directory
+        for shard in link.iterdir():
+            shard.replace(index_dir / shard.name)
+        link.rmdir()
+    ensure_dir_exists(link.parent)
+    link.symlink_to(index_dir.resolve(), target_is_directory=True)
+
+
+class _LanguageClient:
+    """Minimal client of the language server protocol (JSON-RPC with Content-Length framing)."""
+
+    def __init__(self, process: subprocess.Popen[bytes]) -> None:
+        self._stdin = assert_is_not_none(process.stdin)
+        self._messages: queue.Queue[dict[str, Any] | None] = queue.Queue()
+        self._next_id = 1
+        # the messages are read by a thread such that waiting for them can time out
+        threading.Thread(target=self._read_messages, args=[assert_is_not_none(process.stdout)], daemon=True).start()
+
+    def request(self, method: str, params: Any) -> Any:  # noqa: ANN401
+        request_id = self._next_id
+        self._next_id += 1
+        self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+        while True:
+            message = self._receive(timeout=None)
+            if message.get("id") == request_id and "method" not in message:
+                if "error" in message:
+                    raise RuntimeError(f"clangd failed to handle {method}: {message['error'].get('message')}")
+                return message.get("result")
+
+    def notify(self, method: str, params: Any) -> None:  # noqa: ANN401
+        self._send({"jsonrpc": "2.0", "method": method, "params": params})
+
+    def wait_for_progress_end(self, token: str) -> None:
+        started = False
+        while True:
+            try:
+                message = self._receive(timeout=None if started else _IDLE_TIMEOUT)
+            except TimeoutError:
+                return
+            params = message.get("params") or {}
+            if message.get("method") != "$/progress" or params.get("token") != token:
+                continue
+            kind = params.get("value", {}).get("kind")
+            started = started or kind == "begin"
+            if kind == "end":
+                return
+
+    def _receive(self, timeout: float | None) -> dict[str, Any]:
+        while True:
+            try:
+                message = self._messages.get(timeout=timeout)
+            except queue.Empty as e:
+                raise TimeoutError from e
+            if message is None:
+                raise RuntimeError("clangd terminated unexpectedly.")
+            if "method" in message and "id" in message:
+                # requests of the server (e.g. creating a progress token) are acknowledged
+                self._send({"jsonrpc": "2.0", "id": message["id"], "result": None})
+                continue
+            return message
+
+    def _send(self, message: dict[str, Any]) -> None:
+        content = json.dumps(message).encode()
+        self._stdin.write(f"Content-Length: {len(content)}\r\n\r\n".encode() + content)
+        self._stdin.flush()
+
+    def _read_messages(self, stdout: IO[bytes]) -> None:
+        try:
+            while True:
+                headers = {}
+                while (line := stdout.readline().strip()) != b"":
+                    key, _, value = line.decode().partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                if "content-length" not in headers:
+                    break
+                self._messages.put(json.loads(stdout.read(int(headers["content-length"]))))
+        finally:
+            self._messages.put(None)
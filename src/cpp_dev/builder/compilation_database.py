@@ -0,0 +1,60 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+from cpp_dev.common.utils import ensure_dir_exists
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+@dataclass
+class CompileCommand:
+    """The compilation of a source file as recorded in the compilation database."""
+
+    file: str
+    arguments: list[str]
+    output: str
+
+
+def compose_compilation_database(build_dir: Path) -> Path:
+    """Compose the path of the compilation database, which clangd finds in the build directory of a project."""
+    return build_dir / "compile_commands.json"
+
+
+def write_compilation_database(build_dir: Path, commands: list[CompileCommand]) -> bool:
+    """Write the compilation database for the commands executed within the build directory.
+
+    The database is only replaced (atomically) if its entries changed, such that tools watching it
+    do not re-index the project for nothing. Returns True if the database was written.
+    """
+    entries = [
+        {"directory": str(build_dir), "file": command.file, "arguments": command.arguments, "output": command.output}
+        for command in sorted(commands, key=lambda command: command.file)
+    ]
+    content = json.dumps(entries, indent=2) + "\n"
+    database_file = compose_compilation_database(build_dir)
+    if database_file.exists() and database_file.read_text() == content:
+        return False
+    ensure_dir_exists(build_dir)
+    tmp_file = database_file.with_suffix(".tmp")
+    tmp_file.write_text(content)
+    tmp_file.replace(database_file)
+    return True
+
+
+def read_compilation_database(build_dir: Path) -> list[CompileCommand]:
+    """Read the compilation database or return an empty list if it does not exist yet."""
+    database_file = compose_compilation_database(build_dir)
+    if not database_file.exists():
+        return []
+    return [
+        CompileCommand(file=entry["file"], arguments=entry["arguments"], output=entry["output"])
+        for entry in json.loads(database_file.read_text())
+    ]
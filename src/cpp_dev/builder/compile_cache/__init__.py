@@ -0,0 +1,43 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+# This package is executed by Ninja as compiler launcher for each translation unit (see __main__.py).
+# All of its modules must therefore only depend on the standard library to keep the startup overhead low
+# and to be runnable without cpp_dev being importable.
+
+from .launcher import LauncherConfig, compose_launcher_command, main
+from .memory_slots import MemoryPlan, compose_memory_plan_file, read_peak_memory
+from .remote import add_remote_entry, fetch_remote_entry, store_remote_entry
+from .storage import (
+    DEFAULT_COMPILE_CACHE_MAX_SIZE,
+    CompileCacheStats,
+    compose_entry_file,
+    evict_compile_cache,
+    load_compile_cache_stats,
+    reset_compile_cache_stats,
+)
+from .worker_client import COMPILE_WORKER_TOKEN_ENV_VAR, CompileRequest, CompileResponse, compose_worker_authorization
+
+__all__ = [
+    "COMPILE_WORKER_TOKEN_ENV_VAR",
+    "DEFAULT_COMPILE_CACHE_MAX_SIZE",
+    "CompileCacheStats",
+    "CompileRequest",
+    "CompileResponse",
+    "LauncherConfig",
+    "MemoryPlan",
+    "add_remote_entry",
+    "compose_entry_file",
+    "compose_launcher_command",
+    "compose_memory_plan_file",
+    "compose_worker_authorization",
+    "evict_compile_cache",
+    "fetch_remote_entry",
+    "load_compile_cache_stats",
+    "main",
+    "read_peak_memory",
+    "reset_compile_cache_stats",
+    "store_remote_entry",
+]
@@ -0,0 +1,18 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+# Entry point of the compiler launcher run by Ninja as plain script (see compose_launcher_command).
+
+import sys
+from pathlib import Path
+
+if not __package__:
+    # the package is imported from its parent directory as cpp_dev is not importable by an isolated interpreter
+    sys.path.append(str(Path(__file__).resolve().parents[1]))
+    __package__ = "compile_cache"
+
+from .launcher import main
+
+sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,84 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import hashlib
+import re
+import shutil
+from pathlib import Path
+
+from .storage import write_atomically
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def compute_key(toolchain_identity: str, args: list[str], content: bytes) -> str:
+    """Compute the key of a cache entry from the toolchain, the arguments of the command and its input."""
+    digest = hashlib.sha256(f"{_CACHE_VERSION}\0{toolchain_identity}\0".encode())
+    digest.update("\0".join(args).encode())
+    digest.update(b"\1")
+    digest.update(content)
+    return digest.hexdigest()
+
+
+def compute_compile_key(toolchain_identity: str, flags: list[str], content: bytes, base_dir: Path | None) -> str:
+    """Compute the key of a compilation from its preprocessed source.
+
+    Paths within the base directory are keyed relative to it to share entries across checkouts.
+    """
+    if base_dir is None:
+        return compute_key(toolchain_identity, flags, content)
+    # paths within the base directory appear in the include flags and the line markers of the preprocessed source
+    pattern = _compose_base_dir_pattern(base_dir)
+    normalized_flags = [re.sub(pattern, ".", flag) for flag in flags]
+    line_marker_pattern = re.compile(rb'^(#(?: line)? \d+ ")' + pattern.encode(), re.MULTILINE)
+    return compute_key(toolchain_identity, normalized_flags, line_marker_pattern.sub(rb"\1.", content))
+
+
+def compute_manifest_key(toolchain_identity: str, flags: list[str], source: str, base_dir: Path | None) -> str:
+    """Compute the key of the manifest of a compilation, which does not require preprocessing the source."""
+    # relative paths of the source and the flags are resolved against the working directory
+    args = [*flags, str(Path.cwd()), source]
+    if base_dir is not None:
+        pattern = _compose_base_dir_pattern(base_dir)
+        args = [re.sub(pattern, ".", arg) for arg in args]
+    return compute_key(f"manifest\0{toolchain_identity}", args, b"")
+
+
+def identify_toolchain(cache_dir: Path, compiler: str, toolchain: str | None) -> str:
+    """Return the locked toolchain or identify the compiler by the content of its executable."""
+    if toolchain is not None:
+        return toolchain
+    # without a locked toolchain, the compiler is identified by its content to share entries across machines,
+    # which is hashed once per location, modification time and size
+    compiler_path = Path(shutil.which(compiler) or compiler).resolve()
+    stat = compiler_path.stat()
+    stamp = hashlib.sha256(f"{compiler_path}:{stat.st_mtime_ns}:{stat.st_size}".encode()).hexdigest()
+    identity_file = _compose_compilers_dir(cache_dir) / stamp
+    try:
+        return identity_file.read_text()
+    except FileNotFoundError:
+        pass
+    with compiler_path.open("rb") as compiler_file:
+        identity = hashlib.file_digest(compiler_file, "sha256").hexdigest()
+    write_atomically(identity_file, identity.encode())
+    return identity
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Increased whenever the key computation changes to not hit incompatible objects
+_CACHE_VERSION = 3
+
+
+def _compose_base_dir_pattern(base_dir: Path) -> str:
+    return re.escape(str(base_dir)) + r"(?=[/=]|$)"
+
+
+def _compose_compilers_dir(cache_dir: Path) -> Path:
+    return cache_dir / "compilers"
@@ -0,0 +1,264 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import argparse
+import hashlib
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from .keys import compute_compile_key, compute_key, compute_manifest_key, identify_toolchain
+from .manifests import find_manifest_entry, record_manifest_entry, write_depfile
+from .memory_slots import acquire_local_slot, record_peak_memory, reserve_memory
+from .remote import add_remote_entry, fetch_remote_entry
+from .storage import (
+    CompileCacheStats,
+    compose_entry_file,
+    compose_manifest_file,
+    restore_entry,
+    store_entry,
+    update_stats,
+)
+from .worker_client import CompileRequest, compile_remotely, strip_include_flags
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+@dataclass
+class LauncherConfig:
+    """Settings of the cache launcher shared by all compilations and links of a build."""
+
+    cache_dir: Path
+    max_size: int
+    # paths within this directory (i.e. the project) are keyed relative to it to share entries across checkouts
+    base_dir: Path | None = None
+    toolchain_id: str | None = None
+    # digest of the locked dependencies linked into binaries
+    dependency_digest: str | None = None
+    remote_url: str | None = None
+    # directory receiving a marker per new cache entry to be uploaded to the remote cache
+    upload_dir: Path | None = None
+    # addresses (host:port) of compile workers the compilations are distributed to
+    workers: list[str] = field(default_factory=list)
+    # directory holding the lock files limiting the concurrent local compilations if workers are used
+    slot_dir: Path | None = None
+    # directory holding the memory plan local compilations are admitted against and their recorded peak memory
+    memory_dir: Path | None = None
+
+
+def compose_launcher_command(config: LauncherConfig) -> list[str]:
+    """Compose the command prefix running a compilation or link through the cache.
+
+    Compilations append: --output <object> --depfile <depfile> --source <source> -- <cxx> <flags>.
+    Links append: --link --output <binary> -- <link command>.
+    """
+    # the launcher only uses the standard library and is run without processing the site packages,
+    # which dominates the startup time of an interpreter with many installed packages
+    command = [sys.executable, "-I", "-S", str(Path(__file__).resolve().with_name("__main__.py"))]
+    command.extend(["--cache-dir", str(config.cache_dir), "--max-size", str(config.max_size)])
+    if config.base_dir is not None:
+        command.extend(["--base-dir", str(config.base_dir)])
+    if config.toolchain_id is not None:
+        command.extend(["--toolchain", config.toolchain_id])
+    if config.dependency_digest is not None:
+        command.extend(["--dependencies", config.dependency_digest])
+    if config.remote_url is not None and config.upload_dir is not None:
+        command.extend(["--remote-url", config.remote_url, "--upload-dir", str(config.upload_dir)])
+    if config.workers and config.slot_dir is not None:
+        command.extend(["--workers", ",".join(config.workers), "--slot-dir", str(config.slot_dir)])
+    if config.memory_dir is not None:
+        command.extend(["--memory-dir", str(config.memory_dir)])
+    return command
+
+
+def main(argv: list[str]) -> int:
+    """Run a single compilation or link through the cache and return the exit code of the command."""
+    args = _parse_args(argv)
+    if args.link:
+        return _run_link(args)
+    return _run_compile(args)
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_LINK_INPUT_SUFFIXES = (".o", ".a")
+
+# Translation units with a larger preprocessed size prefer remote workers over local slots
+_HEAVY_TRANSLATION_UNIT_SIZE = 2 * 1024**2
+
+
+def _parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="cpd-compile-cache")
+    parser.add_argument("--cache-dir", type=Path, required=True)
+    parser.add_argument("--max-size", type=int, required=True)
+    parser.add_argument("--base-dir", type=Path)
+    parser.add_argument("--toolchain")
+    parser.add_argument("--dependencies")
+    parser.add_argument("--remote-url")
+    parser.add_argument("--upload-dir", type=Path)
+    parser.add_argument("--workers", type=lambda workers: workers.split(","), default=[])
+    parser.add_argument("--slot-dir", type=Path)
+    parser.add_argument("--memory-dir", type=Path)
+    parser.add_argument("--link", action="store_true")
+    parser.add_argument("--output", required=True)
+    parser.add_argument("--depfile")
+    parser.add_argument("--source")
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if args.command[:1] == ["--"]:
+        args.command = args.command[1:]
+    if not args.command:
+        parser.error("the compiler command is missing")
+    if not args.link and (args.depfile is None or args.source is None):
+        parser.error("compilations require --depfile and --source")
+    return args
+
+
+def _run_compile(args: argparse.Namespace) -> int:
+    compiler, *flags = args.command
+    toolchain_identity = identify_toolchain(args.cache_dir, compiler, args.toolchain)
+    # the direct mode finds the result by the content of the dependencies recorded by previous compilations
+    # without preprocessing the source
+    manifest_file = compose_manifest_file(
+        args.cache_dir,
+        compute_manifest_key(toolchain_identity, flags, args.source, args.base_dir),
+    )
+    if _run_direct(args, manifest_file):
+        return 0
+
+    start_time_ns = time.time_ns()
+    preprocess = _preprocess(compiler, [*flags, "-E", "-MD", "-MF", args.depfile, "-MT", args.output, args.source])
+    if preprocess.returncode != 0:
+        # the compilation reports the errors, the result is not cached
+        update_stats(args.cache_dir, args.max_size, CompileCacheStats(uncacheable=1))
+        return _run_command([compiler, *flags, "-MD", "-MF", args.depfile, "-c", args.source, "-o", args.output])[0]
+
+    key = compute_compile_key(toolchain_identity, flags, preprocess.stdout, args.base_dir)
+    returncode = _run_cached(args, key, lambda: _compile(args, compiler, flags, preprocess.stdout))
+    if returncode == 0:
+        manifest_growth = record_manifest_entry(manifest_file, key, Path(args.depfile), args.base_dir, start_time_ns)
+        if manifest_growth:
+            update_stats(args.cache_dir, args.max_size, CompileCacheStats(size=manifest_growth))
+    return returncode
+
+
+def _run_direct(args: argparse.Namespace, manifest_file: Path) -> bool:
+    found = find_manifest_entry(manifest_file, args.base_dir)
+    if found is None:
+        return False
+    key, dependencies = found
+    if not restore_entry(compose_entry_file(args.cache_dir, key), Path(args.output), executable=False):
+        return False
+    # Ninja reads the dependencies of the restored object from the depfile
+    write_depfile(Path(args.depfile), args.output, dependencies)
+    os.utime(manifest_file)
+    update_stats(args.cache_dir, args.max_size, CompileCacheStats(hits=1))
+    return True
+
+
+def _run_link(args: argparse.Namespace) -> int:
+    command = args.command
+    digest = hashlib.sha256()
+    for arg in command:
+        # the inputs are identified by their content as their paths are identical across builds
+        if arg.endswith(_LINK_INPUT_SUFFIXES) and arg != args.output:
+            digest.update(hashlib.sha256(Path(arg).read_bytes()).digest())
+    toolchain_identity = identify_toolchain(args.cache_dir, command[0], args.toolchain)
+    identity = f"link\0{toolchain_identity}\0{args.dependencies}\0{digest.hexdigest()}"
+    key = compute_key(identity, command[1:], b"")
+    # links are always executed locally as their inputs reside on the local machine
+    return _run_cached(args, key, lambda: _run_command(command), executable=True)
+
+
+def _run_cached(
+    args: argparse.Namespace,
+    key: str,
+    execute: Callable[[], tuple[int, bytes]],
+    *,
+    executable: bool = False,
+) -> int:
+    entry_file = compose_entry_file(args.cache_dir, key)
+    output = Path(args.output)
+    if restore_entry(entry_file, output, executable=executable):
+        update_stats(args.cache_dir, args.max_size, CompileCacheStats(hits=1))
+        return 0
+    if args.remote_url is not None:
+        content = fetch_remote_entry(args.remote_url, key)
+        if content is not None:
+            add_remote_entry(args.cache_dir, args.max_size, key, content)
+            if restore_entry(entry_file, output, executable=executable):
+                update_stats(args.cache_dir, args.max_size, CompileCacheStats(hits=1))
+                return 0
+
+    returncode, stderr = execute()
+    if returncode != 0:
+        update_stats(args.cache_dir, args.max_size, CompileCacheStats(uncacheable=1))
+        return returncode
+    size = store_entry(entry_file, output, stderr)
+    update_stats(args.cache_dir, args.max_size, CompileCacheStats(misses=1, size=size))
+    if args.upload_dir is not None:
+        args.upload_dir.mkdir(parents=True, exist_ok=True)
+        (args.upload_dir / key).touch()
+    return 0
+
+
+def _compile(args: argparse.Namespace, compiler: str, flags: list[str], preprocessed: bytes) -> tuple[int, bytes]:
+    local_command = [compiler, *flags, "-MD", "-MF", args.depfile, "-c", args.source, "-o", args.output]
+    if not args.workers or args.slot_dir is None:
+        return _run_locally(args, local_command)
+    if len(preprocessed) < _HEAVY_TRANSLATION_UNIT_SIZE:
+        with acquire_local_slot(args.slot_dir, blocking=False) as acquired:
+            if acquired:
+                return _run_locally(args, local_command)
+    request = CompileRequest(args.toolchain, compiler, strip_include_flags(flags), preprocessed)
+    result = compile_remotely(args.workers, request, Path(args.output))
+    if result is not None:
+        return result
+    # the workers are saturated or failed, the compilation waits for a local slot
+    with acquire_local_slot(args.slot_dir, blocking=True):
+        return _run_locally(args, local_command)
+
+
+def _run_locally(args: argparse.Namespace, command: list[str]) -> tuple[int, bytes]:
+    if args.memory_dir is None:
+        return _run_command(command)
+    with reserve_memory(args.memory_dir, args.output):
+        returncode, stderr, peak = _run_measured_command(command)
+    if returncode == 0:
+        record_peak_memory(args.memory_dir, args.output, peak)
+    return returncode, stderr
+
+
+def _preprocess(compiler: str, args: list[str]) -> subprocess.CompletedProcess[bytes]:
+    return subprocess.run([compiler, *args], capture_output=True, check=False)  # noqa: S603
+
+
+def _run_command(command: list[str]) -> tuple[int, bytes]:
+    returncode, stderr, _ = _run_measured_command(command)
+    return returncode, stderr
+
+
+def _run_measured_command(command: list[str]) -> tuple[int, bytes, int]:
+    # the outputs are buffered in files as the process is reaped by wait4 to obtain its resource usage
+    with tempfile.TemporaryFile() as stdout_file, tempfile.TemporaryFile() as stderr_file:
+        with subprocess.Popen(command, stdout=stdout_file, stderr=stderr_file) as process:  # noqa: S603
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.waitstatus_to_exitcode(status)
+        stdout_file.seek(0)
+        stderr_file.seek(0)
+        stdout, stderr = stdout_file.read(), stderr_file.read()
+    sys.stdout.buffer.write(stdout)
+    sys.stderr.buffer.write(stderr)
+    # the maximum resident set size (in KiB) includes the processes spawned by the compiler driver
+    return process.returncode, stderr, usage.ru_maxrss * 1024
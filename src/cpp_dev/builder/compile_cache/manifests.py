@@ -0,0 +1,129 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import Any
+
+from .storage import write_atomically
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def find_manifest_entry(manifest_file: Path, base_dir: Path | None) -> tuple[str, list[str]] | None:
+    """Find the result of a compilation whose recorded dependencies are unchanged (direct mode).
+
+    Returns the key of the result and the resolved dependencies, None if no dependency set matches.
+    """
+    digests: dict[str, str | None] = {}
+    for entry in _load_manifest(manifest_file):
+        dependencies = _match_dependencies(entry["dependencies"], base_dir, digests)
+        if dependencies is not None:
+            return entry["key"], dependencies
+    return None
+
+
+def record_manifest_entry(
+    manifest_file: Path,
+    key: str,
+    depfile: Path,
+    base_dir: Path | None,
+    start_time_ns: int,
+) -> int:
+    """Record the dependencies of a compilation started at the given time and return the growth of the manifest.
+
+    Nothing is recorded if a dependency was modified during the compilation.
+    """
+    dependencies = []
+    for dependency in read_depfile(depfile):
+        path = os.path.abspath(dependency)  # noqa: PTH100
+        try:
+            stat = os.stat(path)  # noqa: PTH116
+        except FileNotFoundError:
+            return 0
+        if stat.st_mtime_ns >= start_time_ns:
+            # a dependency modified during the compilation may not match the result
+            return 0
+        dependencies.append((_normalize_dependency(path, base_dir), _hash_file(path)))
+    manifest = _load_manifest(manifest_file)
+    entry = {"key": key, "dependencies": dependencies}
+    manifest = [entry, *(other for other in manifest if other["key"] != key)][:_MAX_MANIFEST_ENTRIES]
+    previous_size = manifest_file.stat().st_size if manifest_file.exists() else 0
+    write_atomically(manifest_file, json.dumps(manifest).encode())
+    return manifest_file.stat().st_size - previous_size
+
+
+def read_depfile(depfile: Path) -> list[str]:
+    """Read the dependencies of a depfile written by the compiler."""
+    content = depfile.read_text().replace("\\\n", " ")
+    _, _, prerequisites = content.partition(": ")
+    # spaces within paths are escaped by a backslash
+    return [path.replace("\\ ", " ") for path in re.split(r"(?<!\\)\s+", prerequisites.strip()) if path]
+
+
+def write_depfile(depfile: Path, output: str, dependencies: list[str]) -> None:
+    """Write the depfile of a restored result, from which Ninja reads its dependencies."""
+    escaped = " ".join(dependency.replace(" ", "\\ ") for dependency in dependencies)
+    depfile.write_text(f"{output}: {escaped}\n")
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Number of dependency sets of a compilation remembered by its manifest (e.g. of different branches)
+_MAX_MANIFEST_ENTRIES = 8
+
+
+def _match_dependencies(
+    recorded: list[tuple[str, str]],
+    base_dir: Path | None,
+    digests: dict[str, str | None],
+) -> list[str] | None:
+    # the digests are shared by the entries of a manifest as they mostly list the same dependencies
+    dependencies = []
+    for path, digest in recorded:
+        dependency = _resolve_dependency(path, base_dir)
+        if dependency not in digests:
+            digests[dependency] = _hash_file(dependency)
+        if digests[dependency] != digest:
+            return None
+        dependencies.append(dependency)
+    return dependencies
+
+
+def _load_manifest(manifest_file: Path) -> list[dict[str, Any]]:
+    try:
+        manifest: list[dict[str, Any]] = json.loads(manifest_file.read_bytes())
+    except (FileNotFoundError, ValueError):
+        # not compiled yet, evicted or written by an interrupted launcher
+        return []
+    return manifest
+
+
+def _hash_file(path: str) -> str | None:
+    try:
+        with open(path, "rb") as file:  # noqa: PTH123
+            return hashlib.file_digest(file, "sha256").hexdigest()
+    except OSError:
+        return None
+
+
+def _normalize_dependency(path: str, base_dir: Path | None) -> str:
+    # dependencies within the base directory are recorded relative to it to share manifests across checkouts
+    if base_dir is not None and path.startswith(f"{base_dir}/"):
+        return path.removeprefix(f"{base_dir}/")
+    return path
+
+
+def _resolve_dependency(path: str, base_dir: Path | None) -> str:
+    if base_dir is not None and not path.startswith("/"):
+        return f"{base_dir}/{path}"
+    return path
@@ -0,0 +1,162 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import fcntl
+import json
+import os
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from .storage import lock_dir, write_atomically
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+@dataclass
+class MemoryPlan:
+    """The memory budget of the concurrent local compilations of a build and their expected peak memory."""
+
+    # bytes available to all local compilations, which are not limited if None
+    budget: int | None
+    # peak memory in bytes of the compilations recorded by previous builds by output
+    peaks: dict[str, int] = field(default_factory=dict)
+    # peak memory expected for compilations not recorded yet
+    default_peak: int = 0
+
+    def to_json(self) -> bytes:
+        """Serialize the plan for the launchers."""
+        return json.dumps(asdict(self)).encode()
+
+    @staticmethod
+    def from_json(data: bytes) -> "MemoryPlan":
+        """Deserialize a plan written by the build."""
+        return MemoryPlan(**json.loads(data))
+
+
+def compose_memory_plan_file(memory_dir: Path) -> Path:
+    """Compose the path of the memory plan read by the launchers of a build."""
+    return memory_dir / "plan.json"
+
+
+def read_peak_memory(memory_dir: Path) -> dict[str, int]:
+    """Read the peak memory of the local compilations (in bytes by output) recorded by the launchers.
+
+    The log is appended by every compilation and compacted to the most recent peak per output.
+    It must not be called while a build is running.
+    """
+    log_file = _compose_peak_memory_log(memory_dir)
+    if not log_file.exists():
+        return {}
+    peaks = {}
+    for line in log_file.read_text().splitlines():
+        peak, _, output = line.partition(" ")
+        if peak.isdigit() and output:
+            peaks[output] = int(peak)
+    write_atomically(log_file, "".join(f"{peak} {output}\n" for output, peak in sorted(peaks.items())).encode())
+    return peaks
+
+
+def record_peak_memory(memory_dir: Path, output: str, peak: int) -> None:
+    """Record the peak memory of a local compilation for the memory plan of the next build."""
+    memory_dir.mkdir(parents=True, exist_ok=True)
+    # a single write of a short line to a file opened for appending is not interleaved with other launchers
+    with _compose_peak_memory_log(memory_dir).open("a") as log_file:
+        log_file.write(f"{peak} {output}\n")
+
+
+@contextmanager
+def reserve_memory(memory_dir: Path, output: str) -> Generator[None]:
+    """Wait until the expected peak memory of a compilation fits into the budget of the memory plan."""
+    plan_file = compose_memory_plan_file(memory_dir)
+    plan = MemoryPlan.from_json(plan_file.read_bytes()) if plan_file.exists() else None
+    if plan is None or plan.budget is None:
+        yield
+        return
+    peak = plan.peaks.get(output, plan.default_peak)
+    while not _try_reserve_memory(memory_dir, plan.budget, peak):
+        time.sleep(_MEMORY_POLL_INTERVAL)
+    try:
+        yield
+    finally:
+        with lock_dir(memory_dir):
+            reservations = _load_reservations(memory_dir)
+            reservations.pop(str(os.getpid()), None)
+            write_atomically(_compose_reservations_file(memory_dir), json.dumps(reservations).encode())
+
+
+@contextmanager
+def acquire_local_slot(slot_dir: Path, *, blocking: bool) -> Generator[bool]:
+    """Acquire one of the local compilation slots (one per CPU) if compilations are distributed to workers.
+
+    Yields whether a slot was acquired, which is always the case when blocking.
+    """
+    slot_dir.mkdir(parents=True, exist_ok=True)
+    slots = os.cpu_count() or 1
+    for idx in range(slots):
+        with (slot_dir / str(idx)).open("a") as slot_file:
+            try:
+                fcntl.flock(slot_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            yield True
+            return
+    if not blocking:
+        yield False
+        return
+    with (slot_dir / str(os.getpid() % slots)).open("a") as slot_file:
+        fcntl.flock(slot_file.fileno(), fcntl.LOCK_EX)
+        yield True
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Interval in seconds compilations waiting for memory check for released reservations
+_MEMORY_POLL_INTERVAL = 0.05
+
+
+def _try_reserve_memory(memory_dir: Path, budget: int, peak: int) -> bool:
+    with lock_dir(memory_dir):
+        # reservations of launchers killed (e.g. by an interrupted build) are dropped
+        reservations = {pid: size for pid, size in _load_reservations(memory_dir).items() if _is_alive(int(pid))}
+        # a single compilation is always admitted, even if it exceeds the budget on its own
+        if reservations and sum(reservations.values()) + peak > budget:
+            return False
+        reservations[str(os.getpid())] = peak
+        write_atomically(_compose_reservations_file(memory_dir), json.dumps(reservations).encode())
+        return True
+
+
+def _load_reservations(memory_dir: Path) -> dict[str, int]:
+    reservations_file = _compose_reservations_file(memory_dir)
+    if not reservations_file.exists():
+        return {}
+    reservations: dict[str, int] = json.loads(reservations_file.read_text())
+    return reservations
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # the process exists but belongs to another user
+        return True
+    return True
+
+
+def _compose_peak_memory_log(memory_dir: Path) -> Path:
+    return memory_dir / "peaks.log"
+
+
+def _compose_reservations_file(memory_dir: Path) -> Path:
+    return memory_dir / "reservations.json"
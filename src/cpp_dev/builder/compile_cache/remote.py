@@ -0,0 +1,51 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from pathlib import Path
+
+from .storage import CompileCacheStats, compose_entry_file, update_stats, write_atomically
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def add_remote_entry(cache_dir: Path, max_size: int, key: str, content: bytes) -> None:
+    """Add an entry fetched from a remote cache to the local cache."""
+    entry_file = compose_entry_file(cache_dir, key)
+    write_atomically(entry_file, content)
+    update_stats(cache_dir, max_size, CompileCacheStats(remote_hits=1, size=len(content)))
+
+
+def fetch_remote_entry(remote_url: str, key: str) -> bytes | None:
+    """Fetch an entry from a remote HTTP cache, returning None if it is missing or unreachable."""
+    # urllib is only imported by launchers using remote caches or workers as importing it is comparably slow
+    import urllib.request  # noqa: PLC0415
+
+    try:
+        with urllib.request.urlopen(_compose_remote_url(remote_url, key), timeout=_REMOTE_TIMEOUT) as response:  # noqa: S310
+            return response.read()
+    except (OSError, ValueError):
+        return None
+
+
+def store_remote_entry(remote_url: str, key: str, content: bytes) -> None:
+    """Store an entry in a remote HTTP cache. Raises OSError if the upload failed."""
+    import urllib.request  # noqa: PLC0415
+
+    request = urllib.request.Request(_compose_remote_url(remote_url, key), data=content, method="PUT")  # noqa: S310
+    with urllib.request.urlopen(request, timeout=_REMOTE_TIMEOUT):  # noqa: S310
+        pass
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_REMOTE_TIMEOUT = 10.0
+
+
+def _compose_remote_url(remote_url: str, key: str) -> str:
+    return f"{remote_url.rstrip('/')}/cas/{key}"
@@ -0,0 +1,222 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import fcntl
+import json
+import os
+import shutil
+import sys
+import tempfile
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+DEFAULT_COMPILE_CACHE_MAX_SIZE = 5 * 1024**3
+
+
+@dataclass
+class CompileCacheStats:
+    """Hit/miss statistics and the size of the compilation cache."""
+
+    hits: int = 0
+    # entries fetched from the remote cache, which are counted as hits once restored
+    remote_hits: int = 0
+    misses: int = 0
+    uncacheable: int = 0
+    size: int = 0
+
+
+def compose_entry_file(cache_dir: Path, key: str) -> Path:
+    """Compose the path of a cache entry (object file or linked binary) within the cache."""
+    return _compose_objects_dir(cache_dir) / key[:2] / key[2:]
+
+
+def compose_manifest_file(cache_dir: Path, key: str) -> Path:
+    """Compose the path of the manifest listing the dependencies of the results of a compilation."""
+    return _compose_manifests_dir(cache_dir) / key[:2] / key[2:]
+
+
+def load_compile_cache_stats(cache_dir: Path) -> CompileCacheStats:
+    """Load the statistics of the compilation cache including the changes logged by the launchers."""
+    if not cache_dir.exists():
+        return CompileCacheStats()
+    with lock_dir(cache_dir, shared=True):
+        return _load_stats(cache_dir)
+
+
+def reset_compile_cache_stats(cache_dir: Path) -> None:
+    """Reset the hit/miss statistics while keeping the cached objects."""
+    with lock_dir(cache_dir):
+        stats = _load_stats(cache_dir)
+        _store_stats(cache_dir, CompileCacheStats(size=stats.size))
+
+
+def evict_compile_cache(cache_dir: Path, max_size: int) -> int:
+    """Evict least-recently used objects until the cache size is below the given size.
+
+    Returns the number of evicted objects.
+    """
+    with lock_dir(cache_dir):
+        return _evict(cache_dir, max_size)
+
+
+def update_stats(cache_dir: Path, max_size: int, delta: CompileCacheStats) -> None:
+    """Add the changes of a single launcher to the statistics and evict entries once the cache is too large."""
+    # concurrent launchers append their changes to a log instead of serializing on rewriting the statistics,
+    # which only excludes the rare folding of the log into the statistics
+    with lock_dir(cache_dir, shared=True):
+        log_size = _append_stats_log(cache_dir, delta)
+    if log_size < _STATS_LOG_COMPACTION_SIZE:
+        return
+    with lock_dir(cache_dir):
+        stats = _load_stats(cache_dir)
+        _store_stats(cache_dir, stats)
+        # the cache grows beyond its maximum size by the objects stored since the last folding of the log
+        if stats.size > max_size:
+            _evict(cache_dir, int(max_size * _EVICTION_TARGET))
+
+
+def restore_entry(entry_file: Path, output: Path, *, executable: bool) -> bool:
+    """Restore a cache entry to the output and replay its diagnostics, False if there is no entry."""
+    try:
+        # the entry is copied as compilers may write the output in place, which would modify a hardlink
+        shutil.copyfile(entry_file, output)
+    except FileNotFoundError:
+        return False
+    if executable:
+        output.chmod(0o755)
+    # the modification time records the last usage for the LRU eviction
+    os.utime(entry_file)
+    stderr_file = entry_file.with_suffix(".stderr")
+    if stderr_file.exists():
+        sys.stderr.buffer.write(stderr_file.read_bytes())
+    return True
+
+
+def store_entry(entry_file: Path, output: Path, stderr: bytes) -> int:
+    """Store the output and the diagnostics of a command as cache entry and return the size of the entry."""
+    if stderr:
+        entry_file.parent.mkdir(parents=True, exist_ok=True)
+        entry_file.with_suffix(".stderr").write_bytes(stderr)
+    write_atomically(entry_file, output.read_bytes())
+    return entry_file.stat().st_size
+
+
+def write_atomically(file: Path, content: bytes) -> None:
+    """Write a file such that concurrent launchers never read it partially written."""
+    file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=file.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(content)
+    Path(tmp_name).replace(file)
+
+
+@contextmanager
+def lock_dir(directory: Path, *, shared: bool = False) -> Generator[None]:
+    """Lock a directory shared by concurrent launchers."""
+    directory.mkdir(parents=True, exist_ok=True)
+    with (directory / ".lock").open("a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Fraction of the maximum size the cache is reduced to by an eviction to not evict on every store
+_EVICTION_TARGET = 0.8
+
+# Files stored next to the cache entries that are not entries themselves
+_AUXILIARY_SUFFIXES = (".stderr", ".tmp")
+
+# Size of the log of statistics changes at which a launcher folds it into the statistics
+_STATS_LOG_COMPACTION_SIZE = 64 * 1024
+
+
+def _append_stats_log(cache_dir: Path, delta: CompileCacheStats) -> int:
+    # a single write of a short line to a file opened for appending is not interleaved with other launchers
+    fd = os.open(_compose_stats_log(cache_dir), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, f"{json.dumps(asdict(delta))}\n".encode())
+        return os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+
+
+def _load_stats(cache_dir: Path) -> CompileCacheStats:
+    stats_file = _compose_stats_file(cache_dir)
+    stats = CompileCacheStats(**json.loads(stats_file.read_text())) if stats_file.exists() else CompileCacheStats()
+    log_file = _compose_stats_log(cache_dir)
+    if not log_file.exists():
+        return stats
+    for line in log_file.read_text().splitlines():
+        try:
+            delta = CompileCacheStats(**json.loads(line))
+        except (ValueError, TypeError):
+            # written by a launcher that was killed
+            continue
+        stats.hits += delta.hits
+        stats.remote_hits += delta.remote_hits
+        stats.misses += delta.misses
+        stats.uncacheable += delta.uncacheable
+        stats.size += delta.size
+    return stats
+
+
+def _evict(cache_dir: Path, max_size: int) -> int:
+    entries = []
+    entry_files = [*_compose_objects_dir(cache_dir).glob("*/*"), *_compose_manifests_dir(cache_dir).glob("*/*")]
+    for entry_file in entry_files:
+        if entry_file.suffix in _AUXILIARY_SUFFIXES:
+            continue
+        stat = entry_file.stat()
+        entries.append((stat.st_mtime_ns, stat.st_size, entry_file))
+    size = sum(entry_size for _, entry_size, _ in entries)
+    evicted = 0
+    for _, entry_size, entry_file in sorted(entries):
+        if size <= max_size:
+            break
+        entry_file.unlink()
+        entry_file.with_suffix(".stderr").unlink(missing_ok=True)
+        size -= entry_size
+        evicted += 1
+    stats = _load_stats(cache_dir)
+    stats.size = size
+    _store_stats(cache_dir, stats)
+    return evicted
+
+
+def _store_stats(cache_dir: Path, stats: CompileCacheStats) -> None:
+    # the stored statistics include the logged changes, which requires the exclusive lock of the cache
+    stats_file = _compose_stats_file(cache_dir)
+    tmp_stats_file = stats_file.with_suffix(".tmp")
+    tmp_stats_file.write_text(json.dumps(asdict(stats)))
+    tmp_stats_file.replace(stats_file)
+    _compose_stats_log(cache_dir).unlink(missing_ok=True)
+
+
+def _compose_objects_dir(cache_dir: Path) -> Path:
+    return cache_dir / "objects"
+
+
+def _compose_manifests_dir(cache_dir: Path) -> Path:
+    return cache_dir / "manifests"
+
+
+def _compose_stats_file(cache_dir: Path) -> Path:
+    return cache_dir / "stats.json"
+
+
+def _compose_stats_log(cache_dir: Path) -> Path:
+    return cache_dir / "stats.log"
@@ -0,0 +1,127 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import base64
+import hashlib
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+# Environment variable holding the shared token compile workers authenticate their clients with
+COMPILE_WORKER_TOKEN_ENV_VAR = "CPD_COMPILE_WORKER_TOKEN"  # noqa: S105
+
+
+@dataclass
+class CompileRequest:
+    """A compilation of a preprocessed translation unit dispatched to a compile worker."""
+
+    toolchain: str | None
+    compiler: str
+    flags: list[str]
+    source: bytes
+
+    def to_json(self) -> bytes:
+        """Serialize the request for the transfer to the worker."""
+        return json.dumps({**asdict(self), "source": base64.b64encode(self.source).decode()}).encode()
+
+    @staticmethod
+    def from_json(data: bytes) -> "CompileRequest":
+        """Deserialize a request received by the worker."""
+        fields = json.loads(data)
+        return CompileRequest(**{**fields, "source": base64.b64decode(fields["source"])})
+
+
+@dataclass
+class CompileResponse:
+    """The result of a compilation executed by a compile worker."""
+
+    returncode: int
+    stderr: bytes
+    output: bytes
+
+    def to_json(self) -> bytes:
+        """Serialize the response for the transfer to the client."""
+        return json.dumps(
+            {
+                "returncode": self.returncode,
+                "stderr": base64.b64encode(self.stderr).decode(),
+                "output": base64.b64encode(self.output).decode(),
+            },
+        ).encode()
+
+    @staticmethod
+    def from_json(data: bytes) -> "CompileResponse":
+        """Deserialize a response received by the client."""
+        fields = json.loads(data)
+        return CompileResponse(
+            returncode=fields["returncode"],
+            stderr=base64.b64decode(fields["stderr"]),
+            output=base64.b64decode(fields["output"]),
+        )
+
+
+def compose_worker_authorization(token: str) -> str:
+    """Compose the Authorization header of requests to a compile worker sharing the token."""
+    return f"Bearer {token}"
+
+
+def compile_remotely(workers: list[str], request: CompileRequest, output: Path) -> tuple[int, bytes] | None:
+    """Dispatch a compilation to the first compile worker accepting it.
+
+    Returns None if no worker accepted the compilation or if it failed, which is then run locally.
+    """
+    token = os.environ.get(COMPILE_WORKER_TOKEN_ENV_VAR)
+    if token is None:
+        # the workers reject all compilations without their token
+        return None
+    import urllib.request  # noqa: PLC0415
+
+    data = request.to_json()
+    headers = {"Authorization": compose_worker_authorization(token)}
+    # the first worker is chosen by the output to spread the compilations evenly across the workers
+    offset = int(hashlib.sha256(str(output).encode()).hexdigest(), 16) % len(workers)
+    for worker in workers[offset:] + workers[:offset]:
+        http_request = urllib.request.Request(f"http://{worker}/compile", data=data, headers=headers, method="POST")
+        try:
+            with urllib.request.urlopen(http_request, timeout=_WORKER_TIMEOUT) as response:  # noqa: S310
+                compile_response = CompileResponse.from_json(response.read())
+        except (OSError, ValueError, KeyError):
+            # saturated workers reply with 503 and rejected compilations with 401/403, raised as HTTPError
+            continue
+        if compile_response.returncode != 0:
+            # errors are reported by the local compilation referring to the original source files
+            return None
+        output.write_bytes(compile_response.output)
+        sys.stderr.buffer.write(compile_response.stderr)
+        return 0, compile_response.stderr
+    return None
+
+
+def strip_include_flags(flags: list[str]) -> list[str]:
+    """Strip the flags resolved by the preprocessing from the flags of a compilation sent to a worker."""
+    # include directories and forced includes (e.g. precompiled headers) do not exist on the workers
+    stripped = []
+    skip_next = False
+    for flag in flags:
+        if skip_next:
+            skip_next = False
+        elif flag == "-include":
+            skip_next = True
+        elif not flag.startswith(("-I", "-isystem", "-include")):
+            stripped.append(flag)
+    return stripped
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_WORKER_TIMEOUT = 600.0
@@ -0,0 +1,283 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import hmac
+import json
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import urllib.request
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from .compile_cache import CompileRequest, CompileResponse, compose_worker_authorization
+
+# Compile workers execute compilations of preprocessed translation units on behalf of cpd builds:
+# POST /compile takes a JSON encoded CompileRequest and replies with a CompileResponse, or with 503
+# if all slots of the worker are busy. GET /status replies with the number of slots of the worker.
+# Compilations require the shared token of the worker and are restricted to allowed compilers and flags,
+# as the worker would otherwise execute arbitrary programs for anybody reaching it.
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+# Resolves the locked toolchain (or None for the system compiler) and the compiler name of a request
+# to the compiler executable of the worker.
+ToolchainResolver = Callable[[str | None, str], str]
+
+# Compilers available to requests without a locked toolchain unless configured otherwise
+DEFAULT_WORKER_COMPILERS = ("c++", "g++", "clang++")
+
+
+@dataclass
+class CompileWorkerConfig:
+    """Access control of a compile worker."""
+
+    # shared secret clients authenticate with
+    token: str
+    # compilers requests without a locked toolchain may use, compilers of locked toolchains are matched by name
+    compilers: list[str] = field(default_factory=lambda: list(DEFAULT_WORKER_COMPILERS))
+    # identifiers of the locked toolchain packages requests may use
+    toolchains: list[str] = field(default_factory=list)
+
+
+def resolve_system_compiler(toolchain: str | None, compiler: str) -> str:
+    """Resolve requests without a locked toolchain to the compiler of the same name on the worker."""
+    if toolchain is not None:
+        raise RuntimeError(f"Toolchain {toolchain} is not available on this worker.")
+    resolved = shutil.which(compiler)
+    if resolved is None:
+        raise RuntimeError(f"Compiler {compiler} is not available on this worker.")
+    return resolved
+
+
+def serve_compile_worker(
+    config: CompileWorkerConfig,
+    slots: int,
+    resolver: ToolchainResolver,
+    host: str,
+    port: int,
+) -> None:
+    """Serve compilations in the foreground until interrupted."""
+    with _create_server(config, slots, resolver, host, port) as server:
+        server.serve_forever()
+
+
+@contextmanager
+def run_compile_worker(
+    config: CompileWorkerConfig,
+    slots: int,
+    resolver: ToolchainResolver = resolve_system_compiler,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> Generator[str]:
+    """Run a compile worker in a background thread and provide its address (host:port).
+
+    A free port is chosen if the port is 0.
+    """
+    with _create_server(config, slots, resolver, host, port) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"{host}:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+            thread.join()
+
+
+def fetch_worker_slots(worker: str) -> int | None:
+    """Fetch the number of compilation slots of a worker or return None if it is unreachable."""
+    try:
+        with urllib.request.urlopen(f"http://{worker}/status", timeout=_STATUS_TIMEOUT) as response:
+            return int(json.loads(response.read())["slots"])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_STATUS_TIMEOUT = 2.0
+
+# Flags allowed on workers: optimization, debug information, code generation, warnings, defines and the standard.
+# All other flags are rejected as they may read or write files of the worker (e.g. -fprofile-use=, -ftime-trace=,
+# -save-temps), load plugins or alter the compiler driver (e.g. -B, -mllvm), or add further inputs.
+_ALLOWED_FEATURE_FLAGS = (
+    "PIC",
+    "PIE",
+    "pic",
+    "pie",
+    "asynchronous-unwind-tables",
+    "builtin",
+    "char8_t",
+    "common",
+    "coroutines",
+    "data-sections",
+    "exceptions",
+    "fast-math",
+    "function-sections",
+    "inline-functions",
+    "lto",
+    "omit-frame-pointer",
+    "openmp",
+    "plt",
+    "rtti",
+    "semantic-interposition",
+    "signed-char",
+    "stack-clash-protection",
+    "stack-protector",
+    "stack-protector-all",
+    "stack-protector-strong",
+    "strict-aliasing",
+    "threadsafe-statics",
+    "trapv",
+    "tree-vectorize",
+    "unroll-loops",
+    "unsigned-char",
+    "unwind-tables",
+    "visibility-inlines-hidden",
+    "wrapv",
+)
+_ALLOWED_FLAG_PATTERN = re.compile(
+    "|".join(
+        [
+            r"-O[0-3sgz]?|-Ofast",
+            r"-g[0-3]?|-ggdb[0-3]?|-gdwarf(-[2-5])?|-gsplit-dwarf(=(single|split))?|-g(no-)?(gnu-)?pubnames|-gz",
+            r"-std=(c|gnu)\+\+\w+",
+            r"-[DU][A-Za-z_]\w*(=.*)?",
+            r"-w|-W(no-)?(error=)?[a-z][a-z0-9+-]*(=\d+)?|-pedantic(-errors)?",
+            r"-pthread|-m(32|64)|-m(arch|tune|cpu)=[\w.-]+",
+            r"-f(no-)?(" + "|".join(_ALLOWED_FEATURE_FLAGS) + ")",
+            r"-f(no-)?sanitize(-recover|-trap)?=[\w,-]+",
+            r"-f(visibility|lto|cf-protection|diagnostics-color)=[\w-]+",
+            r"-f(template|constexpr)-depth=\d+",
+            # the prefix maps only rewrite the paths recorded in the object file
+            r"-f(file|debug|macro)-prefix-map=[^=]*=.*",
+        ],
+    ),
+)
+
+
+class _CompileWorkerHandler(BaseHTTPRequestHandler):
+    def __init__(
+        self,
+        *args: Any,  # noqa: ANN401
+        config: CompileWorkerConfig,
+        slots: threading.BoundedSemaphore,
+        slot_count: int,
+        resolver: ToolchainResolver,
+        **kwargs: Any,  # noqa: ANN401
+    ) -> None:
+        self._config = config
+        self._slots = slots
+        self._slot_count = slot_count
+        self._resolver = resolver
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self) -> None:
+        """Report the number of slots of the worker."""
+        if self.path != "/status":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        self._send_content(json.dumps({"slots": self._slot_count}).encode())
+
+    def do_POST(self) -> None:
+        """Compile a preprocessed translation unit if a slot is available."""
+        if self.path != "/compile":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        authorization = self.headers.get("Authorization", "")
+        if not hmac.compare_digest(authorization, compose_worker_authorization(self._config.token)):
+            self.send_error(HTTPStatus.UNAUTHORIZED)
+            return
+        request = CompileRequest.from_json(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        rejection = _check_request(self._config, request)
+        if rejection is not None:
+            self.send_error(HTTPStatus.FORBIDDEN, rejection)
+            return
+        if not self._slots.acquire(blocking=False):
+            self.send_error(HTTPStatus.SERVICE_UNAVAILABLE)
+            return
+        try:
+            response = _compile(self._resolver(request.toolchain, request.compiler), request)
+        except RuntimeError as e:
+            self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+            return
+        finally:
+            self._slots.release()
+        self._send_content(response.to_json())
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Suppress the request logging."""
+
+    def _send_content(self, content: bytes) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def _check_request(config: CompileWorkerConfig, request: CompileRequest) -> str | None:
+    if request.toolchain is None:
+        if request.compiler not in config.compilers:
+            return f"Compiler {request.compiler} is not allowed on this worker."
+    elif request.toolchain not in config.toolchains:
+        return f"Toolchain {request.toolchain} is not allowed on this worker."
+    elif Path(request.compiler).name not in {Path(compiler).name for compiler in config.compilers}:
+        return f"Compiler {request.compiler} is not allowed on this worker."
+    rejected_flag = _find_rejected_flag(request.flags)
+    if rejected_flag is not None:
+        return f"Flag {rejected_flag} is not allowed on this worker."
+    return None
+
+
+def _find_rejected_flag(flags: list[str]) -> str | None:
+    return next((flag for flag in flags if _ALLOWED_FLAG_PATTERN.fullmatch(flag) is None), None)
+
+
+def _compile(compiler: str, request: CompileRequest) -> CompileResponse:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # the suffix tells the compiler that the source is preprocessed already
+        source = Path(tmp_dir) / "tu.ii"
+        output = Path(tmp_dir) / "tu.o"
+        source.write_bytes(request.source)
+        result = subprocess.run(  # noqa: S603
+            [compiler, *request.flags, "-c", str(source), "-o", str(output)],
+            capture_output=True,
+            check=False,
+        )
+        return CompileResponse(
+            returncode=result.returncode,
+            stderr=result.stderr,
+            output=output.read_bytes() if result.returncode == 0 else b"",
+        )
+
+
+def _create_server(
+    config: CompileWorkerConfig,
+    slots: int,
+    resolver: ToolchainResolver,
+    host: str,
+    port: int,
+) -> ThreadingHTTPServer:
+    handler = partial(
+        _CompileWorkerHandler,
+        config=config,
+        slots=threading.BoundedSemaphore(slots),
+        slot_count=slots,
+        resolver=resolver,
+    )
+    return ThreadingHTTPServer((host, port), handler)
@@ -0,0 +1,143 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import hashlib
+import os
+import shutil
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from cpp_dev.common.types import CppStandard
+from cpp_dev.common.utils import ensure_dir_exists
+from cpp_dev.dependency.provider import DependencyIdentifier, DependencyProvider
+from cpp_dev.dependency.specifier import DependencySpecifier
+from cpp_dev.project.lockfile import load_lock_file
+from cpp_dev.project.path_composition import compose_project_lock_file
+from cpp_dev.tool.store import install_tree
+
+from .engine import BuildConfig
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class PreparedDependencies(BaseModel):
+    """The locked dependencies of a project materialized into its build directory."""
+
+    lock_digest: str
+    package_dirs: dict[str, Path]
+
+
+def load_prepared_dependencies(project_dir: Path, build_dir: Path) -> PreparedDependencies | None:
+    """Load the prepared dependencies if they are up-to-date with the lock file of the project."""
+    record_file = _compose_record_file(build_dir)
+    if not record_file.exists():
+        return None
+    prepared = PreparedDependencies.model_validate_json(record_file.read_text())
+    if prepared.lock_digest != _compute_lock_digest(project_dir):
+        return None
+    return prepared
+
+
+def prepare_dependencies(
+    project_dir: Path,
+    build_dir: Path,
+    dependency_provider: DependencyProvider,
+    store_dir: Path,
+) -> PreparedDependencies:
+    """Install the locked dependencies and materialize them into the build directory.
+
+    Packages are materialized through the content-addressed store such that files shared by
+    multiple projects are hardlinked instead of copied. Packages no longer locked are removed.
+    """
+    lock_digest = _compute_lock_digest(project_dir)
+    deps = [
+        DependencySpecifier(f"{package.repository}/{package.name}[{package.version}]")
+        for package in load_lock_file(project_dir).packages
+    ]
+    installed = dependency_provider.install_dependencies(deps) if deps else []
+    deps_dir = _compose_deps_dir(build_dir)
+    package_dirs = {}
+    for dep in installed:
+        target_dir = deps_dir / dep.id.name
+        install_tree(store_dir, f"{dep.id}@{dep.package_dir}", dep.package_dir, target_dir)
+        package_dirs[str(dep.id)] = target_dir
+    _remove_obsolete_packages(deps_dir, {package_dir.name for package_dir in package_dirs.values()})
+
+    prepared = PreparedDependencies(lock_digest=lock_digest, package_dirs=package_dirs)
+    record_file = _compose_record_file(build_dir)
+    ensure_dir_exists(record_file.parent)
+    record_file.write_text(prepared.model_dump_json(indent=2))
+    return prepared
+
+
+def create_build_config(std: CppStandard, prepared: PreparedDependencies) -> BuildConfig:
+    """Create the build configuration from the prepared dependencies.
+
+    Headers and libraries of all packages are made available to the build, except for toolchain
+    packages: the compiler of the LLVM package is used if available, the environment variable
+    CXX or the system compiler otherwise. The locked LLVM package identifies the toolchain for the
+    compilation cache and provides ld.lld for fast linking.
+    """
+    config = BuildConfig(std=std, compiler=os.environ.get("CXX", "c++"), dependency_digest=prepared.lock_digest)
+    for dep_id, package_dir in sorted(prepared.package_dirs.items()):
+        name = DependencyIdentifier.from_str(dep_id).name
+        if name in _TOOLCHAIN_PACKAGES:
+            compiler = package_dir / "bin" / "clang++"
+            if compiler.exists():
+                config.compiler = str(compiler)
+                config.toolchain_id = dep_id
+            linker = package_dir / "bin" / "ld.lld"
+            if linker.exists():
+                config.linker = str(linker)
+            continue
+        if (package_dir / "include").is_dir():
+            config.include_dirs.append(package_dir / "include")
+        lib_dir = package_dir / "lib"
+        if lib_dir.is_dir():
+            config.lib_dirs.append(lib_dir)
+            config.libs.extend(_collect_library_names(lib_dir))
+    return config
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Packages providing the toolchain instead of libraries to link against
+_TOOLCHAIN_PACKAGES = {"llvm"}
+
+_LIBRARY_SUFFIXES = (".a", ".so")
+
+
+def _compute_lock_digest(project_dir: Path) -> str:
+    return hashlib.sha256(compose_project_lock_file(project_dir).read_bytes()).hexdigest()
+
+
+def _collect_library_names(lib_dir: Path) -> list[str]:
+    names = {
+        lib_file.name.removeprefix("lib").split(".")[0]
+        for lib_file in lib_dir.iterdir()
+        if lib_file.name.startswith("lib") and lib_file.suffix in _LIBRARY_SUFFIXES
+    }
+    return sorted(names)
+
+
+def _remove_obsolete_packages(deps_dir: Path, package_names: set[str]) -> None:
+    if not deps_dir.exists():
+        return
+    for package_dir in deps_dir.iterdir():
+        if package_dir.name not in package_names:
+            shutil.rmtree(package_dir)
+
+
+def _compose_deps_dir(build_dir: Path) -> Path:
+    return build_dir / "deps"
+
+
+def _compose_record_file(build_dir: Path) -> Path:
+    return build_dir / "deps.json"
@@ -0,0 +1,610 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import hashlib
+import os
+import shlex
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from cpp_dev.common.types import CppStandard
+from cpp_dev.common.utils import ensure_dir_exists
+from cpp_dev.project.path_composition import compose_build_dir, compose_include_file, compose_source_file
+
+from .build_report import BuildReport, report_build
+from .compilation_database import CompileCommand, compose_compilation_database, write_compilation_database
+from .compile_cache import (
+    DEFAULT_COMPILE_CACHE_MAX_SIZE,
+    LauncherConfig,
+    compose_launcher_command,
+    load_compile_cache_stats,
+)
+from .compile_worker import fetch_worker_slots
+from .fast_link import (
+    FastLinkConfig,
+    LinkTimeReport,
+    compose_fast_link_cxxflags,
+    compose_fast_link_ldflags,
+    report_link_time,
+    supports_fast_link,
+)
+from .memory import find_heavy_compilations, plan_memory
+from .ninja import Jobserver, NinjaBuildError, NinjaFileWriter, compose_build_file, run_ninja
+from .pch import (
+    PrecompiledHeader,
+    PrecompiledHeaderReport,
+    compose_precompiled_header_output,
+    compose_precompiled_header_source,
+    plan_precompiled_headers,
+    report_precompiled_headers,
+    write_precompiled_header_sources,
+)
+from .remote_cache import RemoteCacheResult, upload_in_background
+from .sources import SourceFiles, collect_source_files
+from .targets import compose_library_target, compose_test_target
+from .time_trace import TimeTraceReport, report_time_trace, supports_time_trace
+from .unity import (
+    UnityBatch,
+    UnityReport,
+    compose_unity_source,
+    find_unity_collisions,
+    isolate_unity_sources,
+    plan_unity_batches,
+    report_unity_build,
+    write_unity_sources,
+)
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+@dataclass
+class BuildConfig:
+    """Toolchain and dependency settings of a project build."""
+
+    std: CppStandard = "c++20"
+    compiler: str = "c++"
+    archiver: str = "ar"
+    cxxflags: list[str] = field(default_factory=list)
+    ldflags: list[str] = field(default_factory=lambda: ["-pthread"])
+    include_dirs: list[Path] = field(default_factory=list)
+    lib_dirs: list[Path] = field(default_factory=list)
+    libs: list[str] = field(default_factory=list)
+    # identity of the locked toolchain package, the compiler executable identifies the toolchain otherwise
+    toolchain_id: str | None = None
+    # ld.lld of the locked toolchain package
+    linker: str | None = None
+    # compilations are run through the compilation cache if a cache directory is set
+    compile_cache_dir: Path | None = None
+    compile_cache_max_size: int = DEFAULT_COMPILE_CACHE_MAX_SIZE
+    # digest of the locked dependencies identifying the libraries linked into binaries
+    dependency_digest: str | None = None
+    # objects and test binaries are shared through a remote HTTP cache if set (requires the compilation cache)
+    remote_cache_url: str | None = None
+    # compilations are distributed to these compile workers (host:port, requires the compilation cache)
+    compile_workers: list[str] = field(default_factory=list)
+    # frequently included external headers are precompiled for the translation units including them
+    precompiled_headers: bool = True
+    # sources are compiled in batches of multiple sources per translation unit
+    unity: bool = False
+    # translation units are compiled with -ftime-trace (clang only), bypassing the compilation cache
+    time_trace: bool = False
+    # local compilations are admitted against the available memory by the peak memory recorded in previous
+    # builds (requires the compilation cache)
+    memory_scheduling: bool = True
+    # binaries are linked by lld with split DWARF and a gdb index, optimized builds use ThinLTO (requires the linker)
+    fast_link: FastLinkConfig | None = None
+
+
+@dataclass
+class BuildPlan:
+    """Precompiled headers and unity batches of a build as planned before generating the build file."""
+
+    precompiled_headers: list[PrecompiledHeader] = field(default_factory=list)
+    unity_batches: list[UnityBatch] = field(default_factory=list)
+    # object files of compilations needing much memory, which are placed first in the build file
+    heavy_compilations: list[str] = field(default_factory=list)
+
+
+@dataclass
+class BuildResult:
+    """Result of a project build."""
+
+    build_dir: Path
+    regenerated: bool
+    library: Path
+    test_binary: Path | None
+    remote_cache: RemoteCacheResult | None = None
+    precompiled_headers: list[PrecompiledHeaderReport] = field(default_factory=list)
+    unity: UnityReport | None = None
+    time_trace: TimeTraceReport | None = None
+    link_time: LinkTimeReport | None = None
+    # None if the build did not execute any build statement
+    report: BuildReport | None = None
+
+
+def generate_build_file(
+    project_dir: Path,
+    name: str,
+    config: BuildConfig,
+    build_dir: Path,
+    plan: BuildPlan | None = None,
+) -> bool:
+    """Generate the Ninja build file for the project in the build directory.
+
+    The build file is only re-generated if the set of source files, the build plan or the build
+    configuration changed. Changes of file contents (including headers) are tracked by Ninja itself.
+    Returns True if the build file was (re-)generated.
+    """
+    inputs = _BuildInputs(collect_source_files(project_dir, name), plan or BuildPlan())
+    fingerprint = _compute_fingerprint(project_dir, name, config, inputs)
+    build_file = compose_build_file(build_dir)
+    if _read_fingerprint(build_file) == fingerprint:
+        return False
+    ensure_dir_exists(build_dir)
+    tmp_build_file = build_file.with_suffix(".tmp")
+    tmp_build_file.write_text(_compose_build_file_content(project_dir, name, config, inputs, fingerprint))
+    tmp_build_file.replace(build_file)
+    return True
+
+
+def generate_compilation_database(project_dir: Path, name: str, config: BuildConfig, build_dir: Path) -> bool:
+    """Generate the compilation database of the project sources for tools like clangd.
+
+    The database lists the plain compiler invocation of each source, i.e. without the compilation cache,
+    precompiled headers or unity batches. The dependency include paths of the locked packages are part
+    of the flags. Returns True if the database was (re-)written.
+    """
+    source_files = collect_source_files(project_dir, name)
+    cxxflags = _compose_cxxflags(project_dir, name, config)
+    commands = []
+    for source in [*source_files.library_sources, *source_files.test_sources]:
+        source_file, object_file = str(project_dir / source), _compose_object_file(source)
+        arguments = [config.compiler, *cxxflags, "-c", source_file, "-o", object_file]
+        commands.append(CompileCommand(file=source_file, arguments=arguments, output=object_file))
+    return write_compilation_database(build_dir, commands)
+
+
+def build_project(
+    project_dir: Path,
+    name: str,
+    config: BuildConfig,
+    build_dir: Path | None = None,
+    jobs: int | Jobserver | None = None,
+) -> BuildResult:
+    """Build the project using Ninja without any intermediate build system.
+
+    The library is built from all non-test sources, the test binary from all test sources. A jobserver
+    shares the jobs with concurrent builds (e.g. of build variants). Raises NinjaBuildError if the build fails.
+    """
+    build_dir = build_dir if build_dir is not None else compose_build_dir(project_dir)
+    if config.time_trace and not supports_time_trace(config.compiler):
+        raise RuntimeError(f"Compile-time profiling requires clang, but the compiler is {config.compiler}.")
+    if config.fast_link is not None and not supports_fast_link(config.compiler, config.linker):
+        raise RuntimeError("Fast linking requires clang and ld.lld of a locked LLVM package.")
+    if jobs is None and config.compile_cache_dir is not None and config.compile_workers:
+        # the compilations are distributed to the local CPUs and the slots of all reachable workers
+        jobs = (os.cpu_count() or 1) + sum(fetch_worker_slots(worker) or 0 for worker in config.compile_workers)
+    plan = _plan_build(project_dir, name, config, build_dir, jobs)
+    regenerated = generate_build_file(project_dir, name, config, build_dir, plan)
+    # the database depends on the same inputs as the build file
+    if regenerated or not compose_compilation_database(build_dir).exists():
+        generate_compilation_database(project_dir, name, config, build_dir)
+    cold = _is_cold_build(project_dir, name, build_dir, plan)
+    test_binary = build_dir / compose_test_target(name)
+    test_binary_mtime_ns = test_binary.stat().st_mtime_ns if test_binary.exists() else None
+    start = time.monotonic()
+    build_start_ns = time.time_ns()
+    try:
+        remote_cache = _run_build(project_dir, config, build_dir, jobs)
+    except NinjaBuildError as e:
+        # colliding sources of failed unity batches are compiled separately in a second attempt
+        if not _isolate_unity_collisions(project_dir, name, config, plan, e):
+            raise
+        plan = _plan_build(project_dir, name, config, build_dir, jobs)
+        regenerated = generate_build_file(project_dir, name, config, build_dir, plan) or regenerated
+        # the times of the Ninja log are relative to the start of the second build
+        build_start_ns = time.time_ns()
+        remote_cache = _run_build(project_dir, config, build_dir, jobs)
+    cold_build_ms = round((time.monotonic() - start) * 1000) if cold else None
+    report = report_build(build_dir, build_start_ns, _count_jobs(jobs))
+    unity_report = None
+    # the compile durations are also recorded in the normal mode to compare against, unless nothing was compiled
+    if config.unity or report is not None:
+        unity_report = report_unity_build(project_dir, name, build_dir, plan.unity_batches, cold_build_ms)
+    time_trace = None
+    if config.time_trace:
+        time_trace = report_time_trace(build_dir, _collect_object_files(project_dir, name, plan))
+    link_time = report_link_time(
+        build_dir,
+        compose_test_target(name),
+        test_binary_mtime_ns,
+        fast_link=config.fast_link is not None,
+    )
+    return BuildResult(
+        build_dir=build_dir,
+        regenerated=regenerated,
+        library=build_dir / compose_library_target(name),
+        test_binary=test_binary if test_binary.exists() else None,
+        remote_cache=remote_cache,
+        # the compile durations are also recorded without precompiled headers to compare against
+        precompiled_headers=_report_precompiled_headers(project_dir, name, config, build_dir, plan),
+        unity=unity_report if config.unity else None,
+        time_trace=time_trace,
+        link_time=link_time if test_binary.exists() else None,
+        report=report,
+    )
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Increased whenever the structure of the generated build file changes to force a re-generation
+_GENERATOR_VERSION = 2
+
+_FINGERPRINT_PREFIX = "# cpd-fingerprint: "
+
+# Directory within the build directory receiving the markers of cache entries to upload
+_REMOTE_UPLOAD_DIR = "remote_uploads"
+
+# Directory within the build directory holding the lock files of the local compilation slots
+_LOCAL_SLOT_DIR = "slots"
+
+# Directory within the build directory holding the memory plan and the peak memory of the compilations
+_MEMORY_DIR = "memory"
+
+
+@dataclass
+class _CompileUnit:
+    source_file: str
+    object_file: str
+    precompiled_header: PrecompiledHeader | None
+
+
+@dataclass
+class _BuildInputs:
+    source_files: SourceFiles
+    plan: BuildPlan
+    _precompiled_header_users: dict[str, PrecompiledHeader] | None = field(default=None, init=False, repr=False)
+
+    def compose_compile_units(self, project_dir: Path, sources: list[str]) -> list[_CompileUnit]:
+        batched = {source for batch in self.plan.unity_batches for source in batch.sources}
+        units = [
+            _CompileUnit(
+                os.path.join(project_dir, source),  # noqa: PTH118
+                _compose_object_file(source),
+                self._find_precompiled_header(source),
+            )
+            for source in sources
+            if source not in batched
+        ]
+        for batch in self.plan.unity_batches:
+            if batch.sources[0] in sources:
+                # Ninja runs all commands within the build directory
+                unity_source = str(compose_unity_source(Path(), batch.name))
+                units.append(_CompileUnit(unity_source, _compose_object_file(unity_source), None))
+        # Ninja starts ready build statements in the order of the build file if their priorities are equal
+        ranks = {object_file: rank for rank, object_file in enumerate(self.plan.heavy_compilations)}
+        return sorted(units, key=lambda unit: ranks.get(unit.object_file, len(ranks)))
+
+    def _find_precompiled_header(self, source: str) -> PrecompiledHeader | None:
+        if self._precompiled_header_users is None:
+            self._precompiled_header_users = {
+                tu: precompiled_header
+                for precompiled_header in self.plan.precompiled_headers
+                for tu in precompiled_header.translation_units
+            }
+        return self._precompiled_header_users.get(source)
+
+
+def _plan_build(
+    project_dir: Path,
+    name: str,
+    config: BuildConfig,
+    build_dir: Path,
+    jobs: int | Jobserver | None,
+) -> BuildPlan:
+    # precompiled headers are planned from the include graph, unity batches from the recorded compile durations
+    # and compilations needing much memory are started first
+    plan = BuildPlan()
+    if config.precompiled_headers:
+        command = [config.compiler, *_compose_cxxflags(project_dir, name, config)]
+        plan.precompiled_headers = plan_precompiled_headers(project_dir, name, build_dir, command)
+        write_precompiled_header_sources(build_dir, plan.precompiled_headers)
+    if config.unity:
+        plan.unity_batches = plan_unity_batches(project_dir, name, build_dir, _count_jobs(jobs))
+        write_unity_sources(project_dir, build_dir, plan.unity_batches)
+    if _uses_memory_scheduling(config):
+        plan.heavy_compilations = find_heavy_compilations(plan_memory(build_dir / _MEMORY_DIR))
+    return plan
+
+
+def _count_jobs(jobs: int | Jobserver | None) -> int:
+    num_jobs = jobs.jobs if isinstance(jobs, Jobserver) else jobs
+    return num_jobs or os.cpu_count() or 1
+
+
+def _uses_memory_scheduling(config: BuildConfig) -> bool:
+    # the peak memory is recorded and admitted by the launcher, which is not used for time traces
+    return config.memory_scheduling and config.compile_cache_dir is not None and not config.time_trace
+
+
+def _run_build(
+    project_dir: Path,
+    config: BuildConfig,
+    build_dir: Path,
+    jobs: int | Jobserver | None,
+) -> RemoteCacheResult | None:
+    # unity builds keep going after failures to detect all batches with colliding sources at once
+    keep_going = config.unity
+    if config.compile_cache_dir is None or config.remote_cache_url is None:
+        run_ninja(build_dir, jobs=jobs, keep_going=keep_going)
+        return None
+    # objects missing locally are fetched by the compiler launcher from the remote cache
+    # and new cache entries are uploaded while the build is running
+    remote_cache = RemoteCacheResult()
+    launcher_config = _create_launcher_config(
+        project_dir,
+        config,
+        config.compile_cache_dir,
+        build_dir / _REMOTE_UPLOAD_DIR,
+    )
+    remote_hits = load_compile_cache_stats(config.compile_cache_dir).remote_hits
+    with upload_in_background(launcher_config, remote_cache):
+        run_ninja(build_dir, jobs=jobs, keep_going=keep_going)
+    remote_cache.fetched = load_compile_cache_stats(config.compile_cache_dir).remote_hits - remote_hits
+    return remote_cache
+
+
+def _isolate_unity_collisions(
+    project_dir: Path,
+    name: str,
+    config: BuildConfig,
+    plan: BuildPlan,
+    error: NinjaBuildError,
+) -> bool:
+    # the colliding sources are also compiled separately in all future builds
+    command = [config.compiler, *_compose_cxxflags(project_dir, name, config)]
+    collisions = []
+    for batch in plan.unity_batches:
+        object_file = _compose_object_file(str(compose_unity_source(Path(), batch.name)))
+        if not any(object_file in failed.split(" ") for failed in error.failed_outputs):
+            continue
+        batch_collisions = find_unity_collisions(project_dir, batch, command)
+        if batch_collisions is None:
+            return False
+        collisions.extend(batch_collisions)
+    if not collisions:
+        return False
+    sys.stdout.write(f"Compiling colliding sources separately: {', '.join(collisions)}\n")
+    isolate_unity_sources(error.build_dir, collisions)
+    return True
+
+
+def _is_cold_build(project_dir: Path, name: str, build_dir: Path, plan: BuildPlan) -> bool:
+    return not any((build_dir / object_file).exists() for object_file in _collect_object_files(project_dir, name, plan))
+
+
+def _collect_object_files(project_dir: Path, name: str, plan: BuildPlan) -> list[str]:
+    inputs = _BuildInputs(collect_source_files(project_dir, name), plan)
+    source_files = inputs.source_files
+    units = inputs.compose_compile_units(project_dir, [*source_files.library_sources, *source_files.test_sources])
+    return [unit.object_file for unit in units]
+
+
+def _compute_fingerprint(project_dir: Path, name: str, config: BuildConfig, inputs: _BuildInputs) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{_GENERATOR_VERSION}:{project_dir}:{name}".encode())
+    digest.update(repr(asdict(config)).encode())
+    for file_list in (inputs.source_files.library_sources, inputs.source_files.test_sources):
+        digest.update("\0".join(file_list).encode())
+        digest.update(b"\1")
+    for precompiled_header in inputs.plan.precompiled_headers:
+        digest.update(precompiled_header.model_dump_json(exclude={"estimated_savings_ms"}).encode())
+    for batch in inputs.plan.unity_batches:
+        digest.update(batch.model_dump_json(exclude={"estimated_cost_ms"}).encode())
+    digest.update("\0".join(inputs.plan.heavy_compilations).encode())
+    return digest.hexdigest()
+
+
+def _read_fingerprint(build_file: Path) -> str | None:
+    try:
+        with build_file.open() as f:
+            first_line = f.readline()
+    except FileNotFoundError:
+        return None
+    if not first_line.startswith(_FINGERPRINT_PREFIX):
+        return None
+    return first_line.removeprefix(_FINGERPRINT_PREFIX).strip()
+
+
+def _compose_build_file_content(
+    project_dir: Path,
+    name: str,
+    config: BuildConfig,
+    inputs: _BuildInputs,
+    fingerprint: str,
+) -> str:
+    writer = NinjaFileWriter()
+    writer.comment(f"cpd-fingerprint: {fingerprint}")
+    writer.comment("Generated by cpd: do not edit.")
+    writer.variable("ninja_required_version", "1.10")
+    writer.variable("cxx", shlex.quote(config.compiler))
+    writer.variable("ar", shlex.quote(config.archiver))
+    writer.variable("cxxflags", shlex.join(_compose_cxxflags(project_dir, name, config)))
+    writer.variable("ldflags", shlex.join(_compose_ldflags(config)))
+    writer.variable("libs", shlex.join(_compose_libs(config)))
+    writer.newline()
+
+    writer.rule(
+        "cxx",
+        _compose_compile_command(project_dir, config),
+        depfile="$out.d",
+        deps="gcc",
+        description="CXX $in",
+    )
+    writer.rule(
+        "pch",
+        "$cxx -x c++-header -MD -MF $out.d $cxxflags -c $in -o $out",
+        depfile="$out.d",
+        deps="gcc",
+        description="PCH $in",
+    )
+    writer.rule("ar", "rm -f $out && $ar crs $out $in", description="AR $out")
+    writer.rule("link", _compose_link_command(project_dir, config), description="LINK $out")
+    writer.newline()
+
+    for precompiled_header in inputs.plan.precompiled_headers:
+        writer.build(
+            [compose_precompiled_header_output(precompiled_header.name, config.compiler)],
+            "pch",
+            # Ninja runs all commands within the build directory
+            [str(compose_precompiled_header_source(Path(), precompiled_header.name))],
+        )
+
+    source_files = inputs.source_files
+    library_objects = [
+        _add_compile_statement(writer, config, unit)
+        for unit in inputs.compose_compile_units(project_dir, source_files.library_sources)
+    ]
+    library = compose_library_target(name)
+    writer.build([library], "ar", library_objects)
+    default_targets = [library]
+
+    if source_files.test_sources:
+        test_objects = [
+            _add_compile_statement(writer, config, unit)
+            for unit in inputs.compose_compile_units(project_dir, source_files.test_sources)
+        ]
+        test_binary = compose_test_target(name)
+        writer.build([test_binary], "link", [*test_objects, library])
+        default_targets.append(test_binary)
+
+    writer.newline()
+    writer.default(default_targets)
+    return writer.text()
+
+
+def _add_compile_statement(writer: NinjaFileWriter, config: BuildConfig, unit: _CompileUnit) -> str:
+    precompiled_header = unit.precompiled_header
+    if precompiled_header is None:
+        writer.build([unit.object_file], "cxx", [unit.source_file])
+    else:
+        writer.build(
+            [unit.object_file],
+            "cxx",
+            [unit.source_file],
+            implicit=[compose_precompiled_header_output(precompiled_header.name, config.compiler)],
+            variables={"pchflags": shlex.join(_compose_pchflags(unit))},
+        )
+    return unit.object_file
+
+
+def _compose_pchflags(unit: _CompileUnit) -> list[str]:
+    if unit.precompiled_header is None:
+        return []
+    # the compiler picks up the precompiled header next to the header included relative to the build directory
+    return ["-include", str(compose_precompiled_header_source(Path(), unit.precompiled_header.name))]
+
+
+def _compose_compile_command(project_dir: Path, config: BuildConfig) -> str:
+    if config.time_trace:
+        # clang writes the trace next to the object file, which is not restored by the compilation cache
+        return "$cxx -MD -MF $out.d $cxxflags $pchflags -ftime-trace -c $in -o $out"
+    launcher = _compose_launcher(project_dir, config)
+    if launcher is None:
+        return "$cxx -MD -MF $out.d $cxxflags $pchflags -c $in -o $out"
+    return f"{launcher} --output $out --depfile $out.d --source $in -- $cxx $cxxflags $pchflags"
+
+
+def _compose_link_command(project_dir: Path, config: BuildConfig) -> str:
+    launcher = _compose_launcher(project_dir, config)
+    if launcher is None:
+        return "$cxx $in -o $out $ldflags $libs"
+    return f"{launcher} --link --output $out -- $cxx $in -o $out $ldflags $libs"
+
+
+def _compose_launcher(project_dir: Path, config: BuildConfig) -> str | None:
+    if config.compile_cache_dir is None:
+        return None
+    # Ninja runs all commands within the build directory
+    launcher_config = _create_launcher_config(project_dir, config, config.compile_cache_dir, Path(_REMOTE_UPLOAD_DIR))
+    return shlex.join(compose_launcher_command(launcher_config))
+
+
+def _create_launcher_config(
+    project_dir: Path,
+    config: BuildConfig,
+    cache_dir: Path,
+    upload_dir: Path,
+) -> LauncherConfig:
+    return LauncherConfig(
+        cache_dir=cache_dir,
+        base_dir=project_dir,
+        max_size=config.compile_cache_max_size,
+        toolchain_id=config.toolchain_id,
+        dependency_digest=config.dependency_digest,
+        remote_url=config.remote_cache_url,
+        upload_dir=upload_dir,
+        workers=config.compile_workers,
+        # Ninja runs all commands within the build directory
+        slot_dir=Path(_LOCAL_SLOT_DIR),
+        memory_dir=Path(_MEMORY_DIR) if _uses_memory_scheduling(config) else None,
+    )
+
+
+def _report_precompiled_headers(
+    project_dir: Path,
+    name: str,
+    config: BuildConfig,
+    build_dir: Path,
+    plan: BuildPlan,
+) -> list[PrecompiledHeaderReport]:
+    source_files = collect_source_files(project_dir, name)
+    object_files = {
+        source: _compose_object_file(source) for source in [*source_files.library_sources, *source_files.test_sources]
+    }
+    return report_precompiled_headers(build_dir, plan.precompiled_headers, object_files, config.compiler)
+
+
+def _compose_cxxflags(project_dir: Path, name: str, config: BuildConfig) -> list[str]:
+    include_dirs = [compose_include_file(project_dir, name).parent, compose_source_file(project_dir)]
+    return [
+        f"-std={config.std}",
+        *config.cxxflags,
+        *(compose_fast_link_cxxflags(config.cxxflags) if config.fast_link is not None else []),
+        *(f"-I{include_dir}" for include_dir in include_dirs),
+        *(f"-isystem{include_dir}" for include_dir in config.include_dirs),
+        # cached objects are shared across checkouts, so they must not contain the location of the project
+        *([f"-ffile-prefix-map={project_dir}=."] if config.compile_cache_dir is not None else []),
+    ]
+
+
+def _compose_ldflags(config: BuildConfig) -> list[str]:
+    fast_link_flags = []
+    if config.fast_link is not None and config.linker is not None:
+        fast_link_flags = compose_fast_link_ldflags(config.cxxflags, config.linker, config.fast_link)
+    return [
+        *config.ldflags,
+        *fast_link_flags,
+        *(f"-L{lib_dir}" for lib_dir in config.lib_dirs),
+        # shared libraries of dependencies are found without setting LD_LIBRARY_PATH
+        *(f"-Wl,-rpath,{lib_dir}" for lib_dir in config.lib_dirs),
+    ]
+
+
+def _compose_libs(config: BuildConfig) -> list[str]:
+    if not config.libs:
+        return []
+    # a link group resolves the libraries independent of their order
+    return ["-Wl,--start-group", *(f"-l{lib}" for lib in config.libs), "-Wl,--end-group"]
+
+
+def _compose_object_file(source: str) -> str:
+    return f"obj/{source}.o"
@@ -0,0 +1,129 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from .ninja import read_ninja_log
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+DEFAULT_THINLTO_CACHE_MAX_SIZE = 2 * 1024**3
+
+
+@dataclass
+class FastLinkConfig:
+    """Settings of linking with lld, split DWARF and the ThinLTO cache."""
+
+    # threads used by lld (all CPUs if None)
+    threads: int | None = None
+    # ThinLTO caches the optimized modules of optimized builds in this directory if set
+    thinlto_cache_dir: Path | None = None
+    thinlto_cache_max_size: int = DEFAULT_THINLTO_CACHE_MAX_SIZE
+
+
+class LinkTimeReport(BaseModel):
+    """Comparison of the link time of a binary with and without fast linking."""
+
+    binary: str
+    # duration of the last link in the respective mode (None if not measured yet)
+    fast_link_ms: int | None
+    normal_link_ms: int | None
+
+
+def supports_fast_link(compiler: str, linker: str | None) -> bool:
+    """Check if the toolchain supports fast linking, which requires clang and ld.lld of the LLVM package."""
+    return linker is not None and "clang" in Path(compiler).name
+
+
+def compose_fast_link_cxxflags(cxxflags: list[str]) -> list[str]:
+    """Compose the compile flags for fast linking on top of the flags of the build.
+
+    Debug information is split into sections the linker skips (kept within the object files, such that the
+    compilation cache restores them), and the names for the gdb index are emitted. Optimized builds use ThinLTO.
+    """
+    flags = []
+    if _has_debug_info(cxxflags):
+        flags.extend(["-gsplit-dwarf=single", "-ggnu-pubnames"])
+    if _is_optimized(cxxflags):
+        flags.append("-flto=thin")
+    return flags
+
+
+def compose_fast_link_ldflags(cxxflags: list[str], linker: str, config: FastLinkConfig) -> list[str]:
+    """Compose the link flags for linking with lld on top of the flags of the build."""
+    flags = ["-fuse-ld=lld", f"--ld-path={linker}"]
+    if config.threads is not None:
+        flags.append(f"-Wl,--threads={config.threads}")
+    if _has_debug_info(cxxflags):
+        flags.append("-Wl,--gdb-index")
+    if _is_optimized(cxxflags):
+        flags.append("-flto=thin")
+        if config.thinlto_cache_dir is not None:
+            # lld prunes the least-recently used entries once the cache exceeds the size
+            flags.extend(
+                [
+                    f"-Wl,--thinlto-cache-dir={config.thinlto_cache_dir}",
+                    f"-Wl,--thinlto-cache-policy=cache_size_bytes={config.thinlto_cache_max_size}",
+                ],
+            )
+    return flags
+
+
+def report_link_time(build_dir: Path, binary: str, previous_mtime_ns: int | None, *, fast_link: bool) -> LinkTimeReport:
+    """Record the link time of a binary per link mode and compare both modes.
+
+    The duration is taken from the Ninja log if the binary was linked by the last build, i.e. its
+    modification time differs from the one before the build.
+    """
+    link_times = _load_link_times(build_dir)
+    binary_file = build_dir / binary
+    entry = read_ninja_log(build_dir).get(binary)
+    if entry is not None and binary_file.exists() and binary_file.stat().st_mtime_ns != previous_mtime_ns:
+        link_times[_FAST_LINK if fast_link else _NORMAL_LINK] = entry.duration_ms
+        _compose_link_times_file(build_dir).write_text(json.dumps(link_times))
+    return LinkTimeReport(
+        binary=binary,
+        fast_link_ms=link_times.get(_FAST_LINK),
+        normal_link_ms=link_times.get(_NORMAL_LINK),
+    )
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_FAST_LINK = "fast"
+_NORMAL_LINK = "normal"
+
+# The last optimization level given wins, -O1 and -Og are meant for debugging (e.g. with sanitizers)
+_OPTIMIZED_LEVELS = {"-O2", "-O3", "-Os", "-Oz", "-Ofast"}
+
+
+def _has_debug_info(cxxflags: list[str]) -> bool:
+    debug_flags = [flag for flag in cxxflags if flag.startswith("-g") and flag != "-ggnu-pubnames"]
+    return bool(debug_flags) and debug_flags[-1] != "-g0"
+
+
+def _is_optimized(cxxflags: list[str]) -> bool:
+    levels = [flag for flag in cxxflags if flag.startswith("-O")]
+    return bool(levels) and levels[-1] in _OPTIMIZED_LEVELS
+
+
+def _load_link_times(build_dir: Path) -> dict[str, int]:
+    link_times_file = _compose_link_times_file(build_dir)
+    if not link_times_file.exists():
+        return {}
+    link_times: dict[str, int] = json.loads(link_times_file.read_text())
+    return link_times
+
+
+def _compose_link_times_file(build_dir: Path) -> Path:
+    return build_dir / "link_times.json"
@@ -0,0 +1,233 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import hashlib
+import os
+import re
+from collections.abc import Iterable
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from cpp_dev.common.utils import ensure_dir_exists
+from cpp_dev.project.path_composition import compose_include_file, compose_source_file
+
+from .sources import SourceFiles, collect_source_files
+from .targets import compose_test_target
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class IncludeGraphNode(BaseModel):
+    """A file of the include graph with the project files it includes directly.
+
+    Includes not resolved to project files (system or dependency headers) are kept as spelled.
+    """
+
+    mtime_ns: int
+    size: int
+    digest: str
+    includes: list[str]
+    external_includes: list[str] = []
+
+
+class IncludeGraph(BaseModel):
+    """Include graph of all project files keyed by their path relative to the project directory.
+
+    Includes of files outside the project (system or dependency headers) are not tracked as nodes.
+    """
+
+    version: int = 0
+    nodes: dict[str, IncludeGraphNode] = {}
+
+    def find_dependents(self, changed_files: Iterable[str]) -> set[str]:
+        """Return the changed files and all files including them directly or transitively."""
+        reverse_edges: dict[str, list[str]] = {}
+        for path, node in self.nodes.items():
+            for include in node.includes:
+                reverse_edges.setdefault(include, []).append(path)
+        affected = set(changed_files)
+        pending = list(affected)
+        while pending:
+            for dependent in reverse_edges.get(pending.pop(), []):
+                if dependent not in affected:
+                    affected.add(dependent)
+                    pending.append(dependent)
+        return affected
+
+    def find_external_includes(self, path: str) -> list[str]:
+        """Return the external includes of a file and of all project files it includes transitively.
+
+        The includes are ordered by their first occurrence in a depth-first traversal.
+        """
+        external_includes: dict[str, None] = {}
+        visited = set()
+        pending = [path]
+        while pending:
+            current = pending.pop()
+            node = self.nodes.get(current)
+            if current in visited or node is None:
+                continue
+            visited.add(current)
+            external_includes.update(dict.fromkeys(node.external_includes))
+            pending.extend(reversed(node.includes))
+        return list(external_includes)
+
+
+class AffectedTargets(BaseModel):
+    """Translation units and test binaries affected by a set of changed files."""
+
+    translation_units: list[str]
+    test_sources: list[str]
+    test_binaries: list[str]
+
+
+def update_include_graph(project_dir: Path, name: str, build_dir: Path) -> IncludeGraph:
+    """Update the persisted include graph of the project incrementally and return it.
+
+    Files with unchanged modification time and size are not read. Files with a changed modification
+    time but identical content hash keep their edges. Only files with a changed content are scanned.
+    The scan is preprocessor-free: all include directives are considered, independent of conditionals.
+    """
+    source_files = collect_source_files(project_dir, name)
+    graph = load_include_graph(build_dir) or IncludeGraph()
+    include_roots = [compose_include_file(project_dir, name).parent, compose_source_file(project_dir)]
+    nodes = {}
+    for path in _list_project_files(source_files):
+        nodes[path] = _update_node(project_dir, include_roots, path, graph.nodes.get(path))
+    updated_graph = IncludeGraph(version=_GRAPH_VERSION, nodes=nodes)
+    if updated_graph != graph:
+        store_include_graph(build_dir, updated_graph)
+    return updated_graph
+
+
+def refresh_include_graph(
+    project_dir: Path, name: str, graph: IncludeGraph, changed_files: Iterable[str]
+) -> IncludeGraph:
+    """Re-scan the changed files of an include graph held in memory, e.g. by a long-running watch.
+
+    Other files are not checked and the graph is not persisted. Changed files must be part of the graph,
+    i.e. files were neither added nor removed.
+    """
+    include_roots = [compose_include_file(project_dir, name).parent, compose_source_file(project_dir)]
+    nodes = dict(graph.nodes)
+    for path in changed_files:
+        nodes[path] = _update_node(project_dir, include_roots, path, nodes.get(path))
+    return IncludeGraph(version=graph.version, nodes=nodes)
+
+
+def store_include_graph(build_dir: Path, graph: IncludeGraph) -> None:
+    """Persist the include graph, e.g. to share the scan results with the build directory of another build."""
+    graph_file = _compose_include_graph_file(build_dir)
+    ensure_dir_exists(build_dir)
+    tmp_graph_file = graph_file.with_suffix(".tmp")
+    tmp_graph_file.write_text(graph.model_dump_json())
+    tmp_graph_file.replace(graph_file)
+
+
+def load_include_graph(build_dir: Path) -> IncludeGraph | None:
+    """Load the persisted include graph or return None if it does not exist yet."""
+    graph_file = _compose_include_graph_file(build_dir)
+    if not graph_file.exists():
+        return None
+    graph = IncludeGraph.model_validate_json(graph_file.read_text())
+    # graphs of older versions lack information and are rebuilt from scratch
+    return graph if graph.version == _GRAPH_VERSION else None
+
+
+def find_affected_targets(
+    graph: IncludeGraph,
+    name: str,
+    source_files: SourceFiles,
+    changed_files: Iterable[str],
+) -> AffectedTargets:
+    """Determine the translation units and test binaries affected by the changed files.
+
+    The test binary is affected by any change of a library or test translation unit as it links both.
+    """
+    affected = graph.find_dependents(changed_files)
+    library_units = [source for source in source_files.library_sources if source in affected]
+    test_units = [source for source in source_files.test_sources if source in affected]
+    test_binaries = [compose_test_target(name)] if source_files.test_sources and (library_units or test_units) else []
+    return AffectedTargets(
+        translation_units=library_units + test_units,
+        test_sources=test_units,
+        test_binaries=test_binaries,
+    )
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Increased whenever the information stored per node changes
+_GRAPH_VERSION = 1
+
+_INCLUDE_PATTERN = re.compile(rb'^[ \t]*#[ \t]*include[ \t]*([<"])([^>"\n]+)[>"]', re.MULTILINE)
+
+
+def _list_project_files(source_files: SourceFiles) -> list[str]:
+    return sorted([*source_files.headers, *source_files.library_sources, *source_files.test_sources])
+
+
+def _update_node(
+    project_dir: Path,
+    include_roots: list[Path],
+    path: str,
+    node: IncludeGraphNode | None,
+) -> IncludeGraphNode:
+    file = project_dir / path
+    # os.stat avoids the path parsing of pathlib, which dominates no-op builds of large projects
+    stat = os.stat(os.path.join(project_dir, path))  # noqa: PTH116, PTH118
+    if node is not None and node.mtime_ns == stat.st_mtime_ns and node.size == stat.st_size:
+        return node
+    content = file.read_bytes()
+    digest = hashlib.sha256(content).hexdigest()
+    if node is not None and node.digest == digest:
+        return node.model_copy(update={"mtime_ns": stat.st_mtime_ns, "size": stat.st_size})
+    includes, external_includes = _scan_includes(project_dir, include_roots, file, content)
+    return IncludeGraphNode(
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        digest=digest,
+        includes=includes,
+        external_includes=external_includes,
+    )
+
+
+def _scan_includes(
+    project_dir: Path,
+    include_roots: list[Path],
+    file: Path,
+    content: bytes,
+) -> tuple[list[str], list[str]]:
+    includes: list[str] = []
+    external_includes: list[str] = []
+    for match in _INCLUDE_PATTERN.finditer(content):
+        delimiter, include = match.group(1).decode(), match.group(2).decode(errors="replace").strip()
+        # quoted includes are looked up relative to the including file first
+        search_dirs = [file.parent, *include_roots] if delimiter == '"' else include_roots
+        resolved = _resolve_include(project_dir, search_dirs, include)
+        if resolved is None:
+            if include not in external_includes:
+                external_includes.append(include)
+        elif resolved not in includes:
+            includes.append(resolved)
+    return includes, external_includes
+
+
+def _resolve_include(project_dir: Path, search_dirs: list[Path], include: str) -> str | None:
+    for search_dir in search_dirs:
+        candidate = os.path.normpath(search_dir / include)
+        if os.path.isfile(candidate):  # noqa: PTH113
+            relative = os.path.relpath(candidate, project_dir)
+            return None if relative.startswith("..") else relative
+    return None
+
+
+def _compose_include_graph_file(build_dir: Path) -> Path:
+    return build_dir / "include_graph.json"
@@ -0,0 +1,139 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from pathlib import Path
+
+from cpp_dev.common.utils import ensure_dir_exists
+
+from .compile_cache import MemoryPlan, compose_memory_plan_file, read_peak_memory
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def read_available_memory() -> int | None:
+    """Determine the memory in bytes available to the build.
+
+    The available memory of the system is limited by the memory limits of the cgroup (v1 or v2) of the
+    process and its parents. Returns None if the memory could not be determined, e.g. on other systems than Linux.
+    """
+    candidates = [_read_meminfo_available(), *_read_cgroup_headroom()]
+    return min((candidate for candidate in candidates if candidate is not None), default=None)
+
+
+def plan_memory(memory_dir: Path) -> MemoryPlan:
+    """Write the memory plan the local compilations of the next build are admitted against.
+
+    The budget is a share of the memory available at the start of the build. Compilations are expected to
+    need the peak memory recorded by their previous compilation, or the average of all recorded peaks.
+    """
+    peaks = read_peak_memory(memory_dir)
+    available = read_available_memory()
+    plan = MemoryPlan(
+        budget=int(available * _BUDGET_SHARE) if available is not None else None,
+        peaks=peaks,
+        default_peak=round(sum(peaks.values()) / len(peaks)) if peaks else _DEFAULT_PEAK,
+    )
+    plan_file = compose_memory_plan_file(memory_dir)
+    ensure_dir_exists(plan_file.parent)
+    tmp_file = plan_file.with_suffix(".tmp")
+    tmp_file.write_bytes(plan.to_json())
+    tmp_file.replace(plan_file)
+    return plan
+
+
+def find_heavy_compilations(plan: MemoryPlan) -> list[str]:
+    """Find the outputs of compilations needing much memory, ordered by their peak memory (largest first).
+
+    Scheduling them early avoids them becoming stragglers that wait for memory at the end of the build.
+    The peaks are rounded such that small variations across builds do not change the order.
+    """
+    heavy = [(round(peak / _PEAK_GRANULARITY), output) for output, peak in plan.peaks.items() if peak >= _HEAVY_PEAK]
+    return [output for _, output in sorted(heavy, key=lambda entry: (-entry[0], entry[1]))]
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Share of the available memory used by compilations, the remainder covers links and other processes
+_BUDGET_SHARE = 0.9
+
+# Peak memory expected for compilations if none was recorded yet
+_DEFAULT_PEAK = 512 * 1024**2
+
+# Compilations with a larger peak memory are scheduled first
+_HEAVY_PEAK = 1024**3
+
+_PEAK_GRANULARITY = 256 * 1024**2
+
+_MEMINFO_FILE = Path("/proc/meminfo")
+_CGROUP_FILE = Path("/proc/self/cgroup")
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+
+
+def _read_meminfo_available() -> int | None:
+    try:
+        lines = _MEMINFO_FILE.read_text().splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        key, _, value = line.partition(":")
+        if key == "MemAvailable":
+            return int(value.split()[0]) * 1024
+    return None
+
+
+def _read_cgroup_headroom() -> list[int | None]:
+    try:
+        lines = _CGROUP_FILE.read_text().splitlines()
+    except OSError:
+        return []
+    headroom: list[int | None] = []
+    for line in lines:
+        _, controllers, path = line.split(":", 2)
+        if controllers == "":
+            headroom.extend(
+                _read_headroom(cgroup_dir, "memory.max", "memory.current")
+                for cgroup_dir in _walk_cgroup(_CGROUP_ROOT, path)
+            )
+        elif "memory" in controllers.split(","):
+            headroom.extend(
+                _read_headroom(cgroup_dir, "memory.limit_in_bytes", "memory.usage_in_bytes")
+                for cgroup_dir in _walk_cgroup(_CGROUP_ROOT / "memory", path)
+            )
+    return headroom
+
+
+def _walk_cgroup(root: Path, path: str) -> list[Path]:
+    # the limits of all parent cgroups apply as well
+    cgroup_dir = root / path.lstrip("/")
+    return [cgroup_dir, *(parent for parent in cgroup_dir.parents if parent.is_relative_to(root))]
+
+
+def _read_headroom(cgroup_dir: Path, limit_file: str, usage_file: str) -> int | None:
+    try:
+        limit = (cgroup_dir / limit_file).read_text().strip()
+        usage = int((cgroup_dir / usage_file).read_text())
+    except (OSError, ValueError):
+        return None
+    if not limit.isdigit():
+        # the limit is "max" if the cgroup is not limited
+        return None
+    return max(int(limit) - usage + _read_reclaimable(cgroup_dir), 0)
+
+
+def _read_reclaimable(cgroup_dir: Path) -> int:
+    # the usage includes the page cache, of which the inactive part is reclaimed under memory pressure
+    try:
+        lines = (cgroup_dir / "memory.stat").read_text().splitlines()
+    except OSError:
+        return 0
+    for line in lines:
+        key, _, value = line.partition(" ")
+        if key in {"inactive_file", "total_inactive_file"}:
+            return int(value)
+    return 0
@@ -0,0 +1,344 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections.abc import Iterable
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+from cpp_dev.common.utils import assert_is_not_none
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class NinjaFileWriter:
+    """Writer composing the content of a Ninja build file.
+
+    Paths passed to build statements are escaped, variable values are written as given.
+    """
+
+    def __init__(self) -> None:
+        self._lines: list[str] = []
+
+    def comment(self, text: str) -> None:
+        """Add a comment line."""
+        self._lines.append(f"# {text}")
+
+    def variable(self, name: str, value: str, indent: int = 0) -> None:
+        """Add a variable binding."""
+        self._lines.append(f"{'  ' * indent}{name} = {value}")
+
+    def rule(self, name: str, command: str, **attributes: str) -> None:
+        """Add a rule with the given command and further attributes (e.g. description, depfile)."""
+        self._lines.append(f"rule {name}")
+        self.variable("command", command, indent=1)
+        for attribute, value in attributes.items():
+            self.variable(attribute, value, indent=1)
+
+    def build(
+        self,
+        outputs: Iterable[str],
+        rule: str,
+        inputs: Iterable[str] = (),
+        *,
+        implicit: Iterable[str] = (),
+        variables: dict[str, str] | None = None,
+    ) -> None:
+        """Add a build statement producing the outputs from the inputs using the rule.
+
+        Implicit inputs trigger a rebuild when changed but are not part of the $in variable.
+        """
+        statement = f"build {_escape_paths(outputs)}: {rule}"
+        if inputs:
+            statement += f" {_escape_paths(inputs)}"
+        if implicit:
+            statement += f" | {_escape_paths(implicit)}"
+        self._lines.append(statement)
+        for name, value in (variables or {}).items():
+            self.variable(name, value, indent=1)
+
+    def default(self, targets: Iterable[str]) -> None:
+        """Set the default targets."""
+        self._lines.append(f"default {_escape_paths(targets)}")
+
+    def newline(self) -> None:
+        """Add an empty line."""
+        self._lines.append("")
+
+    def text(self) -> str:
+        """Return the content of the build file."""
+        return "\n".join(self._lines) + "\n"
+
+
+def escape_path(path: str) -> str:
+    """Escape a path for usage in a Ninja build statement."""
+    return path.replace("$", "$$").replace(" ", "$ ").replace(":", "$:")
+
+
+def get_ninja_executable() -> str:
+    """Return the path to the Ninja executable (installed as part of the ninja package)."""
+    ninja = shutil.which("ninja")
+    if ninja is None:
+        raise RuntimeError("The Ninja executable was not found.")
+    return ninja
+
+
+def supports_jobserver() -> bool:
+    """Check whether the Ninja executable acts as client of a jobserver passed by MAKEFLAGS (Ninja 1.13 or newer).
+
+    Older versions ignore the jobserver and run their full number of parallel jobs.
+    """
+    return _read_ninja_version(get_ninja_executable()) >= _JOBSERVER_MIN_VERSION
+
+
+class NinjaBuildError(RuntimeError):
+    """A failed Ninja build providing the outputs of the failed build statements."""
+
+    def __init__(self, build_dir: Path, failed_outputs: list[str]) -> None:
+        super().__init__(f"The build in {build_dir} failed.")
+        self.build_dir = build_dir
+        # Ninja reports the outputs of a statement space-separated without escaping
+        self.failed_outputs = failed_outputs
+
+
+class Jobserver:
+    """A jobserver sharing a budget of parallel jobs across concurrent Ninja processes.
+
+    The jobserver implements the protocol of GNU make using a named pipe, which Ninja supports as client
+    since version 1.13 (see supports_jobserver).
+    Each client runs one job without a token, such that the tokens are the jobs minus the clients.
+    """
+
+    def __init__(self, jobs: int, clients: int) -> None:
+        self.jobs = jobs
+        self._clients = clients
+        self._tmp_dir: tempfile.TemporaryDirectory[str] | None = None
+        self._fd = -1
+
+    def __enter__(self) -> Self:
+        """Create the named pipe and fill in the tokens."""
+        self._tmp_dir = tempfile.TemporaryDirectory(prefix="cpd-jobserver-")
+        os.mkfifo(self.fifo)
+        # the pipe is kept open for reading and writing such that it persists while no client is connected
+        self._fd = os.open(self.fifo, os.O_RDWR)
+        os.write(self._fd, b"+" * max(self.jobs - self._clients, 0))
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Remove the named pipe."""
+        os.close(self._fd)
+        assert_is_not_none(self._tmp_dir).cleanup()
+
+    @property
+    def fifo(self) -> Path:
+        """Return the path of the named pipe."""
+        return Path(assert_is_not_none(self._tmp_dir).name) / "fifo"
+
+    @property
+    def makeflags(self) -> str:
+        """Return the MAKEFLAGS passing the jobserver to the clients."""
+        return f"-j{self.jobs} --jobserver-auth=fifo:{self.fifo}"
+
+
+def run_ninja(
+    build_dir: Path,
+    targets: list[str] | None = None,
+    jobs: int | Jobserver | None = None,
+    *,
+    keep_going: bool = False,
+) -> None:
+    """Run Ninja in the build directory for the given targets (or the default targets).
+
+    The output of Ninja is forwarded line by line to sys.stdout such that it also reaches
+    the client when running inside the cpd daemon. If keep_going is set, Ninja builds as much
+    as possible after a failure such that all failed build statements are reported.
+    The parallel jobs are limited by a number or by a jobserver shared with other Ninja processes.
+    """
+    args = [get_ninja_executable(), "-C", str(build_dir)]
+    env = None
+    if isinstance(jobs, Jobserver):
+        # Ninja only acts as client of the jobserver if the number of jobs is not given
+        env = {**os.environ, "MAKEFLAGS": jobs.makeflags}
+    elif jobs is not None:
+        args.extend(["-j", str(jobs)])
+    if keep_going:
+        args.extend(["-k", "0"])
+    args.extend(targets or [])
+    failed_outputs = []
+    with subprocess.Popen(  # noqa: S603
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env=env,
+    ) as process:
+        for line in assert_is_not_none(process.stdout):
+            sys.stdout.write(line)
+            match = _FAILED_PATTERN.match(line)
+            if match is not None:
+                failed_outputs.append(match.group(1).strip())
+    if process.returncode != 0:
+        raise NinjaBuildError(build_dir, failed_outputs)
+
+
+@dataclass
+class NinjaLogEntry:
+    """The most recent execution of the build statement producing an output as recorded by Ninja."""
+
+    output: str
+    start_ms: int
+    end_ms: int
+    command_hash: str
+    # modification time of the output after the execution
+    mtime_ns: int = 0
+
+    @property
+    def duration_ms(self) -> int:
+        """Return the duration of the execution."""
+        return self.end_ms - self.start_ms
+
+
+def read_ninja_log(build_dir: Path) -> dict[str, NinjaLogEntry]:
+    """Read the log of the Ninja builds in the build directory keyed by output.
+
+    Start and end times are relative to the start of the build the statement was executed in.
+    """
+    log_file = _compose_ninja_log_file(build_dir)
+    if not log_file.exists():
+        return {}
+    entries = {}
+    for line in log_file.read_text().splitlines():
+        if line.startswith("#"):
+            continue
+        start_ms, end_ms, mtime_ns, output, command_hash = line.split("\t")
+        # outputs rebuilt later are appended, such that the last entry is the most recent one
+        entries[output] = NinjaLogEntry(output, int(start_ms), int(end_ms), command_hash, int(mtime_ns))
+    return entries
+
+
+def compose_build_file(build_dir: Path) -> Path:
+    """Compose the path of the Ninja build file in the build directory."""
+    return build_dir / "build.ninja"
+
+
+def read_build_graph(build_dir: Path) -> dict[str, list[str]]:
+    """Read the explicit and implicit inputs of all outputs from the build file in the build directory.
+
+    Only the subset of the Ninja syntax written by the NinjaFileWriter is supported.
+    """
+    graph = {}
+    for line in compose_build_file(build_dir).read_text().splitlines():
+        if not line.startswith("build "):
+            continue
+        outputs, _, inputs = _split_unescaped(line.removeprefix("build "), ":")
+        # the rule is the first input, order-only inputs are not written
+        paths = [path for path in _split_paths(inputs)[1:] if path != "|"]
+        for output in _split_paths(outputs):
+            graph[output] = paths
+    return graph
+
+
+def find_critical_path(build_dir: Path) -> list[NinjaLogEntry]:
+    """Find the chain of dependent build statements with the longest total duration of the last builds.
+
+    The durations are taken from the Ninja log, statements without a log entry take no time.
+    """
+    ninja_log = read_ninja_log(build_dir)
+    durations = {output: entry.duration_ms for output, entry in ninja_log.items()}
+    return [ninja_log[output] for output in find_longest_path(read_build_graph(build_dir), durations)]
+
+
+def find_longest_path(graph: dict[str, list[str]], durations: dict[str, int]) -> list[str]:
+    """Find the chain of dependent outputs of the build graph with the longest total duration.
+
+    Outputs without a duration take no time and are not part of the returned chain.
+    """
+    costs: dict[str, int] = {}
+    predecessors: dict[str, str | None] = {}
+
+    def compute_cost(output: str) -> int:
+        if output not in costs:
+            inputs = [path for path in graph.get(output, []) if path in graph]
+            predecessor = max(inputs, key=compute_cost, default=None)
+            costs[output] = durations.get(output, 0) + (costs[predecessor] if predecessor is not None else 0)
+            predecessors[output] = predecessor
+        return costs[output]
+
+    current = max(graph, key=compute_cost, default=None)
+    path = []
+    while current is not None:
+        if current in durations:
+            path.append(current)
+        current = predecessors[current]
+    return list(reversed(path))
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Newer Ninja versions report the exit code of the failed command before the outputs
+_FAILED_PATTERN = re.compile(r"^FAILED: (?:\[code=-?\d+\] )?(.*)$")
+
+_JOBSERVER_MIN_VERSION = (1, 13)
+
+
+@cache
+def _read_ninja_version(ninja: str) -> tuple[int, int]:
+    # builds of Ninja append suffixes to the version, e.g. 1.13.2.git.kitware.jobserver-pipe-1
+    output = subprocess.run([ninja, "--version"], capture_output=True, text=True, check=True).stdout  # noqa: S603
+    match = re.match(r"(\d+)\.(\d+)", output.strip())
+    if match is None:
+        raise RuntimeError(f"Unable to parse the Ninja version: {output.strip()}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def _escape_paths(paths: Iterable[str]) -> str:
+    return " ".join(escape_path(path) for path in paths)
+
+
+def _compose_ninja_log_file(build_dir: Path) -> Path:
+    return build_dir / ".ninja_log"
+
+
+def _split_unescaped(text: str, separator: str) -> tuple[str, str, str]:
+    idx = 0
+    while idx < len(text):
+        if text[idx] == "$":
+            idx += 2
+            continue
+        if text[idx] == separator:
+            return text[:idx], separator, text[idx + 1 :]
+        idx += 1
+    return text, "", ""
+
+
+def _split_paths(text: str) -> list[str]:
+    paths = []
+    remaining = text.strip()
+    while remaining:
+        path, _, remaining = _split_unescaped(remaining, " ")
+        paths.append(_unescape_path(path))
+        remaining = remaining.lstrip(" ")
+    return paths
+
+
+def _unescape_path(path: str) -> str:
+    return re.sub(r"\$(.)", r"\1", path)
@@ -0,0 +1,270 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import hashlib
+import math
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from cpp_dev.common.utils import ensure_dir_exists
+
+from .include_graph import IncludeGraph, update_include_graph
+from .ninja import read_ninja_log
+from .sources import collect_source_files
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class HeaderCost(BaseModel):
+    """The measured cost of parsing an external header on its own."""
+
+    preprocessed_lines: int
+    parse_ms: int
+
+
+class PrecompiledHeader(BaseModel):
+    """A precompiled header bundling the hottest external headers of a group of translation units."""
+
+    name: str
+    headers: list[str]
+    translation_units: list[str]
+    estimated_savings_ms: int
+
+
+class PrecompiledHeaderReport(BaseModel):
+    """Estimated and measured compile-time savings of a precompiled header."""
+
+    name: str
+    headers: list[str]
+    translation_units: int
+    estimated_savings_ms: int
+    # None as long as no compilation without the precompiled header was recorded for comparison
+    measured_savings_ms: int | None
+
+
+def plan_precompiled_headers(
+    project_dir: Path,
+    name: str,
+    build_dir: Path,
+    command: list[str],
+) -> list[PrecompiledHeader]:
+    """Select the precompiled headers of the library and the test translation units.
+
+    External headers (system and dependency headers, which are stable compared to project headers)
+    included directly or transitively by at least half of the translation units of a group are
+    candidates. Candidates that are cheap to parse are dropped. The parse cost of the headers is
+    measured with the compile command once and cached in the build directory.
+    """
+    graph = update_include_graph(project_dir, name, build_dir)
+    source_files = collect_source_files(project_dir, name)
+    groups = {"library": source_files.library_sources, "tests": source_files.test_sources}
+    includes = {tu: graph.find_external_includes(tu) for tu in [*groups["library"], *groups["tests"]]}
+    candidates = {group: _find_frequent_includes(tus, includes) for group, tus in groups.items()}
+    costs = _load_or_measure_costs(build_dir, command, sorted({h for headers in candidates.values() for h in headers}))
+
+    precompiled_headers = []
+    for group, tus in groups.items():
+        headers = [h for h in candidates[group] if h in costs and costs[h].parse_ms >= _MIN_PARSE_MS]
+        headers = headers[:_MAX_HEADERS]
+        users = [tu for tu in tus if set(includes[tu]) & set(headers)]
+        if len(users) < _MIN_TRANSLATION_UNITS:
+            continue
+        precompiled_headers.append(
+            PrecompiledHeader(
+                name=group,
+                headers=headers,
+                translation_units=users,
+                estimated_savings_ms=_estimate_savings(graph, users, headers, costs),
+            ),
+        )
+    return precompiled_headers
+
+
+def write_precompiled_header_sources(build_dir: Path, precompiled_headers: list[PrecompiledHeader]) -> None:
+    """Write the header files being precompiled. Unchanged files are not touched to not trigger rebuilds."""
+    for precompiled_header in precompiled_headers:
+        header_file = compose_precompiled_header_source(build_dir, precompiled_header.name)
+        content = "// Generated by cpd: do not edit.\n" + "".join(
+            f"#include <{header}>\n" for header in precompiled_header.headers
+        )
+        if not header_file.exists() or header_file.read_text() != content:
+            ensure_dir_exists(header_file.parent)
+            header_file.write_text(content)
+
+
+def compose_precompiled_header_source(build_dir: Path, name: str) -> Path:
+    """Compose the path of the header file being precompiled."""
+    return build_dir / "pch" / f"{name}.hpp"
+
+
+def compose_precompiled_header_output(name: str, compiler: str) -> str:
+    """Compose the build target of a precompiled header, which is found by the compiler next to the header."""
+    suffix = ".pch" if "clang" in Path(compiler).name else ".gch"
+    return f"pch/{name}.hpp{suffix}"
+
+
+def report_precompiled_headers(
+    build_dir: Path,
+    precompiled_headers: list[PrecompiledHeader],
+    object_files: dict[str, str],
+    compiler: str,
+) -> list[PrecompiledHeaderReport]:
+    """Report the savings of the precompiled headers after a build and persist the report in the build directory.
+
+    The savings are measured by the compile durations of the Ninja log: the last compilation of a translation
+    unit without a precompiled header is recorded as baseline, the savings of a precompiled header are the sum
+    of the baseline durations minus the current durations minus the duration of building the precompiled header.
+    """
+    ninja_log = read_ninja_log(build_dir)
+    baseline = _load_baseline(build_dir)
+    users = {tu for precompiled_header in precompiled_headers for tu in precompiled_header.translation_units}
+    for tu, object_file in object_files.items():
+        if tu not in users and object_file in ninja_log:
+            baseline[tu] = ninja_log[object_file].duration_ms
+    _store_model(_compose_baseline_file(build_dir), _Baseline(durations=baseline))
+
+    reports = []
+    for precompiled_header in precompiled_headers:
+        measured = None
+        compared = [
+            tu for tu in precompiled_header.translation_units if tu in baseline and object_files.get(tu) in ninja_log
+        ]
+        pch_entry = ninja_log.get(compose_precompiled_header_output(precompiled_header.name, compiler))
+        if compared and pch_entry is not None:
+            current = sum(ninja_log[object_files[tu]].duration_ms for tu in compared)
+            measured = sum(baseline[tu] for tu in compared) - current - pch_entry.duration_ms
+        reports.append(
+            PrecompiledHeaderReport(
+                name=precompiled_header.name,
+                headers=precompiled_header.headers,
+                translation_units=len(precompiled_header.translation_units),
+                estimated_savings_ms=precompiled_header.estimated_savings_ms,
+                measured_savings_ms=measured,
+            ),
+        )
+    _store_model(_compose_report_file(build_dir), _Report(precompiled_headers=reports))
+    return reports
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# A header must be included by at least this share of the translation units of a group
+_MIN_INCLUDE_SHARE = 0.5
+
+# Precompiled headers are only worth it if shared by multiple translation units
+_MIN_TRANSLATION_UNITS = 2
+
+# Headers parsed faster are not worth precompiling
+_MIN_PARSE_MS = 50
+
+_MAX_HEADERS = 16
+
+
+class _HeaderCosts(BaseModel):
+    command_digest: str
+    costs: dict[str, HeaderCost]
+
+
+class _Baseline(BaseModel):
+    durations: dict[str, int]
+
+
+class _Report(BaseModel):
+    precompiled_headers: list[PrecompiledHeaderReport]
+
+
+def _find_frequent_includes(tus: list[str], includes: dict[str, list[str]]) -> list[str]:
+    counts: dict[str, int] = {}
+    for tu in tus:
+        for include in includes[tu]:
+            counts[include] = counts.get(include, 0) + 1
+    threshold = max(_MIN_TRANSLATION_UNITS, math.ceil(_MIN_INCLUDE_SHARE * len(tus)))
+    # the order of first occurrence is kept as headers may depend on being included in order
+    return [include for include, count in counts.items() if count >= threshold]
+
+
+def _estimate_savings(graph: IncludeGraph, users: list[str], headers: list[str], costs: dict[str, HeaderCost]) -> int:
+    # each header is parsed once for the precompiled header instead of once per including translation unit
+    savings = 0
+    for header in headers:
+        uses = sum(1 for tu in users if header in graph.find_external_includes(tu))
+        savings += costs[header].parse_ms * (uses - 1)
+    return savings
+
+
+def _load_or_measure_costs(build_dir: Path, command: list[str], headers: list[str]) -> dict[str, HeaderCost]:
+    cost_file = _compose_cost_file(build_dir)
+    command_digest = hashlib.sha256("\0".join(command).encode()).hexdigest()
+    cached = _HeaderCosts(command_digest=command_digest, costs={})
+    if cost_file.exists():
+        loaded = _HeaderCosts.model_validate_json(cost_file.read_text())
+        if loaded.command_digest == command_digest:
+            cached = loaded
+    missing = [header for header in headers if header not in cached.costs]
+    if missing:
+        with ThreadPoolExecutor() as executor:
+            for header, cost in zip(missing, executor.map(lambda h: _measure_cost(command, h), missing), strict=True):
+                if cost is not None:
+                    cached.costs[header] = cost
+        _store_model(cost_file, cached)
+    return cached.costs
+
+
+def _measure_cost(command: list[str], header: str) -> HeaderCost | None:
+    source = f"#include <{header}>\n"
+    preprocess = subprocess.run(  # noqa: S603
+        [*command, "-x", "c++", "-E", "-"],
+        input=source.encode(),
+        capture_output=True,
+        check=False,
+    )
+    if preprocess.returncode != 0:
+        # headers not available (e.g. guarded by platform checks) are not precompiled
+        return None
+    start = time.perf_counter()
+    parse = subprocess.run(  # noqa: S603
+        [*command, "-x", "c++", "-fsyntax-only", "-"],
+        input=source.encode(),
+        capture_output=True,
+        check=False,
+    )
+    parse_ms = int((time.perf_counter() - start) * 1000)
+    if parse.returncode != 0:
+        return None
+    return HeaderCost(preprocessed_lines=preprocess.stdout.count(b"\n"), parse_ms=parse_ms)
+
+
+def _load_baseline(build_dir: Path) -> dict[str, int]:
+    baseline_file = _compose_baseline_file(build_dir)
+    if not baseline_file.exists():
+        return {}
+    return _Baseline.model_validate_json(baseline_file.read_text()).durations
+
+
+def _store_model(file: Path, model: BaseModel) -> None:
+    ensure_dir_exists(file.parent)
+    tmp_file = file.with_suffix(".tmp")
+    tmp_file.write_text(model.model_dump_json(indent=2))
+    tmp_file.replace(file)
+
+
+def _compose_cost_file(build_dir: Path) -> Path:
+    return build_dir / "pch" / "costs.json"
+
+
+def _compose_baseline_file(build_dir: Path) -> Path:
+    return build_dir / "pch" / "baseline.json"
+
+
+def _compose_report_file(build_dir: Path) -> Path:
+    return build_dir / "pch" / "report.json"
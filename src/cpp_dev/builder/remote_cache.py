@@ -0,0 +1,101 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import threading
+from collections.abc import Generator
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from .compile_cache import LauncherConfig, compose_entry_file, store_remote_entry
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+@dataclass
+class RemoteCacheResult:
+    """Transfers between the local compilation cache and the remote cache during a build."""
+
+    # objects missing locally are fetched by the compiler launcher when their unit is compiled
+    fetched: int = 0
+    uploaded: int = 0
+    failed_uploads: int = 0
+
+
+@contextmanager
+def upload_in_background(config: LauncherConfig, result: RemoteCacheResult) -> Generator[None]:
+    """Upload new cache entries to the remote cache while the build is running.
+
+    The compiler launcher leaves a marker per new entry in the upload directory. The markers are
+    picked up concurrently to the build and the remaining ones are drained once the build finished.
+    Markers of failed uploads are kept such that the upload is retried by the next build.
+    """
+    if config.remote_url is None or config.upload_dir is None:
+        yield
+        return
+
+    uploader = _BackgroundUploader(config.cache_dir, config.remote_url, config.upload_dir)
+    with ThreadPoolExecutor(max_workers=_TRANSFER_WORKERS) as executor:
+        poller = threading.Thread(target=uploader.poll, args=(executor,), daemon=True)
+        poller.start()
+        try:
+            yield
+        finally:
+            uploader.stop.set()
+            poller.join()
+            uploader.submit_pending(executor)
+            for future in uploader.submitted.values():
+                if future.result():
+                    result.uploaded += 1
+                else:
+                    result.failed_uploads += 1
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Transfers are bound by the network latency, not by the local CPU
+_TRANSFER_WORKERS = 16
+
+_UPLOAD_POLL_INTERVAL = 0.1
+
+
+class _BackgroundUploader:
+    def __init__(self, cache_dir: Path, remote_url: str, upload_dir: Path) -> None:
+        self._cache_dir = cache_dir
+        self._remote_url = remote_url
+        self._upload_dir = upload_dir
+        self.stop = threading.Event()
+        self.submitted: dict[str, Future[bool]] = {}
+
+    def poll(self, executor: ThreadPoolExecutor) -> None:
+        while not self.stop.wait(_UPLOAD_POLL_INTERVAL):
+            self.submit_pending(executor)
+
+    def submit_pending(self, executor: ThreadPoolExecutor) -> None:
+        if not self._upload_dir.exists():
+            return
+        for marker in self._upload_dir.iterdir():
+            if marker.name not in self.submitted:
+                self.submitted[marker.name] = executor.submit(self._upload, marker.name)
+
+    def _upload(self, key: str) -> bool:
+        marker = self._upload_dir / key
+        try:
+            content = compose_entry_file(self._cache_dir, key).read_bytes()
+        except FileNotFoundError:
+            # the entry got evicted from the local cache in the meantime
+            marker.unlink(missing_ok=True)
+            return False
+        try:
+            store_remote_entry(self._remote_url, key, content)
+        except OSError:
+            return False
+        marker.unlink(missing_ok=True)
+        return True
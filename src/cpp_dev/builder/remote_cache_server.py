@@ -0,0 +1,105 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import re
+import tempfile
+import threading
+from collections.abc import Generator
+from contextlib import contextmanager
+from functools import partial
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+# A minimal stand-in for a remote build cache speaking the protocol of the cpd build:
+# GET /cas/<key> returns the stored content (404 if unknown), PUT /cas/<key> stores the request body.
+# It is intended for local testing and small teams, it does neither authenticate nor evict.
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def serve_remote_cache(storage_dir: Path, host: str, port: int) -> None:
+    """Serve the remote cache in the foreground until interrupted."""
+    with _create_server(storage_dir, host, port) as server:
+        server.serve_forever()
+
+
+@contextmanager
+def run_remote_cache_server(storage_dir: Path, host: str = "127.0.0.1", port: int = 0) -> Generator[str]:
+    """Run the remote cache in a background thread and provide its URL.
+
+    A free port is chosen if the port is 0.
+    """
+    with _create_server(storage_dir, host, port) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            yield f"http://{host}:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+            thread.join()
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_KEY_PATH_PATTERN = re.compile(r"/cas/([0-9a-f]{64})")
+
+
+class _RemoteCacheHandler(BaseHTTPRequestHandler):
+    def __init__(self, *args: Any, storage_dir: Path, **kwargs: Any) -> None:  # noqa: ANN401
+        self._storage_dir = storage_dir
+        super().__init__(*args, **kwargs)
+
+    def do_GET(self) -> None:
+        """Return the content stored for a key."""
+        entry_file = self._resolve_entry_file()
+        if entry_file is None:
+            self.send_error(HTTPStatus.BAD_REQUEST)
+            return
+        try:
+            content = entry_file.read_bytes()
+        except FileNotFoundError:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_PUT(self) -> None:
+        """Store the request body for a key."""
+        entry_file = self._resolve_entry_file()
+        if entry_file is None:
+            self.send_error(HTTPStatus.BAD_REQUEST)
+            return
+        content = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        entry_file.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=entry_file.parent, delete=False) as tmp_file:
+            tmp_file.write(content)
+        Path(tmp_file.name).replace(entry_file)
+        self.send_response(HTTPStatus.CREATED)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+        """Suppress the request logging."""
+
+    def _resolve_entry_file(self) -> Path | None:
+        match = _KEY_PATH_PATTERN.fullmatch(self.path)
+        if match is None:
+            return None
+        key = match.group(1)
+        return self._storage_dir / key[:2] / key[2:]
+
+
+def _create_server(storage_dir: Path, host: str, port: int) -> ThreadingHTTPServer:
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    return ThreadingHTTPServer((host, port), partial(_RemoteCacheHandler, storage_dir=storage_dir))
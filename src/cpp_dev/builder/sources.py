@@ -0,0 +1,76 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cpp_dev.project.path_composition import compose_include_file, compose_source_file
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+SOURCE_SUFFIX = ".cpp"
+TEST_SOURCE_SUFFIX = ".test.cpp"
+HEADER_SUFFIXES = (".hpp", ".h")
+
+
+@dataclass
+class SourceFiles:
+    """The source files of a project by their role.
+
+    All paths are relative to the project directory and sorted to get a stable build file.
+    """
+
+    library_sources: list[str] = field(default_factory=list)
+    test_sources: list[str] = field(default_factory=list)
+    headers: list[str] = field(default_factory=list)
+
+
+def collect_source_files(project_dir: Path, name: str) -> SourceFiles:
+    """Collect the source files from the fixed project layout.
+
+    Public headers are located in "include/<name>/", sources and private headers in "src/".
+    Sources ending with ".test.cpp" are test sources, all other ".cpp" files form the library.
+    """
+    source_files = SourceFiles()
+    for relative_file in _scan_files(project_dir, compose_include_file(project_dir, name)):
+        if relative_file.endswith(HEADER_SUFFIXES):
+            source_files.headers.append(relative_file)
+    for relative_file in _scan_files(project_dir, compose_source_file(project_dir)):
+        if relative_file.endswith(TEST_SOURCE_SUFFIX):
+            source_files.test_sources.append(relative_file)
+        elif relative_file.endswith(SOURCE_SUFFIX):
+            source_files.library_sources.append(relative_file)
+        elif relative_file.endswith(HEADER_SUFFIXES):
+            source_files.headers.append(relative_file)
+    source_files.library_sources.sort()
+    source_files.test_sources.sort()
+    source_files.headers.sort()
+    return source_files
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+
+def _scan_files(project_dir: Path, root_dir: Path) -> list[str]:
+    # os.scandir avoids a stat call per file which matters for large projects
+    files = []
+    pending = [str(root_dir)]
+    prefix_length = len(str(project_dir)) + 1
+    while pending:
+        try:
+            entries = list(os.scandir(pending.pop()))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(entry.path)
+            elif entry.is_file():
+                files.append(entry.path[prefix_length:])
+    return files
@@ -0,0 +1,18 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def compose_library_target(name: str) -> str:
+    """Compose the build target of the project library."""
+    return f"lib{name}.a"
+
+
+def compose_test_target(name: str) -> str:
+    """Compose the build target of the test binary holding all tests of the project."""
+    return f"{name}_test"
@@ -0,0 +1,182 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import json
+import multiprocessing
+import os
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from cpp_dev.common.utils import ensure_dir_exists
+
+from .ninja import find_critical_path, read_ninja_log
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class TimeTraceEntry(BaseModel):
+    """The accumulated compile time spent on a translation unit, header, template or build statement."""
+
+    name: str
+    total_ms: int
+    count: int
+
+
+class TimeTraceReport(BaseModel):
+    """The aggregated compile-time profile of the translation units of a build."""
+
+    translation_units: list[TimeTraceEntry]
+    # parse times are inclusive, i.e. contain the parse times of the headers included by a header
+    headers: list[TimeTraceEntry]
+    instantiations: list[TimeTraceEntry]
+    critical_path: list[TimeTraceEntry]
+    # Chrome trace of all translation units placed on the timeline of the build
+    trace_file: Path
+
+
+def supports_time_trace(compiler: str) -> bool:
+    """Check if the compiler writes time traces with -ftime-trace, which is only supported by clang."""
+    return "clang" in Path(compiler).name
+
+
+def compose_time_trace_file(object_file: str) -> str:
+    """Compose the time trace written by clang next to the object file."""
+    return f"{object_file.removesuffix('.o')}.json"
+
+
+def report_time_trace(build_dir: Path, object_files: list[str], limit: int = 10) -> TimeTraceReport:
+    """Aggregate the time traces of the translation units into a report and a merged Chrome trace.
+
+    The traces are parsed in parallel processes. Traces of translation units not rebuilt by the last
+    build are still valid and part of the report. Each report section is limited to the most expensive entries.
+    """
+    trace_files = [
+        (object_file, build_dir / compose_time_trace_file(object_file))
+        for object_file in object_files
+        if (build_dir / compose_time_trace_file(object_file)).exists()
+    ]
+    summaries = _summarize_traces([trace_file for _, trace_file in trace_files])
+
+    translation_units = []
+    headers: dict[str, list[int]] = {}
+    instantiations: dict[str, list[int]] = {}
+    for (object_file, _), summary in zip(trace_files, summaries, strict=True):
+        name = _compose_unit_name(object_file)
+        translation_units.append(TimeTraceEntry(name=name, total_ms=summary.total_ms, count=1))
+        _accumulate(headers, summary.headers)
+        _accumulate(instantiations, summary.instantiations)
+
+    trace_file = _compose_merged_trace_file(build_dir)
+    _write_merged_trace(build_dir, trace_file, trace_files, summaries)
+    return TimeTraceReport(
+        translation_units=sorted(translation_units, key=lambda entry: -entry.total_ms)[:limit],
+        headers=_create_entries(headers, limit),
+        instantiations=_create_entries(instantiations, limit),
+        critical_path=[
+            TimeTraceEntry(name=entry.output, total_ms=entry.duration_ms, count=1)
+            for entry in find_critical_path(build_dir)
+        ],
+        trace_file=trace_file,
+    )
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_SOURCE_EVENT = "Source"
+_INSTANTIATION_EVENTS = {"InstantiateClass", "InstantiateFunction"}
+_TOTAL_EVENT = "ExecuteCompiler"
+
+
+@dataclass
+class _TraceSummary:
+    total_ms: int = 0
+    headers: dict[str, int] = field(default_factory=dict)
+    instantiations: dict[str, int] = field(default_factory=dict)
+    # complete events of the compiler thread with timestamps relative to the compiler start
+    events: list[dict[str, Any]] = field(default_factory=list)
+
+
+def _summarize_traces(trace_files: list[Path]) -> list[_TraceSummary]:
+    if not trace_files:
+        return []
+    # the forkserver avoids forking the threads of the cpd daemon
+    context = multiprocessing.get_context("forkserver")
+    workers = min(len(trace_files), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        return list(executor.map(_summarize_trace, trace_files, chunksize=8))
+
+
+def _summarize_trace(trace_file: Path) -> _TraceSummary:
+    summary = _TraceSummary()
+    total_us = 0
+    for event in json.loads(trace_file.read_bytes()).get("traceEvents", []):
+        if event.get("ph") != "X":
+            continue
+        name, duration_us = event.get("name", ""), event.get("dur", 0)
+        detail = event.get("args", {}).get("detail")
+        if name == _SOURCE_EVENT and detail is not None:
+            summary.headers[detail] = summary.headers.get(detail, 0) + duration_us
+        elif name in _INSTANTIATION_EVENTS and detail is not None:
+            summary.instantiations[detail] = summary.instantiations.get(detail, 0) + duration_us
+        elif name == _TOTAL_EVENT:
+            total_us = max(total_us, duration_us)
+        # summary events ("Total ...") span the whole compilation on separate threads and are not merged
+        if not name.startswith("Total "):
+            summary.events.append(event)
+    summary.total_ms = total_us // 1000
+    summary.headers = {name: duration_us // 1000 for name, duration_us in summary.headers.items()}
+    summary.instantiations = {name: duration_us // 1000 for name, duration_us in summary.instantiations.items()}
+    return summary
+
+
+def _accumulate(totals: dict[str, list[int]], durations: dict[str, int]) -> None:
+    for name, duration_ms in durations.items():
+        total = totals.setdefault(name, [0, 0])
+        total[0] += duration_ms
+        total[1] += 1
+
+
+def _create_entries(totals: dict[str, list[int]], limit: int) -> list[TimeTraceEntry]:
+    entries = [TimeTraceEntry(name=name, total_ms=total[0], count=total[1]) for name, total in totals.items()]
+    return sorted(entries, key=lambda entry: (-entry.total_ms, entry.name))[:limit]
+
+
+def _write_merged_trace(
+    build_dir: Path,
+    trace_file: Path,
+    trace_files: list[tuple[str, Path]],
+    summaries: Iterable[_TraceSummary],
+) -> None:
+    # each translation unit becomes a process of the merged trace, shifted to its start within the build
+    ninja_log = read_ninja_log(build_dir)
+    events: list[dict[str, Any]] = []
+    for pid, ((object_file, _), summary) in enumerate(zip(trace_files, summaries, strict=True), start=1):
+        log_entry = ninja_log.get(object_file)
+        offset_us = log_entry.start_ms * 1000 if log_entry is not None else 0
+        events.append(
+            {"ph": "M", "name": "process_name", "pid": pid, "args": {"name": _compose_unit_name(object_file)}},
+        )
+        events.extend({**event, "pid": pid, "tid": 0, "ts": event.get("ts", 0) + offset_us} for event in summary.events)
+    ensure_dir_exists(trace_file.parent)
+    tmp_file = trace_file.with_suffix(".tmp")
+    tmp_file.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+    tmp_file.replace(trace_file)
+
+
+def _compose_unit_name(object_file: str) -> str:
+    return object_file.removeprefix("obj/").removesuffix(".o")
+
+
+def _compose_merged_trace_file(build_dir: Path) -> Path:
+    return build_dir / "time_trace" / "trace.json"
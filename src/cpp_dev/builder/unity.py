@@ -0,0 +1,263 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import math
+import subprocess
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from cpp_dev.common.utils import ensure_dir_exists
+
+from .include_graph import update_include_graph
+from .ninja import read_ninja_log
+from .sources import collect_source_files
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class UnityBatch(BaseModel):
+    """A group of source files compiled as a single translation unit."""
+
+    name: str
+    sources: list[str]
+    estimated_cost_ms: int
+
+
+class UnityReport(BaseModel):
+    """Comparison of the unity build with the normal build of a project."""
+
+    batches: int
+    # sources compiled as separate translation units as they are edited frequently or collide with others
+    standalone: list[str]
+    isolated: list[str]
+    # wall time of the last build compiling all translation units (None if not measured yet)
+    cold_build_ms: int | None
+    normal_cold_build_ms: int | None
+    # expected compile time after editing a single source weighted by the edit frequency of the sources
+    incremental_rebuild_ms: int
+    normal_incremental_rebuild_ms: int
+
+
+def plan_unity_batches(project_dir: Path, name: str, build_dir: Path, jobs: int) -> list[UnityBatch]:
+    """Group the library and the test sources into batches balanced by their estimated compile cost.
+
+    The compile cost of a source is taken from the last compilation as a separate translation unit.
+    Sources edited frequently or known to collide with other sources are not batched, such that
+    edits do not trigger the recompilation of a large batch. At least as many batches as jobs are
+    formed to keep the build parallel.
+    """
+    state = _update_state(project_dir, name, build_dir)
+    source_files = collect_source_files(project_dir, name)
+    batches = []
+    for group, sources in (("library", source_files.library_sources), ("tests", source_files.test_sources)):
+        standalone = _find_standalone_sources(state, sources)
+        candidates = [source for source in sources if source not in standalone]
+        batches.extend(_create_batches(group, candidates, state, jobs))
+    return batches
+
+
+def write_unity_sources(project_dir: Path, build_dir: Path, batches: list[UnityBatch]) -> None:
+    """Write the source files of the batches. Unchanged files are not touched to not trigger rebuilds."""
+    for batch in batches:
+        unity_file = compose_unity_source(build_dir, batch.name)
+        content = _compose_unity_content(project_dir, batch.sources)
+        if not unity_file.exists() or unity_file.read_text() != content:
+            ensure_dir_exists(unity_file.parent)
+            unity_file.write_text(content)
+
+
+def compose_unity_source(build_dir: Path, name: str) -> Path:
+    """Compose the path of the source file of a batch."""
+    return build_dir / "unity" / f"{name}.cpp"
+
+
+def find_unity_collisions(project_dir: Path, batch: UnityBatch, command: list[str]) -> list[str] | None:
+    """Find the sources of a failed batch that do not compile together with the other sources.
+
+    Returns None if a source does not compile on its own, i.e. the failure is not caused by the batching.
+    The sources are added one by one, such that only the sources colliding with earlier ones are reported.
+    """
+    if not all(_compiles(project_dir, [source], command) for source in batch.sources):
+        return None
+    accepted: list[str] = []
+    collisions = []
+    for source in batch.sources:
+        if _compiles(project_dir, [*accepted, source], command):
+            accepted.append(source)
+        else:
+            collisions.append(source)
+    return collisions or None
+
+
+def isolate_unity_sources(build_dir: Path, sources: list[str]) -> None:
+    """Compile the sources as separate translation units in all future unity builds."""
+    state = _load_state(build_dir)
+    state.isolated = sorted({*state.isolated, *sources})
+    _store_state(build_dir, state)
+
+
+def report_unity_build(
+    project_dir: Path,
+    name: str,
+    build_dir: Path,
+    batches: list[UnityBatch],
+    cold_build_ms: int | None,
+) -> UnityReport:
+    """Record the compile durations of the last build and compare the unity build with the normal build.
+
+    The durations of separately compiled sources are taken from the Ninja log and used to plan future batches.
+    The wall time of cold builds (i.e. compiling all translation units) is recorded per build mode.
+    """
+    state = _update_state(project_dir, name, build_dir)
+    for source, duration_ms in _read_durations(build_dir, state.sources).items():
+        state.sources[source].cost_ms = duration_ms
+    if cold_build_ms is not None:
+        state.cold_build_ms["unity" if batches else "normal"] = cold_build_ms
+    _store_state(build_dir, state)
+
+    batched = {source: batch for batch in batches for source in batch.sources}
+    weights = {source: max(entry.edit_score, _MIN_EDIT_WEIGHT) for source, entry in state.sources.items()}
+    total_weight = sum(weights.values()) or 1.0
+    costs = _estimate_costs(state)
+    incremental = sum(weights[s] * (batched[s].estimated_cost_ms if s in batched else costs[s]) for s in weights)
+    normal_incremental = sum(weights[s] * costs[s] for s in weights)
+    return UnityReport(
+        batches=len(batches),
+        standalone=sorted(source for source in state.sources if source not in batched),
+        isolated=state.isolated,
+        cold_build_ms=state.cold_build_ms.get("unity"),
+        normal_cold_build_ms=state.cold_build_ms.get("normal"),
+        incremental_rebuild_ms=round(incremental / total_weight),
+        normal_incremental_rebuild_ms=round(normal_incremental / total_weight),
+    )
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Sources reaching this edit score (number of edits decayed per build) are compiled separately
+_HOT_EDIT_SCORE = 1.5
+
+# Weight of the previous edit score per build, a slow decay avoids moving sources in and out of batches often
+_EDIT_DECAY = 0.9
+
+# Sources never edited still contribute to the expected incremental rebuild cost
+_MIN_EDIT_WEIGHT = 0.1
+
+# Batches are split once their estimated cost exceeds this limit to keep incremental rebuilds acceptable
+_MAX_BATCH_COST_MS = 30_000
+
+# Cost assumed for sources never compiled separately if no other source was either
+_DEFAULT_COST_MS = 1000
+
+
+class _SourceState(BaseModel):
+    digest: str
+    edit_score: float = 0.0
+    cost_ms: int | None = None
+
+
+class _UnityState(BaseModel):
+    sources: dict[str, _SourceState] = {}
+    isolated: list[str] = []
+    cold_build_ms: dict[str, int] = {}
+
+
+def _update_state(project_dir: Path, name: str, build_dir: Path) -> _UnityState:
+    # edits are detected by the content digests of the include graph, which is updated incrementally
+    graph = update_include_graph(project_dir, name, build_dir)
+    source_files = collect_source_files(project_dir, name)
+    state = _load_state(build_dir)
+    sources = {}
+    for source in [*source_files.library_sources, *source_files.test_sources]:
+        digest = graph.nodes[source].digest
+        previous = state.sources.get(source)
+        if previous is None:
+            sources[source] = _SourceState(digest=digest)
+        else:
+            edit_score = previous.edit_score * _EDIT_DECAY + (1.0 if previous.digest != digest else 0.0)
+            sources[source] = _SourceState(digest=digest, edit_score=edit_score, cost_ms=previous.cost_ms)
+    state.sources = sources
+    state.isolated = [source for source in state.isolated if source in sources]
+    return state
+
+
+def _find_standalone_sources(state: _UnityState, sources: list[str]) -> set[str]:
+    return {
+        source for source in sources if source in state.isolated or state.sources[source].edit_score >= _HOT_EDIT_SCORE
+    }
+
+
+def _create_batches(group: str, sources: list[str], state: _UnityState, jobs: int) -> list[UnityBatch]:
+    costs = _estimate_costs(state)
+    total_cost = sum(costs[source] for source in sources)
+    # batches of a single source are no batches, larger batches are split to keep the build parallel
+    num_batches = min(max(jobs, math.ceil(total_cost / _MAX_BATCH_COST_MS)), len(sources) // 2)
+    if num_batches == 0:
+        return []
+    # the longest-processing-time-first heuristic assigns each source to the batch with the lowest cost
+    members: list[list[str]] = [[] for _ in range(num_batches)]
+    batch_costs = [0] * num_batches
+    for source in sorted(sources, key=lambda s: (-costs[s], s)):
+        idx = batch_costs.index(min(batch_costs))
+        members[idx].append(source)
+        batch_costs[idx] += costs[source]
+    return [
+        UnityBatch(name=f"{group}_{idx}", sources=sorted(batch_sources), estimated_cost_ms=batch_costs[idx])
+        for idx, batch_sources in enumerate(members)
+    ]
+
+
+def _estimate_costs(state: _UnityState) -> dict[str, int]:
+    known = [entry.cost_ms for entry in state.sources.values() if entry.cost_ms is not None]
+    default = round(sum(known) / len(known)) if known else _DEFAULT_COST_MS
+    return {source: entry.cost_ms if entry.cost_ms is not None else default for source, entry in state.sources.items()}
+
+
+def _read_durations(build_dir: Path, sources: dict[str, _SourceState]) -> dict[str, int]:
+    ninja_log = read_ninja_log(build_dir)
+    durations = {}
+    for source in sources:
+        entry = ninja_log.get(f"obj/{source}.o")
+        if entry is not None:
+            durations[source] = entry.duration_ms
+    return durations
+
+
+def _compose_unity_content(project_dir: Path, sources: list[str]) -> str:
+    return "// Generated by cpd: do not edit.\n" + "".join(f'#include "{project_dir / source}"\n' for source in sources)
+
+
+def _compiles(project_dir: Path, sources: list[str], command: list[str]) -> bool:
+    result = subprocess.run(  # noqa: S603
+        [*command, "-x", "c++", "-fsyntax-only", "-"],
+        input=_compose_unity_content(project_dir, sources).encode(),
+        capture_output=True,
+        check=False,
+    )
+    return result.returncode == 0
+
+
+def _load_state(build_dir: Path) -> _UnityState:
+    state_file = _compose_state_file(build_dir)
+    if not state_file.exists():
+        return _UnityState()
+    return _UnityState.model_validate_json(state_file.read_text())
+
+
+def _store_state(build_dir: Path, state: _UnityState) -> None:
+    state_file = _compose_state_file(build_dir)
+    ensure_dir_exists(state_file.parent)
+    tmp_file = state_file.with_suffix(".tmp")
+    tmp_file.write_text(state.model_dump_json(indent=2))
+    tmp_file.replace(state_file)
+
+
+def _compose_state_file(build_dir: Path) -> Path:
+    return build_dir / "unity" / "state.json"
@@ -0,0 +1,146 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import dataclasses
+import os
+from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Literal
+
+from .engine import BuildConfig, BuildResult, build_project
+from .include_graph import store_include_graph, update_include_graph
+from .ninja import Jobserver, supports_jobserver
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+BuildType = Literal["Debug", "Release"]
+
+
+@dataclass
+class BuildVariant:
+    """Compiler and linker flags of a build variant and the build type of the dependencies it links against."""
+
+    name: str
+    cxxflags: list[str]
+    ldflags: list[str]
+    build_type: BuildType
+
+
+BUILD_VARIANTS = {
+    variant.name: variant
+    for variant in [
+        BuildVariant("debug", ["-O0", "-g"], [], "Debug"),
+        BuildVariant("release", ["-O2", "-DNDEBUG"], [], "Release"),
+        BuildVariant(
+            "asan",
+            ["-O1", "-g", "-fsanitize=address", "-fno-omit-frame-pointer"],
+            ["-fsanitize=address"],
+            "Debug",
+        ),
+        BuildVariant(
+            "ubsan",
+            ["-O1", "-g", "-fsanitize=undefined", "-fno-sanitize-recover=undefined"],
+            ["-fsanitize=undefined"],
+            "Debug",
+        ),
+    ]
+}
+
+
+def parse_build_variants(spec: str) -> list[BuildVariant]:
+    """Parse a comma-separated list of build variant names."""
+    variants = []
+    for name in dict.fromkeys(name.strip() for name in spec.split(",") if name.strip()):
+        if name not in BUILD_VARIANTS:
+            raise RuntimeError(f"Unknown build variant {name}, available variants: {', '.join(BUILD_VARIANTS)}.")
+        variants.append(BUILD_VARIANTS[name])
+    if not variants:
+        raise RuntimeError("No build variant given.")
+    return variants
+
+
+def apply_build_variant(config: BuildConfig, variant: BuildVariant) -> BuildConfig:
+    """Return a copy of the build configuration with the flags of the variant."""
+    return dataclasses.replace(
+        config,
+        cxxflags=[*config.cxxflags, *variant.cxxflags],
+        ldflags=[*config.ldflags, *variant.ldflags],
+        # binaries linked against dependencies of different build types must not share cached links
+        dependency_digest=f"{config.dependency_digest}:{variant.build_type}" if config.dependency_digest else None,
+    )
+
+
+def compose_variant_build_dir(build_dir: Path, variant: str) -> Path:
+    """Compose the build directory of a variant within the build directory of the project."""
+    return build_dir / "variants" / variant
+
+
+def compose_variant_dependency_dir(build_dir: Path, build_type: BuildType) -> Path:
+    """Compose the directory the dependencies of a build type are prepared in, shared by all variants using it."""
+    return build_dir / "variants" / f"deps-{build_type.lower()}"
+
+
+def build_variants(
+    project_dir: Path,
+    name: str,
+    configs: dict[str, BuildConfig],
+    build_dir: Path,
+    jobs: int | None = None,
+) -> dict[str, BuildResult]:
+    """Build multiple variants of the project concurrently, each in its own build directory.
+
+    The Ninja processes of all variants share the parallel jobs (the number of CPUs by default) through
+    a jobserver, or split them evenly if the Ninja version does not support jobservers. The include graph
+    is scanned once and seeded into the build directories of the variants, such that their builds find
+    all files up to date. All variants are built even if one of them fails.
+    """
+    graph = update_include_graph(project_dir, name, build_dir)
+    for variant in configs:
+        store_include_graph(compose_variant_build_dir(build_dir, variant), graph)
+    with (
+        _share_jobs(jobs or os.cpu_count() or 1, len(configs)) as shared_jobs,
+        ThreadPoolExecutor(max_workers=len(configs)) as executor,
+    ):
+        futures = {
+            variant: executor.submit(
+                build_project,
+                project_dir,
+                name,
+                config,
+                compose_variant_build_dir(build_dir, variant),
+                shared_jobs,
+            )
+            for variant, config in configs.items()
+        }
+        results = {}
+        failed = []
+        for variant, future in futures.items():
+            try:
+                results[variant] = future.result()
+            except RuntimeError:
+                failed.append(variant)
+    if failed:
+        raise RuntimeError(f"The build of the variants {', '.join(failed)} failed.")
+    return results
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+
+@contextmanager
+def _share_jobs(jobs: int, clients: int) -> Generator[int | Jobserver]:
+    if not supports_jobserver():
+        # the Ninja processes would each run the full number of jobs and oversubscribe the machine
+        yield max(jobs // clients, 1)
+        return
+    with Jobserver(jobs, clients) as jobserver:
+        yield jobserver
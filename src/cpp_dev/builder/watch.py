@@ -0,0 +1,249 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import ctypes
+import os
+import select
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Self
+
+from cpp_dev.project.path_composition import compose_include_file, compose_source_file
+
+from .include_graph import (
+    AffectedTargets,
+    find_affected_targets,
+    refresh_include_graph,
+    update_include_graph,
+)
+from .sources import HEADER_SUFFIXES, SOURCE_SUFFIX, collect_source_files
+from .targets import compose_library_target, compose_test_target
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+@dataclass
+class WatchChanges:
+    """A debounced batch of changed project files and the build targets affected by them."""
+
+    changed_files: list[str]
+    # the project configuration, the lock file or the set of source files changed, such that the
+    # build must be planned from scratch
+    full_build: bool
+    affected: AffectedTargets
+    # Ninja targets to build for the affected translation units (empty for a full build)
+    targets: list[str]
+
+
+class ProjectWatcher:
+    """Watch the sources, headers and configuration files of a project using inotify.
+
+    The include graph is kept in memory and only the changed files are re-scanned, such that the
+    affected targets of a change are determined without walking the project tree.
+    """
+
+    def __init__(self, project_dir: Path, name: str, build_dir: Path, debounce: float = 0.1) -> None:
+        self._project_dir = project_dir
+        self._name = name
+        self._build_dir = build_dir
+        self._debounce = debounce
+        self._source_dirs = [compose_include_file(project_dir, name).parent, compose_source_file(project_dir)]
+        self._inotify = _Inotify()
+        # the configuration files are located in the project directory, which also contains the build directory
+        self._inotify.add_watch(project_dir)
+        for source_dir in self._source_dirs:
+            self._inotify.add_tree(source_dir)
+        self._source_files = collect_source_files(project_dir, name)
+        self._graph = update_include_graph(project_dir, name, build_dir)
+
+    def __enter__(self) -> Self:
+        """Enter the watch scope."""
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop watching."""
+        self.close()
+
+    def close(self) -> None:
+        """Stop watching and release the inotify instance."""
+        self._inotify.close()
+
+    def wait(self, timeout: float | None = None) -> WatchChanges | None:
+        """Wait for the next batch of changes or return None if nothing changed within the timeout.
+
+        Changes are collected until no further change arrives within the debounce interval, such that
+        saving multiple files (or an editor writing a file in multiple steps) results in a single batch.
+        """
+        paths = self._read(timeout)
+        if paths is None:
+            return None
+        while (more_paths := self._read(self._debounce)) is not None:
+            paths |= more_paths
+        return self._process_changes(paths)
+
+    def _read(self, timeout: float | None) -> set[Path] | None:
+        # changes of other files in the project directory (e.g. the build directory) are ignored
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+            paths = self._inotify.read(remaining)
+            if paths is None:
+                return None
+            relevant = {path for path in paths if self._is_relevant(path)}
+            if relevant:
+                return relevant
+
+    def _is_relevant(self, path: Path) -> bool:
+        if path == _OVERFLOW or (path.parent == self._project_dir and path.name in _CONFIG_FILES):
+            return True
+        return any(path.is_relative_to(source_dir) for source_dir in self._source_dirs)
+
+    def _process_changes(self, paths: set[Path]) -> WatchChanges:
+        changed_files = sorted(
+            str(path.relative_to(self._project_dir)) for path in paths if path.is_relative_to(self._project_dir)
+        )
+        if _OVERFLOW in paths or any(self._changes_structure(changed_file) for changed_file in changed_files):
+            self._source_files = collect_source_files(self._project_dir, self._name)
+            self._graph = update_include_graph(self._project_dir, self._name, self._build_dir)
+            affected = find_affected_targets(self._graph, self._name, self._source_files, self._graph.nodes)
+            return WatchChanges(changed_files=changed_files, full_build=True, affected=affected, targets=[])
+
+        project_files = [changed_file for changed_file in changed_files if changed_file in self._graph.nodes]
+        self._graph = refresh_include_graph(self._project_dir, self._name, self._graph, project_files)
+        affected = find_affected_targets(self._graph, self._name, self._source_files, project_files)
+        targets = []
+        if any(source in self._source_files.library_sources for source in affected.translation_units):
+            targets.append(compose_library_target(self._name))
+        if affected.test_binaries:
+            targets.append(compose_test_target(self._name))
+        return WatchChanges(changed_files=changed_files, full_build=False, affected=affected, targets=targets)
+
+    def _changes_structure(self, changed_file: str) -> bool:
+        # the set of project files is derived from the events instead of re-scanning the project tree
+        if changed_file in _CONFIG_FILES:
+            return True
+        path = self._project_dir / changed_file
+        if changed_file.endswith((SOURCE_SUFFIX, *HEADER_SUFFIXES)):
+            return path.is_file() != (changed_file in self._graph.nodes)
+        # directories containing project files were moved or removed
+        return not path.exists() and any(node.startswith(f"{changed_file}/") for node in self._graph.nodes)
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_CONFIG_FILES = {"cpp-dev.yaml", "cpp-dev.lock"}
+
+# Marker path for a queue overflow, i.e. changes were lost
+_OVERFLOW = Path("/")
+
+# Constants of <sys/inotify.h>
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ISDIR = 0x40000000
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+_READ_SIZE = 64 * 1024
+
+
+class _Inotify:
+    def __init__(self) -> None:
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_CLOEXEC | _IN_NONBLOCK)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "Failed to initialize inotify.")
+        self._watches: dict[int, Path] = {}
+        # directories created within recursively watched directories are watched as well
+        self._recursive: set[int] = set()
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def add_watch(self, directory: Path) -> int:
+        wd: int = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Failed to watch {directory}.")
+        self._watches[wd] = directory
+        return wd
+
+    def add_tree(self, root_dir: Path) -> set[Path]:
+        # the files within are returned as they are new if the directory was created
+        files: set[Path] = set()
+        for directory, _, file_names in os.walk(root_dir):
+            self._recursive.add(self.add_watch(Path(directory)))
+            files.update(Path(directory) / file_name for file_name in file_names)
+        return files
+
+    def read(self, timeout: float | None) -> set[Path] | None:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            remaining = max(deadline - time.monotonic(), 0.0) if deadline is not None else None
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return None
+            paths = self._parse_events(os.read(self._fd, _READ_SIZE))
+            # events of removed watches do not refer to project files
+            if paths:
+                return paths
+
+    def _parse_events(self, data: bytes) -> set[Path]:
+        paths = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                paths.add(_OVERFLOW)
+                continue
+            if mask & _IN_IGNORED:
+                self._watches.pop(wd, None)
+                self._recursive.discard(wd)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            path = directory / name if name else directory
+            paths.add(path)
+            if wd in self._recursive and mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO) and path.is_dir():
+                # files created before the watch got added are not reported by inotify
+                paths |= self.add_tree(path)
+        return paths
@@ -3,10 +3,11 @@
 # This work is licensed under the terms of the BSD-3-Clause license.
 # For a copy, see <https://opensource.org/license/bsd-3-clause>.
 
+import json
+import os
 from dataclasses import dataclass
 from enum import Enum
-
-import distro
+from pathlib import Path
 
 ###############################################################################
 # Public API                                                                ###
@@ -29,9 +30,12 @@ class OperatingSystem:
     version: str
 
 
-def assert_supported_os() -> None:
-    """Assert that the current operating system is supported by cpd."""
-    os = detect_os()
+def assert_supported_os(cache_dir: Path | None = None) -> None:
+    """Assert that the current operating system is supported by cpd.
+
+    If a cache directory is given, the detection result is cached per host in this directory.
+    """
+    os = detect_os() if cache_dir is None else detect_os_cached(cache_dir)
     if os.type == OperatingSystemType.Unsupported:
         msg = f"Unsupported operating system: {os.name} {os.version}"
         raise RuntimeError(msg)
@@ -39,6 +43,9 @@ def assert_supported_os() -> None:
 
 def detect_os() -> OperatingSystem:
     """Detect the current operating system: id, name and version."""
+    # distro is only imported when the detection actually runs as importing it is comparably slow
+    import distro  # noqa: PLC0415
+
     distro_id = distro.id()
     distro_name = distro.name(pretty=True)
     distro_version = distro.version(best=True)
@@ -50,6 +57,21 @@ def detect_os() -> OperatingSystem:
     )
 
 
+def detect_os_cached(cache_dir: Path) -> OperatingSystem:
+    """Detect the current operating system using a per-host cache file in the cache directory.
+
+    The cache is invalidated whenever the os-release file changes, e.g. due to a distribution upgrade.
+    """
+    cache_file = _compose_os_cache_file(cache_dir)
+    fingerprint = _compute_os_release_fingerprint()
+    cached_os = _load_cached_os(cache_file, fingerprint)
+    if cached_os is not None:
+        return cached_os
+    operating_system = detect_os()
+    _store_cached_os(cache_file, fingerprint, operating_system)
+    return operating_system
+
+
 def get_supported_os() -> list[OperatingSystemType]:
     """Return a list of supported operating system types."""
     return [
@@ -82,3 +104,48 @@ def _construct_unsupported_os(name: str, version: str) -> OperatingSystem:
         name=name,
         version=version,
     )
+
+
+_OS_RELEASE_FILES = (Path("/etc/os-release"), Path("/usr/lib/os-release"))
+
+
+def _compute_os_release_fingerprint() -> str:
+    for os_release_file in _OS_RELEASE_FILES:
+        try:
+            stat = os_release_file.stat()
+        except OSError:
+            continue
+        return f"{os_release_file}:{stat.st_mtime_ns}:{stat.st_size}"
+    return "none"
+
+
+def _load_cached_os(cache_file: Path, fingerprint: str) -> OperatingSystem | None:
+    try:
+        data = json.loads(cache_file.read_text())
+    except (OSError, ValueError):
+        return None
+    if data.get("fingerprint") != fingerprint:
+        return None
+    return OperatingSystem(type=OperatingSystemType(data["type"]), name=data["name"], version=data["version"])
+
+
+def _store_cached_os(cache_file: Path, fingerprint: str, operating_system: OperatingSystem) -> None:
+    data = {
+        "fingerprint": fingerprint,
+        "type": operating_system.type.value,
+        "name": operating_system.name,
+        "version": operating_system.version,
+    }
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_cache_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+        tmp_cache_file.write_text(json.dumps(data))
+        tmp_cache_file.replace(cache_file)
+    except OSError:
+        # the cache is an optimization only, e.g. a read-only home directory must not break cpd
+        return
+
+
+def _compose_os_cache_file(cache_dir: Path) -> Path:
+    # the cpd directory may be shared across hosts, e.g. on a network home directory
+    return cache_dir / f"os-{os.uname().nodename}.json"
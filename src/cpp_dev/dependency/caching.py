@@ -0,0 +1,69 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import time
+from collections.abc import Callable
+
+from cpp_dev.common.version import SemanticVersion
+
+from .provider import DependencyIdentifier, DependencyProvider, InstalledDependency
+from .specifier import DependencySpecifier
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class CachingDependencyProvider(DependencyProvider):
+    """Dependency provider caching the resolution results of another provider.
+
+    Available versions and dependency hulls are cached for a limited time to pick up new
+    packages on the remote eventually. Installations are always forwarded.
+    This provider is intended for long-running processes like the cpd daemon.
+    """
+
+    def __init__(
+        self,
+        provider: DependencyProvider,
+        ttl: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._provider = provider
+        self._ttl = ttl
+        self._clock = clock
+        self._versions: dict[tuple[str, str], tuple[float, list[SemanticVersion]]] = {}
+        self._hulls: dict[tuple[str, ...], tuple[float, set[DependencyIdentifier]]] = {}
+
+    def fetch_versions(self, repository: str, name: str) -> list[SemanticVersion]:
+        """Fetch available versions from the cache or the underlying provider."""
+        key = (repository, name)
+        cached = self._versions.get(key)
+        if cached is not None and self._is_valid(cached[0]):
+            return list(cached[1])
+        versions = self._provider.fetch_versions(repository, name)
+        self._versions[key] = (self._clock(), list(versions))
+        return versions
+
+    def collect_dependency_hull(self, deps: list[DependencySpecifier]) -> set[DependencyIdentifier]:
+        """Collect the dependency hull from the cache or the underlying provider."""
+        key = tuple(sorted(str(dep) for dep in deps))
+        cached = self._hulls.get(key)
+        if cached is not None and self._is_valid(cached[0]):
+            return set(cached[1])
+        hull = self._provider.collect_dependency_hull(deps)
+        self._hulls[key] = (self._clock(), set(hull))
+        return hull
+
+    def install_dependencies(self, deps: list[DependencySpecifier]) -> list[InstalledDependency]:
+        """Install the dependencies using the underlying provider."""
+        return self._provider.install_dependencies(deps)
+
+    def invalidate(self) -> None:
+        """Drop all cached resolution results."""
+        self._versions.clear()
+        self._hulls.clear()
+
+    def _is_valid(self, timestamp: float) -> bool:
+        return self._clock() - timestamp < self._ttl
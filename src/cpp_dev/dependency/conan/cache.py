@@ -0,0 +1,168 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import os
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from filelock import FileLock
+from pydantic import BaseModel
+
+from cpp_dev.dependency.provider import DependencyIdentifier
+
+from .command_wrapper import ConanInstallNode, conan_remove
+from .mirror import invalidate_restored_mirror
+from .types import ConanPackageReferenceWithSemanticVersion
+from .utils import compose_conan_package_reference_from_identifier, conan_env
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class CachedPackageRevision(BaseModel):
+    """Usage information of a single package revision in the Conan cache."""
+
+    ref: str
+    recipe_revision: str
+    package_id: str
+    package_revision: str
+    size: int
+    last_access: float
+
+    @property
+    def pattern(self) -> str:
+        """Return the Conan pattern identifying exactly this package revision."""
+        return f"{self.ref}#{self.recipe_revision}:{self.package_id}#{self.package_revision}"
+
+
+class CacheUsageIndex(BaseModel):
+    """Usage information of all package revisions installed by cpd, keyed by their Conan pattern."""
+
+    packages: dict[str, CachedPackageRevision] = {}
+
+    @property
+    def total_size(self) -> int:
+        """Return the accumulated size of all tracked package revisions."""
+        return sum(package.size for package in self.packages.values())
+
+
+@dataclass
+class CacheGarbageCollectionResult:
+    """Result of a garbage collection run on the Conan cache."""
+
+    cache_size: int
+    reclaimed_bytes: int = 0
+    evicted: list[str] = field(default_factory=list)
+    # package revisions whose removal failed, which are kept in the usage index to be retried
+    failed: list[str] = field(default_factory=list)
+
+
+def record_cache_usage(conan_home: Path, nodes: Iterable[ConanInstallNode]) -> None:
+    """Record the access of installed package revisions in the cache usage index.
+
+    The size of a package revision is computed only once when it is seen for the first time
+    because package revisions are immutable.
+    """
+    now = time.time()
+    with _lock_usage_index(conan_home):
+        index = load_cache_usage_index(conan_home)
+        for node in nodes:
+            if node.rrev is None or node.package_id is None or node.prev is None or node.package_folder is None:
+                continue
+            ref = ConanPackageReferenceWithSemanticVersion.from_raw_string_with_revision(node.ref)
+            package = CachedPackageRevision(
+                ref=str(ref),
+                recipe_revision=node.rrev,
+                package_id=node.package_id,
+                package_revision=node.prev,
+                size=0,
+                last_access=now,
+            )
+            if package.pattern in index.packages:
+                index.packages[package.pattern].last_access = now
+            else:
+                package.size = _compute_dir_size(Path(node.package_folder))
+                index.packages[package.pattern] = package
+        _store_cache_usage_index(conan_home, index)
+
+
+def collect_garbage(
+    conan_home: Path,
+    max_size: int,
+    protected: set[DependencyIdentifier],
+) -> CacheGarbageCollectionResult:
+    """Evict least-recently used package revisions until the cache fits into the size quota.
+
+    Package revisions of protected dependencies (e.g. referenced by lock files) are never evicted.
+    The check is cheap if the quota is not exceeded as only the usage index gets read.
+    """
+    with _lock_usage_index(conan_home):
+        index = load_cache_usage_index(conan_home)
+        result = CacheGarbageCollectionResult(cache_size=index.total_size)
+        if result.cache_size <= max_size:
+            return result
+
+        protected_refs = {str(compose_conan_package_reference_from_identifier(dep)) for dep in protected}
+        candidates = sorted(
+            (package for package in index.packages.values() if package.ref not in protected_refs),
+            key=lambda package: package.last_access,
+        )
+        with conan_env(conan_home):
+            for package in candidates:
+                if result.cache_size <= max_size:
+                    break
+                if not conan_remove(package.pattern):
+                    result.failed.append(package.pattern)
+                    continue
+                del index.packages[package.pattern]
+                result.cache_size -= package.size
+                result.reclaimed_bytes += package.size
+                result.evicted.append(package.pattern)
+
+        if result.evicted:
+            _store_cache_usage_index(conan_home, index)
+            invalidate_restored_mirror(conan_home)
+        return result
+
+
+def load_cache_usage_index(conan_home: Path) -> CacheUsageIndex:
+    """Load the cache usage index or return an empty index if nothing was recorded yet."""
+    index_file = _compose_usage_index_file(conan_home)
+    if not index_file.exists():
+        return CacheUsageIndex()
+    return CacheUsageIndex.model_validate_json(index_file.read_text())
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+
+def _compute_dir_size(path: Path) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            file_path = Path(root) / file
+            if not file_path.is_symlink():
+                size += file_path.stat().st_size
+    return size
+
+
+def _store_cache_usage_index(conan_home: Path, index: CacheUsageIndex) -> None:
+    index_file = _compose_usage_index_file(conan_home)
+    tmp_index_file = index_file.with_suffix(".tmp")
+    tmp_index_file.write_text(index.model_dump_json())
+    tmp_index_file.replace(index_file)
+
+
+def _lock_usage_index(conan_home: Path) -> FileLock:
+    return FileLock(conan_home / ".cpd_cache_usage.lock")
+
+
+def _compose_usage_index_file(conan_home: Path) -> Path:
+    return conan_home / ".cpd_cache_usage.json"
@@ -26,7 +26,7 @@ class ConanCommandException(Exception):
         super().__init__(f"{self._command} failed: {self._msg}")
 
 
-ConanSettingName = Literal["compiler", "compiler.cppstd"]
+ConanSettingName = Literal["compiler", "compiler.cppstd", "build_type"]
 ConanSettings = dict[ConanSettingName, object]
 
 
@@ -57,16 +57,103 @@ def conan_remote_login(remote: str, user: str, password: str) -> None:
 class ConanListResult(RootModel):
     root: Mapping[str, Mapping[ConanPackageReferenceWithSemanticVersion, dict]]
 
-def conan_list(remote: str, name: str) -> Mapping[ConanPackageReferenceWithSemanticVersion, dict]:
+# Name under which "conan list" reports results for the local cache.
+CONAN_LOCAL_CACHE = "Local Cache"
+
+def _compose_remote_args(remote: str | None) -> list[str]:
+    return [f"--remote={remote}"] if remote is not None else []
+
+def conan_list(remote: str | None, name: str) -> Mapping[ConanPackageReferenceWithSemanticVersion, dict]:
+    """Run "conan list" for all versions of a package.
+
+    The local cache is listed instead of a remote if remote is None.
+    """
     stdout, _ = run_command_assert_success(
         "conan",
         "list",
         "-f", "json",
-        f"--remote={remote}",
+        *_compose_remote_args(remote),
         f"{name}/",
     )
     parsed_data = ConanListResult.model_validate_json(stdout)
-    return parsed_data.root[remote]
+    return parsed_data.root[remote if remote is not None else CONAN_LOCAL_CACHE]
+
+
+class ConanRevisionInfo(BaseModel):
+    timestamp: float
+
+class ConanBinaryPackageRevisions(BaseModel):
+    revisions: dict[str, ConanRevisionInfo] = {}
+
+class ConanRecipeRevisionInfo(BaseModel):
+    timestamp: float
+    packages: dict[str, ConanBinaryPackageRevisions] = {}
+
+class ConanRecipeRevisions(BaseModel):
+    revisions: dict[str, ConanRecipeRevisionInfo] = {}
+
+class ConanRevisionListResult(RootModel):
+    root: Mapping[str, Mapping[str, ConanRecipeRevisions | str]]
+
+def conan_list_revisions(remote: str | None, ref: ConanPackageReferenceWithSemanticVersion) -> ConanRecipeRevisions:
+    """Run "conan list" for all recipe and package revisions of a package reference.
+
+    The local cache is listed instead of a remote if remote is None.
+    An empty result is returned if the package reference does not exist.
+    """
+    stdout, _ = run_command_assert_success(
+        "conan",
+        "list",
+        "-f", "json",
+        *_compose_remote_args(remote),
+        f"{ref}#*:*#*",
+    )
+    parsed_data = ConanRevisionListResult.model_validate_json(stdout)
+    result = parsed_data.root[remote if remote is not None else CONAN_LOCAL_CACHE].get(str(ref))
+    # a non-existing reference is reported as error string instead of the revisions
+    if not isinstance(result, ConanRecipeRevisions):
+        return ConanRecipeRevisions()
+    return result
+
+
+######################
+### Conan Download ###
+######################
+def conan_download(pattern: str, remote: str) -> None:
+    """Run "conan download" for a package pattern, e.g. "name/version@user/channel#rrev:package_id#prev"."""
+    run_command_assert_success(
+        "conan",
+        "download",
+        "-r", remote,
+        pattern,
+    )
+
+
+########################
+### Conan Cache Save ###
+########################
+def conan_cache_save(pattern: str, archive_file: Path) -> None:
+    """Run "conan cache save" to store the packages matching the pattern into an archive."""
+    run_command_assert_success(
+        "conan",
+        "cache",
+        "save",
+        "--file", str(archive_file),
+        pattern,
+    )
+
+
+###########################
+### Conan Cache Restore ###
+###########################
+def conan_cache_restore(archive_file: Path) -> None:
+    """Run "conan cache restore" to restore the packages of an archive into the local cache."""
+    run_command_assert_success(
+        "conan",
+        "cache",
+        "restore",
+        str(archive_file),
+    )
 
 
 ###############################
@@ -116,8 +203,11 @@ def _handle_graph_buildorder_error(stderr: str) -> None:
         msg="generic error",
     )
 
-def conan_graph_buildorder(conanfile_path: Path, profile: str, settings: ConanSettings) -> ConanGraphBuildOrder:
-    """Run "conan graph buildorder"."""
+def conan_graph_buildorder(conanfile_path: Path, profile: str, settings: ConanSettings, no_remote: bool = False) -> ConanGraphBuildOrder:
+    """Run "conan graph buildorder".
+
+    The graph is resolved from the local cache only if no_remote is set.
+    """
     command = [
         "conan",
         "graph",
@@ -127,6 +217,8 @@ def conan_graph_buildorder(conanfile_path: Path, profile: str, settings: ConanSe
         "-f", "json",
         "--order-by", "recipe",
     ]
+    if no_remote:
+        command.append("--no-remote")
     for key, value in settings.items():
         command.extend(["-s:a", f"{key}={value}"])
     rc, stdout, stderr = run_command(
@@ -138,6 +230,61 @@ def conan_graph_buildorder(conanfile_path: Path, profile: str, settings: ConanSe
     return ConanGraphBuildOrder.model_validate_json(stdout)
 
 
+#####################
+### Conan Install ###
+#####################
+class ConanInstallNode(BaseModel):
+    ref: str
+    rrev: str | None = None
+    package_id: str | None = None
+    prev: str | None = None
+    package_folder: str | None = None
+
+class ConanInstallGraph(BaseModel):
+    nodes: dict[str, ConanInstallNode]
+
+class ConanInstallResult(BaseModel):
+    graph: ConanInstallGraph
+
+def conan_install(conanfile_path: Path, profile: str, settings: ConanSettings, no_remote: bool = False) -> ConanInstallResult:
+    """Run "conan install".
+
+    The packages are installed from the local cache only if no_remote is set.
+    """
+    command = [
+        "conan",
+        "install",
+        str(conanfile_path),
+        "-pr:a", profile,
+        "-f", "json",
+    ]
+    if no_remote:
+        command.append("--no-remote")
+    for key, value in settings.items():
+        command.extend(["-s:a", f"{key}={value}"])
+    stdout, _ = run_command_assert_success(
+        *command
+    )
+    return ConanInstallResult.model_validate_json(stdout)
+
+
+####################
+### Conan Remove ###
+####################
+def conan_remove(pattern: str) -> bool:
+    """Run "conan remove" for a package pattern in the local cache.
+
+    Returns False if the pattern did not match any package in the cache.
+    """
+    rc, _, _ = run_command(
+        "conan",
+        "remove",
+        "-c",
+        pattern,
+    )
+    return rc == 0
+
+
 ####################
 ### Conan Create ###
 ####################
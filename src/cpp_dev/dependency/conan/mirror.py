@@ -0,0 +1,205 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from cpp_dev.common.utils import ensure_dir_exists
+from cpp_dev.dependency.provider import DependencyIdentifier
+
+from .command_wrapper import conan_cache_restore, conan_cache_save, conan_download, conan_list_revisions
+from .setup import CONAN_REMOTE
+from .types import ConanPackageReferenceWithSemanticVersion
+from .utils import compose_conan_package_reference_from_identifier, conan_env
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class MirroredRevision(BaseModel):
+    """A single recipe/package revision stored as archive in the mirror."""
+
+    ref: str
+    recipe_revision: str
+    package_id: str | None
+    package_revision: str | None
+    archive: str
+
+    @property
+    def pattern(self) -> str:
+        """Return the Conan pattern identifying exactly this revision."""
+        return _compose_revision_pattern(self.ref, self.recipe_revision, self.package_id, self.package_revision)
+
+
+class MirrorIndex(BaseModel):
+    """Index of all revisions available in a local file-system mirror."""
+
+    revisions: list[MirroredRevision] = []
+
+
+@dataclass
+class MirrorSyncResult:
+    """Result of a mirror synchronization."""
+
+    transferred: list[str] = field(default_factory=list)
+    up_to_date: int = 0
+
+
+def sync_mirror(
+    conan_home: Path,
+    mirror_dir: Path,
+    deps: Iterable[DependencyIdentifier],
+    remote: str = CONAN_REMOTE,
+) -> MirrorSyncResult:
+    """Synchronize the packages of the given dependencies from the remote into the mirror directory.
+
+    Only the revisions a locked version resolves to are mirrored (see _list_locked_revisions).
+    The synchronization is incremental: only recipe and package revisions not yet present in the
+    mirror are downloaded and archived. The index is persisted after each transferred revision
+    such that an interrupted synchronization can be resumed.
+    """
+    ensure_dir_exists(_compose_archive_dir(mirror_dir))
+    index = load_mirror_index(mirror_dir)
+    present_patterns = {revision.pattern for revision in index.revisions}
+    result = MirrorSyncResult()
+    with conan_env(conan_home):
+        for dep in sorted(set(deps), key=str):
+            ref = compose_conan_package_reference_from_identifier(dep)
+            for revision in _list_locked_revisions(remote, ref):
+                if revision.pattern in present_patterns:
+                    result.up_to_date += 1
+                    continue
+                conan_download(revision.pattern, remote)
+                conan_cache_save(revision.pattern, _compose_archive_dir(mirror_dir) / revision.archive)
+                index.revisions.append(revision)
+                present_patterns.add(revision.pattern)
+                _store_mirror_index(mirror_dir, index)
+                result.transferred.append(revision.pattern)
+    return result
+
+
+def restore_mirror(conan_home: Path, mirror_dir: Path) -> list[str]:
+    """Restore all mirror archives into the Conan cache that have not been restored before.
+
+    Returns the patterns of the restored revisions.
+    """
+    index = load_mirror_index(mirror_dir)
+    restored_archives = _load_restored_archives(conan_home)
+    restored = []
+    with conan_env(conan_home):
+        for revision in index.revisions:
+            if revision.archive in restored_archives:
+                continue
+            conan_cache_restore(_compose_archive_dir(mirror_dir) / revision.archive)
+            restored_archives.add(revision.archive)
+            restored.append(revision.pattern)
+    if restored:
+        _store_restored_archives(conan_home, restored_archives)
+    return restored
+
+
+def invalidate_restored_mirror(conan_home: Path) -> None:
+    """Forget which mirror archives were restored such that the next restore re-applies all of them.
+
+    This is required whenever packages are removed from the Conan cache.
+    """
+    _compose_restored_file(conan_home).unlink(missing_ok=True)
+
+
+def load_mirror_index(mirror_dir: Path) -> MirrorIndex:
+    """Load the mirror index or return an empty index if the mirror does not exist yet."""
+    index_file = _compose_index_file(mirror_dir)
+    if not index_file.exists():
+        return MirrorIndex()
+    return MirrorIndex.model_validate_json(index_file.read_text())
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+
+def _list_locked_revisions(remote: str, ref: ConanPackageReferenceWithSemanticVersion) -> list[MirroredRevision]:
+    """List the revisions Conan resolves a locked version to.
+
+    Lock files pin versions only, for which Conan installs the latest recipe revision and the
+    latest package revision of each binary package. Older revisions are never resolved.
+    """
+    recipe_revisions = conan_list_revisions(remote, ref)
+    if not recipe_revisions.revisions:
+        return []
+    recipe_revision, recipe_info = max(recipe_revisions.revisions.items(), key=lambda item: item[1].timestamp)
+    if not recipe_info.packages:
+        return [_create_mirrored_revision(ref, recipe_revision, None, None)]
+    revisions = []
+    for package_id, package_info in recipe_info.packages.items():
+        if not package_info.revisions:
+            continue
+        package_revision, _ = max(package_info.revisions.items(), key=lambda item: item[1].timestamp)
+        revisions.append(_create_mirrored_revision(ref, recipe_revision, package_id, package_revision))
+    return revisions
+
+
+def _create_mirrored_revision(
+    ref: ConanPackageReferenceWithSemanticVersion,
+    recipe_revision: str,
+    package_id: str | None,
+    package_revision: str | None,
+) -> MirroredRevision:
+    archive_parts = [ref.name, str(ref.version), ref.user, recipe_revision]
+    if package_id is not None and package_revision is not None:
+        archive_parts.extend([package_id, package_revision])
+    return MirroredRevision(
+        ref=str(ref),
+        recipe_revision=recipe_revision,
+        package_id=package_id,
+        package_revision=package_revision,
+        archive="-".join(archive_parts) + ".tgz",
+    )
+
+
+def _compose_revision_pattern(
+    ref: str,
+    recipe_revision: str,
+    package_id: str | None,
+    package_revision: str | None,
+) -> str:
+    if package_id is None or package_revision is None:
+        return f"{ref}#{recipe_revision}"
+    return f"{ref}#{recipe_revision}:{package_id}#{package_revision}"
+
+
+def _store_mirror_index(mirror_dir: Path, index: MirrorIndex) -> None:
+    index_file = _compose_index_file(mirror_dir)
+    tmp_index_file = index_file.with_suffix(".tmp")
+    tmp_index_file.write_text(index.model_dump_json(indent=2))
+    tmp_index_file.replace(index_file)
+
+
+def _load_restored_archives(conan_home: Path) -> set[str]:
+    restored_file = _compose_restored_file(conan_home)
+    if not restored_file.exists():
+        return set()
+    return set(restored_file.read_text().splitlines())
+
+
+def _store_restored_archives(conan_home: Path, archives: set[str]) -> None:
+    _compose_restored_file(conan_home).write_text("\n".join(sorted(archives)))
+
+
+def _compose_index_file(mirror_dir: Path) -> Path:
+    return mirror_dir / "index.json"
+
+
+def _compose_archive_dir(mirror_dir: Path) -> Path:
+    return mirror_dir / "archives"
+
+
+def _compose_restored_file(conan_home: Path) -> Path:
+    return conan_home / ".cpd_mirror_restored"
@@ -13,16 +13,21 @@ from pathlib import Path
 from cpp_dev.common.types import CppStandard
 from cpp_dev.common.utils import create_tmp_dir
 from cpp_dev.common.version import SemanticVersion
+from cpp_dev.dependency.conan.cache import record_cache_usage
 from cpp_dev.dependency.conan.command_wrapper import (ConanRecipeAttributes,
+                                                      ConanInstallResult,
                                                       ConanSettings,
                                                       conan_graph_buildorder,
+                                                      conan_install,
                                                       conan_list)
+from cpp_dev.dependency.conan.mirror import restore_mirror
 from cpp_dev.dependency.conan.setup import CONAN_REMOTE
 from cpp_dev.dependency.conan.types import \
     ConanPackageReferenceWithSemanticVersion
 from cpp_dev.dependency.conan.utils import conan_env, create_conanfile
 from cpp_dev.dependency.provider import (DependencyIdentifier,
-                                         DependencyProvider)
+                                         DependencyProvider,
+                                         InstalledDependency)
 from cpp_dev.dependency.specifier import DependencySpecifier
 from cpp_dev.dependency.types import DependencySpecifierParts
 
@@ -31,37 +36,61 @@ from cpp_dev.dependency.types import DependencySpecifierParts
 ###############################################################################
 
 class ConanDependencyProvider(DependencyProvider):
-    
-    def __init__(self, conan_home_dir: Path, profile: str, settings: dict[ConanSetting, object] | None = None) -> None:
+    """Dependency provider using the Conan package manager.
+
+    If a mirror directory is given, the provider works offline: the mirror gets restored into the
+    Conan cache and all resolutions are performed against the local cache only.
+    """
+
+    def __init__(self, conan_home_dir: Path, profile: str, settings: ConanSettings | None = None, mirror_dir: Path | None = None) -> None:
         self._conan_home_dir = conan_home_dir
         self._profile = profile
         self._settings = settings
+        self._mirror_dir = mirror_dir
+        self._mirror_restored = False
 
     def fetch_versions(self, repository: str, name: str) -> list[SemanticVersion]:
+        self._restore_mirror_once()
         with conan_env(self._conan_home_dir):
-            package_references = _retrieve_conan_package_references(repository, name)
+            package_references = _retrieve_conan_package_references(self._compose_remote(), repository, name)
             available_versions = sorted([ref.version for ref in package_references], reverse=True)
             return available_versions
 
-    def collect_dependency_hull(self, deps: list[DependencySpecifier]) -> list[DependencyIdentifier]:
+    def collect_dependency_hull(self, deps: list[DependencySpecifier]) -> set[DependencyIdentifier]:
+        self._restore_mirror_once()
         with conan_env(self._conan_home_dir):
             with create_tmp_dir() as tmp_dir:
                 conanfile_path = create_conanfile(tmp_dir, deps)
                 conan_settings = self._settings if self._settings else {}
-                build_order = conan_graph_buildorder(conanfile_path, self._profile, conan_settings)
+                build_order = conan_graph_buildorder(conanfile_path, self._profile, conan_settings, no_remote=self._mirror_dir is not None)
                 return _construct_depenencies(build_order.order)
                 
 
-    def install_dependencies(self, deps: list[DependencySpecifier]) -> list[DependencySpecifier]:
-        ... # Implementation using Conan package manager
+    def install_dependencies(self, deps: list[DependencySpecifier]) -> list[InstalledDependency]:
+        self._restore_mirror_once()
+        with conan_env(self._conan_home_dir):
+            with create_tmp_dir() as tmp_dir:
+                conanfile_path = create_conanfile(tmp_dir, deps)
+                conan_settings = self._settings if self._settings else {}
+                install_result = conan_install(conanfile_path, self._profile, conan_settings, no_remote=self._mirror_dir is not None)
+                record_cache_usage(self._conan_home_dir, install_result.graph.nodes.values())
+                return _construct_installed_dependencies(install_result)
+
+    def _compose_remote(self) -> str | None:
+        return None if self._mirror_dir is not None else CONAN_REMOTE
+
+    def _restore_mirror_once(self) -> None:
+        if self._mirror_dir is not None and not self._mirror_restored:
+            restore_mirror(self._conan_home_dir, self._mirror_dir)
+            self._mirror_restored = True
 
 
 ###############################################################################
 # Implementation                                                            ###
 ###############################################################################
 
-def _retrieve_conan_package_references(repository: str, name: str) -> list[ConanPackageReferenceWithSemanticVersion]:
-    package_data = conan_list(CONAN_REMOTE, name)
+def _retrieve_conan_package_references(remote: str | None, repository: str, name: str) -> list[ConanPackageReferenceWithSemanticVersion]:
+    package_data = conan_list(remote, name)
     package_references = [
         ref
         for ref in package_data.keys()
@@ -78,4 +107,21 @@ def _construct_depenencies(build_order: list[list[ConanRecipeAttributes]]) -> se
             DependencyIdentifier(repository=ref.user, name=ref.name, version=ref.version)
         )
     return dependencies
-    
\ No newline at end of file
+
+
+# Name of the consumer node in the Conan install graph
+_CONAN_CONSUMER_NODE_REF = "conanfile"
+
+def _construct_installed_dependencies(install_result: ConanInstallResult) -> list[InstalledDependency]:
+    installed = []
+    for node in install_result.graph.nodes.values():
+        if node.ref == _CONAN_CONSUMER_NODE_REF or node.package_folder is None:
+            continue
+        ref = ConanPackageReferenceWithSemanticVersion.from_raw_string_with_revision(node.ref)
+        installed.append(
+            InstalledDependency(
+                id=DependencyIdentifier(repository=ref.user, name=ref.name, version=ref.version),
+                package_dir=Path(node.package_folder),
+            )
+        )
+    return installed
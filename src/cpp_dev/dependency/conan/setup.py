@@ -14,6 +14,9 @@ from .utils import conan_env
 
 CONAN_REMOTE = "cpd"
 
+# The Conan profile installed with the Conan configuration of cpd.
+DEFAULT_CONAN_PROFILE = "ubuntu-24.04-x86_64"
+
 # The default Conan user and password are used to authenticate against the Conan
 # Important: this user has only READ permissions which is required to download packages
 # and obtain meta data.
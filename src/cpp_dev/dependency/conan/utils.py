@@ -12,6 +12,7 @@ from cpp_dev.common.version import SemanticVersion
 from cpp_dev.dependency.conan.types import (
     ConanPackageReferenceWithSemanticVersion,
     ConanPackageReferenceWithVersionRanges)
+from cpp_dev.dependency.provider import DependencyIdentifier
 from cpp_dev.dependency.specifier import DependencySpecifier
 
 ###############################################################################
@@ -43,6 +44,13 @@ def compose_conan_package_reference(ref: DependencySpecifier) -> ConanPackageRef
     return ConanPackageReferenceWithVersionRanges(f"{ref.name}/{_get_conan_package_version(ref)}@{ref.repository}/{DEFAULT_CONAN_CHANNEL}")
 
 
+def compose_conan_package_reference_from_identifier(
+    dep: DependencyIdentifier,
+) -> ConanPackageReferenceWithSemanticVersion:
+    """Compose a Conan package reference from a resolved dependency identifier."""
+    return ConanPackageReferenceWithSemanticVersion(f"{dep.name}/{dep.version}@{dep.repository}/{DEFAULT_CONAN_CHANNEL}")
+
+
 ###############################################################################
 # Implementation                                                            ###
 ###############################################################################
@@ -7,11 +7,15 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 from cpp_dev.common.version import SemanticVersion
 
 from .specifier import DependencySpecifier
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
 ###############################################################################
 # Public API                                                                ###
 ###############################################################################
@@ -49,6 +53,14 @@ class DependencyIdentifier:
         return f"{self.repository}/{self.name}/{self.version}"
 
 
+@dataclass
+class InstalledDependency:
+    """A dependency installed by a dependency provider and the directory holding its package content."""
+
+    id: DependencyIdentifier
+    package_dir: Path
+
+
 class DependencyProvider(ABC):
     """Abstract base class for dependency providers.
 
@@ -87,14 +99,15 @@ class DependencyProvider(ABC):
         """
 
     @abstractmethod
-    def install_dependencies(self, deps: list[DependencySpecifier]) -> list[DependencySpecifier]:
+    def install_dependencies(self, deps: list[DependencySpecifier]) -> list[InstalledDependency]:
         """Install the dependencies represented by the input list.
 
         Args:
             deps (list[DependencySpecifier]): The list of dependencies to install.
 
         Return:
-            The list of successfully installed dependencies (including transitive dependencies).
+            The list of successfully installed dependencies (including transitive dependencies)
+            together with their package directories.
 
         Raise:
             DependencyError: If an error occurs during dependency rinstallation.
@@ -67,15 +67,26 @@ def create_project_config(
 
 
 def load_project_config(project_dir: Path) -> ProjectConfig:
-    """Load the package configuration from the specified package folder."""
+    """Load the package configuration from the specified package folder.
+
+    Parsed configurations are cached per file state to keep long-running processes (e.g. the cpd daemon)
+    from re-parsing unchanged files. A copy is returned such that callers may modify it.
+    """
     config_file = compose_project_config_file(project_dir)
-    return ProjectConfig.model_validate(yaml.safe_load(config_file.read_text()))
+    file_state = _get_file_state(config_file)
+    cached = _PROJECT_CONFIG_CACHE.get(config_file)
+    if cached is not None and cached[0] == file_state:
+        return cached[1].model_copy(deep=True)
+    config = ProjectConfig.model_validate(yaml.safe_load(config_file.read_text()))
+    _PROJECT_CONFIG_CACHE[config_file] = (file_state, config.model_copy(deep=True))
+    return config
 
 
 def store_project_config(project_dir: Path, config: ProjectConfig) -> None:
     """Store the package configuration in the specified package folder."""
     config_file = compose_project_config_file(project_dir)
     config_file.write_text(yaml.dump(config.model_dump()))
+    _PROJECT_CONFIG_CACHE[config_file] = (_get_file_state(config_file), config.model_copy(deep=True))
 
 
 def update_dependencies(
@@ -109,6 +120,16 @@ def validate_dependencies(project_config: ProjectConfig) -> None:
 ###############################################################################
 
 
+_FileState = tuple[int, int]
+
+_PROJECT_CONFIG_CACHE: dict[Path, tuple[_FileState, ProjectConfig]] = {}
+
+
+def _get_file_state(file: Path) -> _FileState:
+    stat = file.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
 def _update_or_add_dependency_entries(
     existing_deps: list[DependencySpecifier],
     new_deps: list[DependencySpecifier],
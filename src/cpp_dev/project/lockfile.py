@@ -44,5 +44,9 @@ def store_lock_file(project_dir: Path, locked_dependencies: LockedDependencies)
 
 def load_lock_file(project_dir: Path) -> LockedDependencies:
     """Read the locked dependencies from file."""
-    lock_file = compose_project_lock_file(project_dir)
+    return load_lock_file_from_path(compose_project_lock_file(project_dir))
+
+
+def load_lock_file_from_path(lock_file: Path) -> LockedDependencies:
+    """Read the locked dependencies from the lock file at the given path."""
     return LockedDependencies.model_validate(yaml.safe_load(lock_file.read_text()))
@@ -28,3 +28,8 @@ def compose_include_file(project_dir: Path, name: str, *components: str) -> Path
 def compose_source_file(project_dir: Path, *components: str) -> Path:
     """Compose the path to a source file."""
     return (project_dir / "src").joinpath(*components)
+
+
+def compose_build_dir(project_dir: Path) -> Path:
+    """Compose the path to the build directory holding all generated files."""
+    return project_dir / "build"
@@ -0,0 +1,77 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import fnmatch
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .result_cache import ResultCacheConfig, load_cached_listing, store_cached_listing
+from .runner import UnitTest, list_test_cases
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def discover_test_cases(
+    binaries: list[Path],
+    cache_config: ResultCacheConfig | None = None,
+    jobs: int | None = None,
+) -> list[UnitTest]:
+    """List the test cases of the test binaries in the order of the binaries.
+
+    Listings are cached by the content hash of the binaries, such that unchanged binaries are not launched.
+    Binaries missing in the cache are listed in parallel processes (the number of CPUs by default).
+    """
+    listings: dict[Path, list[UnitTest]] = {}
+    missing = []
+    for binary in dict.fromkeys(binaries):
+        cached = load_cached_listing(cache_config, binary) if cache_config is not None else None
+        if cached is None:
+            missing.append(binary)
+        else:
+            listings[binary] = cached
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(len(missing), jobs or os.cpu_count() or 1)) as executor:
+            for binary, cases in zip(missing, executor.map(list_test_cases, missing), strict=True):
+                listings[binary] = cases
+                if cache_config is not None:
+                    store_cached_listing(cache_config, binary, cases)
+    return [case for binary in dict.fromkeys(binaries) for case in listings[binary]]
+
+
+def filter_test_cases(cases: list[UnitTest], test_filter: str) -> list[UnitTest]:
+    """Filter test cases by a gtest filter of positive and negative patterns (e.g. "Suite.*:Other.*-*.Slow").
+
+    Raises a RuntimeError if a positive pattern matches no test case, e.g. a misspelled test case name.
+    """
+    positive, _, negative = test_filter.partition("-")
+    positive_patterns = [pattern for pattern in positive.split(":") if pattern]
+    negative_patterns = [pattern for pattern in negative.split(":") if pattern]
+    names = [case.display_name for case in cases]
+    unmatched = [pattern for pattern in positive_patterns if not _matches_any(pattern, names)]
+    if unmatched:
+        raise RuntimeError(f"No test case matches the filter patterns {', '.join(unmatched)}.")
+    # a filter with negative patterns only selects all other test cases
+    positive_patterns = positive_patterns or ["*"]
+    return [
+        case
+        for case in cases
+        if _matches(case.display_name, positive_patterns) and not _matches(case.display_name, negative_patterns)
+    ]
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+
+def _matches_any(pattern: str, names: list[str]) -> bool:
+    return any(fnmatch.fnmatchcase(name, pattern) for name in names)
+
+
+def _matches(name: str, patterns: list[str]) -> bool:
+    return any(fnmatch.fnmatchcase(name, pattern) for pattern in patterns)
@@ -0,0 +1,254 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import hashlib
+import json
+import shlex
+import shutil
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from cpp_dev.builder.include_graph import IncludeGraph, load_include_graph
+from cpp_dev.builder.sources import SourceFiles, collect_source_files
+from cpp_dev.project.path_composition import compose_project_config_file, compose_project_lock_file
+
+from .runner import UnitTest, UnitTestHistory, read_test_history
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+@dataclass
+class UnitTestSelection:
+    """Test cases selected for a set of changed files with the number of test cases run and skipped per reason."""
+
+    selected: list[UnitTest]
+    run_reasons: dict[str, int] = field(default_factory=dict)
+    skip_reasons: dict[str, int] = field(default_factory=dict)
+    # set if all test cases are run independent of the changed files
+    full_suite_reason: str | None = None
+
+    @property
+    def skipped(self) -> int:
+        """Return the number of skipped test cases."""
+        return sum(self.skip_reasons.values())
+
+
+def collect_changed_files(project_dir: Path, since: str | None = None) -> list[str]:
+    """Collect the files changed in the working tree relative to a git revision (HEAD by default).
+
+    Untracked files that are not ignored are considered changed. The paths are relative to the project directory.
+    """
+    git = shutil.which("git")
+    if git is None:
+        raise RuntimeError("The git executable was not found, which is required to determine the changed files.")
+    changed = _run_git(git, project_dir, ["diff", "--name-only", "--relative", "--no-renames", since or "HEAD"])
+    untracked = _run_git(git, project_dir, ["ls-files", "--others", "--exclude-standard"])
+    return sorted(set(changed) | set(untracked))
+
+
+def select_affected_tests(
+    project_dir: Path,
+    name: str,
+    cases: list[UnitTest],
+    changed_files: list[str],
+) -> UnitTestSelection:
+    """Select the test cases affected by the changed files from the test cases of the test binaries.
+
+    A test case is affected if the test source defining it includes a changed file (directly or transitively)
+    or if a changed library source is covered by the test case. Coverage is read from the optional file
+    <binary>.coverage.json mapping test case names to the project files they execute; without it, every
+    change of a library source affects all test cases. New test cases and test cases that failed in their
+    last run are always selected.
+
+    All test cases are run if the project configuration or the lock file changed, or if the toolchain
+    recorded by the last run of the test binary (see record_test_inputs) differs from the current one.
+    """
+    changed = set(changed_files)
+    config_files = {
+        compose_project_config_file(project_dir).relative_to(project_dir).as_posix(),
+        compose_project_lock_file(project_dir).relative_to(project_dir).as_posix(),
+    }
+    if changed & config_files:
+        return UnitTestSelection(cases, full_suite_reason=f"{', '.join(sorted(changed & config_files))} changed")
+    source_files = collect_source_files(project_dir, name)
+    selection = UnitTestSelection([])
+    for binary, binary_cases in _group_by_binary(cases).items():
+        graph = load_include_graph(binary.parent)
+        if graph is None:
+            return UnitTestSelection(cases, full_suite_reason=f"no include graph in {binary.parent}")
+        if _load_recorded_toolchain(binary) != _compute_toolchain_digest(binary.parent):
+            return UnitTestSelection(cases, full_suite_reason=f"toolchain of {binary.name} changed since its last run")
+        _select_binary_cases(
+            project_dir, binary, binary_cases, _compose_impact(graph, source_files, changed), selection
+        )
+    return selection
+
+
+def record_test_inputs(binary: Path) -> None:
+    """Record the toolchain of a test binary after running its tests, which later selections compare against."""
+    impact_file = _compose_impact_file(binary)
+    impact_file.write_text(json.dumps({"toolchain": _compute_toolchain_digest(binary.parent)}))
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Build variables of the Ninja build file describing the toolchain of the build
+_TOOLCHAIN_VARIABLES = ("cxx", "ar", "cxxflags", "ldflags", "libs")
+
+_NEW_TEST = "new test case"
+_FAILED_TEST = "failed in the last run"
+_TEST_SOURCE_AFFECTED = "test source affected"
+_UNKNOWN_TEST_SOURCE = "translation unit affected (test source unknown)"
+_COVERED_SOURCE_AFFECTED = "covered library source affected"
+_LIBRARY_AFFECTED = "library source affected (no coverage data)"
+_NOT_AFFECTED = "not affected by the changed files"
+_NOT_COVERED = "affected library sources not covered"
+
+
+@dataclass
+class _Impact:
+    # the changed files and all files including them
+    affected: set[str]
+    # affected translation units
+    library_sources: set[str]
+    test_sources: set[str]
+
+
+def _run_git(git: str, project_dir: Path, args: list[str]) -> list[str]:
+    result = subprocess.run(  # noqa: S603
+        [git, "-C", str(project_dir), *args],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Failed to determine the changed files with git: {result.stderr.strip()}")
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def _group_by_binary(cases: list[UnitTest]) -> dict[Path, list[UnitTest]]:
+    groups: dict[Path, list[UnitTest]] = {}
+    for case in cases:
+        groups.setdefault(case.binary, []).append(case)
+    return groups
+
+
+def _compose_impact(graph: IncludeGraph, source_files: SourceFiles, changed: set[str]) -> _Impact:
+    affected = graph.find_dependents(changed)
+    return _Impact(
+        affected=affected,
+        library_sources={source for source in source_files.library_sources if source in affected},
+        test_sources={source for source in source_files.test_sources if source in affected},
+    )
+
+
+def _select_binary_cases(
+    project_dir: Path,
+    binary: Path,
+    cases: list[UnitTest],
+    impact: _Impact,
+    selection: UnitTestSelection,
+) -> None:
+    history = read_test_history(binary)
+    coverage = _load_coverage(binary)
+    for case in cases:
+        run_reason, skip_reason = _classify_case(project_dir, case, impact, history, coverage)
+        if run_reason is not None:
+            selection.selected.append(case)
+            selection.run_reasons[run_reason] = selection.run_reasons.get(run_reason, 0) + 1
+        else:
+            selection.skip_reasons[skip_reason] = selection.skip_reasons.get(skip_reason, 0) + 1
+
+
+def _classify_case(
+    project_dir: Path,
+    case: UnitTest,
+    impact: _Impact,
+    history: UnitTestHistory,
+    coverage: dict[str, list[str]] | None,
+) -> tuple[str | None, str]:
+    """Return the reason to run the test case, or None and the reason to skip it."""
+    if case.display_name in history.failed:
+        return _FAILED_TEST, ""
+    if case.display_name not in history.durations:
+        return _NEW_TEST, ""
+    test_source = _relativize_test_source(project_dir, case.file)
+    if case.name is None or test_source is None:
+        # test cases not attributed to a test source run on changes of any translation unit
+        affected = bool(impact.library_sources or impact.test_sources)
+        return (_UNKNOWN_TEST_SOURCE if affected else None), _NOT_AFFECTED
+    if test_source in impact.affected:
+        return _TEST_SOURCE_AFFECTED, ""
+    return _classify_by_coverage(case.name, impact, coverage)
+
+
+def _classify_by_coverage(
+    name: str,
+    impact: _Impact,
+    coverage: dict[str, list[str]] | None,
+) -> tuple[str | None, str]:
+    if not impact.library_sources:
+        return None, _NOT_AFFECTED
+    if coverage is None or name not in coverage:
+        return _LIBRARY_AFFECTED, ""
+    if impact.library_sources & set(coverage[name]):
+        return _COVERED_SOURCE_AFFECTED, ""
+    return None, _NOT_COVERED
+
+
+def _relativize_test_source(project_dir: Path, file: str | None) -> str | None:
+    # gtest reports the source file as passed to the compiler, which is absolute for builds of cpd
+    if file is None:
+        return None
+    path = Path(file)
+    if not path.is_absolute():
+        return path.as_posix()
+    for root in (project_dir.absolute(), project_dir.resolve()):
+        if path.is_relative_to(root):
+            return path.relative_to(root).as_posix()
+    return None
+
+
+def _load_coverage(binary: Path) -> dict[str, list[str]] | None:
+    coverage_file = binary.with_name(f"{binary.name}.coverage.json")
+    if not coverage_file.exists():
+        return None
+    coverage: dict[str, list[str]] = json.loads(coverage_file.read_text())
+    return coverage
+
+
+def _load_recorded_toolchain(binary: Path) -> str | None:
+    impact_file = _compose_impact_file(binary)
+    if not impact_file.exists():
+        return None
+    toolchain: str | None = json.loads(impact_file.read_text()).get("toolchain")
+    return toolchain
+
+
+def _compute_toolchain_digest(build_dir: Path) -> str | None:
+    """Hash the toolchain variables of the build file and the compiler executable (by size and mtime)."""
+    build_file = build_dir / "build.ninja"
+    if not build_file.exists():
+        return None
+    digest = hashlib.sha256()
+    for line in build_file.read_text().splitlines():
+        variable, _, value = line.partition(" = ")
+        if variable in _TOOLCHAIN_VARIABLES:
+            digest.update(line.encode())
+            if variable == "cxx":
+                compiler = shutil.which(shlex.split(value)[0])
+                if compiler is not None:
+                    stat = Path(compiler).stat()
+                    digest.update(f"{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+def _compose_impact_file(binary: Path) -> Path:
+    return binary.with_name(f"{binary.name}.impact.json")
@@ -0,0 +1,287 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import contextlib
+import hashlib
+import os
+import platform
+import shlex
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from pydantic import BaseModel
+
+from cpp_dev.builder.compile_cache import fetch_remote_entry, store_remote_entry
+from cpp_dev.builder.sources import HEADER_SUFFIXES, SOURCE_SUFFIX
+from cpp_dev.project.path_composition import compose_build_dir
+
+from .runner import UnitTest, UnitTestResult
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+DEFAULT_TEST_CACHE_MAX_SIZE = 256 * 1024**2
+
+
+@dataclass
+class ResultCacheConfig:
+    """Location and size of the cache of test results and listings and the remote HTTP cache sharing the results."""
+
+    cache_dir: Path
+    max_size: int = DEFAULT_TEST_CACHE_MAX_SIZE
+    remote_url: str | None = None
+
+
+def compute_test_key(cases: list[UnitTest], data_dir: Path) -> str:
+    """Compute the cache key of running test cases of a single test binary.
+
+    The key covers the content of the binary, the shared libraries it loads from the library directories
+    of the build (runtime inputs), the environment variables affecting tests and the platform.
+    Tests run within the data directory (i.e. the project), so the content of its files is covered as test data,
+    except for C++ sources (part of the binary), hidden files and the build directory. The location of the data
+    directory is not covered such that checkouts on other machines share the results.
+    """
+    (binary,) = {case.binary for case in cases}
+    digest = hashlib.sha256(f"{_CACHE_VERSION}\0".encode())
+    digest.update(compute_file_digest(binary).encode())
+    digest.update(b"\1")
+    digest.update("\0".join(sorted(case.display_name for case in cases)).encode())
+    digest.update(b"\1")
+    for library in _find_runtime_libraries(binary.parent):
+        digest.update(f"{library.name}\0{compute_file_digest(library)}\0".encode())
+    digest.update(b"\1")
+    digest.update(_describe_environment().encode())
+    digest.update(b"\1")
+    for data_file in _find_test_data(data_dir):
+        digest.update(f"{data_file}\0{compute_file_digest(data_dir / data_file)}\0".encode())
+    return digest.hexdigest()
+
+
+def compute_file_digest(path: Path) -> str:
+    """Compute the content hash of a file, which is kept as long as its modification time and size are unchanged."""
+    stat = path.stat()
+    resolved = str(path.resolve())
+    known = _FILE_DIGESTS.get(resolved)
+    if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+        return known[2]
+    with path.open("rb") as file:
+        digest = hashlib.file_digest(file, "sha256").hexdigest()
+    _FILE_DIGESTS[resolved] = (stat.st_mtime_ns, stat.st_size, digest)
+    _UPDATED_FILE_DIGESTS.add(resolved)
+    return digest
+
+
+def load_file_digests(cache_dir: Path) -> None:
+    """Load the content hashes of files computed by previous runs such that unchanged files are not hashed again."""
+    digests = _load_file_digests(cache_dir)
+    for resolved, known in digests.files.items():
+        _FILE_DIGESTS.setdefault(resolved, known)
+
+
+def store_file_digests(cache_dir: Path) -> None:
+    """Store the content hashes of files computed by this process for later runs.
+
+    The hashes are merged with the ones stored by concurrent runs in the meantime.
+    """
+    if not _UPDATED_FILE_DIGESTS:
+        return
+    digests = _load_file_digests(cache_dir)
+    digests.files.update({resolved: _FILE_DIGESTS[resolved] for resolved in _UPDATED_FILE_DIGESTS})
+    digests_file = _compose_digests_file(cache_dir)
+    digests_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=digests_file.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(digests.model_dump_json().encode())
+    Path(tmp_name).replace(digests_file)
+    _UPDATED_FILE_DIGESTS.clear()
+
+
+def load_cached_results(config: ResultCacheConfig, key: str, binary: Path) -> list[UnitTestResult] | None:
+    """Load the results of a passing run from the local or the remote cache, None if there is no entry.
+
+    The results are attributed to the given binary, which may be located elsewhere than the cached one.
+    """
+    entry_file = _compose_entry_file(config.cache_dir, _RESULTS, key)
+    content = _load_entry(entry_file)
+    if content is None:
+        content = fetch_remote_entry(config.remote_url, key) if config.remote_url is not None else None
+        if content is None:
+            return None
+        _store_entry(config, entry_file, content)
+    entry = _CacheEntry.model_validate_json(content)
+    return [result.model_copy(update={"binary": binary}) for result in entry.results]
+
+
+def store_cached_results(config: ResultCacheConfig, key: str, results: list[UnitTestResult]) -> bool:
+    """Store the results of a run in the local and the remote cache if all test cases passed.
+
+    Failures of the upload to the remote cache are ignored. Returns whether the results were stored.
+    """
+    if not results or not all(result.passed for result in results):
+        return False
+    content = _CacheEntry(results=results).model_dump_json().encode()
+    _store_entry(config, _compose_entry_file(config.cache_dir, _RESULTS, key), content)
+    if config.remote_url is not None:
+        with contextlib.suppress(OSError):
+            store_remote_entry(config.remote_url, key, content)
+    return True
+
+
+def load_cached_listing(config: ResultCacheConfig, binary: Path) -> list[UnitTest] | None:
+    """Load the test cases listed by a test binary of the same content, None if it was not listed yet."""
+    content = _load_entry(_compose_entry_file(config.cache_dir, _LISTINGS, compute_file_digest(binary)))
+    if content is None:
+        return None
+    listing = _CachedListing.model_validate_json(content)
+    return [UnitTest(binary, case.name, case.file) for case in listing.cases]
+
+
+def store_cached_listing(config: ResultCacheConfig, binary: Path, cases: list[UnitTest]) -> None:
+    """Store the test cases listed by a test binary keyed by the content of the binary."""
+    listing = _CachedListing(cases=[_ListedCase(name=case.name, file=case.file) for case in cases])
+    entry_file = _compose_entry_file(config.cache_dir, _LISTINGS, compute_file_digest(binary))
+    _store_entry(config, entry_file, listing.model_dump_json().encode())
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Increased whenever the key computation or the entry format changes
+_CACHE_VERSION = 3
+
+# Fraction of the maximum size the cache is reduced to by an eviction to not evict on every store
+_EVICTION_TARGET = 0.8
+
+# Environment variables read by gtest, the sanitizer runtimes and the C library
+_ENVIRONMENT_PREFIXES = ("GTEST_", "ASAN_", "LSAN_", "MSAN_", "TSAN_", "UBSAN_", "LC_")
+_ENVIRONMENT_VARIABLES = ("LANG", "LD_LIBRARY_PATH", "LD_PRELOAD", "TZ")
+
+_RPATH_PREFIX = "-Wl,-rpath,"
+
+# The content hashes of files keyed by their resolved path with the modification time and size they were computed for
+_FILE_DIGESTS: dict[str, tuple[int, int, str]] = {}
+_UPDATED_FILE_DIGESTS: set[str] = set()
+
+
+# Kinds of cache entries, each kept in its own directory
+_RESULTS = "results"
+_LISTINGS = "listings"
+
+
+class _CacheEntry(BaseModel):
+    results: list[UnitTestResult]
+
+
+class _ListedCase(BaseModel):
+    name: str | None
+    file: str | None
+
+
+class _CachedListing(BaseModel):
+    cases: list[_ListedCase]
+
+
+class _FileDigests(BaseModel):
+    files: dict[str, tuple[int, int, str]] = {}
+
+
+def _find_runtime_libraries(build_dir: Path) -> list[Path]:
+    # the test binaries locate the shared libraries of the dependencies by the rpath of the link flags
+    build_file = build_dir / "build.ninja"
+    if not build_file.exists():
+        return []
+    libraries = []
+    for line in build_file.read_text().splitlines():
+        variable, _, value = line.partition(" = ")
+        if variable != "ldflags":
+            continue
+        for flag in shlex.split(value):
+            if flag.startswith(_RPATH_PREFIX):
+                libraries.extend(sorted(Path(flag.removeprefix(_RPATH_PREFIX)).glob("*.so*")))
+    return libraries
+
+
+def _find_test_data(data_dir: Path) -> list[str]:
+    build_dir = compose_build_dir(data_dir)
+    data_files: list[str] = []
+    for directory, dir_names, file_names in os.walk(data_dir):
+        dir_names[:] = sorted(
+            name for name in dir_names if not name.startswith(".") and Path(directory, name) != build_dir
+        )
+        relative_dir = Path(directory).relative_to(data_dir)
+        data_files.extend(
+            str(relative_dir / name)
+            for name in sorted(file_names)
+            if not name.startswith(".") and not name.endswith((SOURCE_SUFFIX, *HEADER_SUFFIXES))
+        )
+    return data_files
+
+
+def _describe_environment() -> str:
+    variables = sorted(
+        f"{name}={value}"
+        for name, value in os.environ.items()
+        if name in _ENVIRONMENT_VARIABLES or name.startswith(_ENVIRONMENT_PREFIXES)
+    )
+    return "\0".join([platform.system(), platform.machine(), platform.release(), *variables])
+
+
+def _load_file_digests(cache_dir: Path) -> _FileDigests:
+    digests_file = _compose_digests_file(cache_dir)
+    if not digests_file.exists():
+        return _FileDigests()
+    return _FileDigests.model_validate_json(digests_file.read_bytes())
+
+
+def _load_entry(entry_file: Path) -> bytes | None:
+    try:
+        content = entry_file.read_bytes()
+        # the modification time records the last usage for the LRU eviction
+        os.utime(entry_file)
+    except FileNotFoundError:
+        # evicted concurrently by another run
+        return None
+    return content
+
+
+def _store_entry(config: ResultCacheConfig, entry_file: Path, content: bytes) -> None:
+    entry_file.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=entry_file.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(content)
+    Path(tmp_name).replace(entry_file)
+    _evict(config.cache_dir, config.max_size)
+
+
+def _evict(cache_dir: Path, max_size: int) -> None:
+    entries = []
+    for entry_file in cache_dir.glob("*/*/*"):
+        if entry_file.suffix == ".tmp":
+            continue
+        try:
+            stat = entry_file.stat()
+        except FileNotFoundError:
+            # evicted concurrently by another run
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, entry_file))
+    size = sum(entry_size for _, entry_size, _ in entries)
+    if size <= max_size:
+        return
+    for _, entry_size, entry_file in sorted(entries):
+        if size <= max_size * _EVICTION_TARGET:
+            break
+        entry_file.unlink(missing_ok=True)
+        size -= entry_size
+
+
+def _compose_entry_file(cache_dir: Path, kind: str, key: str) -> Path:
+    return cache_dir / kind / key[:2] / key[2:]
+
+
+def _compose_digests_file(cache_dir: Path) -> Path:
+    return cache_dir / "file_digests.json"
@@ -0,0 +1,403 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import json
+import mmap
+import os
+import subprocess
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+@dataclass(frozen=True)
+class UnitTest:
+    """A test case of a test binary."""
+
+    binary: Path
+    # the name of the gtest test case (Suite.Case), None for binaries not using gtest
+    name: str | None
+    # the source file defining the test case if reported by gtest
+    file: str | None = field(default=None, compare=False)
+
+    @property
+    def display_name(self) -> str:
+        """Return the name of the test case as shown to the user."""
+        return self.name if self.name is not None else self.binary.name
+
+
+class UnitTestResult(BaseModel):
+    """The result of a test case and its output if it failed."""
+
+    binary: Path
+    name: str
+    passed: bool
+    duration_ms: int
+    output: str
+
+
+class UnitTestHistory(BaseModel):
+    """Results of the most recent run of each test case of a test binary."""
+
+    durations: dict[str, int] = {}
+    # test cases that failed in their most recent run
+    failed: list[str] = []
+
+
+class UnitTestReport(BaseModel):
+    """The results of all test cases in the order of their listing."""
+
+    results: list[UnitTestResult]
+    wall_ms: int
+    jobs: int
+    # merged results of the test binaries in the JSON and XML format of gtest
+    result_files: list[Path]
+
+    @property
+    def failed(self) -> list[UnitTestResult]:
+        """Return the results of the failed test cases."""
+        return [result for result in self.results if not result.passed]
+
+    @property
+    def cpu_ms(self) -> int:
+        """Return the total duration of all test cases."""
+        return sum(result.duration_ms for result in self.results)
+
+
+def list_test_cases(binary: Path) -> list[UnitTest]:
+    """List the test cases of a gtest binary, or the binary itself as single test case if it does not use gtest.
+
+    Disabled test cases are not listed. The source files of the test cases are taken from the JSON listing
+    written by gtest 1.10 or newer.
+    """
+    if not _uses_gtest(binary):
+        return [UnitTest(binary, None)]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = Path(tmp_dir) / "tests.json"
+        process = subprocess.run(  # noqa: S603
+            [binary, "--gtest_list_tests", f"--gtest_output=json:{json_file}"],
+            capture_output=True,
+            text=True,
+            check=False,
+        )
+        entries = _read_json_results(json_file)
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to list the tests of {binary}: {process.stderr.strip()}")
+    cases = []
+    suite = None
+    for line in process.stdout.splitlines():
+        # parameterized and typed tests are followed by a comment with their parameter or type
+        entry = line.split("#", 1)[0].rstrip()
+        if not entry:
+            continue
+        if not entry.startswith(" "):
+            suite = entry if entry.endswith(".") else None
+        elif suite is not None and not _is_disabled(suite, entry.strip()):
+            name = f"{suite}{entry.strip()}"
+            cases.append(UnitTest(binary, name, entries.get(name, {}).get("file")))
+    return cases
+
+
+def run_tests(
+    cases: list[UnitTest],
+    jobs: int | None = None,
+    on_result: Callable[[UnitTestResult], None] | None = None,
+) -> UnitTestReport:
+    """Run the test cases (of one or more test binaries) in parallel processes.
+
+    The test cases are run in batches (using gtest filters) scheduled longest first by the durations
+    recorded by previous runs, such that the wall time approaches the total duration divided by the jobs.
+    The results are passed to the callback as soon as all results listed before are available,
+    such that the output is streamed in a deterministic order.
+    Batches failing without a result (e.g. by a crash) are repeated per test case to find the failing ones.
+    The results of each binary are merged into JSON and XML files next to the binary.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    binaries = list(dict.fromkeys(case.binary for case in cases))
+    histories = {binary: _load_history(binary) for binary in binaries}
+    estimates = {case: _estimate_duration(histories[case.binary].durations, case) for case in cases}
+    batches = _plan_batches(cases, estimates, jobs)
+
+    start = time.monotonic()
+    outcomes: dict[UnitTest, _Outcome] = {}
+    reported = 0
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        pending: set[Future[dict[UnitTest, _Outcome]]] = {executor.submit(_run_batch, batch) for batch in batches}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcomes.update(future.result())
+            while reported < len(cases) and cases[reported] in outcomes:
+                if on_result is not None:
+                    on_result(outcomes[cases[reported]].result)
+                reported += 1
+    wall_ms = round((time.monotonic() - start) * 1000)
+
+    result_files = []
+    for binary in binaries:
+        binary_outcomes = [outcomes[case] for case in cases if case.binary == binary]
+        _update_history(binary, histories[binary], [outcome.result for outcome in binary_outcomes])
+        result_files.extend(_write_results(binary, binary_outcomes))
+    return UnitTestReport(
+        results=[outcomes[case].result for case in cases],
+        wall_ms=wall_ms,
+        jobs=jobs,
+        result_files=result_files,
+    )
+
+
+def read_test_history(binary: Path) -> UnitTestHistory:
+    """Read the durations and failures of the test cases of a binary recorded by previous runs."""
+    return _load_history(binary)
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Number of batches per job, smaller batches balance the load at the cost of more processes
+_BATCHES_PER_JOB = 4
+
+# Duration expected for test cases of binaries without any recorded duration
+_DEFAULT_DURATION_MS = 10
+
+# Maximum length of the test filter of a batch, well below the limit of a single argument (MAX_ARG_STRLEN, 128 KiB)
+_MAX_FILTER_LENGTH = 64 * 1024
+
+# The help message of statically linked gtest and the symbols of gtest linked dynamically
+_GTEST_MARKERS = (b"--gtest_list_tests", b"_ZN7testing")
+
+_RUN_PREFIX = "[ RUN      ] "
+_END_PREFIXES = ("[       OK ] ", "[  FAILED  ] ", "[  SKIPPED ] ")
+
+
+@dataclass
+class _Outcome:
+    result: UnitTestResult
+    # the entry of the test case in the JSON output of gtest
+    entry: dict[str, Any] = field(default_factory=dict)
+
+
+def _uses_gtest(binary: Path) -> bool:
+    # the binary is not run to find out as it may run its tests instead
+    with binary.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+        return any(content.find(marker) != -1 for marker in _GTEST_MARKERS)
+
+
+def _is_disabled(suite: str, case: str) -> bool:
+    return suite.startswith("DISABLED_") or case.startswith("DISABLED_")
+
+
+def _estimate_duration(timings: dict[str, int], case: UnitTest) -> int:
+    if case.display_name in timings:
+        return timings[case.display_name]
+    return round(sum(timings.values()) / len(timings)) if timings else _DEFAULT_DURATION_MS
+
+
+def _plan_batches(cases: list[UnitTest], estimates: dict[UnitTest, int], jobs: int) -> list[list[UnitTest]]:
+    # test cases longer than the target run on their own, shorter ones are batched up to the target duration
+    # as long as the test filter of the batch fits into a single command line argument
+    target_ms = sum(estimates.values()) / (jobs * _BATCHES_PER_JOB)
+    batches: list[tuple[int, int, list[UnitTest]]] = []
+    open_batches: dict[Path, tuple[int, int, list[UnitTest]]] = {}
+    for case in sorted(cases, key=lambda case: -estimates[case]):
+        cost, filter_length, batch = open_batches.get(case.binary, (0, 0, []))
+        # the names are joined by a separator
+        case_filter_length = len(str(case.name)) + 1
+        if case.name is None or (
+            batch and (cost + estimates[case] > target_ms or filter_length + case_filter_length > _MAX_FILTER_LENGTH)
+        ):
+            batches.append((cost, filter_length, batch))
+            cost, filter_length, batch = 0, 0, []
+        open_batches[case.binary] = (cost + estimates[case], filter_length + case_filter_length, [*batch, case])
+    batches.extend(open_batches.values())
+    return [batch for _, _, batch in sorted(batches, key=lambda entry: -entry[0]) if batch]
+
+
+def _run_batch(batch: list[UnitTest]) -> dict[UnitTest, _Outcome]:
+    binary = batch[0].binary
+    if batch[0].name is None:
+        start = time.monotonic()
+        process = subprocess.run([binary], capture_output=True, text=True, check=False)  # noqa: S603
+        duration_ms = round((time.monotonic() - start) * 1000)
+        output = process.stdout + process.stderr
+        return {batch[0]: _create_outcome(batch[0], duration_ms, output, passed=process.returncode == 0)}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        json_file = Path(tmp_dir) / "results.json"
+        start = time.monotonic()
+        process = subprocess.run(  # noqa: S603
+            [
+                binary,
+                f"--gtest_filter={':'.join(str(case.name) for case in batch)}",
+                f"--gtest_output=json:{json_file}",
+                "--gtest_color=no",
+            ],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            check=False,
+        )
+        duration_ms = round((time.monotonic() - start) * 1000)
+        entries = _read_json_results(json_file)
+    outputs = _split_outputs(process.stdout)
+    failed = any(entry.get("failures") for entry in entries.values())
+    if process.returncode != 0 and not failed:
+        # the process crashed or failed after the tests (e.g. by a leak check)
+        if len(batch) > 1:
+            return {case: outcome for single in batch for case, outcome in _run_batch([single]).items()}
+        output = f"{process.stdout}\nExited with code {process.returncode}."
+        return {batch[0]: _create_outcome(batch[0], duration_ms, output, passed=False)}
+    outcomes = {}
+    for case in batch:
+        entry = entries.get(str(case.name))
+        if entry is None:
+            outcomes[case] = _create_outcome(case, 0, f"{case.name} was not run.", passed=False)
+            continue
+        passed = not entry.get("failures")
+        case_duration_ms = round(float(str(entry.get("time", "0s")).removesuffix("s")) * 1000)
+        outcome = _create_outcome(case, case_duration_ms, outputs.get(str(case.name), ""), passed=passed)
+        outcome.entry = entry
+        outcomes[case] = outcome
+    return outcomes
+
+
+def _create_outcome(case: UnitTest, duration_ms: int, output: str, *, passed: bool) -> _Outcome:
+    result = UnitTestResult(
+        binary=case.binary,
+        name=case.display_name,
+        passed=passed,
+        duration_ms=duration_ms,
+        output="" if passed else output,
+    )
+    entry: dict[str, Any] = {"name": case.display_name, "time": f"{duration_ms / 1000:.3f}s"}
+    if not passed:
+        entry["failures"] = [{"failure": output}]
+    return _Outcome(result, entry)
+
+
+def _read_json_results(json_file: Path) -> dict[str, dict[str, Any]]:
+    if not json_file.exists():
+        return {}
+    try:
+        data = json.loads(json_file.read_text())
+    except json.JSONDecodeError:
+        return {}
+    return {
+        f"{suite['name']}.{entry['name']}": entry
+        for suite in data.get("testsuites", [])
+        for entry in suite.get("testsuite", [])
+    }
+
+
+def _split_outputs(stdout: str) -> dict[str, str]:
+    outputs: dict[str, str] = {}
+    current = None
+    lines: list[str] = []
+    for line in stdout.splitlines():
+        if line.startswith(_RUN_PREFIX):
+            current, lines = line.removeprefix(_RUN_PREFIX).strip(), []
+        elif current is not None and line.startswith(_END_PREFIXES) and line[len(_RUN_PREFIX) :].startswith(current):
+            outputs[current] = "\n".join(lines)
+            current = None
+        elif current is not None:
+            lines.append(line)
+    return outputs
+
+
+def _write_results(binary: Path, outcomes: list[_Outcome]) -> list[Path]:
+    suites: dict[str, list[dict[str, Any]]] = {}
+    for outcome in outcomes:
+        suite, _, name = outcome.result.name.rpartition(".")
+        suites.setdefault(suite or binary.name, []).append({**outcome.entry, "name": name})
+    all_entries = [entry for entries in suites.values() for entry in entries]
+    results = {
+        **_summarize_entries(all_entries),
+        "testsuites": [
+            {"name": suite, **_summarize_entries(entries), "testsuite": entries} for suite, entries in suites.items()
+        ],
+    }
+    json_file = binary.with_name(f"{binary.name}.results.json")
+    json_file.write_text(json.dumps(results, indent=2))
+    xml_file = binary.with_name(f"{binary.name}.results.xml")
+    ET.ElementTree(_create_xml_results(results)).write(xml_file, encoding="utf-8", xml_declaration=True)
+    return [json_file, xml_file]
+
+
+def _create_xml_results(results: dict[str, Any]) -> ET.Element:
+    root = ET.Element(
+        "testsuites",
+        tests=str(results["tests"]),
+        failures=str(results["failures"]),
+        time=str(results["time"]).removesuffix("s"),
+    )
+    for suite in results["testsuites"]:
+        suite_element = ET.SubElement(
+            root,
+            "testsuite",
+            name=suite["name"],
+            tests=str(suite["tests"]),
+            failures=str(suite["failures"]),
+            time=str(suite["time"]).removesuffix("s"),
+        )
+        for entry in suite["testsuite"]:
+            case_element = ET.SubElement(
+                suite_element,
+                "testcase",
+                name=entry["name"],
+                classname=suite["name"],
+                time=str(entry.get("time", "0s")).removesuffix("s"),
+            )
+            for failure in entry.get("failures", []):
+                message = failure.get("failure", "")
+                ET.SubElement(case_element, "failure", message=message.split("\n", 1)[0]).text = message
+    return root
+
+
+def _summarize_entries(entries: list[dict[str, Any]]) -> dict[str, Any]:
+    return {
+        "tests": len(entries),
+        "failures": sum(1 for entry in entries if entry.get("failures")),
+        "time": f"{sum(_parse_seconds(entry) for entry in entries):.3f}s",
+    }
+
+
+def _parse_seconds(entry: dict[str, Any]) -> float:
+    return float(str(entry.get("time", "0s")).removesuffix("s"))
+
+
+def _load_history(binary: Path) -> UnitTestHistory:
+    history_file = _compose_history_file(binary)
+    if not history_file.exists():
+        return UnitTestHistory()
+    return UnitTestHistory.model_validate_json(history_file.read_text())
+
+
+def _update_history(binary: Path, history: UnitTestHistory, results: list[UnitTestResult]) -> None:
+    # test cases not run keep their previous state
+    run = {result.name for result in results}
+    updated = UnitTestHistory(
+        durations={**history.durations, **{result.name: result.duration_ms for result in results}},
+        failed=sorted({name for name in history.failed if name not in run} | {r.name for r in results if not r.passed}),
+    )
+    history_file = _compose_history_file(binary)
+    tmp_history_file = history_file.with_suffix(".tmp")
+    tmp_history_file.write_text(updated.model_dump_json())
+    tmp_history_file.replace(history_file)
+
+
+def _compose_history_file(binary: Path) -> Path:
+    return binary.with_name(f"{binary.name}.history.json")
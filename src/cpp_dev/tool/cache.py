@@ -0,0 +1,145 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+from filelock import FileLock
+
+from cpp_dev.common.utils import ensure_dir_exists
+from cpp_dev.dependency.conan.cache import CacheGarbageCollectionResult, collect_garbage
+from cpp_dev.dependency.provider import DependencyIdentifier
+from cpp_dev.project.lockfile import load_lock_file
+from cpp_dev.project.path_composition import compose_project_lock_file
+from cpp_dev.tool.paths import get_conan_home_dir, get_store_dir
+from cpp_dev.tool.store import StoreGarbageCollectionResult, collect_store_garbage
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+DEFAULT_CACHE_MAX_SIZE = 20 * 1024**3
+
+
+@dataclass
+class GarbageCollectionResult:
+    """Result of a garbage collection run on the package cache and the package store."""
+
+    packages: CacheGarbageCollectionResult
+    store: StoreGarbageCollectionResult
+
+
+def register_project(cpd_dir: Path, project_dir: Path) -> None:
+    """Register a project such that the packages of its lock file are protected from cache eviction."""
+    ensure_dir_exists(cpd_dir)
+    with _lock_project_registry(cpd_dir):
+        projects = _load_project_registry(cpd_dir)
+        projects.add(project_dir.resolve())
+        _store_project_registry(cpd_dir, projects)
+
+
+def get_registered_projects(cpd_dir: Path) -> list[Path]:
+    """Return all registered projects that still have a lock file."""
+    return sorted(
+        project_dir
+        for project_dir in _load_project_registry(cpd_dir)
+        if compose_project_lock_file(project_dir).exists()
+    )
+
+
+def collect_locked_dependencies(cpd_dir: Path) -> set[DependencyIdentifier]:
+    """Collect the locked dependencies of all registered projects."""
+    return {
+        DependencyIdentifier(repository=package.repository, name=package.name, version=package.version)
+        for project_dir in get_registered_projects(cpd_dir)
+        for package in load_lock_file(project_dir).packages
+    }
+
+
+def parse_size(size: str) -> int:
+    """Parse a size string with an optional binary unit suffix (K, M, G, T) into bytes."""
+    match = re.fullmatch(r"\s*(\d+)\s*([KMGT]?)B?\s*", size.upper())
+    if match is None:
+        raise ValueError(f"Invalid size: got {size}, expected format <number>[K|M|G|T].")
+    exponent = " KMGT".index(match.group(2) or " ")
+    return int(match.group(1)) * 1024**exponent
+
+
+def get_cache_max_size() -> int | None:
+    """Return the cache size quota configured by the environment, if any."""
+    if _CPD_CACHE_MAX_SIZE_ENV_VAR not in os.environ:
+        return None
+    return parse_size(os.environ[_CPD_CACHE_MAX_SIZE_ENV_VAR])
+
+
+def get_compile_cache_max_size() -> int | None:
+    """Return the compilation cache size quota configured by the environment, if any."""
+    if _CPD_COMPILE_CACHE_MAX_SIZE_ENV_VAR not in os.environ:
+        return None
+    return parse_size(os.environ[_CPD_COMPILE_CACHE_MAX_SIZE_ENV_VAR])
+
+
+def get_test_cache_max_size() -> int | None:
+    """Return the test result cache size quota configured by the environment, if any."""
+    if _CPD_TEST_CACHE_MAX_SIZE_ENV_VAR not in os.environ:
+        return None
+    return parse_size(os.environ[_CPD_TEST_CACHE_MAX_SIZE_ENV_VAR])
+
+
+def get_remote_cache_url() -> str | None:
+    """Return the URL of the remote build cache configured by the environment, if any."""
+    return os.environ.get(_CPD_REMOTE_CACHE_URL_ENV_VAR)
+
+
+def run_cache_gc(cpd_dir: Path, max_size: int | None = None) -> GarbageCollectionResult:
+    """Run the garbage collection of the Conan cache and the package store.
+
+    The size quota is taken from the environment or the default if not specified.
+    Packages referenced by lock files of registered projects are never evicted.
+    Store entries of evicted packages are removed afterwards.
+    """
+    if max_size is None:
+        max_size = get_cache_max_size() or DEFAULT_CACHE_MAX_SIZE
+    packages = collect_garbage(get_conan_home_dir(cpd_dir), max_size, collect_locked_dependencies(cpd_dir))
+    return GarbageCollectionResult(packages=packages, store=collect_store_garbage(get_store_dir(cpd_dir)))
+
+
+def run_auto_cache_gc(cpd_dir: Path) -> GarbageCollectionResult | None:
+    """Run the garbage collection after installations if a size quota is configured by the environment."""
+    max_size = get_cache_max_size()
+    if max_size is None:
+        return None
+    return run_cache_gc(cpd_dir, max_size)
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_CPD_CACHE_MAX_SIZE_ENV_VAR = "CPD_CACHE_MAX_SIZE"
+_CPD_COMPILE_CACHE_MAX_SIZE_ENV_VAR = "CPD_COMPILE_CACHE_MAX_SIZE"
+_CPD_TEST_CACHE_MAX_SIZE_ENV_VAR = "CPD_TEST_CACHE_MAX_SIZE"
+_CPD_REMOTE_CACHE_URL_ENV_VAR = "CPD_REMOTE_CACHE_URL"
+
+
+def _load_project_registry(cpd_dir: Path) -> set[Path]:
+    registry_file = _compose_project_registry_file(cpd_dir)
+    if not registry_file.exists():
+        return set()
+    return {Path(line) for line in registry_file.read_text().splitlines() if line}
+
+
+def _store_project_registry(cpd_dir: Path, projects: set[Path]) -> None:
+    _compose_project_registry_file(cpd_dir).write_text("\n".join(sorted(str(project) for project in projects)))
+
+
+def _lock_project_registry(cpd_dir: Path) -> FileLock:
+    return FileLock(cpd_dir / ".projects_lock")
+
+
+def _compose_project_registry_file(cpd_dir: Path) -> Path:
+    return cpd_dir / "projects.txt"
@@ -0,0 +1,227 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from collections.abc import Callable, Generator
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Any
+
+from cpp_dev.common.utils import ensure_dir_exists
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+# Callback executing a cpd command line (without the program name) and returning the exit code.
+DaemonCommandHandler = Callable[[list[str]], int]
+
+
+def get_daemon_socket_file(cpd_dir: Path) -> Path:
+    """Return the path to the Unix socket of the cpd daemon."""
+    return cpd_dir / "daemon.sock"
+
+
+def serve_daemon(cpd_dir: Path, command_handler: DaemonCommandHandler) -> None:
+    """Serve cpd commands on a Unix socket until a stop request is received.
+
+    Commands are executed one after another inside the daemon process such that imported modules,
+    caches and parsed files stay warm across commands. A stale socket file of a crashed daemon is removed.
+    """
+    socket_file = get_daemon_socket_file(cpd_dir)
+    ensure_dir_exists(cpd_dir)
+    if is_daemon_running(cpd_dir):
+        raise RuntimeError(f"The cpd daemon is already running on {socket_file}.")
+    socket_file.unlink(missing_ok=True)
+
+    with _DaemonServer(str(socket_file), command_handler) as server:
+        try:
+            server.serve_forever()
+        finally:
+            socket_file.unlink(missing_ok=True)
+
+
+def forward_to_daemon(cpd_dir: Path, argv: list[str]) -> int | None:
+    """Forward a command to the cpd daemon if it is running.
+
+    The command runs in the working directory and with the environment of the calling process.
+    Its output is streamed to stdout/stderr of the calling process while it is running.
+    Returns the exit code of the command or None if no daemon is running. If the daemon fails after accepting
+    the command, the command is not run again as it may have been executed partially.
+    """
+    request = {"type": "run", "argv": argv, "cwd": str(Path.cwd()), "env": dict(os.environ)}
+    streams = {"stdout": sys.stdout, "stderr": sys.stderr}
+
+    def write_output(message: dict[str, Any]) -> None:
+        stream = streams[message["stream"]]
+        stream.write(message["text"])
+        stream.flush()
+
+    try:
+        response = _send_request(cpd_dir, request, write_output)
+    except OSError as e:
+        streams["stderr"].write(f"The cpd daemon failed while running the command: {e}\n")
+        return _DAEMON_FAILURE_RETURNCODE
+    if response is None:
+        return None
+    return int(response["returncode"])
+
+
+def is_daemon_running(cpd_dir: Path) -> bool:
+    """Check if the cpd daemon is running and responding."""
+    try:
+        return _send_request(cpd_dir, {"type": "ping"}) is not None
+    except OSError:
+        return False
+
+
+def stop_daemon(cpd_dir: Path) -> bool:
+    """Stop the cpd daemon. Returns False if no daemon was running."""
+    try:
+        return _send_request(cpd_dir, {"type": "stop"}) is not None
+    except OSError:
+        # the daemon exited before confirming the request
+        return True
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_CONNECT_TIMEOUT = 0.5
+
+_DAEMON_FAILURE_RETURNCODE = 1
+
+
+class _DaemonServer(socketserver.UnixStreamServer):
+    def __init__(self, socket_file: str, command_handler: DaemonCommandHandler) -> None:
+        self.command_handler = command_handler
+        super().__init__(socket_file, _DaemonRequestHandler)
+
+
+class _DaemonRequestHandler(socketserver.StreamRequestHandler):
+    server: _DaemonServer
+
+    def handle(self) -> None:
+        request = json.loads(self.rfile.readline())
+        connection = _ClientConnection(self.wfile)
+        if request["type"] == "run":
+            response = _run_command(self.server.command_handler, request, connection)
+        elif request["type"] == "stop":
+            # shutdown waits for the serve loop to exit, so it must not run in the request handling thread
+            threading.Thread(target=self.server.shutdown).start()
+            response = {}
+        else:
+            response = {}
+        connection.send(response)
+
+
+# Requests and responses are sent as one JSON object per line. The output of a running command is sent as
+# {"stream": "stdout" | "stderr", "text": ...} messages ahead of the final response.
+class _ClientConnection:
+    def __init__(self, wfile: io.BufferedIOBase) -> None:
+        self._wfile = wfile
+        # the output may be written by multiple threads of a command
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def send(self, message: dict[str, Any]) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self._wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+                self._wfile.flush()
+            except OSError:
+                # the client got interrupted, the command keeps running to not leave a broken build behind
+                self._closed = True
+
+
+class _OutputStream(io.TextIOBase):
+    def __init__(self, connection: _ClientConnection, stream: str) -> None:
+        self._connection = connection
+        self._stream = stream
+
+    def write(self, text: str) -> int:
+        if text:
+            self._connection.send({"stream": self._stream, "text": text})
+        return len(text)
+
+
+def _run_command(
+    command_handler: DaemonCommandHandler,
+    request: dict[str, Any],
+    connection: _ClientConnection,
+) -> dict[str, Any]:
+    stdout = _OutputStream(connection, "stdout")
+    stderr = _OutputStream(connection, "stderr")
+    with (
+        redirect_stdout(stdout),
+        redirect_stderr(stderr),
+        _changed_cwd(Path(request["cwd"])),
+        _changed_environment(request["env"]),
+    ):
+        try:
+            returncode = command_handler(request["argv"])
+        except SystemExit as e:
+            returncode = 0 if e.code is None else e.code if isinstance(e.code, int) else 1
+    return {"returncode": returncode}
+
+
+@contextmanager
+def _changed_environment(env: dict[str, str]) -> Generator[None]:
+    # commands are executed one after another, so the environment of the daemon process can be replaced
+    old_env = dict(os.environ)
+    os.environ.clear()
+    os.environ.update(env)
+    try:
+        yield
+    finally:
+        os.environ.clear()
+        os.environ.update(old_env)
+
+
+@contextmanager
+def _changed_cwd(cwd: Path) -> Generator[None]:
+    old_cwd = Path.cwd()
+    os.chdir(cwd)
+    try:
+        yield
+    finally:
+        os.chdir(old_cwd)
+
+
+def _send_request(
+    cpd_dir: Path,
+    request: dict[str, Any],
+    on_output: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, Any] | None:
+    socket_file = get_daemon_socket_file(cpd_dir)
+    if not socket_file.exists():
+        return None
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.settimeout(_CONNECT_TIMEOUT)
+        try:
+            client.connect(str(socket_file))
+            client.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        except OSError:
+            # a stale socket file or a daemon that exited before reading the request
+            return None
+        # commands may run arbitrarily long once the daemon accepted the request
+        client.settimeout(None)
+        with client.makefile("rb") as messages:
+            for line in messages:
+                message: dict[str, Any] = json.loads(line)
+                if "stream" not in message:
+                    return message
+                if on_output is not None:
+                    on_output(message)
+    raise ConnectionError("The cpd daemon closed the connection without a response.")
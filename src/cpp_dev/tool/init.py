@@ -3,13 +3,16 @@
 # This work is licensed under the terms of the BSD-3-Clause license.
 # For a copy, see <https://opensource.org/license/bsd-3-clause>.
 
-import os
+import fcntl
+import hashlib
+from collections.abc import Generator
+from contextlib import contextmanager
 from pathlib import Path
 
-from filelock import FileLock, Timeout
-
 from cpp_dev.common.utils import ensure_dir_exists
 from cpp_dev.dependency.conan.setup import get_conan_config_source_dir, initialize_conan
+from cpp_dev.tool.migration import migrate_cpd_home
+from cpp_dev.tool.paths import get_conan_home_dir
 from cpp_dev.tool.version import get_cpd_version_from_code, read_version_file, write_version_file
 
 ###############################################################################
@@ -18,12 +21,28 @@ from cpp_dev.tool.version import get_cpd_version_from_code, read_version_file, w
 
 
 def assure_cpd_is_initialized(cpd_dir: Path) -> None:
-    """Check that cpd is properly initialized, e.g. that the Conan folder exists."""
-    conan_dir = _compose_conan_home(cpd_dir)
-    if not conan_dir.exists():
-        initialize_cpd(cpd_dir)
-    else:
-        update_cpd(cpd_dir)
+    """Check that cpd is properly initialized, e.g. that the Conan folder exists.
+
+    The fast path only reads the setup stamp recording the cpd version and the fingerprint of the installed
+    Conan configuration, which stats the configuration files without reading them. While one process
+    (re-)initializes cpd, other processes wait on a shared lock and return as soon as the stamp is up-to-date
+    instead of queuing up for the exclusive lock.
+    """
+    expected_stamp = _compose_setup_stamp()
+    if _read_setup_stamp(cpd_dir) == expected_stamp:
+        return
+    ensure_dir_exists(cpd_dir)
+    with _lock_init(cpd_dir, shared=True):
+        if _read_setup_stamp(cpd_dir) == expected_stamp:
+            return
+    with _lock_init(cpd_dir, shared=False):
+        if _read_setup_stamp(cpd_dir) == expected_stamp:
+            return
+        if not get_conan_home_dir(cpd_dir).exists():
+            _initialize_cpd(cpd_dir)
+        else:
+            _update_cpd(cpd_dir)
+        _write_setup_stamp(cpd_dir, expected_stamp)
 
 
 def initialize_cpd(cpd_dir: Path) -> None:
@@ -33,75 +52,84 @@ def initialize_cpd(cpd_dir: Path) -> None:
     without inteference from other executions.
     """
     ensure_dir_exists(cpd_dir)
-    init_lock = _compose_init_lock_file(cpd_dir)
-    try:
-        with init_lock:
-            _initialize_cpd(cpd_dir)
-    except Timeout as e:
-        raise RuntimeError("The cpd init operation is already in progress.") from e
+    with _lock_init(cpd_dir, shared=False):
+        _initialize_cpd(cpd_dir)
+        _write_setup_stamp(cpd_dir, _compose_setup_stamp())
 
 
 def update_cpd(cpd_dir: Path) -> None:
-    """Update cpd to have all configurations properly setup."""
-    cpd_tool_version_in_code = get_cpd_version_from_code()
-    cpd_version_installed = read_version_file(cpd_dir)
-    if cpd_tool_version_in_code != cpd_version_installed:
-        raise RuntimeError(
-            f"The cpd tool version in code ({cpd_tool_version_in_code}) "
-            f"does not match the installed version ({cpd_version_installed}). "
-            "Updates are not yet supported.",
-        )
+    """Update cpd to have all configurations properly setup.
 
-
-def get_cpd_dir(base_dir: Path | None = None) -> Path:
-    """Return the path to the cpd directory."""
-    return _compose_cpd_dir(_get_base_dir_or_env_or_home(base_dir))
-
-
-def get_conan_home_dir(cpd_dir: Path | None = None) -> Path:
-    """Return the path to the Conan home directory."""
-    return _compose_conan_home(_get_cpd_dir_or_default(cpd_dir))
+    The cpd home is migrated in place from the installed to the current version such that
+    the package cache is kept. The update holds the init lock to not interfere with other executions.
+    """
+    with _lock_init(cpd_dir, shared=False):
+        _update_cpd(cpd_dir)
+        _write_setup_stamp(cpd_dir, _compose_setup_stamp())
 
 
 ###############################################################################
 # Implementation                                                            ###
 ###############################################################################
 
-_CPD_HOME_DIR_ENV_VAR = "CPD_HOME"
-
-
-def _get_base_dir_or_env_or_home(base_dir: Path | None = None) -> Path:
-    if base_dir is not None:
-        return base_dir
-    if _CPD_HOME_DIR_ENV_VAR in os.environ:
-        return Path(os.environ[_CPD_HOME_DIR_ENV_VAR])
-    return Path.home()
 
-
-def _get_cpd_dir_or_default(cpd_dir: Path | None = None) -> Path:
-    if cpd_dir is not None:
-        return cpd_dir
-    return get_cpd_dir()
+def _initialize_cpd(cpd_dir: Path) -> None:
+    _initialize_conan(cpd_dir)
 
 
-def _initialize_cpd(cpd_dir: Path) -> None:
+def _update_cpd(cpd_dir: Path) -> None:
+    migrate_cpd_home(cpd_dir, read_version_file(cpd_dir), get_cpd_version_from_code())
     _initialize_conan(cpd_dir)
 
 
 def _initialize_conan(cpd_dir: Path) -> None:
-    conan_dir = _compose_conan_home(cpd_dir)
+    conan_dir = get_conan_home_dir(cpd_dir)
     ensure_dir_exists(conan_dir)
     initialize_conan(conan_dir, get_conan_config_source_dir())
     write_version_file(cpd_dir, get_cpd_version_from_code())
 
 
-def _compose_init_lock_file(cpd_dir: Path, timeout: float | None = None) -> FileLock:
-    return FileLock(cpd_dir / ".init_lock", timeout=timeout if timeout is not None else -1)
+@contextmanager
+def _lock_init(cpd_dir: Path, *, shared: bool) -> Generator[None]:
+    # flock is used directly as shared locks are required to let waiters pass concurrently
+    with _compose_init_lock_file(cpd_dir).open("a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _compose_setup_stamp() -> str:
+    return f"{get_cpd_version_from_code()}:{_compute_config_fingerprint(get_conan_config_source_dir())}"
+
+
+def _compute_config_fingerprint(config_dir: Path) -> str:
+    # the configuration is shipped with cpd, such that modifications change the modification time or size
+    digest = hashlib.sha256()
+    for config_file in sorted(path for path in config_dir.rglob("*") if path.is_file()):
+        stat = config_file.stat()
+        digest.update(f"{config_file.relative_to(config_dir)}\0{stat.st_mtime_ns}\0{stat.st_size}\0".encode())
+    return digest.hexdigest()
+
+
+def _read_setup_stamp(cpd_dir: Path) -> str | None:
+    try:
+        return _compose_setup_stamp_file(cpd_dir).read_text()
+    except FileNotFoundError:
+        return None
+
+
+def _write_setup_stamp(cpd_dir: Path, stamp: str) -> None:
+    stamp_file = _compose_setup_stamp_file(cpd_dir)
+    tmp_stamp_file = stamp_file.with_suffix(".tmp")
+    tmp_stamp_file.write_text(stamp)
+    tmp_stamp_file.replace(stamp_file)
 
 
-def _compose_cpd_dir(base_dir: Path) -> Path:
-    return base_dir / ".cpd"
+def _compose_init_lock_file(cpd_dir: Path) -> Path:
+    return cpd_dir / ".init_lock"
 
 
-def _compose_conan_home(cpd_dir: Path) -> Path:
-    return cpd_dir / "conan2"
+def _compose_setup_stamp_file(cpd_dir: Path) -> Path:
+    return cpd_dir / "setup.stamp"
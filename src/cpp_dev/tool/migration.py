@@ -0,0 +1,87 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+
+from cpp_dev.common.version import SemanticVersion
+from cpp_dev.tool.paths import get_store_dir
+from cpp_dev.tool.store import collect_store_garbage, remove_untracked_manifests
+from cpp_dev.tool.version import write_version_file
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+@dataclass
+class Migration:
+    """A migration step of the cpd home layout introduced with the given cpd version.
+
+    Migrations are applied in place and must keep the package cache intact.
+    """
+
+    version: SemanticVersion
+    description: str
+    apply: Callable[[Path], None]
+
+
+def get_pending_migrations(installed_version: SemanticVersion, target_version: SemanticVersion) -> list[Migration]:
+    """Return the migrations required to upgrade a cpd home from the installed to the target version in order."""
+    return [
+        migration
+        for migration in sorted(_MIGRATIONS, key=lambda migration: migration.version)
+        if installed_version < migration.version and not target_version < migration.version
+    ]
+
+
+def migrate_cpd_home(
+    cpd_dir: Path,
+    installed_version: SemanticVersion,
+    target_version: SemanticVersion,
+) -> list[Migration]:
+    """Upgrade the cpd home from the installed to the target version by applying the pending migrations.
+
+    The version file is advanced after each migration such that an interrupted upgrade resumes
+    with the first migration not yet applied. Downgrades are not supported.
+    The caller is responsible to hold the init lock of the cpd home.
+    """
+    if target_version < installed_version:
+        raise RuntimeError(
+            f"The cpd tool version in code ({target_version}) "
+            f"is older than the installed version ({installed_version}). Downgrades are not supported.",
+        )
+    migrations = get_pending_migrations(installed_version, target_version)
+    for migration in migrations:
+        migration.apply(cpd_dir)
+        write_version_file(cpd_dir, migration.version)
+    write_version_file(cpd_dir, target_version)
+    return migrations
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+
+def _relink_package_store(cpd_dir: Path) -> None:
+    # the blobs of untracked manifests are copies of the package files, the trees are added again
+    # with blobs linked to the package files by the next installation
+    store_dir = get_store_dir(cpd_dir)
+    remove_untracked_manifests(store_dir)
+    collect_store_garbage(store_dir)
+
+
+# Registry of all migrations of the cpd home layout. Each change of the layout (e.g. a new cache
+# index format) adds a migration for the cpd version introducing it. Re-installing the Conan
+# configuration is not a migration, it happens on every version change.
+_MIGRATIONS: list[Migration] = [
+    Migration(
+        SemanticVersion("0.0.2"),
+        "Link the blobs of the package store to the package files",
+        _relink_package_store,
+    ),
+]
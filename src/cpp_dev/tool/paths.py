@@ -0,0 +1,103 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import os
+from pathlib import Path
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def get_cpd_dir(base_dir: Path | None = None) -> Path:
+    """Return the path to the cpd directory."""
+    return _compose_cpd_dir(_get_base_dir_or_env_or_home(base_dir))
+
+
+def get_conan_home_dir(cpd_dir: Path | None = None) -> Path:
+    """Return the path to the Conan home directory."""
+    return _compose_conan_home(_get_cpd_dir_or_default(cpd_dir))
+
+
+def get_store_dir(cpd_dir: Path | None = None) -> Path:
+    """Return the path to the content-addressed package store."""
+    return _compose_store_dir(_get_cpd_dir_or_default(cpd_dir))
+
+
+def get_compile_cache_dir(cpd_dir: Path | None = None) -> Path:
+    """Return the path to the compilation cache holding object files shared by all projects."""
+    return _compose_compile_cache_dir(_get_cpd_dir_or_default(cpd_dir))
+
+
+def get_test_cache_dir(cpd_dir: Path | None = None) -> Path:
+    """Return the path to the cache of test results shared by all projects."""
+    return _compose_test_cache_dir(_get_cpd_dir_or_default(cpd_dir))
+
+
+def get_clangd_index_dir(cpd_dir: Path | None = None) -> Path:
+    """Return the path to the clangd index shards shared by the worktrees of a project."""
+    return _compose_clangd_index_dir(_get_cpd_dir_or_default(cpd_dir))
+
+
+def get_thinlto_cache_dir(cpd_dir: Path | None = None) -> Path:
+    """Return the path to the ThinLTO cache of lld shared by all projects."""
+    return _compose_thinlto_cache_dir(_get_cpd_dir_or_default(cpd_dir))
+
+
+def get_mirror_dir() -> Path | None:
+    """Return the local package mirror (see "cpd mirror sync") configured by the environment, if any."""
+    if _CPD_MIRROR_DIR_ENV_VAR not in os.environ:
+        return None
+    return Path(os.environ[_CPD_MIRROR_DIR_ENV_VAR]).absolute()
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_CPD_HOME_DIR_ENV_VAR = "CPD_HOME"
+_CPD_MIRROR_DIR_ENV_VAR = "CPD_MIRROR_DIR"
+
+
+def _get_base_dir_or_env_or_home(base_dir: Path | None = None) -> Path:
+    if base_dir is not None:
+        return base_dir
+    if _CPD_HOME_DIR_ENV_VAR in os.environ:
+        return Path(os.environ[_CPD_HOME_DIR_ENV_VAR])
+    return Path.home()
+
+
+def _get_cpd_dir_or_default(cpd_dir: Path | None = None) -> Path:
+    if cpd_dir is not None:
+        return cpd_dir
+    return get_cpd_dir()
+
+
+def _compose_cpd_dir(base_dir: Path) -> Path:
+    return base_dir / ".cpd"
+
+
+def _compose_conan_home(cpd_dir: Path) -> Path:
+    return cpd_dir / "conan2"
+
+
+def _compose_store_dir(cpd_dir: Path) -> Path:
+    return cpd_dir / "store"
+
+
+def _compose_compile_cache_dir(cpd_dir: Path) -> Path:
+    return cpd_dir / "compile_cache"
+
+
+def _compose_test_cache_dir(cpd_dir: Path) -> Path:
+    return cpd_dir / "test_cache"
+
+
+def _compose_clangd_index_dir(cpd_dir: Path) -> Path:
+    return cpd_dir / "clangd_index"
+
+
+def _compose_thinlto_cache_dir(cpd_dir: Path) -> Path:
+    return cpd_dir / "thinlto_cache"
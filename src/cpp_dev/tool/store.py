@@ -0,0 +1,327 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import errno
+import fcntl
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+from filelock import FileLock
+from pydantic import BaseModel
+
+from cpp_dev.common.utils import ensure_dir_exists
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+class StoreEntry(BaseModel):
+    """A single file or symlink of a package tree in the content-addressed store."""
+
+    path: str
+    digest: str | None = None
+    executable: bool = False
+    symlink: str | None = None
+
+
+class StoreManifest(BaseModel):
+    """The list of entries forming a package tree in the content-addressed store."""
+
+    key: str
+    entries: list[StoreEntry]
+    # the directory the tree was added from (e.g. the package folder in the Conan cache)
+    source_dir: str | None = None
+
+
+@dataclass
+class StoreGarbageCollectionResult:
+    """Result of a garbage collection run on the content-addressed store."""
+
+    removed_manifests: int = 0
+    removed_blobs: int = 0
+    # blobs still hardlinked into build directories do not free any space
+    reclaimed_bytes: int = 0
+
+
+def add_tree(store_dir: Path, key: str, source_dir: Path) -> StoreManifest:
+    """Add all files of the source directory to the store and record them under the given key.
+
+    Each file content is stored exactly once as blob named by its SHA-256 digest, which is hardlinked to the
+    source file (or reflinked/copied on another file system) to not duplicate the content on disk.
+    If a manifest for the key exists already, the source directory is not scanned again.
+    Concurrent additions of the same key are serialized by a file lock, blobs are published atomically.
+    """
+    ensure_dir_exists(_compose_lock_dir(store_dir))
+    with FileLock(_compose_lock_dir(store_dir) / f"{_hash_key(key)}.lock"):
+        manifest = load_manifest(store_dir, key)
+        if manifest is not None:
+            return manifest
+        # the added blobs are unreferenced until the manifest is stored, so the garbage collection must not run
+        with _lock_garbage_collection(store_dir):
+            entries = _add_entries(store_dir, source_dir)
+            manifest = StoreManifest(key=key, entries=entries, source_dir=str(source_dir))
+            _store_manifest(store_dir, manifest)
+        return manifest
+
+
+def load_manifest(store_dir: Path, key: str) -> StoreManifest | None:
+    """Load the manifest for the given key or return None if the key is not in the store."""
+    manifest_file = _compose_manifest_file(store_dir, key)
+    if not manifest_file.exists():
+        return None
+    return StoreManifest.model_validate_json(manifest_file.read_text())
+
+
+def materialize_tree(store_dir: Path, manifest: StoreManifest, target_dir: Path) -> None:
+    """Materialize the package tree of the manifest into the target directory.
+
+    Files are hardlinked to the blobs in the store. If hardlinks are not possible (e.g. the target
+    is on another file system), files are reflinked if supported and copied otherwise.
+    Blobs are read-only to prevent modifications of the shared content through a hardlink.
+    Files of the target directory not being part of the manifest (e.g. of a previous package version)
+    are removed.
+    """
+    ensure_dir_exists(target_dir)
+    _remove_stale_entries(target_dir, {entry.path for entry in manifest.entries})
+    for entry in manifest.entries:
+        target_file = target_dir / entry.path
+        ensure_dir_exists(target_file.parent)
+        if entry.symlink is not None:
+            target_file.unlink(missing_ok=True)
+            target_file.symlink_to(entry.symlink)
+        elif entry.digest is not None:
+            blob_file = _compose_blob_file(store_dir, entry.digest, executable=entry.executable)
+            if _is_linked_to(target_file, blob_file):
+                continue
+            target_file.unlink(missing_ok=True)
+            _link_or_copy(blob_file, target_file)
+
+
+def install_tree(store_dir: Path, key: str, source_dir: Path, target_dir: Path) -> StoreManifest:
+    """Add the source directory to the store (if not yet present) and materialize it into the target directory."""
+    manifest = add_tree(store_dir, key, source_dir)
+    materialize_tree(store_dir, manifest, target_dir)
+    return manifest
+
+
+def verify_store(store_dir: Path, *, remove_corrupted: bool = False) -> list[str]:
+    """Verify the integrity of all blobs by recomputing their digests.
+
+    Returns the digests of all corrupted blobs. Corrupted blobs are deleted if requested such that
+    they get re-populated by the next addition of a package tree containing them.
+    """
+    corrupted: list[str] = []
+    blob_dir = _compose_blob_dir(store_dir)
+    if not blob_dir.exists():
+        return corrupted
+    for blob_file in sorted(blob_dir.glob("*/*")):
+        if blob_file.suffix == ".tmp":
+            continue
+        digest = blob_file.parent.name + blob_file.name.removesuffix(_EXECUTABLE_SUFFIX)
+        if _compute_digest(blob_file) != digest:
+            corrupted.append(digest)
+            if remove_corrupted:
+                blob_file.unlink()
+    if remove_corrupted and corrupted:
+        _remove_manifests_referencing(store_dir, set(corrupted))
+    return corrupted
+
+
+def collect_store_garbage(store_dir: Path) -> StoreGarbageCollectionResult:
+    """Remove the manifests whose source directory was removed (e.g. evicted from the Conan cache).
+
+    Afterwards, all blobs not referenced by a remaining manifest are removed. Materialized trees
+    keep their files as they are hardlinks of the blobs.
+    """
+    result = StoreGarbageCollectionResult()
+    manifest_dir = _compose_manifest_dir(store_dir)
+    blob_dir = _compose_blob_dir(store_dir)
+    if not manifest_dir.exists() and not blob_dir.exists():
+        return result
+    with _lock_garbage_collection(store_dir):
+        referenced: set[Path] = set()
+        for manifest_file in manifest_dir.glob("*.json"):
+            manifest = StoreManifest.model_validate_json(manifest_file.read_text())
+            if manifest.source_dir is not None and not Path(manifest.source_dir).exists():
+                manifest_file.unlink()
+                result.removed_manifests += 1
+                continue
+            referenced.update(
+                _compose_blob_file(store_dir, entry.digest, executable=entry.executable)
+                for entry in manifest.entries
+                if entry.digest is not None
+            )
+        # temporary files are left behind by interrupted additions
+        for blob_file in blob_dir.glob("*/*"):
+            if blob_file in referenced:
+                continue
+            blob_stat = blob_file.stat()
+            if blob_stat.st_nlink == 1:
+                result.reclaimed_bytes += blob_stat.st_size
+            blob_file.unlink()
+            result.removed_blobs += blob_file.suffix != ".tmp"
+    return result
+
+
+def remove_untracked_manifests(store_dir: Path) -> int:
+    """Remove the manifests not recording their source directory and return their number.
+
+    Such manifests were added before the blobs were linked to the package files and can never be
+    collected as garbage. The next installation adds the trees again.
+    """
+    removed = 0
+    manifest_dir = _compose_manifest_dir(store_dir)
+    if not manifest_dir.exists():
+        return removed
+    with _lock_garbage_collection(store_dir):
+        for manifest_file in manifest_dir.glob("*.json"):
+            if StoreManifest.model_validate_json(manifest_file.read_text()).source_dir is None:
+                manifest_file.unlink()
+                removed += 1
+    return removed
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+# Executables are stored as separate blobs to keep the file mode part of the blob identity
+_EXECUTABLE_SUFFIX = ".x"
+
+# ioctl request code of FICLONE on Linux to create a copy-on-write clone of a file
+_FICLONE = 0x40049409
+
+
+def _add_entries(store_dir: Path, source_dir: Path) -> list[StoreEntry]:
+    entries = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for name in sorted(files) + sorted(d for d in dirs if (Path(root) / d).is_symlink()):
+            source_file = Path(root) / name
+            relative_path = str(source_file.relative_to(source_dir))
+            if source_file.is_symlink():
+                entries.append(StoreEntry(path=relative_path, symlink=str(source_file.readlink())))
+                continue
+            executable = bool(source_file.stat().st_mode & stat.S_IXUSR)
+            digest = _add_blob(store_dir, source_file, executable=executable)
+            entries.append(StoreEntry(path=relative_path, digest=digest, executable=executable))
+    return entries
+
+
+def _add_blob(store_dir: Path, source_file: Path, *, executable: bool) -> str:
+    digest = _compute_digest(source_file)
+    blob_file = _compose_blob_file(store_dir, digest, executable=executable)
+    if blob_file.exists():
+        return digest
+    ensure_dir_exists(blob_file.parent)
+    # the unique name of the temporary file is reserved by creating it and replaced by the link
+    fd, tmp_name = tempfile.mkstemp(dir=blob_file.parent, suffix=".tmp")
+    os.close(fd)
+    tmp_blob_file = Path(tmp_name)
+    tmp_blob_file.unlink()
+    _link_or_copy(source_file, tmp_blob_file)
+    # a hardlinked source file becomes read-only as well, which is fine for immutable package files
+    tmp_blob_file.chmod(0o555 if executable else 0o444)
+    tmp_blob_file.replace(blob_file)
+    return digest
+
+
+def _remove_stale_entries(target_dir: Path, paths: set[str]) -> None:
+    parent_dirs = {parent.as_posix() for path in paths for parent in Path(path).parents}
+    for root, dir_names, file_names in os.walk(target_dir, topdown=False):
+        root_dir = Path(root)
+        for name in [*file_names, *dir_names]:
+            entry_path = root_dir / name
+            relative_path = entry_path.relative_to(target_dir).as_posix()
+            if relative_path in paths:
+                continue
+            if entry_path.is_symlink() or not entry_path.is_dir():
+                entry_path.unlink()
+            elif relative_path not in parent_dirs and not any(entry_path.iterdir()):
+                entry_path.rmdir()
+
+
+def _is_linked_to(target_file: Path, blob_file: Path) -> bool:
+    try:
+        return target_file.samefile(blob_file)
+    except OSError:
+        return False
+
+
+def _link_or_copy(blob_file: Path, target_file: Path) -> None:
+    try:
+        target_file.hardlink_to(blob_file)
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EMLINK, errno.EPERM):
+            raise
+        if not _reflink(blob_file, target_file):
+            shutil.copy2(blob_file, target_file)
+
+
+def _reflink(source_file: Path, target_file: Path) -> bool:
+    with source_file.open("rb") as source, target_file.open("wb") as target:
+        try:
+            fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+        except OSError:
+            return False
+    shutil.copymode(source_file, target_file)
+    return True
+
+
+def _compute_digest(file: Path) -> str:
+    with file.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def _hash_key(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _store_manifest(store_dir: Path, manifest: StoreManifest) -> None:
+    manifest_file = _compose_manifest_file(store_dir, manifest.key)
+    ensure_dir_exists(manifest_file.parent)
+    tmp_manifest_file = manifest_file.with_suffix(".tmp")
+    tmp_manifest_file.write_text(manifest.model_dump_json())
+    tmp_manifest_file.replace(manifest_file)
+
+
+def _remove_manifests_referencing(store_dir: Path, digests: set[str]) -> None:
+    manifest_dir = _compose_manifest_dir(store_dir)
+    for manifest_file in manifest_dir.glob("*.json"):
+        manifest = StoreManifest.model_validate_json(manifest_file.read_text())
+        if any(entry.digest in digests for entry in manifest.entries):
+            manifest_file.unlink()
+
+
+def _compose_blob_dir(store_dir: Path) -> Path:
+    return store_dir / "blobs"
+
+
+def _compose_blob_file(store_dir: Path, digest: str, *, executable: bool) -> Path:
+    suffix = _EXECUTABLE_SUFFIX if executable else ""
+    return _compose_blob_dir(store_dir) / digest[:2] / f"{digest[2:]}{suffix}"
+
+
+def _compose_manifest_dir(store_dir: Path) -> Path:
+    return store_dir / "manifests"
+
+
+def _compose_manifest_file(store_dir: Path, key: str) -> Path:
+    return _compose_manifest_dir(store_dir) / f"{_hash_key(key)}.json"
+
+
+def _lock_garbage_collection(store_dir: Path) -> FileLock:
+    ensure_dir_exists(_compose_lock_dir(store_dir))
+    return FileLock(_compose_lock_dir(store_dir) / "gc.lock")
+
+
+def _compose_lock_dir(store_dir: Path) -> Path:
+    return store_dir / "locks"
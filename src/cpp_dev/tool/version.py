@@ -5,6 +5,7 @@
 
 from pathlib import Path
 
+from cpp_dev import __version__
 from cpp_dev.common.version import SemanticVersion
 
 ###############################################################################
@@ -14,11 +15,7 @@ from cpp_dev.common.version import SemanticVersion
 
 def get_cpd_version_from_code() -> SemanticVersion:
     """Get the version of the cpd tool."""
-    return SemanticVersion.from_parts(
-        major=_CPD_MAJOR_VERSION,
-        minor=_CPD_MINOR_VERSION,
-        patch=_CPD_PATCH_VERSION,
-    )
+    return SemanticVersion(__version__)
 
 
 def read_version_file(cpd_dir: Path) -> SemanticVersion:
@@ -35,12 +32,3 @@ def write_version_file(cpd_dir: Path, version: SemanticVersion) -> None:
     version_file = cpd_dir / "version.txt"
     with version_file.open("w") as f:
         f.write(str(version))
-
-
-###############################################################################
-# Implementation                                                            ###
-###############################################################################
-
-_CPD_MAJOR_VERSION = 0
-_CPD_MINOR_VERSION = 0
-_CPD_PATCH_VERSION = 1
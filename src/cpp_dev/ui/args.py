@@ -0,0 +1,235 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import re
+from argparse import ArgumentTypeError
+from pathlib import Path
+
+import typed_argparse as tap
+
+from cpp_dev.common.types import CppStandard
+from cpp_dev.common.utils import is_valid_name
+
+# The argument definitions of all cpd commands are kept free of heavy imports (pydantic, Conan, ...)
+# such that the command line parser (and shell completion) can be set up without loading the command
+# implementations.
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def _validate_project_name(name: str) -> str:
+    if not is_valid_name(name):
+        raise ArgumentTypeError(f"Invalid package name: got {name}, expected characters, underscores only.")
+    return name
+
+
+def _validate_semantic_version(version: str) -> str:
+    if re.fullmatch(r"\d+\.\d+\.\d+", version) is None:
+        raise ArgumentTypeError(f"Invalid semantic version: got {version}, expected format <major>.<minor>.<patch>.")
+    return version
+
+
+class NewProjectArgs(tap.TypedArgs):
+    """Arguments for the "cpd new" command."""
+
+    name: str = tap.arg(help="The name of the project.", positional=True, type=_validate_project_name)
+    version: str = tap.arg(help="The version of the project.", type=_validate_semantic_version)
+    std: CppStandard = tap.arg(help="The C++ standard to use for the project.", default="c++20")
+    parent_dir: Path = tap.arg(
+        default=Path.cwd(),
+        help="The parent directory to create the project directory into. "
+        "The current directory is used if this option is not provided. ",
+    )
+    author: str | None = tap.arg(help="The author of the project.")
+    license: str | None = tap.arg(help="The license of the project.")
+    description: str | None = tap.arg(help="A short description of the project.")
+
+
+class AddDependencyArgs(tap.TypedArgs):
+    """Arguments for the "cpd add" command."""
+
+    dependency_spec: list[str] = tap.arg(
+        help="""The dependency to add to the project. The format is "<repository>/<name>[<version_spec>]".
+        The parameter <repository> is the user or organization that owns the dependency.
+        This parameter is optional in which case an "official" repository is assumed.
+        The parameter <name> is the name of the dependency.
+        The parameter <version_spec> supports an exact version, lower/upper bounds, intervals or "latest".
+        This parameter is optional in which case the latest version is used.
+        The exact version is specified as "<major>.<minor>.<patch>", while lower/upper bounds and intervals
+        use the format "< | <= | > | >= <major>[.<minor>[.<patch>]]" with minor and parts parts being optional.
+        Multiple range specs can be combined with "," forming a logical AND conjunction.
+        Examples: boost, boost[latest], boost[1.0.0], boost[>=1.0], boost[<2.0], official/boost[>=1.5,<2.0]
+        """,
+        positional=True,
+    )
+
+
+class BuildArgs(tap.TypedArgs):
+    """Arguments for the "cpd build" command."""
+
+    jobs: int | None = tap.arg("-j", help="The number of parallel build jobs. Ninja chooses a default if not provided.")
+    no_compile_cache: bool = tap.arg(help="Compile all translation units without the compilation cache.")
+    remote_cache: str | None = tap.arg(
+        help="The URL of a remote HTTP cache sharing objects and test binaries across machines. "
+        "The environment variable CPD_REMOTE_CACHE_URL is used if not provided.",
+    )
+    workers: str | None = tap.arg(
+        help="Comma-separated compile workers (host:port) to distribute compilations to. "
+        "The environment variable CPD_COMPILE_WORKERS is used if not provided. "
+        "The workers authenticate the build by the token of the environment variable CPD_COMPILE_WORKER_TOKEN.",
+    )
+    no_pch: bool = tap.arg(help="Compile all translation units without precompiled headers.")
+    no_memory_scheduling: bool = tap.arg(
+        help="Run local compilations without admitting them against the available memory by their peak memory "
+        "recorded in previous builds.",
+    )
+    report: bool = tap.arg(
+        help="Print the critical path, the achieved parallelism and idle cores of the build and the compilations "
+        "worth splitting. Regressions compared with previous builds of the same size are highlighted.",
+    )
+    pch_report: bool = tap.arg(help="Print the estimated and measured savings of the precompiled headers.")
+    unity: bool = tap.arg(
+        help="Compile the sources in batches balanced by their compile cost (unity build) "
+        "and compare the build times with the normal build.",
+    )
+    time_trace: bool = tap.arg(
+        help="Profile the compilation with -ftime-trace (clang only) and report the most expensive "
+        "translation units, headers and template instantiations.",
+    )
+    fast_link: bool = tap.arg(
+        help="Link with lld of the locked LLVM package using split DWARF and a gdb index, optimized builds use "
+        "ThinLTO with a shared cache. The link time of the test binary is compared with the normal mode.",
+    )
+    link_threads: int | None = tap.arg(
+        help="The number of threads lld links with in fast link mode. All CPUs if not provided."
+    )
+    variants: str | None = tap.arg(
+        help="Comma-separated build variants (debug, release, asan, ubsan) built concurrently in "
+        "build/variants/<variant> sharing the parallel jobs. Dependencies are installed once per build type.",
+    )
+    watch: bool = tap.arg(
+        help="Keep watching the sources, headers and configuration files and rebuild the affected targets "
+        "on every change until interrupted.",
+    )
+
+
+class IndexArgs(tap.TypedArgs):
+    """Arguments for the "cpd index" command."""
+
+    jobs: int | None = tap.arg("-j", help="The number of parallel indexing jobs. The number of CPUs if not provided.")
+
+
+class ExecutionArgs(tap.TypedArgs):
+    """Arguments for the "cpd execute" command."""
+
+
+class TestArgs(BuildArgs):
+    """Arguments for the "cpd test" command, which builds the project before running the tests."""
+
+    affected: bool = tap.arg(
+        help="Run only the test cases affected by the files changed in the working tree, determined by the "
+        "include graph and optional coverage data (<test binary>.coverage.json). All tests are run if the "
+        "configuration, the lock file or the toolchain changed.",
+    )
+    since: str | None = tap.arg(
+        help="The git revision the changed files are determined against with --affected. HEAD if not provided.",
+    )
+    test_filter: str | None = tap.arg(
+        "--filter",
+        help="Run the test cases matching the gtest filter (e.g. 'Suite.*:Other.*-*.Slow'). "
+        "Patterns matching no test case are reported as error.",
+    )
+    list_tests: bool = tap.arg(
+        help="Print the test cases of the test binaries built before without building or running them. "
+        "Listings are cached by the content of the test binaries (e.g. for shell completion).",
+    )
+    no_test_cache: bool = tap.arg(
+        help="Run the tests even if a passing run of the same test binary, runtime inputs, test data (the files "
+        "of the project except for sources and the build directory) and environment is cached. "
+        "The cache is shared through the remote cache if configured.",
+    )
+
+
+class CheckArgs(tap.TypedArgs):
+    """Arguments for the "cpd check" command."""
+
+
+class FormatArgs(tap.TypedArgs):
+    """Arguments for the "cpd format" command."""
+
+
+class PackageArgs(tap.TypedArgs):
+    """Arguments for the "cpd package" command."""
+
+
+class VersionArgs(tap.TypedArgs):
+    """Arguments for the "cpd version" command."""
+
+
+class MirrorSyncArgs(tap.TypedArgs):
+    """Arguments for the "cpd mirror sync" command."""
+
+    mirror_dir: Path = tap.arg(
+        help="The local directory holding the mirrored packages. Set CPD_MIRROR_DIR to it to build offline.",
+    )
+    lock_files: list[Path] = tap.arg(
+        help="The lock files (cpp-dev.lock) whose packages get mirrored.",
+        positional=True,
+    )
+
+
+class CacheGcArgs(tap.TypedArgs):
+    """Arguments for the "cpd cache gc" command."""
+
+    max_size: str | None = tap.arg(
+        help="The size quota of the package cache, e.g. 20G. "
+        "The environment variable CPD_CACHE_MAX_SIZE or a default of 20G is used if not provided.",
+    )
+
+
+class CacheStatsArgs(tap.TypedArgs):
+    """Arguments for the "cpd cache stats" command."""
+
+    zero: bool = tap.arg(help="Reset the hit/miss statistics of the compilation cache after printing them.")
+
+
+class CacheServeArgs(tap.TypedArgs):
+    """Arguments for the "cpd cache serve" command."""
+
+    storage_dir: Path = tap.arg(help="The directory holding the cache entries.")
+    host: str = tap.arg(default="127.0.0.1", help="The address to listen on.")
+    port: int = tap.arg(default=8765, help="The port to listen on.")
+
+
+class StoreVerifyArgs(tap.TypedArgs):
+    """Arguments for the "cpd store verify" command."""
+
+    repair: bool = tap.arg(help="Remove corrupted files from the store such that they get re-populated.")
+
+
+class WorkerStartArgs(tap.TypedArgs):
+    """Arguments for the "cpd worker start" command."""
+
+    slots: int | None = tap.arg(help="The number of concurrent compilations. The number of CPUs if not provided.")
+    host: str = tap.arg(default="127.0.0.1", help="The address to listen on.")
+    port: int = tap.arg(default=8766, help="The port to listen on.")
+    compilers: str | None = tap.arg(
+        help="Comma-separated compilers (names or absolute paths) that compilations without a locked toolchain "
+        "may use. Compilers of locked toolchains are matched by name. Defaults to c++, g++ and clang++.",
+    )
+    toolchains: str | None = tap.arg(
+        help="Comma-separated identifiers of the locked toolchain packages compilations may use "
+        "(e.g. official/llvm[18.1.8]). No toolchain is allowed if not provided.",
+    )
+
+
+class DaemonStartArgs(tap.TypedArgs):
+    """Arguments for the "cpd daemon start" command."""
+
+
+class DaemonStopArgs(tap.TypedArgs):
+    """Arguments for the "cpd daemon stop" command."""
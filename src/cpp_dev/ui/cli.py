@@ -4,32 +4,40 @@
 # For a copy, see <https://opensource.org/license/bsd-3-clause>.
 
 
+import importlib
 import logging
+import os
 import sys
+from collections.abc import Callable
+from typing import Any
 
 import typed_argparse as tap
 
 from cpp_dev.common.os_detection import assert_supported_os
+from cpp_dev.tool.daemon import forward_to_daemon
+from cpp_dev.tool.paths import get_cpd_dir
 
-from .mgmt import VersionArgs, command_version
-from .project import (
+from .args import (
     AddDependencyArgs,
     BuildArgs,
+    CacheGcArgs,
+    CacheServeArgs,
+    CacheStatsArgs,
     CheckArgs,
+    DaemonStartArgs,
+    DaemonStopArgs,
     ExecutionArgs,
     FormatArgs,
+    IndexArgs,
+    MirrorSyncArgs,
     NewProjectArgs,
     PackageArgs,
+    StoreVerifyArgs,
     TestArgs,
-    command_add_dependency,
-    command_build,
-    command_check,
-    command_execute,
-    command_format,
-    command_new_project,
-    command_package,
-    command_test,
+    VersionArgs,
+    WorkerStartArgs,
 )
+from .mgmt import command_daemon_start, command_daemon_stop, command_version
 
 ###############################################################################
 # Public API                                                                ###
@@ -37,11 +45,27 @@ from .project import (
 
 
 def main() -> None:
-    """Run main entry point for the cpd command line interface."""
+    """Run main entry point for the cpd command line interface.
+
+    The command is forwarded to the cpd daemon if it is running.
+    """
+    argv = sys.argv[1:]
+    returncode = None
+    if _is_forwardable(argv):
+        returncode = forward_to_daemon(get_cpd_dir(), argv)
+    if returncode is None:
+        returncode = run_cli(argv)
+    sys.exit(returncode)
+
+
+def run_cli(argv: list[str]) -> int:
+    """Run a cpd command line (without the program name) in the current process and return its exit code.
+
+    Only the argument definitions are imported upfront. The implementation of a command is imported
+    once the command line got parsed such that e.g. "cpd version" or shell completion stay fast.
+    """
     try:
-        assert_supported_os()
         # assert_cpd_is_initialized(get_cpd_dir())  # noqa: ERA001
-
         tap.Parser(
             tap.SubParserGroup(
                 tap.SubParser("new", NewProjectArgs, help="Create a new cpp-dev project"),
@@ -51,6 +75,7 @@ def main() -> None:
                     help="Add a dependency to the project",
                 ),
                 tap.SubParser("build", BuildArgs, help="Build the project"),
+                tap.SubParser("index", IndexArgs, help="Prebuild the clangd index of the project"),
                 tap.SubParser("execute", ExecutionArgs, help="Execute the built code"),
                 tap.SubParser("test", TestArgs, help="Run the tests"),
                 tap.SubParser("check", CheckArgs, help="Perform static code analysis"),
@@ -60,19 +85,109 @@ def main() -> None:
                     PackageArgs,
                     help="Package the project into a distributable cpp-dev format",
                 ),
+                tap.SubParser(
+                    "mirror",
+                    tap.SubParserGroup(
+                        tap.SubParser("sync", MirrorSyncArgs, help="Synchronize packages into a local mirror"),
+                    ),
+                    help="Manage local package mirrors for offline usage",
+                ),
+                tap.SubParser(
+                    "cache",
+                    tap.SubParserGroup(
+                        tap.SubParser("gc", CacheGcArgs, help="Evict least-recently used packages"),
+                        tap.SubParser("stats", CacheStatsArgs, help="Print the statistics of the compilation cache"),
+                        tap.SubParser("serve", CacheServeArgs, help="Serve a remote build cache for local testing"),
+                    ),
+                    help="Manage the package and compilation caches",
+                ),
+                tap.SubParser(
+                    "store",
+                    tap.SubParserGroup(
+                        tap.SubParser("verify", StoreVerifyArgs, help="Verify the integrity of the package store"),
+                    ),
+                    help="Manage the content-addressed package store",
+                ),
+                tap.SubParser(
+                    "worker",
+                    tap.SubParserGroup(
+                        tap.SubParser("start", WorkerStartArgs, help="Run a compile worker in the foreground"),
+                    ),
+                    help="Manage compile workers executing compilations of other machines",
+                ),
+                tap.SubParser(
+                    _DAEMON_COMMAND,
+                    tap.SubParserGroup(
+                        tap.SubParser("start", DaemonStartArgs, help="Run the cpd daemon in the foreground"),
+                        tap.SubParser("stop", DaemonStopArgs, help="Stop the running cpd daemon"),
+                    ),
+                    help="Manage the cpd daemon keeping state warm across commands",
+                ),
                 tap.SubParser("version", VersionArgs, help="Print the version of cpd"),
             ),
         ).bind(
-            tap.Binding(NewProjectArgs, command_new_project),
-            tap.Binding(AddDependencyArgs, command_add_dependency),
-            tap.Binding(BuildArgs, command_build),
-            tap.Binding(ExecutionArgs, command_execute),
-            tap.Binding(TestArgs, command_test),
-            tap.Binding(CheckArgs, command_check),
-            tap.Binding(FormatArgs, command_format),
-            tap.Binding(PackageArgs, command_package),
+            tap.Binding(NewProjectArgs, _lazy_command(_PROJECT_COMMANDS, "command_new_project")),
+            tap.Binding(AddDependencyArgs, _lazy_command(_PROJECT_COMMANDS, "command_add_dependency")),
+            tap.Binding(BuildArgs, _lazy_command(_PROJECT_COMMANDS, "command_build")),
+            tap.Binding(IndexArgs, _lazy_command(_PROJECT_COMMANDS, "command_index")),
+            tap.Binding(ExecutionArgs, _lazy_command(_PROJECT_COMMANDS, "command_execute")),
+            tap.Binding(TestArgs, _lazy_command(_PROJECT_COMMANDS, "command_test")),
+            tap.Binding(CheckArgs, _lazy_command(_PROJECT_COMMANDS, "command_check")),
+            tap.Binding(FormatArgs, _lazy_command(_PROJECT_COMMANDS, "command_format")),
+            tap.Binding(PackageArgs, _lazy_command(_PROJECT_COMMANDS, "command_package")),
+            tap.Binding(MirrorSyncArgs, _lazy_command(_PACKAGE_COMMANDS, "command_mirror_sync")),
+            tap.Binding(CacheGcArgs, _lazy_command(_PACKAGE_COMMANDS, "command_cache_gc")),
+            tap.Binding(CacheStatsArgs, _lazy_command(_PACKAGE_COMMANDS, "command_cache_stats")),
+            tap.Binding(CacheServeArgs, _lazy_command(_PACKAGE_COMMANDS, "command_cache_serve")),
+            tap.Binding(StoreVerifyArgs, _lazy_command(_PACKAGE_COMMANDS, "command_store_verify")),
+            tap.Binding(WorkerStartArgs, _lazy_command(_PROJECT_COMMANDS, "command_worker_start")),
+            tap.Binding(DaemonStartArgs, lambda args: command_daemon_start(args, run_cli)),
+            tap.Binding(DaemonStopArgs, command_daemon_stop),
             tap.Binding(VersionArgs, command_version),
-        ).run()
+        ).run(argv)
     except Exception:
         logging.exception("Failed to run cpd command")
-        sys.exit(1)
+        return 1
+    return 0
+
+
+###############################################################################
+# Implementation                                                            ###
+###############################################################################
+
+_DAEMON_COMMAND = "daemon"
+
+_CPD_NO_DAEMON_ENV_VAR = "CPD_NO_DAEMON"
+
+_WATCH_OPTION = "--watch"
+
+_PROJECT_COMMANDS = "cpp_dev.ui.project"
+_PACKAGE_COMMANDS = "cpp_dev.ui.packages"
+
+
+def _is_forwardable(argv: list[str]) -> bool:
+    """Check if the command may be executed by the daemon.
+
+    Daemon management always runs locally, as well as watch modes, which run until interrupted while an
+    interrupt only stops the client of a forwarded command.
+    """
+    return (
+        _CPD_NO_DAEMON_ENV_VAR not in os.environ
+        and (len(argv) == 0 or argv[0] != _DAEMON_COMMAND)
+        and _WATCH_OPTION not in argv
+    )
+
+
+def _lazy_command(module_name: str, command_name: str) -> Callable[[Any], None]:
+    """Create a command importing its implementation module only when being executed.
+
+    Commands operating on projects or packages require a supported operating system.
+    The detection result is cached per host in the cpd directory to avoid parsing os-release on each call.
+    """
+
+    def run_command(args: Any) -> None:  # noqa: ANN401
+        assert_supported_os(get_cpd_dir())
+        command: Callable[[Any], None] = getattr(importlib.import_module(module_name), command_name)
+        command(args)
+
+    return run_command
@@ -3,19 +3,28 @@
 # This work is licensed under the terms of the BSD-3-Clause license.
 # For a copy, see <https://opensource.org/license/bsd-3-clause>.
 
-import typed_argparse as tap
+from cpp_dev import __version__
+from cpp_dev.tool.daemon import DaemonCommandHandler, serve_daemon, stop_daemon
+from cpp_dev.tool.paths import get_cpd_dir
 
-from cpp_dev.tool.version import get_cpd_version_from_code
+from .args import DaemonStartArgs, DaemonStopArgs, VersionArgs
 
 ###############################################################################
 # Public API                                                                ###
 ###############################################################################
 
 
-class VersionArgs(tap.TypedArgs):
-    """Arguments for the "cpd version" command."""
-
-
 def command_version(_: VersionArgs) -> None:
     """Print the version of the cpd command."""
-    print(f"cpp-dev version {get_cpd_version_from_code()}")  # noqa: T201
+    print(f"cpp-dev version {__version__}")  # noqa: T201
+
+
+def command_daemon_start(_: DaemonStartArgs, command_handler: DaemonCommandHandler) -> None:
+    """Run the cpd daemon serving the commands of cpd clients until it gets stopped."""
+    serve_daemon(get_cpd_dir(), command_handler)
+
+
+def command_daemon_stop(_: DaemonStopArgs) -> None:
+    """Stop the running cpd daemon."""
+    if not stop_daemon(get_cpd_dir()):
+        print("The cpd daemon is not running.")  # noqa: T201
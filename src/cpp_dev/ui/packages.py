@@ -0,0 +1,82 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from cpp_dev.builder.compile_cache import load_compile_cache_stats, reset_compile_cache_stats
+from cpp_dev.builder.remote_cache_server import serve_remote_cache
+from cpp_dev.dependency.conan.mirror import sync_mirror
+from cpp_dev.dependency.provider import DependencyIdentifier
+from cpp_dev.project.lockfile import load_lock_file_from_path
+from cpp_dev.tool.cache import parse_size, run_cache_gc
+from cpp_dev.tool.init import assure_cpd_is_initialized
+from cpp_dev.tool.paths import get_compile_cache_dir, get_conan_home_dir, get_cpd_dir, get_store_dir
+from cpp_dev.tool.store import verify_store
+
+from .args import CacheGcArgs, CacheServeArgs, CacheStatsArgs, MirrorSyncArgs, StoreVerifyArgs
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+
+def command_mirror_sync(args: MirrorSyncArgs) -> None:
+    """Synchronize the packages referenced by lock files into a local mirror."""
+    cpd_dir = get_cpd_dir()
+    assure_cpd_is_initialized(cpd_dir)
+    deps = {
+        DependencyIdentifier(repository=package.repository, name=package.name, version=package.version)
+        for lock_file in args.lock_files
+        for package in load_lock_file_from_path(lock_file).packages
+    }
+    result = sync_mirror(get_conan_home_dir(cpd_dir), args.mirror_dir, deps)
+    print(  # noqa: T201
+        f"Transferred {len(result.transferred)} revisions, {result.up_to_date} revisions already up-to-date.",
+    )
+
+
+def command_cache_gc(args: CacheGcArgs) -> None:
+    """Evict least-recently used packages from the package cache until the size quota is met."""
+    cpd_dir = get_cpd_dir()
+    assure_cpd_is_initialized(cpd_dir)
+    result = run_cache_gc(cpd_dir, parse_size(args.max_size) if args.max_size is not None else None)
+    print(  # noqa: T201
+        f"Evicted {len(result.packages.evicted)} packages, reclaimed {result.packages.reclaimed_bytes} bytes, "
+        f"cache size is {result.packages.cache_size} bytes.",
+    )
+    print(  # noqa: T201
+        f"Removed {result.store.removed_manifests} package trees and {result.store.removed_blobs} files "
+        f"from the package store, reclaimed {result.store.reclaimed_bytes} bytes.",
+    )
+    for pattern in result.packages.failed:
+        print(f"Failed to remove {pattern} from the package cache.")  # noqa: T201
+
+
+def command_cache_stats(args: CacheStatsArgs) -> None:
+    """Print the hit/miss statistics and the size of the compilation cache."""
+    compile_cache_dir = get_compile_cache_dir()
+    stats = load_compile_cache_stats(compile_cache_dir)
+    lookups = stats.hits + stats.misses
+    hit_rate = 100 * stats.hits / lookups if lookups > 0 else 0.0
+    print(  # noqa: T201
+        f"Compilation cache: {stats.hits} hits, {stats.misses} misses ({hit_rate:.1f}% hit rate), "
+        f"{stats.remote_hits} fetched from remote, {stats.uncacheable} uncacheable, "
+        f"cache size is {stats.size} bytes.",
+    )
+    if args.zero:
+        reset_compile_cache_stats(compile_cache_dir)
+
+
+def command_cache_serve(args: CacheServeArgs) -> None:
+    """Serve a remote build cache from a local directory until interrupted."""
+    print(f"Serving remote build cache at http://{args.host}:{args.port}")  # noqa: T201
+    serve_remote_cache(args.storage_dir, args.host, args.port)
+
+
+def command_store_verify(args: StoreVerifyArgs) -> None:
+    """Verify the integrity of the content-addressed package store."""
+    corrupted = verify_store(get_store_dir(), remove_corrupted=args.repair)
+    for digest in corrupted:
+        print(f"Corrupted file in store: {digest}")  # noqa: T201
+    if corrupted and not args.repair:
+        raise RuntimeError(f"Found {len(corrupted)} corrupted files in the package store.")
@@ -3,92 +3,104 @@
 # This work is licensed under the terms of the BSD-3-Clause license.
 # For a copy, see <https://opensource.org/license/bsd-3-clause>.
 
-from argparse import ArgumentTypeError
+import os
+import secrets
+import time
+from collections.abc import Callable
+from functools import cache, partial
 from pathlib import Path
 
-import typed_argparse as tap
-
-from cpp_dev.common.types import CppStandard
-from cpp_dev.common.utils import is_valid_name
-from cpp_dev.project.management import setup_project
-from cpp_dev.project.types import ProjectConfig, SemanticVersion
+from cpp_dev.builder.build_report import BuildReport
+from cpp_dev.builder.clangd_index import compose_project_key, prebuild_clangd_index
+from cpp_dev.builder.compile_cache import (
+    COMPILE_WORKER_TOKEN_ENV_VAR,
+    DEFAULT_COMPILE_CACHE_MAX_SIZE,
+    CompileCacheStats,
+    load_compile_cache_stats,
+)
+from cpp_dev.builder.compile_worker import CompileWorkerConfig, resolve_system_compiler, serve_compile_worker
+from cpp_dev.builder.dependencies import create_build_config, load_prepared_dependencies, prepare_dependencies
+from cpp_dev.builder.engine import BuildConfig, BuildResult, build_project, generate_compilation_database
+from cpp_dev.builder.fast_link import FastLinkConfig, LinkTimeReport
+from cpp_dev.builder.ninja import run_ninja
+from cpp_dev.builder.pch import PrecompiledHeaderReport
+from cpp_dev.builder.targets import compose_test_target
+from cpp_dev.builder.time_trace import TimeTraceReport
+from cpp_dev.builder.unity import UnityReport
+from cpp_dev.builder.variants import (
+    BuildType,
+    apply_build_variant,
+    build_variants,
+    compose_variant_build_dir,
+    compose_variant_dependency_dir,
+    parse_build_variants,
+)
+from cpp_dev.builder.watch import ProjectWatcher
+from cpp_dev.common.utils import assert_is_not_none
+from cpp_dev.common.version import SemanticVersion
+from cpp_dev.dependency.caching import CachingDependencyProvider
+from cpp_dev.dependency.conan.command_wrapper import ConanSettings
+from cpp_dev.dependency.conan.provider import ConanDependencyProvider
+from cpp_dev.dependency.conan.setup import DEFAULT_CONAN_PROFILE
+from cpp_dev.dependency.provider import DependencyIdentifier, DependencyProvider
+from cpp_dev.dependency.specifier import DependencySpecifier
+from cpp_dev.project import Project, setup_project
+from cpp_dev.project.config import ProjectConfig, load_project_config
+from cpp_dev.project.path_composition import compose_build_dir
+from cpp_dev.testing.discovery import discover_test_cases, filter_test_cases
+from cpp_dev.testing.impact import UnitTestSelection, collect_changed_files, record_test_inputs, select_affected_tests
+from cpp_dev.testing.result_cache import (
+    DEFAULT_TEST_CACHE_MAX_SIZE,
+    ResultCacheConfig,
+    compute_test_key,
+    load_cached_results,
+    load_file_digests,
+    store_cached_results,
+    store_file_digests,
+)
+from cpp_dev.testing.runner import UnitTest, UnitTestResult, run_tests
+from cpp_dev.tool.cache import (
+    get_compile_cache_max_size,
+    get_remote_cache_url,
+    get_test_cache_max_size,
+    register_project,
+    run_auto_cache_gc,
+)
+from cpp_dev.tool.paths import (
+    get_clangd_index_dir,
+    get_compile_cache_dir,
+    get_conan_home_dir,
+    get_cpd_dir,
+    get_mirror_dir,
+    get_store_dir,
+    get_test_cache_dir,
+    get_thinlto_cache_dir,
+)
+
+from .args import (
+    AddDependencyArgs,
+    BuildArgs,
+    CheckArgs,
+    ExecutionArgs,
+    FormatArgs,
+    IndexArgs,
+    NewProjectArgs,
+    PackageArgs,
+    TestArgs,
+    WorkerStartArgs,
+)
 
 ###############################################################################
 # Public API                                                                ###
 ###############################################################################
 
 
-def _validate_project_name(name: str) -> str:
-    if not is_valid_name(name):
-        raise ArgumentTypeError(f"Invalid package name: got {name}, expected characters, underscores only.")
-    return name
-
-
-class NewProjectArgs(tap.TypedArgs):
-    """Arguments for the "cpd new" command."""
-
-    name: str = tap.arg(help="The name of the project.", positional=True, type=_validate_project_name)
-    version: SemanticVersion = tap.arg(help="The version of the project.")
-    std: CppStandard = tap.arg(help="The C++ standard to use for the project.", default="c++20")
-    parent_dir: Path = tap.arg(
-        default=Path.cwd(),
-        help="The parent directory to create the project directory into. "
-        "The current directory is used if this option is not provided. ",
-    )
-    author: str | None = tap.arg(help="The author of the project.")
-    license: str | None = tap.arg(help="The license of the project.")
-    description: str | None = tap.arg(help="A short description of the project.")
-
-
-class AddDependencyArgs(tap.TypedArgs):
-    """Arguments for the "cpd add" command."""
-
-    dependency_spec: list[str] = tap.arg(
-        help="""The dependency to add to the project. The format is "<repository>/<name>[<version_spec>]".
-        The parameter <repository> is the user or organization that owns the dependency.
-        This parameter is optional in which case an "official" repository is assumed.
-        The parameter <name> is the name of the dependency.
-        The parameter <version_spec> supports an exact version, lower/upper bounds, intervals or "latest".
-        This parameter is optional in which case the latest version is used.
-        The exact version is specified as "<major>.<minor>.<patch>", while lower/upper bounds and intervals
-        use the format "< | <= | > | >= <major>[.<minor>[.<patch>]]" with minor and parts parts being optional.
-        Multiple range specs can be combined with "," forming a logical AND conjunction.
-        Examples: boost, boost[latest], boost[1.0.0], boost[>=1.0], boost[<2.0], official/boost[>=1.5,<2.0]
-        """,
-        positional=True,
-    )
-
-
-class BuildArgs(tap.TypedArgs):
-    """Arguments for the "cpd build" command."""
-
-
-class ExecutionArgs(tap.TypedArgs):
-    """Arguments for the "cpd execute" command."""
-
-
-class TestArgs(tap.TypedArgs):
-    """Arguments for the "cpd test" command."""
-
-
-class CheckArgs(tap.TypedArgs):
-    """Arguments for the "cpd check" command."""
-
-
-class FormatArgs(tap.TypedArgs):
-    """Arguments for the "cpd format" command."""
-
-
-class PackageArgs(tap.TypedArgs):
-    """Arguments for the "cpd package" command."""
-
-
 def command_new_project(args: NewProjectArgs) -> None:
     """Create a new project with the specified configuration."""
-    setup_project(
+    project = setup_project(
         project_config=ProjectConfig(
             name=args.name,
-            version=args.version,
+            version=SemanticVersion(args.version),
             std=args.std,
             author=args.author,
             license=args.license,
@@ -97,15 +109,59 @@ def command_new_project(args: NewProjectArgs) -> None:
             dev_dependencies=[],
             cpd_dependencies=[],
         ),
+        dependency_provider=_get_dependency_provider(),
+        parent_dir=args.parent_dir,
     )
+    register_project(get_cpd_dir(), project.project_dir)
 
 
 def command_add_dependency(args: AddDependencyArgs) -> None:
     """Add a new dependency to the project."""
+    project = Project(Path.cwd(), _get_dependency_provider())
+    project.add_package_dependency([DependencySpecifier(spec) for spec in args.dependency_spec], "runtime")
+    register_project(get_cpd_dir(), project.project_dir)
 
 
 def command_build(args: BuildArgs) -> None:
     """Build the project."""
+    if args.watch:
+        _watch_project(args, run_tests=False)
+    elif args.variants:
+        _build_variants(args)
+    else:
+        _build_project(args)
+
+
+def command_index(args: IndexArgs) -> None:
+    """Prebuild the clangd index of the project in a cache shared by all worktrees of the project."""
+    project_dir = Path.cwd()
+    project_config = load_project_config(project_dir)
+    build_dir = compose_build_dir(project_dir)
+    build_config = _create_build_config(project_dir, project_config, build_dir)
+    generate_compilation_database(project_dir, project_config.name, build_config, build_dir)
+    index_dir = get_clangd_index_dir() / compose_project_key(project_dir)
+    prebuild_clangd_index(project_dir, build_dir, index_dir, args.jobs)
+    print(f"Prebuilt the clangd index in {index_dir}.")  # noqa: T201
+
+
+def command_worker_start(args: WorkerStartArgs) -> None:
+    """Run a compile worker executing compilations dispatched by cpd builds of other machines.
+
+    Clients authenticate with the token of the environment variable CPD_COMPILE_WORKER_TOKEN,
+    which is generated and printed if not set.
+    """
+    slots = args.slots or os.cpu_count() or 1
+    token = os.environ.get(COMPILE_WORKER_TOKEN_ENV_VAR)
+    if token is None:
+        token = secrets.token_urlsafe()
+        print(f"Clients authenticate with {COMPILE_WORKER_TOKEN_ENV_VAR}={token}")  # noqa: T201
+    config = CompileWorkerConfig(token=token)
+    if args.compilers is not None:
+        config.compilers = [compiler.strip() for compiler in args.compilers.split(",")]
+    if args.toolchains is not None:
+        config.toolchains = [toolchain.strip() for toolchain in args.toolchains.split(",")]
+    print(f"Serving compilations at {args.host}:{args.port} with {slots} slots")  # noqa: T201
+    serve_compile_worker(config, slots, _resolve_toolchain, args.host, args.port)
 
 
 def command_execute(args: ExecutionArgs) -> None:
@@ -113,7 +169,22 @@ def command_execute(args: ExecutionArgs) -> None:
 
 
 def command_test(args: TestArgs) -> None:
-    """Run the tests for the project."""
+    """Build the project and run the tests sharded across all CPUs."""
+    if args.list_tests:
+        _list_tests(args)
+        return
+    if args.watch:
+        if args.affected or args.since is not None:
+            raise RuntimeError("Affected tests are selected by the watch mode itself, --affected is not supported.")
+        _watch_project(args, run_tests=True)
+        return
+    if args.variants:
+        test_binaries = [result.test_binary for result in _build_variants(args).values()]
+    else:
+        test_binaries = [_build_project(args).test_binary]
+    changed_files = collect_changed_files(Path.cwd(), args.since) if args.affected or args.since is not None else None
+    if not _run_tests(test_binaries, changed_files, args.test_filter, use_cache=not args.no_test_cache):
+        raise RuntimeError("The tests failed.")
 
 
 def command_check(args: CheckArgs) -> None:
@@ -131,3 +202,401 @@ def command_package(args: PackageArgs) -> None:
 ###############################################################################
 # Implementation                                                            ###
 ###############################################################################
+
+
+_CPD_COMPILE_WORKERS_ENV_VAR = "CPD_COMPILE_WORKERS"
+
+
+def _build_project(args: BuildArgs) -> BuildResult:
+    project_dir = Path.cwd()
+    project_config = load_project_config(project_dir)
+    build_dir = compose_build_dir(project_dir)
+    build_config = _create_build_config(project_dir, project_config, build_dir)
+    _apply_build_args(build_config, args)
+    stats_before = _load_compile_cache_stats(build_config)
+    result = build_project(project_dir, project_config.name, build_config, build_dir, jobs=args.jobs)
+    _print_compile_cache_summary(build_config, stats_before)
+    _print_build_result(result, args)
+    return result
+
+
+def _build_variants(args: BuildArgs) -> dict[str, BuildResult]:
+    """Build the variants concurrently, the dependencies are prepared once per build type."""
+    project_dir = Path.cwd()
+    project_config = load_project_config(project_dir)
+    build_dir = compose_build_dir(project_dir)
+    configs = {}
+    for variant in parse_build_variants(assert_is_not_none(args.variants)):
+        deps_dir = compose_variant_dependency_dir(build_dir, variant.build_type)
+        build_config = _create_build_config(project_dir, project_config, deps_dir, variant.build_type)
+        configs[variant.name] = apply_build_variant(build_config, variant)
+        _apply_build_args(configs[variant.name], args)
+    any_config = next(iter(configs.values()))
+    stats_before = _load_compile_cache_stats(any_config)
+    results = build_variants(project_dir, project_config.name, configs, build_dir, jobs=args.jobs)
+    _print_compile_cache_summary(any_config, stats_before)
+    for variant_name, result in results.items():
+        print(f"Built variant {variant_name}.")  # noqa: T201
+        _print_build_result(result, args)
+    return results
+
+
+def _create_build_config(
+    project_dir: Path,
+    project_config: ProjectConfig,
+    deps_dir: Path,
+    build_type: BuildType | None = None,
+) -> BuildConfig:
+    prepared = load_prepared_dependencies(project_dir, deps_dir)
+    if prepared is None:
+        prepared = prepare_dependencies(project_dir, deps_dir, _get_dependency_provider(build_type), get_store_dir())
+        run_auto_cache_gc(get_cpd_dir())
+    return create_build_config(project_config.std, prepared)
+
+
+def _apply_build_args(build_config: BuildConfig, args: BuildArgs) -> None:
+    build_config.precompiled_headers = not args.no_pch
+    build_config.memory_scheduling = not args.no_memory_scheduling
+    build_config.unity = args.unity
+    build_config.time_trace = args.time_trace
+    if args.fast_link:
+        build_config.fast_link = FastLinkConfig(threads=args.link_threads, thinlto_cache_dir=get_thinlto_cache_dir())
+    if args.no_compile_cache:
+        return
+    build_config.compile_cache_dir = get_compile_cache_dir()
+    build_config.compile_cache_max_size = get_compile_cache_max_size() or DEFAULT_COMPILE_CACHE_MAX_SIZE
+    build_config.remote_cache_url = args.remote_cache or get_remote_cache_url()
+    workers = args.workers or os.environ.get(_CPD_COMPILE_WORKERS_ENV_VAR)
+    build_config.compile_workers = [worker.strip() for worker in workers.split(",")] if workers else []
+
+
+def _watch_project(args: BuildArgs, *, run_tests: bool) -> None:
+    """Rebuild (and test) the project on every change until interrupted.
+
+    Changes of sources and headers only build the affected targets and run the tests if the test binary
+    is affected. Changes of the configuration or the set of source files trigger a full build.
+    """
+    if args.variants:
+        raise RuntimeError("Build variants are not supported in watch mode.")
+    project_dir = Path.cwd()
+    name = load_project_config(project_dir).name
+    build_dir = compose_build_dir(project_dir)
+    try:
+        with ProjectWatcher(project_dir, name, build_dir) as watcher:
+            _run_watch_iteration(lambda: _build_project(args).test_binary, run_tests=run_tests)
+            while True:
+                print("Watching for changes (press Ctrl-C to stop)...")  # noqa: T201
+                changes = assert_is_not_none(watcher.wait())
+                start = time.monotonic()
+                if changes.full_build:
+                    _run_watch_iteration(lambda: _build_project(args).test_binary, run_tests=run_tests)
+                elif changes.targets:
+                    _run_watch_iteration(
+                        partial(_build_targets, build_dir, name, changes.targets, args.jobs),
+                        run_tests=run_tests and bool(changes.affected.test_binaries),
+                    )
+                else:
+                    continue
+                print(f"Finished in {time.monotonic() - start:.2f}s.")  # noqa: T201
+    except KeyboardInterrupt:
+        pass
+
+
+def _run_watch_iteration(build: Callable[[], Path | None], *, run_tests: bool) -> None:
+    # failures are reported without ending the watch such that the next change can fix them
+    try:
+        test_binary = build()
+        if run_tests:
+            _run_tests([test_binary])
+    except RuntimeError as e:
+        print(f"Error: {e}")  # noqa: T201
+
+
+def _build_targets(build_dir: Path, name: str, targets: list[str], jobs: int | None) -> Path | None:
+    run_ninja(build_dir, targets, jobs=jobs)
+    test_binary = build_dir / compose_test_target(name)
+    return test_binary if test_binary.exists() else None
+
+
+def _run_tests(
+    test_binaries: list[Path | None],
+    changed_files: list[str] | None = None,
+    test_filter: str | None = None,
+    *,
+    use_cache: bool = True,
+) -> bool:
+    """Run the test cases of the test binaries sharded across all CPUs and print their results.
+
+    Only the test cases matching the filter and affected by the changed files are run if given. Test binaries
+    with a cached passing run of the same test cases are not run, but their cached results are shown.
+    """
+    binaries = [test_binary for test_binary in test_binaries if test_binary is not None]
+    cases = _collect_test_cases(binaries, changed_files, test_filter)
+    if not cases:
+        print("No tests to run.")  # noqa: T201
+        return True
+    # the results of multiple binaries (i.e. build variants) are labelled by their build directory
+    print_result = partial(_print_test_result, labelled=len(binaries) > 1)
+    cache_config = _create_result_cache_config() if use_cache else None
+    keys: dict[Path, str] = {}
+    cached_results: list[UnitTestResult] = []
+    if cache_config is not None:
+        keys, cached_results = _load_cached_test_results(cache_config, cases)
+        for result in cached_results:
+            print_result(result, cached=True)
+    cached_binaries = {result.binary for result in cached_results}
+    pending = [case for case in cases if case.binary not in cached_binaries]
+    report = run_tests(pending, on_result=print_result) if pending else None
+    for binary in binaries:
+        record_test_inputs(binary)
+    if report is None:
+        print(f"{len(cached_results)} tests passed (cached).")  # noqa: T201
+        return True
+    if cache_config is not None:
+        for binary in dict.fromkeys(case.binary for case in pending):
+            binary_results = [result for result in report.results if result.binary == binary]
+            store_cached_results(cache_config, keys[binary], binary_results)
+    print(  # noqa: T201
+        f"{len(report.results) + len(cached_results)} tests ({len(cached_results)} cached), {len(report.failed)} "
+        f"failed in {report.wall_ms} ms (total test time {report.cpu_ms} ms on {report.jobs} jobs).",
+    )
+    return not report.failed
+
+
+def _collect_test_cases(
+    binaries: list[Path],
+    changed_files: list[str] | None,
+    test_filter: str | None,
+) -> list[UnitTest]:
+    cases = discover_test_cases(binaries, _create_result_cache_config())
+    if test_filter is not None:
+        cases = filter_test_cases(cases, test_filter)
+    if changed_files is not None:
+        project_dir = Path.cwd()
+        selection = select_affected_tests(project_dir, load_project_config(project_dir).name, cases, changed_files)
+        _print_test_selection(selection)
+        cases = selection.selected
+    return cases
+
+
+def _list_tests(args: TestArgs) -> None:
+    """Print the test cases of the test binaries built before, which are listed from the cache if unchanged."""
+    project_dir = Path.cwd()
+    name = load_project_config(project_dir).name
+    build_dir = compose_build_dir(project_dir)
+    if args.variants:
+        build_dirs = [
+            compose_variant_build_dir(build_dir, variant.name) for variant in parse_build_variants(args.variants)
+        ]
+    else:
+        build_dirs = [build_dir]
+    binaries = [directory / compose_test_target(name) for directory in build_dirs]
+    cases = discover_test_cases([binary for binary in binaries if binary.exists()], _create_result_cache_config())
+    if args.test_filter is not None:
+        cases = filter_test_cases(cases, args.test_filter)
+    for case_name in dict.fromkeys(case.display_name for case in cases):
+        print(case_name)  # noqa: T201
+
+
+def _load_cached_test_results(
+    cache_config: ResultCacheConfig,
+    cases: list[UnitTest],
+) -> tuple[dict[Path, str], list[UnitTestResult]]:
+    """Compute the cache keys of the test binaries and load the cached results of the test binaries found."""
+    cases_by_binary: dict[Path, list[UnitTest]] = {}
+    for case in cases:
+        cases_by_binary.setdefault(case.binary, []).append(case)
+    keys = {}
+    cached_results = []
+    # the test data is hashed only if changed since the last run
+    load_file_digests(cache_config.cache_dir)
+    for binary, binary_cases in cases_by_binary.items():
+        # the tests run within the project directory
+        keys[binary] = compute_test_key(binary_cases, Path.cwd())
+        cached_results.extend(load_cached_results(cache_config, keys[binary], binary) or [])
+    store_file_digests(cache_config.cache_dir)
+    return keys, cached_results
+
+
+def _create_result_cache_config() -> ResultCacheConfig:
+    return ResultCacheConfig(
+        cache_dir=get_test_cache_dir(),
+        max_size=get_test_cache_max_size() or DEFAULT_TEST_CACHE_MAX_SIZE,
+        remote_url=get_remote_cache_url(),
+    )
+
+
+def _print_test_selection(selection: UnitTestSelection) -> None:
+    if selection.full_suite_reason is not None:
+        print(f"Running all {len(selection.selected)} tests: {selection.full_suite_reason}.")  # noqa: T201
+        return
+    print(f"Running {len(selection.selected)} affected tests, skipped {selection.skipped} tests.")  # noqa: T201
+    for reason, count in sorted(selection.run_reasons.items(), key=lambda item: -item[1]):
+        print(f"  run {count}: {reason}")  # noqa: T201
+    for reason, count in sorted(selection.skip_reasons.items(), key=lambda item: -item[1]):
+        print(f"  skipped {count}: {reason}")  # noqa: T201
+
+
+def _print_test_result(result: UnitTestResult, *, labelled: bool, cached: bool = False) -> None:
+    label = f"{result.binary.parent.name}: " if labelled else ""
+    status = ("PASSED" if result.passed else "FAILED") + (" (cached)" if cached else "")
+    print(f"{status} {label}{result.name} ({result.duration_ms} ms)")  # noqa: T201
+    for line in result.output.splitlines():
+        print(f"  {line}")  # noqa: T201
+
+
+@cache
+def _resolve_toolchain(toolchain: str | None, compiler: str) -> str:
+    """Resolve the compiler of a locked toolchain by installing its package from the Conan reference.
+
+    Compilations without a locked toolchain use the compiler of the same name available on the worker.
+    """
+    if toolchain is None:
+        return resolve_system_compiler(toolchain, compiler)
+    dep_id = DependencyIdentifier.from_str(toolchain)
+    specifier = DependencySpecifier(f"{dep_id.repository}/{dep_id.name}[{dep_id.version}]")
+    (installed,) = _get_dependency_provider().install_dependencies([specifier])
+    resolved = installed.package_dir / "bin" / Path(compiler).name
+    if not resolved.exists():
+        raise RuntimeError(f"Compiler {compiler} is not part of the toolchain {toolchain}.")
+    return str(resolved)
+
+
+def _get_dependency_provider(build_type: BuildType | None = None) -> DependencyProvider:
+    """Return the dependency provider shared by all commands of this process.
+
+    Resolution results are cached such that they stay warm across commands executed by the cpd daemon.
+    The build type of the dependencies overrides the one of the profile if given.
+    Packages are resolved offline from the mirror configured by the environment if any.
+    """
+    return _create_dependency_provider(build_type, get_mirror_dir())
+
+
+@cache
+def _create_dependency_provider(build_type: BuildType | None, mirror_dir: Path | None) -> DependencyProvider:
+    settings: ConanSettings | None = {"build_type": build_type} if build_type is not None else None
+    return CachingDependencyProvider(
+        ConanDependencyProvider(get_conan_home_dir(), DEFAULT_CONAN_PROFILE, settings, mirror_dir=mirror_dir),
+    )
+
+
+def _load_compile_cache_stats(build_config: BuildConfig) -> CompileCacheStats | None:
+    if build_config.compile_cache_dir is None:
+        return None
+    return load_compile_cache_stats(build_config.compile_cache_dir)
+
+
+def _print_compile_cache_summary(build_config: BuildConfig, before: CompileCacheStats | None) -> None:
+    after = _load_compile_cache_stats(build_config)
+    if before is None or after is None:
+        return
+    hits = after.hits - before.hits
+    misses = after.misses - before.misses
+    if hits + misses > 0:
+        print(f"Compilation cache: {hits} hits, {misses} misses.")  # noqa: T201
+
+
+def _print_build_result(result: BuildResult, args: BuildArgs) -> None:
+    if result.remote_cache is not None:
+        print(  # noqa: T201
+            f"Remote cache: {result.remote_cache.fetched} fetched, {result.remote_cache.uploaded} uploaded, "
+            f"{result.remote_cache.failed_uploads} failed uploads.",
+        )
+    _print_build_reports(result, args)
+
+
+def _print_build_reports(result: BuildResult, args: BuildArgs) -> None:
+    if args.report:
+        _print_build_report(result.report)
+    if args.pch_report:
+        _print_precompiled_header_report(result.precompiled_headers)
+    _print_unity_report(result.unity)
+    _print_time_trace_report(result.time_trace)
+    if args.fast_link:
+        _print_link_time_report(result.link_time)
+
+
+def _print_build_report(report: BuildReport | None) -> None:
+    if report is None:
+        print("No build statements executed.")  # noqa: T201
+        return
+    summary = report.summary
+    print(  # noqa: T201
+        f"Build: {summary.statements} statements, wall time {summary.wall_ms} ms, "
+        f"critical path {summary.critical_path_ms} ms, parallelism {summary.parallelism:.1f} of {summary.cores} cores.",
+    )
+    print(f"  Parallelism over time: {' '.join(f'{value:.1f}' for value in report.parallelism)}")  # noqa: T201
+    print("Critical path:")  # noqa: T201
+    for entry in report.critical_path:
+        print(f"  {entry.duration_ms:>8} ms  {entry.output}")  # noqa: T201
+    if report.idle_gaps:
+        print("Idle cores:")  # noqa: T201
+        for gap in report.idle_gaps:
+            print(f"  {gap.start_ms:>8} - {gap.end_ms} ms: {gap.idle_core_ms} idle core ms")  # noqa: T201
+    if report.split_candidates:
+        print("Splitting these compilations shortens the wall time:")  # noqa: T201
+        for candidate in report.split_candidates:
+            print(  # noqa: T201
+                f"  {candidate.savings_ms:>8} ms  {candidate.output} ({candidate.duration_ms} ms)",
+            )
+    for regression in report.regressions:
+        print(f"Regression: {regression}")  # noqa: T201
+
+
+def _print_precompiled_header_report(reports: list[PrecompiledHeaderReport]) -> None:
+    if not reports:
+        print("No precompiled headers.")  # noqa: T201
+        return
+    for report in reports:
+        print(  # noqa: T201
+            f"Precompiled header {report.name} ({report.translation_units} translation units): "
+            f"estimated savings {report.estimated_savings_ms} ms, "
+            f"measured savings {_format_duration(report.measured_savings_ms)}.",
+        )
+        print(f"  {', '.join(report.headers)}")  # noqa: T201
+
+
+def _print_unity_report(report: UnityReport | None) -> None:
+    if report is None:
+        return
+    print(f"Unity build: {report.batches} batches, {len(report.standalone)} separate sources.")  # noqa: T201
+    if report.isolated:
+        print(f"  Colliding sources: {', '.join(report.isolated)}")  # noqa: T201
+    print(  # noqa: T201
+        f"  Cold build: {_format_duration(report.cold_build_ms)} "
+        f"(normal: {_format_duration(report.normal_cold_build_ms)})",
+    )
+    print(  # noqa: T201
+        f"  Incremental rebuild: {report.incremental_rebuild_ms} ms "
+        f"(normal: {report.normal_incremental_rebuild_ms} ms)",
+    )
+
+
+def _print_time_trace_report(report: TimeTraceReport | None) -> None:
+    if report is None:
+        return
+    sections = [
+        ("Slowest translation units", report.translation_units),
+        ("Most expensive headers (inclusive parse time)", report.headers),
+        ("Most expensive template instantiations", report.instantiations),
+        ("Critical path", report.critical_path),
+    ]
+    for title, entries in sections:
+        print(f"{title}:")  # noqa: T201
+        for entry in entries:
+            count = f" ({entry.count}x)" if entry.count > 1 else ""
+            print(f"  {entry.total_ms:>8} ms  {entry.name}{count}")  # noqa: T201
+    print(f"Chrome trace: {report.trace_file}")  # noqa: T201
+
+
+def _print_link_time_report(report: LinkTimeReport | None) -> None:
+    if report is None:
+        return
+    print(  # noqa: T201
+        f"Link time of {report.binary}: {_format_duration(report.fast_link_ms)} "
+        f"(normal: {_format_duration(report.normal_link_ms)})",
+    )
+
+
+def _format_duration(duration_ms: int | None) -> str:
+    return f"{duration_ms} ms" if duration_ms is not None else "not measured yet"
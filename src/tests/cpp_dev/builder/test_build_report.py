@@ -0,0 +1,77 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from pathlib import Path
+
+from cpp_dev.builder.build_report import IdleGap, SplitCandidate, report_build
+from cpp_dev.builder.engine import BuildConfig, build_project
+from cpp_dev.builder.ninja import NinjaFileWriter
+
+from .utils import create_project_layout, requires_compiler
+
+_BUILD_START_NS = 10**18
+
+
+def _write_ninja_files(build_dir: Path, a_end_ms: int) -> None:
+    writer = NinjaFileWriter()
+    writer.build(["obj/a.o"], "cxx", ["/src/a.cpp"])
+    writer.build(["obj/b.o"], "cxx", ["/src/b.cpp"])
+    writer.build(["liba.a"], "ar", ["obj/a.o", "obj/b.o"])
+    writer.build(["lib_test"], "link", ["liba.a"])
+    (build_dir / "build.ninja").write_text(writer.text())
+    mtime_ns = _BUILD_START_NS + 1
+    (build_dir / ".ninja_log").write_text(
+        "# ninja log v7\n"
+        # the statement of a previous build is not part of the report
+        "0\t900\t5\tobj/c.o\tabc\n"
+        f"0\t{a_end_ms}\t{mtime_ns}\tobj/a.o\tabc\n"
+        f"0\t100\t{mtime_ns}\tobj/b.o\tabc\n"
+        f"{a_end_ms}\t{a_end_ms + 50}\t{mtime_ns}\tliba.a\tabc\n"
+        f"{a_end_ms + 50}\t{a_end_ms + 100}\t{mtime_ns}\tlib_test\tabc\n",
+    )
+
+
+def test_report_build(tmp_path: Path) -> None:
+    _write_ninja_files(tmp_path, a_end_ms=400)
+    report = report_build(tmp_path, _BUILD_START_NS, cores=2)
+
+    assert report is not None
+    assert (report.summary.statements, report.summary.wall_ms, report.summary.busy_ms) == (4, 500, 600)
+    assert report.summary.critical_path_ms == 500
+    assert [entry.output for entry in report.critical_path] == ["obj/a.o", "liba.a", "lib_test"]
+    assert report.parallelism[:4] == [2.0, 2.0, 2.0, 2.0]
+    assert sum(report.parallelism) / len(report.parallelism) == report.summary.parallelism
+    assert report.idle_gaps == [IdleGap(start_ms=100, end_ms=500, idle_core_ms=400)]
+    # splitting obj/a.o shortens the critical path until obj/b.o and the work on both cores bound the build
+    assert report.split_candidates == [SplitCandidate(output="obj/a.o", duration_ms=400, savings_ms=200)]
+    assert report.baseline is None
+
+
+def test_report_build_regressions(tmp_path: Path) -> None:
+    _write_ninja_files(tmp_path, a_end_ms=400)
+    report_build(tmp_path, _BUILD_START_NS, cores=2)
+    report = report_build(tmp_path, _BUILD_START_NS, cores=2)
+    assert report is not None
+    assert report.baseline is not None
+    assert report.regressions == []
+
+    _write_ninja_files(tmp_path, a_end_ms=800)
+    report = report_build(tmp_path, _BUILD_START_NS, cores=2)
+    assert report is not None
+    assert report.regressions == [
+        "wall time 900 ms (baseline: 500 ms)",
+        "critical path 900 ms (baseline: 500 ms)",
+    ]
+
+
+@requires_compiler
+def test_build_reports_executed_statements(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=2)
+    result = build_project(tmp_path, "lib", BuildConfig())
+    assert result.report is not None
+    assert result.report.summary.statements == 5
+    assert result.report.critical_path[-1].output == "lib_test"
+
+    assert build_project(tmp_path, "lib", BuildConfig()).report is None
@@ -0,0 +1,71 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.builder.clangd_index import compose_project_key, prebuild_clangd_index
+from cpp_dev.builder.compilation_database import compose_compilation_database, read_compilation_database
+from cpp_dev.builder.engine import BuildConfig, generate_compilation_database
+
+from .utils import create_project_layout, requires_clangd
+
+
+def test_generate_compilation_database(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib")
+    build_dir = tmp_path / "build"
+    config = BuildConfig(include_dirs=[tmp_path / "deps" / "include"])
+
+    assert generate_compilation_database(tmp_path, "lib", config, build_dir)
+    commands = read_compilation_database(build_dir)
+    assert [command.file for command in commands] == [
+        str(tmp_path / "src" / "lib.test.cpp"),
+        str(tmp_path / "src" / "lib_0.cpp"),
+    ]
+    assert f"-isystem{tmp_path / 'deps' / 'include'}" in commands[0].arguments
+    assert f"-I{tmp_path / 'include'}" in commands[0].arguments
+
+    # the database is not touched if its entries are unchanged
+    mtime = compose_compilation_database(build_dir).stat().st_mtime_ns
+    assert not generate_compilation_database(tmp_path, "lib", config, build_dir)
+    assert compose_compilation_database(build_dir).stat().st_mtime_ns == mtime
+
+    (tmp_path / "src" / "lib_1.cpp").write_text("int api_1() { return 1; }\n")
+    assert generate_compilation_database(tmp_path, "lib", config, build_dir)
+    assert len(read_compilation_database(build_dir)) == 3
+
+
+@requires_clangd
+def test_prebuild_clangd_index(tmp_path: Path) -> None:
+    worktrees = [tmp_path / "main", tmp_path / "feature"]
+    index_dir = tmp_path / "index"
+    for worktree in worktrees:
+        create_project_layout(worktree, "lib")
+        generate_compilation_database(worktree, "lib", BuildConfig(compiler="clang++"), worktree / "build")
+        prebuild_clangd_index(worktree, worktree / "build", index_dir, jobs=2)
+        assert (worktree / ".cache" / "clangd" / "index").resolve() == index_dir.resolve()
+
+    # both worktrees store the shards of their sources in the shared directory
+    assert len(list(index_dir.glob("lib_0.cpp.*.idx"))) == 2
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="No git available")
+def test_project_key_is_shared_by_worktrees(tmp_path: Path) -> None:
+    main_dir, feature_dir = tmp_path / "main", tmp_path / "feature"
+    create_project_layout(main_dir, "lib")
+    git = ["git", "-c", "user.name=cpd", "-c", "user.email=cpd@localhost"]
+    for args in (
+        ["init", "-q"],
+        ["add", "."],
+        ["commit", "-q", "-m", "init"],
+        ["worktree", "add", "-q", str(feature_dir)],
+    ):
+        subprocess.run([*git, "-C", str(main_dir), *args], check=True)  # noqa: S603
+
+    assert compose_project_key(main_dir) == compose_project_key(feature_dir)
+    assert compose_project_key(main_dir) != compose_project_key(tmp_path)
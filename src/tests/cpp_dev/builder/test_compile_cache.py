@@ -0,0 +1,146 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import shutil
+import subprocess
+from pathlib import Path
+
+from cpp_dev.builder.compile_cache import (
+    CompileCacheStats,
+    evict_compile_cache,
+    load_compile_cache_stats,
+    main,
+    reset_compile_cache_stats,
+)
+from cpp_dev.builder.engine import BuildConfig, build_project
+
+from .utils import create_project_layout, requires_compiler
+
+
+@requires_compiler
+def test_rebuild_from_compile_cache(tmp_path: Path) -> None:
+    project_dir = tmp_path / "project"
+    cache_dir = tmp_path / "cache"
+    create_project_layout(project_dir, "lib", num_sources=2)
+    config = BuildConfig(compile_cache_dir=cache_dir)
+
+    result = build_project(project_dir, "lib", config)
+    # the objects and the linked test binary are cached
+    stats = load_compile_cache_stats(cache_dir)
+    assert (stats.hits, stats.misses) == (0, 4)
+    assert stats.size > 0
+
+    # a clean build, e.g. after switching back to a branch, is served from the cache
+    shutil.rmtree(result.build_dir)
+    result = build_project(project_dir, "lib", config)
+    stats = load_compile_cache_stats(cache_dir)
+    assert (stats.hits, stats.misses) == (4, 4)
+    assert result.test_binary is not None
+    assert subprocess.run([result.test_binary], check=False).returncode == 0  # noqa: S603
+
+    # headers are part of the key as the preprocessed source is hashed
+    (project_dir / "include" / "lib" / "lib.hpp").write_text("#pragma once\nint api_0();\nint api_1();\nint other();\n")
+    build_project(project_dir, "lib", config)
+    # the objects are unchanged by the additional declaration, such that the link is still a hit
+    stats = load_compile_cache_stats(cache_dir)
+    assert (stats.hits, stats.misses) == (5, 7)
+
+
+@requires_compiler
+def test_compile_cache_key_includes_flags_and_toolchain(tmp_path: Path) -> None:
+    project_dir = tmp_path / "project"
+    cache_dir = tmp_path / "cache"
+    create_project_layout(project_dir, "lib")
+
+    build_project(project_dir, "lib", BuildConfig(compile_cache_dir=cache_dir))
+    shutil.rmtree(project_dir / "build")
+    build_project(project_dir, "lib", BuildConfig(compile_cache_dir=cache_dir, cxxflags=["-O2"]))
+    shutil.rmtree(project_dir / "build")
+    build_project(project_dir, "lib", BuildConfig(compile_cache_dir=cache_dir, toolchain_id="official/llvm[19.1.0]"))
+
+    stats = load_compile_cache_stats(cache_dir)
+    assert (stats.hits, stats.misses) == (0, 9)
+
+
+@requires_compiler
+def test_failed_compilation_is_not_cached(tmp_path: Path) -> None:
+    cache_dir = tmp_path / "cache"
+    source = tmp_path / "broken.cpp"
+    source.write_text("int broken( { return 0; }\n")
+    argv = [
+        *("--cache-dir", str(cache_dir), "--max-size", "1000000"),
+        *("--output", str(tmp_path / "broken.o"), "--depfile", str(tmp_path / "broken.o.d")),
+        *("--source", str(source), "--", "c++"),
+    ]
+
+    assert main(argv) != 0
+    assert main(argv) != 0
+    stats = load_compile_cache_stats(cache_dir)
+    assert (stats.hits, stats.misses, stats.uncacheable) == (0, 0, 2)
+
+
+@requires_compiler
+def test_direct_mode_skips_preprocessing(tmp_path: Path) -> None:
+    cache_dir = tmp_path / "cache"
+    (tmp_path / "lib.hpp").write_text("int api();\n")
+    source = tmp_path / "lib.cpp"
+    source.write_text('#include "lib.hpp"\nint api() { return 1; }\n')
+    # the compiler wrapper records the preprocessing runs
+    compiler = tmp_path / "cxx"
+    compiler.write_text(
+        f'#!/bin/sh\ncase "$*" in *" -E "*) echo >> {tmp_path / "preprocessed.log"};; esac\nexec c++ "$@"\n'
+    )
+    compiler.chmod(0o755)
+    output, depfile = tmp_path / "lib.o", tmp_path / "lib.o.d"
+    argv = [
+        *("--cache-dir", str(cache_dir), "--max-size", "1000000", "--base-dir", str(tmp_path)),
+        *("--output", str(output), "--depfile", str(depfile)),
+        *("--source", str(source), "--", str(compiler), "-O1"),
+    ]
+
+    def count_preprocessing() -> int:
+        return len((tmp_path / "preprocessed.log").read_text().splitlines())
+
+    assert main(argv) == 0
+    assert count_preprocessing() == 1
+    output.unlink()
+    depfile.unlink()
+
+    # the object is found by the hashes of the dependencies recorded in the manifest of the compilation
+    assert main(argv) == 0
+    assert count_preprocessing() == 1
+    assert output.exists()
+    assert str(tmp_path / "lib.hpp") in depfile.read_text()
+
+    # changed dependencies require the preprocessing
+    (tmp_path / "lib.hpp").write_text("int api();\nint other();\n")
+    assert main(argv) == 0
+    assert count_preprocessing() == 2
+    stats = load_compile_cache_stats(cache_dir)
+    assert (stats.hits, stats.misses) == (1, 2)
+    # the changes of the statistics are logged by the launchers and folded by the exclusive operations
+    assert not (cache_dir / "stats.json").exists()
+    reset_compile_cache_stats(cache_dir)
+    assert not (cache_dir / "stats.log").exists()
+    assert load_compile_cache_stats(cache_dir) == CompileCacheStats(size=stats.size)
+
+
+@requires_compiler
+def test_evict_compile_cache(tmp_path: Path) -> None:
+    project_dir = tmp_path / "project"
+    cache_dir = tmp_path / "cache"
+    create_project_layout(project_dir, "lib", num_sources=2)
+    build_project(project_dir, "lib", BuildConfig(compile_cache_dir=cache_dir))
+    size = load_compile_cache_stats(cache_dir).size
+
+    assert evict_compile_cache(cache_dir, size) == 0
+    assert evict_compile_cache(cache_dir, size - 1) >= 1
+    assert evict_compile_cache(cache_dir, 0) >= 1
+    assert load_compile_cache_stats(cache_dir).size == 0
+    assert not list((cache_dir / "objects").glob("*/*"))
+
+    reset_compile_cache_stats(cache_dir)
+    stats = load_compile_cache_stats(cache_dir)
+    assert (stats.hits, stats.misses) == (0, 0)
@@ -0,0 +1,169 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import fcntl
+import os
+import secrets
+import subprocess
+import threading
+import urllib.error
+import urllib.request
+from collections.abc import Generator
+from contextlib import ExitStack, contextmanager
+from http import HTTPStatus
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.builder.compile_cache import COMPILE_WORKER_TOKEN_ENV_VAR, CompileRequest, CompileResponse
+from cpp_dev.builder.compile_worker import (
+    CompileWorkerConfig,
+    fetch_worker_slots,
+    resolve_system_compiler,
+    run_compile_worker,
+)
+from cpp_dev.builder.engine import BuildConfig, build_project
+
+from .utils import create_project_layout, requires_compiler
+
+
+@contextmanager
+def _occupy_local_slots(build_dir: Path) -> Generator[ExitStack]:
+    """Hold all local compilation slots of the build such that compilations are dispatched to the workers."""
+    slot_dir = build_dir / "slots"
+    slot_dir.mkdir(parents=True)
+    with ExitStack() as stack:
+        for idx in range(os.cpu_count() or 1):
+            slot_file = stack.enter_context((slot_dir / str(idx)).open("a"))
+            fcntl.flock(slot_file.fileno(), fcntl.LOCK_EX)
+        yield stack
+
+
+_TOKEN = secrets.token_urlsafe()
+
+
+def _send_compile_request(worker: str, request: CompileRequest, token: str = _TOKEN) -> CompileResponse:
+    http_request = urllib.request.Request(
+        f"http://{worker}/compile",
+        data=request.to_json(),
+        headers={"Authorization": f"Bearer {token}"},
+        method="POST",
+    )
+    with urllib.request.urlopen(http_request) as response:  # noqa: S310
+        return CompileResponse.from_json(response.read())
+
+
+@requires_compiler
+def test_compile_worker() -> None:
+    source = b"int answer() { return 42; }\n"
+    with run_compile_worker(CompileWorkerConfig(token=_TOKEN), slots=2) as worker:
+        assert fetch_worker_slots(worker) == 2
+        compile_response = _send_compile_request(worker, CompileRequest(None, "c++", ["-O2"], source))
+    assert compile_response.returncode == 0
+    assert compile_response.output.startswith(b"\x7fELF")
+    assert fetch_worker_slots(worker) is None
+
+
+def test_compile_worker_rejects_requests() -> None:
+    source = b"int answer() { return 42; }\n"
+    config = CompileWorkerConfig(token=_TOKEN, toolchains=["official/llvm[18.1.8]"])
+    resolved = []
+
+    def resolver(toolchain: str | None, compiler: str) -> str:
+        resolved.append(compiler)
+        raise RuntimeError(f"Toolchain {toolchain} of {compiler} not available.")
+
+    def send(request: CompileRequest, token: str = _TOKEN) -> int:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            _send_compile_request(worker, request, token)
+        return error.value.code
+
+    with run_compile_worker(config, slots=1, resolver=resolver) as worker:
+        assert send(CompileRequest(None, "c++", [], source), "wrong") == HTTPStatus.UNAUTHORIZED
+        assert send(CompileRequest(None, "python3", [], source)) == HTTPStatus.FORBIDDEN
+        assert send(CompileRequest(None, "/usr/bin/c++", [], source)) == HTTPStatus.FORBIDDEN
+        assert send(CompileRequest("official/gcc[14.1.0]", "g++", [], source)) == HTTPStatus.FORBIDDEN
+        assert send(CompileRequest("official/llvm[18.1.8]", "/opt/llvm/bin/lli", [], source)) == HTTPStatus.FORBIDDEN
+        for flags in [
+            ["-o", "out.o"],
+            ["-Bbin"],
+            ["-fplugin=plugin.so"],
+            ["-Xclang", "-load", "-Xclang", "plugin.so"],
+            ["@flags.txt"],
+            ["--driver-mode=cl"],
+            ["-specs=gcc.specs"],
+            ["-x", "c++", "-include", "/etc/passwd"],
+            ["-ftime-trace=/tmp/trace.json"],
+            ["-fprofile-use=/etc/passwd"],
+            ["-fprofile-instr-use=/etc/passwd"],
+            ["-fsanitize-ignorelist=/etc/passwd"],
+            ["-fcrash-diagnostics-dir=/tmp"],
+            ["-fmodules-cache-path=/tmp"],
+            ["-mllvm", "-debug"],
+            ["-fdump-tree-all"],
+            ["-save-temps=obj"],
+            ["-dumpdir", "dumps/"],
+            ["-Wa,-adhln=/tmp/listing"],
+            ["-D", "NAME"],
+            ["/etc/passwd"],
+        ]:
+            assert send(CompileRequest(None, "c++", flags, source)) == HTTPStatus.FORBIDDEN, flags
+        assert not resolved
+        # allowed compilations reach the resolver
+        flags = [
+            *("-std=c++20", "-O2", "-g", "-DNDEBUG", "-Wall", "-Werror=return-type", "-pthread"),
+            *("-fsanitize=address", "-fno-omit-frame-pointer", "-gsplit-dwarf=single", "-ggnu-pubnames"),
+            *("-flto=thin", "-ffile-prefix-map=/home/project=."),
+        ]
+        request = CompileRequest("official/llvm[18.1.8]", "/opt/llvm/bin/clang++", flags, source)
+        assert send(request) == HTTPStatus.INTERNAL_SERVER_ERROR
+        assert resolved == ["/opt/llvm/bin/clang++"]
+
+
+@requires_compiler
+def test_build_with_compile_workers(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=2)
+    monkeypatch.setenv(COMPILE_WORKER_TOKEN_ENV_VAR, _TOKEN)
+    requests = []
+
+    def resolver(toolchain: str | None, compiler: str) -> str:
+        requests.append(compiler)
+        return resolve_system_compiler(toolchain, compiler)
+
+    with (
+        run_compile_worker(CompileWorkerConfig(token=_TOKEN), slots=4, resolver=resolver) as worker,
+        _occupy_local_slots(tmp_path / "build"),
+    ):
+        config = BuildConfig(compile_cache_dir=tmp_path / "cache", compile_workers=[worker])
+        result = build_project(tmp_path, "lib", config)
+
+    # all compilations are executed by the worker while the link is executed locally
+    assert len(requests) == 3
+    assert result.test_binary is not None
+    assert subprocess.run([result.test_binary], check=False).returncode == 0  # noqa: S603
+
+
+@requires_compiler
+def test_build_falls_back_to_local_compilation(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    create_project_layout(tmp_path, "lib")
+    monkeypatch.setenv(COMPILE_WORKER_TOKEN_ENV_VAR, _TOKEN)
+    failures = []
+
+    def resolver(toolchain: str | None, compiler: str) -> str:
+        failures.append(compiler)
+        raise RuntimeError(f"Toolchain {toolchain} of {compiler} not available.")
+
+    with (
+        run_compile_worker(CompileWorkerConfig(token=_TOKEN), slots=1, resolver=resolver) as worker,
+        _occupy_local_slots(tmp_path / "build") as slots,
+    ):
+        # the local slots get available once the worker failed
+        threading.Timer(1.0, slots.close).start()
+        config = BuildConfig(compile_cache_dir=tmp_path / "cache", compile_workers=[worker])
+        result = build_project(tmp_path, "lib", config)
+
+    assert failures
+    assert result.test_binary is not None
+    assert subprocess.run([result.test_binary], check=False).returncode == 0  # noqa: S603
@@ -0,0 +1,80 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import pytest
+
+from cpp_dev.builder.dependencies import create_build_config, load_prepared_dependencies, prepare_dependencies
+from cpp_dev.dependency.provider import DependencyIdentifier, DependencyProvider, InstalledDependency
+from cpp_dev.dependency.specifier import DependencySpecifier
+
+
+@pytest.fixture
+def project_dir(tmp_path: Path) -> Path:
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    (project_dir / "cpp-dev.lock").write_text(
+        "packages:\n"
+        "- repository: official\n  name: gtest\n  version: 1.15.0\n"
+        "- repository: official\n  name: llvm\n  version: 19.0.0\n",
+    )
+    return project_dir
+
+
+@pytest.fixture
+def dependency_provider(tmp_path: Path) -> DependencyProvider:
+    gtest_dir = tmp_path / "conan" / "gtest"
+    (gtest_dir / "include" / "gtest").mkdir(parents=True)
+    (gtest_dir / "include" / "gtest" / "gtest.h").write_text("#pragma once")
+    (gtest_dir / "lib").mkdir()
+    (gtest_dir / "lib" / "libgtest.a").write_text("archive")
+    (gtest_dir / "lib" / "libgtest_main.a").write_text("archive")
+    llvm_dir = tmp_path / "conan" / "llvm"
+    (llvm_dir / "bin").mkdir(parents=True)
+    (llvm_dir / "bin" / "clang++").write_text("#!/bin/sh")
+    (llvm_dir / "bin" / "ld.lld").write_text("#!/bin/sh")
+
+    provider = MagicMock(spec=DependencyProvider)
+    provider.install_dependencies.return_value = [
+        InstalledDependency(DependencyIdentifier.from_str("official/gtest/1.15.0"), gtest_dir),
+        InstalledDependency(DependencyIdentifier.from_str("official/llvm/19.0.0"), llvm_dir),
+    ]
+    return provider
+
+
+def test_prepare_dependencies(tmp_path: Path, project_dir: Path, dependency_provider: MagicMock) -> None:
+    build_dir = project_dir / "build"
+    assert load_prepared_dependencies(project_dir, build_dir) is None
+
+    prepared = prepare_dependencies(project_dir, build_dir, dependency_provider, tmp_path / "store")
+    dependency_provider.install_dependencies.assert_called_once_with(
+        [DependencySpecifier("official/gtest[1.15.0]"), DependencySpecifier("official/llvm[19.0.0]")],
+    )
+    assert (build_dir / "deps" / "gtest" / "include" / "gtest" / "gtest.h").exists()
+    assert load_prepared_dependencies(project_dir, build_dir) == prepared
+
+    config = create_build_config("c++20", prepared)
+    assert config.compiler == str(build_dir / "deps" / "llvm" / "bin" / "clang++")
+    assert config.linker == str(build_dir / "deps" / "llvm" / "bin" / "ld.lld")
+    assert config.include_dirs == [build_dir / "deps" / "gtest" / "include"]
+    assert config.lib_dirs == [build_dir / "deps" / "gtest" / "lib"]
+    assert config.libs == ["gtest", "gtest_main"]
+
+
+def test_prepared_dependencies_outdated_by_lock_file(
+    tmp_path: Path,
+    project_dir: Path,
+    dependency_provider: MagicMock,
+) -> None:
+    build_dir = project_dir / "build"
+    prepare_dependencies(project_dir, build_dir, dependency_provider, tmp_path / "store")
+    (project_dir / "cpp-dev.lock").write_text("packages: []\n")
+    assert load_prepared_dependencies(project_dir, build_dir) is None
+
+    dependency_provider.install_dependencies.return_value = []
+    prepare_dependencies(project_dir, build_dir, dependency_provider, tmp_path / "store")
+    assert not (build_dir / "deps" / "gtest").exists()
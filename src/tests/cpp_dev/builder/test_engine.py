@@ -0,0 +1,80 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import subprocess
+import time
+from pathlib import Path
+
+from cpp_dev.builder.engine import BuildConfig, build_project, generate_build_file
+
+from .utils import create_project_layout, requires_compiler
+
+
+@requires_compiler
+def test_build_project(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=2)
+
+    result = build_project(tmp_path, "lib", BuildConfig())
+    assert result.regenerated
+    assert result.library.exists()
+    assert result.test_binary is not None
+    assert subprocess.run([result.test_binary], check=False).returncode == 0  # noqa: S603
+
+    result = build_project(tmp_path, "lib", BuildConfig())
+    assert not result.regenerated
+
+
+def test_generate_build_file_only_on_changes(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib")
+    build_dir = tmp_path / "build"
+
+    assert generate_build_file(tmp_path, "lib", BuildConfig(), build_dir)
+    assert not generate_build_file(tmp_path, "lib", BuildConfig(), build_dir)
+
+    # content changes are tracked by Ninja and do not require a re-generation
+    (tmp_path / "src" / "lib_0.cpp").write_text("int api_0() { return 1; }\n")
+    assert not generate_build_file(tmp_path, "lib", BuildConfig(), build_dir)
+
+    (tmp_path / "src" / "new.cpp").write_text("int new_api() { return 1; }\n")
+    assert generate_build_file(tmp_path, "lib", BuildConfig(), build_dir)
+
+    assert generate_build_file(tmp_path, "lib", BuildConfig(cxxflags=["-O2"]), build_dir)
+    build_file = (build_dir / "build.ninja").read_text()
+    assert "build obj/src/new.cpp.o: cxx" in build_file
+    assert "-O2" in build_file
+
+
+# Writes the outputs (and depfiles) of compilations, links and archives without compiling anything
+_FAKE_TOOL = """\
+#!/bin/sh
+[ "$1" = crs ] && exec touch "$2"
+while [ $# -gt 0 ]; do
+    case "$1" in
+        -o) out="$2"; shift ;;
+        -MF) depfile="$2"; shift ;;
+        -c) source="$2"; shift ;;
+    esac
+    shift
+done
+touch "$out"
+[ -z "$depfile" ] || echo "$out: $source" > "$depfile"
+"""
+
+
+def test_build_project_no_op_for_large_project(tmp_path: Path) -> None:
+    project_dir = tmp_path / "project"
+    create_project_layout(project_dir, "lib", num_sources=2000)
+    fake_tool = tmp_path / "fake_tool"
+    fake_tool.write_text(_FAKE_TOOL)
+    fake_tool.chmod(0o755)
+    config = BuildConfig(compiler=str(fake_tool), archiver=str(fake_tool))
+    build_project(project_dir, "lib", config)
+
+    # the no-op path includes the build planning, the compilation database, Ninja and the reports
+    start = time.perf_counter()
+    result = build_project(project_dir, "lib", config)
+    assert time.perf_counter() - start < 0.2
+    assert not result.regenerated
+    assert result.report is None
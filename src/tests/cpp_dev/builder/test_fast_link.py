@@ -0,0 +1,66 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.builder.engine import BuildConfig, build_project
+from cpp_dev.builder.fast_link import (
+    FastLinkConfig,
+    compose_fast_link_cxxflags,
+    compose_fast_link_ldflags,
+    report_link_time,
+)
+
+from .utils import create_project_layout
+
+
+def test_compose_fast_link_flags_for_debug_builds() -> None:
+    cxxflags = ["-O0", "-g"]
+    assert compose_fast_link_cxxflags(cxxflags) == ["-gsplit-dwarf=single", "-ggnu-pubnames"]
+    assert compose_fast_link_ldflags(cxxflags, "/llvm/bin/ld.lld", FastLinkConfig(threads=4)) == [
+        "-fuse-ld=lld",
+        "--ld-path=/llvm/bin/ld.lld",
+        "-Wl,--threads=4",
+        "-Wl,--gdb-index",
+    ]
+
+
+def test_compose_fast_link_flags_for_optimized_builds(tmp_path: Path) -> None:
+    cxxflags = ["-O2", "-DNDEBUG"]
+    config = FastLinkConfig(thinlto_cache_dir=tmp_path / "thinlto", thinlto_cache_max_size=1000)
+    assert compose_fast_link_cxxflags(cxxflags) == ["-flto=thin"]
+    assert compose_fast_link_ldflags(cxxflags, "/llvm/bin/ld.lld", config) == [
+        "-fuse-ld=lld",
+        "--ld-path=/llvm/bin/ld.lld",
+        "-flto=thin",
+        f"-Wl,--thinlto-cache-dir={tmp_path / 'thinlto'}",
+        "-Wl,--thinlto-cache-policy=cache_size_bytes=1000",
+    ]
+    # sanitizer builds optimizing for debugging are neither split nor linked with ThinLTO
+    assert compose_fast_link_cxxflags(["-O2", "-O1", "-g", "-g0"]) == []
+
+
+def test_report_link_time(tmp_path: Path) -> None:
+    binary = tmp_path / "lib_test"
+    binary.write_text("binary")
+    (tmp_path / ".ninja_log").write_text("# ninja log v7\n10\t250\t0\tlib_test\tabc\n")
+    report = report_link_time(tmp_path, "lib_test", None, fast_link=False)
+    assert (report.fast_link_ms, report.normal_link_ms) == (None, 240)
+
+    (tmp_path / ".ninja_log").write_text("# ninja log v7\n10\t250\t0\tlib_test\tabc\n0\t60\t0\tlib_test\tdef\n")
+    report = report_link_time(tmp_path, "lib_test", None, fast_link=True)
+    assert (report.fast_link_ms, report.normal_link_ms) == (60, 240)
+
+    # the binary was not linked by the last build
+    report = report_link_time(tmp_path, "lib_test", binary.stat().st_mtime_ns, fast_link=False)
+    assert (report.fast_link_ms, report.normal_link_ms) == (60, 240)
+
+
+def test_fast_link_requires_lld(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib")
+    with pytest.raises(RuntimeError, match="Fast linking requires"):
+        build_project(tmp_path, "lib", BuildConfig(fast_link=FastLinkConfig()))
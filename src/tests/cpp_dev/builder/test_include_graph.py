@@ -0,0 +1,90 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+from cpp_dev.builder import include_graph
+from cpp_dev.builder.include_graph import find_affected_targets, load_include_graph, update_include_graph
+from cpp_dev.builder.sources import collect_source_files
+
+from .utils import create_project_layout
+
+
+def _create_project(project_dir: Path) -> None:
+    create_project_layout(project_dir, "lib", num_sources=2)
+    (project_dir / "src" / "detail.hpp").write_text('#pragma once\n#include "lib/lib.hpp"\n#include <vector>\n')
+    (project_dir / "src" / "lib_1.cpp").write_text('#include "detail.hpp"\n  #  include <lib/lib.hpp>\n')
+
+
+def test_update_include_graph(tmp_path: Path) -> None:
+    _create_project(tmp_path)
+    graph = update_include_graph(tmp_path, "lib", tmp_path / "build")
+
+    assert graph.nodes["src/lib_0.cpp"].includes == ["include/lib/lib.hpp"]
+    assert graph.nodes["src/lib_1.cpp"].includes == ["src/detail.hpp", "include/lib/lib.hpp"]
+    assert graph.nodes["src/detail.hpp"].includes == ["include/lib/lib.hpp"]
+    assert load_include_graph(tmp_path / "build") == graph
+
+
+def test_find_external_includes(tmp_path: Path) -> None:
+    _create_project(tmp_path)
+    (tmp_path / "src" / "lib_0.cpp").write_text('#include <string>\n#include "lib/lib.hpp"\n#include "detail.hpp"\n')
+    graph = update_include_graph(tmp_path, "lib", tmp_path / "build")
+
+    assert graph.nodes["src/detail.hpp"].external_includes == ["vector"]
+    # transitive external includes are collected once in the order of their first occurrence
+    assert graph.find_external_includes("src/lib_0.cpp") == ["string", "vector"]
+    assert graph.find_external_includes("src/lib.test.cpp") == []
+
+
+def test_find_affected_targets(tmp_path: Path) -> None:
+    _create_project(tmp_path)
+    graph = update_include_graph(tmp_path, "lib", tmp_path / "build")
+    source_files = collect_source_files(tmp_path, "lib")
+
+    affected = find_affected_targets(graph, "lib", source_files, ["src/detail.hpp"])
+    assert affected.translation_units == ["src/lib_1.cpp"]
+    assert affected.test_sources == []
+    assert affected.test_binaries == ["lib_test"]
+
+    affected = find_affected_targets(graph, "lib", source_files, ["include/lib/lib.hpp"])
+    assert affected.translation_units == ["src/lib_0.cpp", "src/lib_1.cpp", "src/lib.test.cpp"]
+    assert affected.test_sources == ["src/lib.test.cpp"]
+
+    affected = find_affected_targets(graph, "lib", source_files, ["README.md"])
+    assert affected.translation_units == []
+    assert affected.test_binaries == []
+
+
+def test_update_include_graph_incrementally(tmp_path: Path) -> None:
+    _create_project(tmp_path)
+    build_dir = tmp_path / "build"
+    update_include_graph(tmp_path, "lib", build_dir)
+
+    source_file = tmp_path / "src" / "lib_0.cpp"
+    with patch.object(include_graph, "_scan_includes", wraps=include_graph._scan_includes) as scan:  # noqa: SLF001
+        # a changed modification time with the same content does not trigger a scan
+        os.utime(source_file, ns=(0, 0))
+        update_include_graph(tmp_path, "lib", build_dir)
+        scan.assert_not_called()
+
+        source_file.write_text('#include "detail.hpp"\n')
+        graph = update_include_graph(tmp_path, "lib", build_dir)
+        scan.assert_called_once()
+    assert graph.nodes["src/lib_0.cpp"].includes == ["src/detail.hpp"]
+
+
+def test_find_affected_targets_for_large_project(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=2000)
+    update_include_graph(tmp_path, "lib", tmp_path / "build")
+
+    start = time.perf_counter()
+    graph = update_include_graph(tmp_path, "lib", tmp_path / "build")
+    affected = find_affected_targets(graph, "lib", collect_source_files(tmp_path, "lib"), ["include/lib/lib.hpp"])
+    assert time.perf_counter() - start < 0.5
+    assert len(affected.translation_units) == 2001
@@ -0,0 +1,68 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import json
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from cpp_dev.builder.compile_cache import MemoryPlan, compose_memory_plan_file, main, read_peak_memory
+from cpp_dev.builder.engine import BuildConfig, build_project
+from cpp_dev.builder.memory import find_heavy_compilations, read_available_memory
+
+from .utils import create_project_layout, requires_compiler
+
+
+def test_read_available_memory() -> None:
+    available = read_available_memory()
+    assert available is not None
+    assert available > 0
+
+
+def test_find_heavy_compilations() -> None:
+    gib = 1024**3
+    plan = MemoryPlan(budget=None, peaks={"obj/a.o": 2 * gib, "obj/b.o": gib // 2, "obj/c.o": 3 * gib, "obj/d.o": gib})
+    assert find_heavy_compilations(plan) == ["obj/c.o", "obj/a.o", "obj/d.o"]
+
+
+@requires_compiler
+def test_build_records_peak_memory(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=2)
+    result = build_project(tmp_path, "lib", BuildConfig(compile_cache_dir=tmp_path / "cache"))
+
+    peaks = read_peak_memory(result.build_dir / "memory")
+    assert sorted(peaks) == ["obj/src/lib.test.cpp.o", "obj/src/lib_0.cpp.o", "obj/src/lib_1.cpp.o"]
+    assert all(peak > 0 for peak in peaks.values())
+
+    # the next build is planned with the recorded peaks
+    build_project(tmp_path, "lib", BuildConfig(compile_cache_dir=tmp_path / "cache"))
+    plan = MemoryPlan.from_json(compose_memory_plan_file(result.build_dir / "memory").read_bytes())
+    assert plan.peaks == peaks
+    assert plan.budget is not None
+
+
+@requires_compiler
+def test_compilation_waits_for_memory(tmp_path: Path) -> None:
+    memory_dir = tmp_path / "memory"
+    memory_dir.mkdir()
+    compose_memory_plan_file(memory_dir).write_bytes(MemoryPlan(budget=1, default_peak=1).to_json())
+    # another compilation holds the whole budget until it finishes
+    other = subprocess.Popen(["sleep", "0.5"])  # noqa: S607
+    threading.Thread(target=other.wait).start()
+    (memory_dir / "reservations.json").write_text(json.dumps({str(other.pid): 1}))
+    source = tmp_path / "answer.cpp"
+    source.write_text("int answer() { return 42; }\n")
+    argv = [
+        *("--cache-dir", str(tmp_path / "cache"), "--max-size", "1000000", "--memory-dir", str(memory_dir)),
+        *("--output", str(tmp_path / "answer.o"), "--depfile", str(tmp_path / "answer.o.d")),
+        *("--source", str(source), "--", "c++"),
+    ]
+
+    start = time.monotonic()
+    assert main(argv) == 0
+    assert time.monotonic() - start >= 0.4
+    assert json.loads((memory_dir / "reservations.json").read_text()) == {}
+    assert str(tmp_path / "answer.o") in read_peak_memory(memory_dir)
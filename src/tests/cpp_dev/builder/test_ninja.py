@@ -0,0 +1,106 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import os
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.builder.ninja import (
+    Jobserver,
+    NinjaBuildError,
+    NinjaFileWriter,
+    NinjaLogEntry,
+    escape_path,
+    find_critical_path,
+    read_build_graph,
+    read_ninja_log,
+    run_ninja,
+    supports_jobserver,
+)
+
+
+def test_escape_path() -> None:
+    assert escape_path("/a b/c:d/$e") == "/a$ b/c$:d/$$e"
+
+
+def test_ninja_file_writer() -> None:
+    writer = NinjaFileWriter()
+    writer.variable("cxx", "c++")
+    writer.rule("cxx", "$cxx -c $in -o $out", depfile="$out.d")
+    writer.build(["obj/a b.o"], "cxx", ["src/a b.cpp"], implicit=["gen.hpp"], variables={"extra": "-O2"})
+    writer.default(["obj/a b.o"])
+    assert writer.text() == (
+        "cxx = c++\n"
+        "rule cxx\n"
+        "  command = $cxx -c $in -o $out\n"
+        "  depfile = $out.d\n"
+        "build obj/a$ b.o: cxx src/a$ b.cpp | gen.hpp\n"
+        "  extra = -O2\n"
+        "default obj/a$ b.o\n"
+    )
+
+
+def test_read_ninja_log(tmp_path: Path) -> None:
+    assert read_ninja_log(tmp_path) == {}
+    (tmp_path / ".ninja_log").write_text(
+        "# ninja log v7\n10\t250\t0\tobj/a.cpp.o\tabc\n12\t90\t0\tliba.a\tdef\n5\t105\t0\tobj/a.cpp.o\t123\n",
+    )
+    log = read_ninja_log(tmp_path)
+    assert log == {
+        "obj/a.cpp.o": NinjaLogEntry("obj/a.cpp.o", 5, 105, "123"),
+        "liba.a": NinjaLogEntry("liba.a", 12, 90, "def"),
+    }
+    assert log["obj/a.cpp.o"].duration_ms == 100
+
+
+def test_run_ninja_reports_failed_outputs(tmp_path: Path) -> None:
+    (tmp_path / "build.ninja").write_text("rule fail\n  command = false\nbuild a.o b.o: fail\nbuild c.o: fail\n")
+    with pytest.raises(NinjaBuildError) as error:
+        run_ninja(tmp_path, jobs=1, keep_going=True)
+    assert sorted(error.value.failed_outputs) == ["a.o b.o", "c.o"]
+
+
+def test_run_ninja_with_jobserver(tmp_path: Path) -> None:
+    if not supports_jobserver():
+        pytest.skip("The Ninja version does not support jobservers.")
+    # the commands fail if they run concurrently, which they do unless limited by the jobserver
+    command = "mkdir lock || exit 1; sleep 0.2; rmdir lock; touch $out"
+    (tmp_path / "build.ninja").write_text(
+        f"rule exclusive\n  command = {command}\nbuild a: exclusive\nbuild b: exclusive\nbuild c: exclusive\n",
+    )
+    with Jobserver(1, clients=1) as jobserver:
+        assert f"fifo:{jobserver.fifo}" in jobserver.makeflags
+        run_ninja(tmp_path, jobs=jobserver)
+    assert all((tmp_path / output).exists() for output in ["a", "b", "c"])
+
+
+@pytest.mark.parametrize(("version", "supported"), [("1.11.1", False), ("1.13.2.git.kitware.jobserver-pipe-1", True)])
+def test_supports_jobserver(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, version: str, *, supported: bool) -> None:
+    ninja = tmp_path / "ninja"
+    ninja.write_text(f"#!/bin/sh\necho {version}\n")
+    ninja.chmod(0o755)
+    monkeypatch.setenv("PATH", str(tmp_path), prepend=os.pathsep)
+    assert supports_jobserver() == supported
+
+
+def test_find_critical_path(tmp_path: Path) -> None:
+    writer = NinjaFileWriter()
+    writer.build(["obj/a b.o"], "cxx", ["/src/a b.cpp"], implicit=["pch/x.gch"])
+    writer.build(["pch/x.gch"], "pch", ["pch/x.hpp"])
+    writer.build(["obj/c.o"], "cxx", ["/src/c.cpp"])
+    writer.build(["liba.a"], "ar", ["obj/a b.o", "obj/c.o"])
+    (tmp_path / "build.ninja").write_text(writer.text())
+    (tmp_path / ".ninja_log").write_text(
+        "# ninja log v7\n"
+        "0\t100\t0\tpch/x.gch\t1\n"
+        "100\t300\t0\tobj/a b.o\t2\n"
+        "0\t250\t0\tobj/c.o\t3\n"
+        "350\t360\t0\tliba.a\t4\n",
+    )
+
+    assert read_build_graph(tmp_path)["obj/a b.o"] == ["/src/a b.cpp", "pch/x.gch"]
+    # the chain through the precompiled header takes longer than the single longer compilation
+    assert [entry.output for entry in find_critical_path(tmp_path)] == ["pch/x.gch", "obj/a b.o", "liba.a"]
@@ -0,0 +1,71 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import subprocess
+from pathlib import Path
+from unittest.mock import patch
+
+from cpp_dev.builder import pch
+from cpp_dev.builder.engine import BuildConfig, build_project
+from cpp_dev.builder.pch import plan_precompiled_headers
+
+from .utils import create_project_layout, requires_compiler
+
+
+def _create_project(project_dir: Path) -> None:
+    create_project_layout(project_dir, "lib", num_sources=3)
+    for idx, extra_include in enumerate(["<map>", "<map>", "<cmath>"]):
+        source_file = project_dir / "src" / f"lib_{idx}.cpp"
+        includes = f"#include <string>\n#include <vector>\n#include {extra_include}\n"
+        source_file.write_text(includes + source_file.read_text())
+
+
+@requires_compiler
+def test_plan_precompiled_headers(tmp_path: Path) -> None:
+    _create_project(tmp_path)
+    command = ["c++", "-std=c++20"]
+
+    with patch.object(pch, "_MIN_PARSE_MS", 0):
+        (precompiled_header,) = plan_precompiled_headers(tmp_path, "lib", tmp_path / "build", command)
+    # headers included by less than half of the translation units are not precompiled
+    assert precompiled_header.name == "library"
+    assert precompiled_header.headers == ["string", "vector", "map"]
+    assert precompiled_header.translation_units == ["src/lib_0.cpp", "src/lib_1.cpp", "src/lib_2.cpp"]
+
+    # the measured costs are reused for the same command
+    with patch.object(pch, "_MIN_PARSE_MS", 0), patch.object(pch, "_measure_cost") as measure:
+        plan_precompiled_headers(tmp_path, "lib", tmp_path / "build", command)
+    measure.assert_not_called()
+
+    # cheap headers are not precompiled
+    with patch.object(pch, "_MIN_PARSE_MS", 1_000_000):
+        assert plan_precompiled_headers(tmp_path, "lib", tmp_path / "build", command) == []
+
+
+@requires_compiler
+def test_build_with_precompiled_headers(tmp_path: Path) -> None:
+    _create_project(tmp_path)
+
+    # the first build without precompiled headers records the compile durations to compare against
+    build_project(tmp_path, "lib", BuildConfig(precompiled_headers=False))
+    with patch.object(pch, "_MIN_PARSE_MS", 0):
+        result = build_project(tmp_path, "lib", BuildConfig())
+
+    (report,) = result.precompiled_headers
+    assert report.translation_units == 3
+    assert report.estimated_savings_ms >= 0
+    assert report.measured_savings_ms is not None
+    assert result.test_binary is not None
+    assert subprocess.run([result.test_binary], check=False).returncode == 0  # noqa: S603
+
+    # the precompiled header is only rebuilt if its headers or the flags change
+    pch_file = tmp_path / "build" / "pch" / "library.hpp.gch"
+    mtime = pch_file.stat().st_mtime_ns
+    with patch.object(pch, "_MIN_PARSE_MS", 0):
+        build_project(tmp_path, "lib", BuildConfig())
+    assert pch_file.stat().st_mtime_ns == mtime
+    with patch.object(pch, "_MIN_PARSE_MS", 0):
+        build_project(tmp_path, "lib", BuildConfig(cxxflags=["-O1"]))
+    assert pch_file.stat().st_mtime_ns != mtime
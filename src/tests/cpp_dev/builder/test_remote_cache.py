@@ -0,0 +1,98 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import shutil
+import socket
+import subprocess
+from dataclasses import replace
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from cpp_dev.builder import pch
+from cpp_dev.builder.compile_cache import fetch_remote_entry, load_compile_cache_stats, store_remote_entry
+from cpp_dev.builder.engine import BuildConfig, build_project
+from cpp_dev.builder.remote_cache_server import run_remote_cache_server
+
+from .utils import create_project_layout, requires_compiler
+
+
+def test_remote_cache_server(tmp_path: Path) -> None:
+    key = "ab" * 32
+    with run_remote_cache_server(tmp_path / "storage") as url:
+        assert fetch_remote_entry(url, key) is None
+        store_remote_entry(url, key, b"object")
+        assert fetch_remote_entry(url, key) == b"object"
+        # keys are validated to not escape the storage directory
+        assert fetch_remote_entry(url, "../../etc/passwd") is None
+    assert (tmp_path / "storage" / "ab" / key[2:]).read_bytes() == b"object"
+
+
+@requires_compiler
+def test_cold_build_from_remote_cache(tmp_path: Path) -> None:
+    project_dir = tmp_path / "project"
+    create_project_layout(project_dir, "lib", num_sources=2)
+
+    with run_remote_cache_server(tmp_path / "storage") as url:
+        result = build_project(project_dir, "lib", BuildConfig(compile_cache_dir=tmp_path / "a", remote_cache_url=url))
+        assert result.remote_cache is not None
+        # two library objects, the test object and the test binary
+        assert (result.remote_cache.fetched, result.remote_cache.uploaded) == (0, 4)
+        assert not list((result.build_dir / "remote_uploads").iterdir())
+
+        # a teammate builds the same commit in another checkout with an empty local cache
+        other_project_dir = tmp_path / "other" / "project"
+        shutil.copytree(project_dir, other_project_dir, ignore=shutil.ignore_patterns("build"))
+        cache_dir = tmp_path / "b"
+        config = BuildConfig(compile_cache_dir=cache_dir, remote_cache_url=url)
+        result = build_project(other_project_dir, "lib", config)
+        assert result.remote_cache is not None
+        assert (result.remote_cache.fetched, result.remote_cache.uploaded) == (4, 0)
+
+    stats = load_compile_cache_stats(cache_dir)
+    assert (stats.hits, stats.remote_hits, stats.misses) == (4, 4, 0)
+    assert result.test_binary is not None
+    assert subprocess.run([result.test_binary], check=False).returncode == 0  # noqa: S603
+
+
+@requires_compiler
+@pytest.mark.parametrize("unity", [False, True])
+def test_launcher_fetches_compilations_of_the_build(tmp_path: Path, *, unity: bool) -> None:
+    project_dir = tmp_path / "project"
+    create_project_layout(project_dir, "lib", num_sources=3)
+    for source_file in (project_dir / "src").glob("lib_*.cpp"):
+        source_file.write_text("#include <string>\n#include <vector>\n" + source_file.read_text())
+
+    with run_remote_cache_server(tmp_path / "storage") as url, patch.object(pch, "_MIN_PARSE_MS", 0):
+        config = BuildConfig(compile_cache_dir=tmp_path / "a", remote_cache_url=url, unity=unity)
+        result = build_project(project_dir, "lib", config, jobs=1)
+        # the library sources are compiled in a unity batch or with a precompiled header otherwise
+        assert result.unity.batches > 0 if result.unity is not None else result.precompiled_headers
+        assert result.remote_cache is not None
+        uploaded = result.remote_cache.uploaded
+
+        shutil.rmtree(result.build_dir)
+        result = build_project(project_dir, "lib", replace(config, compile_cache_dir=tmp_path / "b"), jobs=1)
+        assert result.remote_cache is not None
+        # all compilations and the test binary are fetched by the launcher
+        assert result.remote_cache.fetched == uploaded
+
+    assert load_compile_cache_stats(tmp_path / "b").misses == 0
+
+
+@requires_compiler
+def test_failed_uploads_are_kept_for_retry(tmp_path: Path) -> None:
+    project_dir = tmp_path / "project"
+    create_project_layout(project_dir, "lib")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        unreachable_url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    config = BuildConfig(compile_cache_dir=tmp_path / "cache", remote_cache_url=unreachable_url)
+    result = build_project(project_dir, "lib", config)
+    assert result.remote_cache is not None
+    assert (result.remote_cache.uploaded, result.remote_cache.failed_uploads) == (0, 3)
+    assert len(list((result.build_dir / "remote_uploads").iterdir())) == 3
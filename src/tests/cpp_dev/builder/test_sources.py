@@ -0,0 +1,31 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from pathlib import Path
+
+from cpp_dev.builder.sources import collect_source_files
+
+
+def test_collect_source_files(tmp_path: Path) -> None:
+    (tmp_path / "include" / "lib" / "detail").mkdir(parents=True)
+    (tmp_path / "src" / "impl").mkdir(parents=True)
+    (tmp_path / "include" / "lib" / "lib.hpp").touch()
+    (tmp_path / "include" / "lib" / "detail" / "helper.hpp").touch()
+    (tmp_path / "include" / "lib" / "README.md").touch()
+    (tmp_path / "src" / "lib.cpp").touch()
+    (tmp_path / "src" / "impl" / "impl.cpp").touch()
+    (tmp_path / "src" / "impl" / "impl.hpp").touch()
+    (tmp_path / "src" / "lib.test.cpp").touch()
+
+    source_files = collect_source_files(tmp_path, "lib")
+    assert source_files.library_sources == ["src/impl/impl.cpp", "src/lib.cpp"]
+    assert source_files.test_sources == ["src/lib.test.cpp"]
+    assert source_files.headers == ["include/lib/detail/helper.hpp", "include/lib/lib.hpp", "src/impl/impl.hpp"]
+
+
+def test_collect_source_files_empty_project(tmp_path: Path) -> None:
+    source_files = collect_source_files(tmp_path, "lib")
+    assert source_files.library_sources == []
+    assert source_files.test_sources == []
@@ -0,0 +1,79 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import json
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.builder.engine import BuildConfig, build_project
+from cpp_dev.builder.ninja import NinjaFileWriter
+from cpp_dev.builder.time_trace import report_time_trace
+
+from .utils import create_project_layout, requires_clang, requires_compiler
+
+
+def _write_trace(trace_file: Path, total_us: int, headers: dict[str, int], instantiations: dict[str, int]) -> None:
+    events = [{"ph": "X", "name": "ExecuteCompiler", "ts": 0, "dur": total_us, "pid": 1, "tid": 1}]
+    events.extend(
+        {"ph": "X", "name": "Source", "ts": 10, "dur": dur, "pid": 1, "tid": 1, "args": {"detail": header}}
+        for header, dur in headers.items()
+    )
+    events.extend(
+        {"ph": "X", "name": "InstantiateClass", "ts": 10, "dur": dur, "pid": 1, "tid": 1, "args": {"detail": name}}
+        for name, dur in instantiations.items()
+    )
+    events.append({"ph": "X", "name": "Total Source", "ts": 0, "dur": total_us, "pid": 1, "tid": 2})
+    trace_file.parent.mkdir(parents=True, exist_ok=True)
+    trace_file.write_text(json.dumps({"traceEvents": events}))
+
+
+def test_report_time_trace(tmp_path: Path) -> None:
+    writer = NinjaFileWriter()
+    writer.build(["obj/src/a.cpp.o"], "cxx", ["/src/a.cpp"])
+    writer.build(["obj/src/b.cpp.o"], "cxx", ["/src/b.cpp"])
+    writer.build(["liba.a"], "ar", ["obj/src/a.cpp.o", "obj/src/b.cpp.o"])
+    (tmp_path / "build.ninja").write_text(writer.text())
+    (tmp_path / ".ninja_log").write_text(
+        "# ninja log v7\n0\t900\t0\tobj/src/a.cpp.o\t1\n5\t400\t0\tobj/src/b.cpp.o\t2\n900\t950\t0\tliba.a\t3\n",
+    )
+    _write_trace(tmp_path / "obj/src/a.cpp.json", 900_000, {"vector": 300_000}, {"std::vector<int>": 50_000})
+    _write_trace(tmp_path / "obj/src/b.cpp.json", 390_000, {"vector": 250_000, "map": 100_000}, {})
+
+    report = report_time_trace(tmp_path, ["obj/src/a.cpp.o", "obj/src/b.cpp.o"])
+
+    assert [(entry.name, entry.total_ms) for entry in report.translation_units] == [
+        ("src/a.cpp", 900),
+        ("src/b.cpp", 390),
+    ]
+    assert [(entry.name, entry.total_ms, entry.count) for entry in report.headers] == [
+        ("vector", 550, 2),
+        ("map", 100, 1),
+    ]
+    assert [entry.name for entry in report.instantiations] == ["std::vector<int>"]
+    assert [entry.name for entry in report.critical_path] == ["obj/src/a.cpp.o", "liba.a"]
+    # the translation units are placed at their start within the build, summary events are dropped
+    merged = json.loads(report.trace_file.read_text())["traceEvents"]
+    assert {event["args"]["name"] for event in merged if event["ph"] == "M"} == {"src/a.cpp", "src/b.cpp"}
+    assert {event["ts"] for event in merged if event["ph"] == "X" and event["name"] == "ExecuteCompiler"} == {0, 5000}
+    assert not [event for event in merged if event["name"].startswith("Total ")]
+
+
+@requires_compiler
+def test_time_trace_requires_clang(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib")
+    with pytest.raises(RuntimeError, match="requires clang"):
+        build_project(tmp_path, "lib", BuildConfig(time_trace=True))
+
+
+@requires_clang
+def test_build_with_time_trace(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=2)
+    result = build_project(tmp_path, "lib", BuildConfig(compiler="clang++", time_trace=True))
+
+    assert result.time_trace is not None
+    assert len(result.time_trace.translation_units) == 3
+    assert result.time_trace.critical_path
+    assert result.time_trace.trace_file.exists()
@@ -0,0 +1,67 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import subprocess
+from pathlib import Path
+
+from cpp_dev.builder.engine import BuildConfig, build_project
+from cpp_dev.builder.unity import plan_unity_batches
+
+from .utils import create_project_layout, requires_compiler
+
+
+@requires_compiler
+def test_unity_build(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=6)
+
+    normal = build_project(tmp_path, "lib", BuildConfig())
+    assert normal.unity is None
+    result = build_project(tmp_path, "lib", BuildConfig(unity=True), jobs=2)
+
+    # the sources are batched balanced by the compile durations of the normal build
+    assert result.unity is not None
+    assert result.unity.batches == 2
+    assert result.unity.normal_cold_build_ms is not None
+    batches = plan_unity_batches(tmp_path, "lib", tmp_path / "build", jobs=2)
+    assert sorted(len(batch.sources) for batch in batches) == [3, 3]
+    assert (tmp_path / "build" / "obj" / "unity" / "library_0.cpp.o").exists()
+    assert result.test_binary is not None
+    assert subprocess.run([result.test_binary], check=False).returncode == 0  # noqa: S603
+
+
+@requires_compiler
+def test_unity_build_isolates_colliding_sources(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=4)
+    for idx in (1, 3):
+        source_file = tmp_path / "src" / f"lib_{idx}.cpp"
+        source_file.write_text(source_file.read_text() + "static int helper() { return 1; }\n")
+
+    result = build_project(tmp_path, "lib", BuildConfig(unity=True), jobs=1)
+
+    assert result.unity is not None
+    assert result.unity.isolated == ["src/lib_3.cpp"]
+    assert "src/lib_3.cpp" in result.unity.standalone
+    assert result.unity.cold_build_ms is not None
+    assert result.test_binary is not None
+
+
+@requires_compiler
+def test_unity_build_keeps_frequently_edited_sources_separate(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=4)
+    config = BuildConfig(unity=True)
+    build_project(tmp_path, "lib", config, jobs=1)
+
+    source_file = tmp_path / "src" / "lib_2.cpp"
+    for edit in range(2):
+        source_file.write_text(source_file.read_text() + f"// edit {edit}\n")
+        result = build_project(tmp_path, "lib", config, jobs=1)
+
+    assert result.unity is not None
+    assert "src/lib_2.cpp" in result.unity.standalone
+    assert result.unity.isolated == []
+    batched = [
+        source for batch in plan_unity_batches(tmp_path, "lib", tmp_path / "build", jobs=1) for source in batch.sources
+    ]
+    assert batched == ["src/lib_0.cpp", "src/lib_1.cpp", "src/lib_3.cpp"]
@@ -0,0 +1,59 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.builder import variants
+from cpp_dev.builder.engine import BuildConfig
+from cpp_dev.builder.include_graph import load_include_graph
+from cpp_dev.builder.variants import (
+    apply_build_variant,
+    build_variants,
+    compose_variant_build_dir,
+    parse_build_variants,
+)
+
+from .utils import create_project_layout, requires_compiler
+
+
+def test_parse_build_variants() -> None:
+    assert [variant.name for variant in parse_build_variants("debug, asan,debug")] == ["debug", "asan"]
+    with pytest.raises(RuntimeError, match="Unknown build variant msan"):
+        parse_build_variants("debug,msan")
+    with pytest.raises(RuntimeError):
+        parse_build_variants(" , ")
+
+
+def test_apply_build_variant() -> None:
+    config = BuildConfig(cxxflags=["-Wall"], ldflags=["-pthread"], dependency_digest="abc")
+    asan = apply_build_variant(config, parse_build_variants("asan")[0])
+    assert asan.cxxflags == ["-Wall", "-O1", "-g", "-fsanitize=address", "-fno-omit-frame-pointer"]
+    assert asan.ldflags == ["-pthread", "-fsanitize=address"]
+    assert asan.dependency_digest == "abc:Debug"
+    assert config.cxxflags == ["-Wall"]
+
+
+@requires_compiler
+@pytest.mark.parametrize("jobserver", [True, False])
+def test_build_variants(tmp_path: Path, monkeypatch: pytest.MonkeyPatch, *, jobserver: bool) -> None:
+    # without jobserver support of Ninja, the jobs are split across the variants
+    monkeypatch.setattr(variants, "supports_jobserver", lambda: jobserver)
+    create_project_layout(tmp_path, "lib", num_sources=2)
+    build_dir = tmp_path / "build"
+    configs = {
+        variant.name: apply_build_variant(BuildConfig(compile_cache_dir=tmp_path / "cache"), variant)
+        for variant in parse_build_variants("debug,release")
+    }
+    results = build_variants(tmp_path, "lib", configs, build_dir, jobs=2)
+
+    assert sorted(results) == ["debug", "release"]
+    for variant, result in results.items():
+        assert result.build_dir == compose_variant_build_dir(build_dir, variant)
+        assert result.test_binary is not None
+        assert result.test_binary.exists()
+        # the include graph scanned once is seeded into the build directory of each variant
+        assert load_include_graph(result.build_dir) == load_include_graph(build_dir)
@@ -0,0 +1,62 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import threading
+from pathlib import Path
+
+from cpp_dev.builder.watch import ProjectWatcher
+
+from .utils import create_project_layout
+
+
+def _write_later(file: Path, content: str, delay: float = 0.1) -> None:
+    threading.Timer(delay, file.write_text, args=[content]).start()
+
+
+def test_watch_source_change(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=2)
+    with ProjectWatcher(tmp_path, "lib", tmp_path / "build") as watcher:
+        assert watcher.wait(timeout=0.2) is None
+
+        _write_later(tmp_path / "src" / "lib_0.cpp", "int api_0() { return 1; }\n")
+        changes = watcher.wait(timeout=5.0)
+
+    assert changes is not None
+    assert changes.changed_files == ["src/lib_0.cpp"]
+    assert not changes.full_build
+    assert changes.affected.translation_units == ["src/lib_0.cpp"]
+    assert changes.targets == ["liblib.a", "lib_test"]
+
+
+def test_watch_debounces_changes(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib", num_sources=2)
+    with ProjectWatcher(tmp_path, "lib", tmp_path / "build", debounce=0.3) as watcher:
+        _write_later(tmp_path / "src" / "lib_0.cpp", "int api_0() { return 1; }\n", delay=0.1)
+        _write_later(tmp_path / "include" / "lib" / "lib.hpp", "#pragma once\nint api_0();\n", delay=0.2)
+        changes = watcher.wait(timeout=5.0)
+        assert watcher.wait(timeout=0.2) is None
+
+    assert changes is not None
+    assert changes.changed_files == ["include/lib/lib.hpp", "src/lib_0.cpp"]
+    assert sorted(changes.affected.translation_units) == ["src/lib.test.cpp", "src/lib_0.cpp", "src/lib_1.cpp"]
+
+
+def test_watch_structure_change(tmp_path: Path) -> None:
+    create_project_layout(tmp_path, "lib")
+    with ProjectWatcher(tmp_path, "lib", tmp_path / "build") as watcher:
+        (tmp_path / "src" / "detail").mkdir()
+        _write_later(tmp_path / "src" / "detail" / "lib_1.cpp", "int api_1() { return 1; }\n")
+        added = watcher.wait(timeout=5.0)
+
+        _write_later(tmp_path / "cpp-dev.lock", "packages: []\n")
+        locked = watcher.wait(timeout=5.0)
+
+    assert added is not None
+    assert added.full_build
+    assert "src/detail/lib_1.cpp" in added.changed_files
+    assert "src/detail/lib_1.cpp" in added.affected.translation_units
+    assert locked is not None
+    assert locked.full_build
+    assert locked.changed_files == ["cpp-dev.lock"]
@@ -0,0 +1,47 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import shutil
+from pathlib import Path
+from textwrap import dedent
+
+import pytest
+
+###############################################################################
+# Public API                                                                ###
+###############################################################################
+
+requires_compiler = pytest.mark.skipif(shutil.which("c++") is None, reason="No C++ compiler available")
+requires_clang = pytest.mark.skipif(shutil.which("clang++") is None, reason="No clang compiler available")
+requires_clangd = pytest.mark.skipif(shutil.which("clangd") is None, reason="No clangd available")
+
+
+def create_project_layout(project_dir: Path, name: str, num_sources: int = 1) -> None:
+    """Create a project layout with a library, a test using its own main function and a lock file.
+
+    The test does not depend on gtest such that it builds without any installed dependencies.
+    """
+    include_dir = project_dir / "include" / name
+    source_dir = project_dir / "src"
+    include_dir.mkdir(parents=True)
+    source_dir.mkdir(parents=True)
+    (project_dir / "cpp-dev.lock").write_text("packages: []\n")
+    (include_dir / f"{name}.hpp").write_text(
+        "#pragma once\n" + "".join(f"int api_{idx}();\n" for idx in range(num_sources)),
+    )
+    for idx in range(num_sources):
+        source = f'#include "{name}/{name}.hpp"\nint api_{idx}() {{ return {idx}; }}\n'
+        (source_dir / f"{name}_{idx}.cpp").write_text(source)
+    (source_dir / f"{name}.test.cpp").write_text(
+        dedent(
+            f"""\
+            #include "{name}/{name}.hpp"
+
+            int main() {{
+                return api_0() == 0 ? 0 : 1;
+            }}
+            """,
+        ),
+    )
@@ -3,18 +3,19 @@
 
 from collections.abc import Generator
 from contextlib import contextmanager
+from pathlib import Path
 from unittest.mock import patch
 
 import pytest
 
-from cpp_dev.common.os_detection import OperatingSystemType, assert_supported_os, detect_os
+from cpp_dev.common.os_detection import OperatingSystemType, assert_supported_os, detect_os, detect_os_cached
 
 
 @contextmanager
 def patch_os_detection_module(os_id: str, os_version: str) -> Generator[None]:
     with (
-        patch("cpp_dev.common.os_detection.distro.id", return_value=os_id),
-        patch("cpp_dev.common.os_detection.distro.version", return_value=os_version),
+        patch("distro.id", return_value=os_id),
+        patch("distro.version", return_value=os_version),
     ):
         yield
 
@@ -51,3 +52,31 @@ def test_assert_supported_os_not_ok(os_id: str, os_version: str) -> None:
         pytest.raises(RuntimeError, match="Unsupported operating system"),
     ):
         assert_supported_os()
+
+
+def test_detect_os_cached(tmp_path: Path) -> None:
+    with patch_os_detection_module("ubuntu", "24.04"):
+        assert detect_os_cached(tmp_path).type == OperatingSystemType.Ubuntu2404
+    with patch("distro.id", side_effect=AssertionError("os-release must not be parsed again")):
+        assert detect_os_cached(tmp_path).type == OperatingSystemType.Ubuntu2404
+
+
+def test_detect_os_cached_invalidated_by_os_release_change(tmp_path: Path) -> None:
+    with (
+        patch_os_detection_module("ubuntu", "24.04"),
+        patch("cpp_dev.common.os_detection._compute_os_release_fingerprint", return_value="before"),
+    ):
+        assert detect_os_cached(tmp_path).type == OperatingSystemType.Ubuntu2404
+    with (
+        patch_os_detection_module("centos", "7"),
+        patch("cpp_dev.common.os_detection._compute_os_release_fingerprint", return_value="after"),
+    ):
+        assert detect_os_cached(tmp_path).type == OperatingSystemType.Unsupported
+
+
+def test_assert_supported_os_cached_not_ok(tmp_path: Path) -> None:
+    with (
+        patch_os_detection_module("centos", "7"),
+        pytest.raises(RuntimeError, match="Unsupported operating system"),
+    ):
+        assert_supported_os(tmp_path)
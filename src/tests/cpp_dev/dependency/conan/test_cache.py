@@ -0,0 +1,89 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from collections.abc import Generator
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from cpp_dev.dependency.conan.cache import collect_garbage, load_cache_usage_index, record_cache_usage
+from cpp_dev.dependency.conan.command_wrapper import ConanInstallNode
+from cpp_dev.dependency.provider import DependencyIdentifier
+
+
+@pytest.fixture
+def patched_conan_remove() -> Generator[MagicMock]:
+    with patch("cpp_dev.dependency.conan.cache.conan_remove", return_value=True) as mock:
+        yield mock
+
+
+def _create_install_node(tmp_path: Path, name: str, size: int) -> ConanInstallNode:
+    package_folder = tmp_path / "packages" / name
+    package_folder.mkdir(parents=True)
+    (package_folder / "lib.a").write_bytes(b"x" * size)
+    return ConanInstallNode(
+        ref=f"{name}/1.0.0@official/cppdev#rrev",
+        rrev="rrev",
+        package_id="pkgid",
+        prev="prev",
+        package_folder=str(package_folder),
+    )
+
+
+def test_record_cache_usage(tmp_path: Path) -> None:
+    nodes = [_create_install_node(tmp_path, "dep", 100), ConanInstallNode(ref="conanfile")]
+    record_cache_usage(tmp_path, nodes)
+    index = load_cache_usage_index(tmp_path)
+    assert list(index.packages) == ["dep/1.0.0@official/cppdev#rrev:pkgid#prev"]
+    assert index.total_size == 100
+
+    first_access = index.packages["dep/1.0.0@official/cppdev#rrev:pkgid#prev"].last_access
+    record_cache_usage(tmp_path, nodes)
+    index = load_cache_usage_index(tmp_path)
+    assert index.packages["dep/1.0.0@official/cppdev#rrev:pkgid#prev"].last_access >= first_access
+
+
+def test_collect_garbage_within_quota(tmp_path: Path, patched_conan_remove: MagicMock) -> None:
+    record_cache_usage(tmp_path, [_create_install_node(tmp_path, "dep", 100)])
+    result = collect_garbage(tmp_path, 100, set())
+    assert result.reclaimed_bytes == 0
+    assert result.cache_size == 100
+    patched_conan_remove.assert_not_called()
+
+
+def test_collect_garbage_evicts_least_recently_used(tmp_path: Path, patched_conan_remove: MagicMock) -> None:
+    record_cache_usage(tmp_path, [_create_install_node(tmp_path, "oldest", 100)])
+    record_cache_usage(tmp_path, [_create_install_node(tmp_path, "protected", 100)])
+    record_cache_usage(tmp_path, [_create_install_node(tmp_path, "older", 100)])
+    record_cache_usage(tmp_path, [_create_install_node(tmp_path, "newest", 100)])
+
+    result = collect_garbage(tmp_path, 200, {DependencyIdentifier.from_str("official/protected/1.0.0")})
+    assert result.evicted == [
+        "oldest/1.0.0@official/cppdev#rrev:pkgid#prev",
+        "older/1.0.0@official/cppdev#rrev:pkgid#prev",
+    ]
+    assert result.reclaimed_bytes == 200
+    assert result.cache_size == 200
+    assert patched_conan_remove.call_count == 2
+    assert set(load_cache_usage_index(tmp_path).packages) == {
+        "protected/1.0.0@official/cppdev#rrev:pkgid#prev",
+        "newest/1.0.0@official/cppdev#rrev:pkgid#prev",
+    }
+
+
+def test_collect_garbage_keeps_failed_removals(tmp_path: Path, patched_conan_remove: MagicMock) -> None:
+    record_cache_usage(tmp_path, [_create_install_node(tmp_path, "locked", 100)])
+    record_cache_usage(tmp_path, [_create_install_node(tmp_path, "older", 100)])
+    record_cache_usage(tmp_path, [_create_install_node(tmp_path, "newest", 100)])
+    patched_conan_remove.side_effect = lambda pattern: not pattern.startswith("locked/")
+
+    result = collect_garbage(tmp_path, 200, set())
+    assert result.failed == ["locked/1.0.0@official/cppdev#rrev:pkgid#prev"]
+    assert result.evicted == ["older/1.0.0@official/cppdev#rrev:pkgid#prev"]
+    assert result.reclaimed_bytes == 100
+    assert result.cache_size == 200
+    # the failed removal is retried by the next garbage collection
+    assert "locked/1.0.0@official/cppdev#rrev:pkgid#prev" in load_cache_usage_index(tmp_path).packages
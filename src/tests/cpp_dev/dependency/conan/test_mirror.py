@@ -0,0 +1,122 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.common.version import SemanticVersion
+from cpp_dev.dependency.conan.command_wrapper import (conan_config_install,
+                                                      conan_create,
+                                                      conan_list_revisions,
+                                                      conan_upload)
+from cpp_dev.dependency.conan.mirror import load_mirror_index, restore_mirror, sync_mirror
+from cpp_dev.dependency.conan.provider import ConanDependencyProvider
+from cpp_dev.dependency.conan.setup import CONAN_REMOTE
+from cpp_dev.dependency.conan.types import \
+    ConanPackageReferenceWithSemanticVersion
+from cpp_dev.dependency.conan.utils import conan_env
+from cpp_dev.dependency.provider import DependencyIdentifier
+from cpp_dev.dependency.specifier import DependencySpecifier
+
+from .utils.env import ConanTestEnv, ConanTestPackage, create_conan_test_env
+
+
+@pytest.fixture
+def conan_test_environment(tmp_path: Path, unused_http_port: int) -> Generator[ConanTestEnv]:
+    TEST_PACKAGES = [
+        ConanTestPackage(
+            ref=ConanPackageReferenceWithSemanticVersion("dep/1.0.0@official/cppdev"),
+            dependencies=[],
+            cpp_standard="c++20",
+        ),
+        ConanTestPackage(
+            ref=ConanPackageReferenceWithSemanticVersion("cpd/1.0.0@official/cppdev"),
+            dependencies=[ConanPackageReferenceWithSemanticVersion("dep/1.0.0@official/cppdev")],
+            cpp_standard="c++20",
+        ),
+    ]
+    with create_conan_test_env(tmp_path / "conan", unused_http_port, TEST_PACKAGES) as conan_test_env:
+        yield conan_test_env
+
+
+@pytest.mark.conan_remote
+def test_sync_mirror_is_incremental(tmp_path: Path, conan_test_environment: ConanTestEnv) -> None:
+    mirror_dir = tmp_path / "mirror"
+    dep = DependencyIdentifier.from_str("official/dep/1.0.0")
+    cpd = DependencyIdentifier.from_str("official/cpd/1.0.0")
+
+    result = sync_mirror(conan_test_environment.conan_home_dir, mirror_dir, [dep])
+    assert len(result.transferred) == 1
+    assert result.transferred[0].startswith("dep/1.0.0@official/cppdev#")
+    assert result.up_to_date == 0
+
+    result = sync_mirror(conan_test_environment.conan_home_dir, mirror_dir, [dep, cpd])
+    assert len(result.transferred) == 1
+    assert result.transferred[0].startswith("cpd/1.0.0@official/cppdev#")
+    assert result.up_to_date == 1
+
+    result = sync_mirror(conan_test_environment.conan_home_dir, mirror_dir, [dep, cpd])
+    assert len(result.transferred) == 0
+    assert result.up_to_date == 2
+
+    index = load_mirror_index(mirror_dir)
+    assert len(index.revisions) == 2
+    for revision in index.revisions:
+        assert (mirror_dir / "archives" / revision.archive).exists()
+
+
+@pytest.mark.conan_remote
+def test_sync_mirror_transfers_locked_revisions_only(tmp_path: Path, conan_test_environment: ConanTestEnv) -> None:
+    ref = ConanPackageReferenceWithSemanticVersion("dep/1.0.0@official/cppdev")
+    # a changed recipe creates a new recipe revision of the same version
+    package_dir = conan_test_environment.conan_home_dir / ".conan_package_creation" / "dep_1.0.0"
+    with (package_dir / "conanfile.py").open("a") as conanfile:
+        conanfile.write("\n# second revision\n")
+    with conan_env(conan_test_environment.conan_home_dir):
+        conan_create(package_dir, conan_test_environment.profile, conan_test_environment.construct_conan_settings())
+        conan_upload(ref, CONAN_REMOTE)
+        recipe_revisions = conan_list_revisions(CONAN_REMOTE, ref).revisions
+    assert len(recipe_revisions) == 2
+    latest_recipe_revision = max(recipe_revisions, key=lambda revision: recipe_revisions[revision].timestamp)
+
+    mirror_dir = tmp_path / "mirror"
+    result = sync_mirror(conan_test_environment.conan_home_dir, mirror_dir, [DependencyIdentifier.from_str("official/dep/1.0.0")])
+    assert len(result.transferred) == 1
+    (revision,) = load_mirror_index(mirror_dir).revisions
+    assert revision.recipe_revision == latest_recipe_revision
+
+
+@pytest.mark.conan_remote
+def test_provider_resolves_from_mirror(tmp_path: Path, conan_test_environment: ConanTestEnv) -> None:
+    mirror_dir = tmp_path / "mirror"
+    sync_mirror(
+        conan_test_environment.conan_home_dir,
+        mirror_dir,
+        [DependencyIdentifier.from_str("official/cpd/1.0.0"), DependencyIdentifier.from_str("official/dep/1.0.0")],
+    )
+
+    offline_conan_home = tmp_path / "offline"
+    with conan_env(offline_conan_home):
+        conan_config_install(conan_test_environment.source_config_dir)
+
+    provider = ConanDependencyProvider(
+        offline_conan_home,
+        conan_test_environment.profile,
+        conan_test_environment.construct_conan_settings(),
+        mirror_dir=mirror_dir,
+    )
+    assert provider.fetch_versions("official", "cpd") == [SemanticVersion("1.0.0")]
+    dependencies = provider.collect_dependency_hull([DependencySpecifier("official/cpd[>=1.0.0]")])
+    assert DependencyIdentifier.from_str("official/cpd/1.0.0") in dependencies
+    assert DependencyIdentifier.from_str("official/dep/1.0.0") in dependencies
+
+    installed = provider.install_dependencies([DependencySpecifier("official/cpd[1.0.0]")])
+    assert sorted(str(dep.id) for dep in installed) == ["official/cpd/1.0.0", "official/dep/1.0.0"]
+    assert all(dep.package_dir.exists() for dep in installed)
+
+    # all archives have been restored already such that a second restore is a no-op
+    assert restore_mirror(offline_conan_home, mirror_dir) == []
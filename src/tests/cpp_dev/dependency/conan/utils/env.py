@@ -41,8 +41,9 @@ class ConanTestPackage:
 class ConanTestEnv:
     """A Conan environment for testing."""
 
-    def __init__(self, conan_home_dir: Path, profile: str, server: ConanServer, compiler: str, cppstd: CppStandard) -> None:
+    def __init__(self, conan_home_dir: Path, source_config_dir: Path, profile: str, server: ConanServer, compiler: str, cppstd: CppStandard) -> None:
         self._conan_home_dir = conan_home_dir
+        self._source_config_dir = source_config_dir
         self._package_dir =  conan_home_dir / ".conan_package_creation"
         ensure_dir_exists(self._package_dir)
         self._profile = profile
@@ -61,6 +62,11 @@ class ConanTestEnv:
         """Return the base directory of the Conan environment."""
         return self._conan_home_dir
 
+    @property
+    def source_config_dir(self) -> Path:
+        """Return the directory of the Conan configuration installed into the Conan home."""
+        return self._source_config_dir
+
     @property
     def profile(self) -> str:
         """Return the profile used for testing."""
@@ -104,7 +110,7 @@ def create_conan_test_env(base_dir: Path, server_http_port: int, packages: list[
         initialize_conan(conan_home_dir, source_config_path)
 
         with conan_env(conan_home_dir):
-            conan_test_env = ConanTestEnv(conan_home_dir, attributes.profile, server, attributes.compiler, attributes.cppstd)
+            conan_test_env = ConanTestEnv(conan_home_dir, source_config_path, attributes.profile, server, attributes.compiler, attributes.cppstd)
             conan_test_env.create_and_upload_packages(packages)
             yield conan_test_env
 
@@ -0,0 +1,53 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from unittest.mock import MagicMock
+
+from cpp_dev.common.version import SemanticVersion
+from cpp_dev.dependency.caching import CachingDependencyProvider
+from cpp_dev.dependency.provider import DependencyIdentifier, DependencyProvider
+from cpp_dev.dependency.specifier import DependencySpecifier
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _create_provider_mock() -> MagicMock:
+    provider = MagicMock(spec=DependencyProvider)
+    provider.fetch_versions.return_value = [SemanticVersion("1.0.0")]
+    provider.collect_dependency_hull.return_value = {DependencyIdentifier.from_str("official/cpd/1.0.0")}
+    return provider
+
+
+def test_fetch_versions_is_cached_until_expiry() -> None:
+    clock = _Clock()
+    provider = _create_provider_mock()
+    caching_provider = CachingDependencyProvider(provider, ttl=10.0, clock=clock)
+
+    assert caching_provider.fetch_versions("official", "cpd") == [SemanticVersion("1.0.0")]
+    assert caching_provider.fetch_versions("official", "cpd") == [SemanticVersion("1.0.0")]
+    assert provider.fetch_versions.call_count == 1
+
+    clock.now = 10.0
+    caching_provider.fetch_versions("official", "cpd")
+    assert provider.fetch_versions.call_count == 2
+
+
+def test_collect_dependency_hull_is_cached_independent_of_order() -> None:
+    provider = _create_provider_mock()
+    caching_provider = CachingDependencyProvider(provider, clock=_Clock())
+
+    caching_provider.collect_dependency_hull([DependencySpecifier("official/a[1.0.0]"), DependencySpecifier("b")])
+    caching_provider.collect_dependency_hull([DependencySpecifier("b"), DependencySpecifier("official/a[1.0.0]")])
+    assert provider.collect_dependency_hull.call_count == 1
+
+    caching_provider.invalidate()
+    caching_provider.collect_dependency_hull([DependencySpecifier("b")])
+    assert provider.collect_dependency_hull.call_count == 2
@@ -15,6 +15,7 @@ from cpp_dev.project.config import (
     ProjectConfig,
     create_project_config,
     load_project_config,
+    store_project_config,
     update_dependencies,
     validate_dependencies,
 )
@@ -115,3 +116,13 @@ def test_validate_dependencies_invalid() -> None:
     )
     with pytest.raises(ValueError, match="Dependency 'dep1' is defined multiple times."):
         validate_dependencies(invalid_config)
+
+
+def test_load_project_config_returns_copy_of_cached_config(tmp_path: Path, project_config: ProjectConfig) -> None:
+    create_project_config(tmp_path, project_config)
+    loaded_config = load_project_config(tmp_path)
+    loaded_config.dependencies.append(DependencySpecifier("other"))
+    assert load_project_config(tmp_path) == project_config
+
+    store_project_config(tmp_path, loaded_config)
+    assert load_project_config(tmp_path) == loaded_config
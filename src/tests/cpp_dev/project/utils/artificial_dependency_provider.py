@@ -9,7 +9,7 @@ from dataclasses import dataclass
 
 from cpp_dev.common.types import CppStandard
 from cpp_dev.common.version import SemanticVersion
-from cpp_dev.dependency.provider import DependencyIdentifier, DependencyProvider
+from cpp_dev.dependency.provider import DependencyIdentifier, DependencyProvider, InstalledDependency
 from cpp_dev.dependency.specifier import DependencySpecifier
 
 ###############################################################################
@@ -48,7 +48,7 @@ class ArtificialDependencyProvider(DependencyProvider):
         """Collect the dependency hull for a list of dependencies."""
         return set()
 
-    def install_dependencies(self, _deps: list[DependencySpecifier]) -> list[DependencySpecifier]:
+    def install_dependencies(self, _deps: list[DependencySpecifier]) -> list[InstalledDependency]:
         """Install the dependencies represented by the list of dependency specifiers."""
         return []
 
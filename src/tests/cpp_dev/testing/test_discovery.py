@@ -0,0 +1,78 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import sys
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.testing.discovery import discover_test_cases, filter_test_cases
+from cpp_dev.testing.result_cache import ResultCacheConfig
+from cpp_dev.testing.runner import UnitTest
+
+# Lists the test cases and records every launch of the binary
+_FAKE_GTEST = """\
+import sys
+with open(sys.argv[0] + ".log", "a") as log:
+    log.write("launched\\n")
+print("Suite.")
+print("  {first}")
+print("  second")
+"""
+
+
+def _create_binary(directory: Path, first: str) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    binary = directory / "lib_test"
+    # the marker lets the runner identify the binary as gtest binary
+    binary.write_text(f"#!{sys.executable}\n# --gtest_list_tests\n{_FAKE_GTEST.format(first=first)}")
+    binary.chmod(0o755)
+    return binary
+
+
+def _count_launches(binary: Path) -> int:
+    log_file = binary.with_name(f"{binary.name}.log")
+    return len(log_file.read_text().splitlines()) if log_file.exists() else 0
+
+
+def test_discover_test_cases(tmp_path: Path) -> None:
+    config = ResultCacheConfig(tmp_path / "cache")
+    debug_binary = _create_binary(tmp_path / "debug", "first")
+    release_binary = _create_binary(tmp_path / "release", "first")
+    expected = [
+        UnitTest(binary, f"Suite.{name}") for binary in [debug_binary, release_binary] for name in ["first", "second"]
+    ]
+    assert discover_test_cases([debug_binary, release_binary], config, jobs=2) == expected
+    assert (_count_launches(debug_binary), _count_launches(release_binary)) == (1, 1)
+
+    # unchanged binaries are listed from the cache, also at other locations
+    assert discover_test_cases([debug_binary, release_binary], config) == expected
+    copied_binary = tmp_path / "copy" / "lib_test"
+    copied_binary.parent.mkdir()
+    copied_binary.write_bytes(debug_binary.read_bytes())
+    assert discover_test_cases([copied_binary], config) == [
+        UnitTest(copied_binary, "Suite.first"),
+        UnitTest(copied_binary, "Suite.second"),
+    ]
+    assert (_count_launches(debug_binary), _count_launches(release_binary), _count_launches(copied_binary)) == (1, 1, 0)
+
+    # rebuilt binaries are listed again
+    _create_binary(tmp_path / "debug", "renamed")
+    assert discover_test_cases([debug_binary], config)[0] == UnitTest(debug_binary, "Suite.renamed")
+    assert _count_launches(debug_binary) == 2
+
+
+def test_filter_test_cases(tmp_path: Path) -> None:
+    binary = tmp_path / "lib_test"
+    cases = [UnitTest(binary, name) for name in ["Fast.a", "Fast.b", "Slow.c", "Other.d"]]
+
+    def filter_names(test_filter: str) -> list[str | None]:
+        return [case.name for case in filter_test_cases(cases, test_filter)]
+
+    assert filter_names("Fast.*:Other.d") == ["Fast.a", "Fast.b", "Other.d"]
+    assert filter_names("*-Fast.?:Slow.*") == ["Other.d"]
+    assert filter_names("-Fast.*") == ["Slow.c", "Other.d"]
+    with pytest.raises(RuntimeError, match=r"No test case matches the filter patterns Fast\.x, Missing\.\*"):
+        filter_test_cases(cases, "Fast.a:Fast.x:Missing.*")
@@ -0,0 +1,94 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import json
+import subprocess
+from pathlib import Path
+
+from cpp_dev.builder.include_graph import update_include_graph
+from cpp_dev.testing.impact import collect_changed_files, record_test_inputs, select_affected_tests
+from cpp_dev.testing.runner import UnitTest
+from tests.cpp_dev.builder.utils import create_project_layout
+
+
+def _create_test_setup(project_dir: Path) -> list[UnitTest]:
+    create_project_layout(project_dir, "lib", num_sources=2)
+    (project_dir / "src" / "other.test.cpp").write_text('#include "lib/lib.hpp"\n')
+    build_dir = project_dir / "build"
+    update_include_graph(project_dir, "lib", build_dir)
+    (build_dir / "build.ninja").write_text("cxx = c++\ncxxflags = -O0\n")
+    binary = build_dir / "lib_test"
+    binary.with_name("lib_test.coverage.json").write_text(
+        json.dumps({"A.a": ["src/lib_0.cpp"], "B.b": ["src/lib_1.cpp"], "C.c": ["src/lib_0.cpp"]}),
+    )
+    binary.with_name("lib_test.history.json").write_text(
+        json.dumps({"durations": {"A.a": 1, "B.b": 1, "C.c": 1, "D.d": 1}, "failed": ["D.d"]}),
+    )
+    record_test_inputs(binary)
+    return [
+        UnitTest(binary, "A.a", "src/lib.test.cpp"),
+        UnitTest(binary, "B.b", str(project_dir / "src" / "lib.test.cpp")),
+        UnitTest(binary, "C.c", "src/other.test.cpp"),
+        UnitTest(binary, "D.d", "src/other.test.cpp"),
+        UnitTest(binary, "E.e", "src/other.test.cpp"),
+    ]
+
+
+def test_select_affected_tests(tmp_path: Path) -> None:
+    cases = _create_test_setup(tmp_path)
+
+    selection = select_affected_tests(tmp_path, "lib", cases, ["src/lib_1.cpp"])
+    assert [case.name for case in selection.selected] == ["B.b", "D.d", "E.e"]
+    assert selection.run_reasons == {
+        "covered library source affected": 1,
+        "failed in the last run": 1,
+        "new test case": 1,
+    }
+    assert selection.skip_reasons == {"affected library sources not covered": 2}
+
+    # the header is included by all sources
+    selection = select_affected_tests(tmp_path, "lib", cases, ["include/lib/lib.hpp"])
+    assert len(selection.selected) == len(cases)
+    assert selection.run_reasons["test source affected"] == 3
+
+    selection = select_affected_tests(tmp_path, "lib", cases, ["src/other.test.cpp", "README.md"])
+    assert [case.name for case in selection.selected] == ["C.c", "D.d", "E.e"]
+    assert selection.skip_reasons == {"not affected by the changed files": 2}
+    assert selection.full_suite_reason is None
+
+
+def test_select_affected_tests_runs_full_suite(tmp_path: Path) -> None:
+    cases = _create_test_setup(tmp_path)
+
+    selection = select_affected_tests(tmp_path, "lib", cases, ["cpp-dev.lock"])
+    assert selection.selected == cases
+    assert selection.full_suite_reason == "cpp-dev.lock changed"
+
+    (tmp_path / "build" / "build.ninja").write_text("cxx = c++\ncxxflags = -O2\n")
+    selection = select_affected_tests(tmp_path, "lib", cases, ["README.md"])
+    assert selection.selected == cases
+    assert selection.full_suite_reason == "toolchain of lib_test changed since its last run"
+
+
+def test_collect_changed_files(tmp_path: Path) -> None:
+    def git(*args: str) -> None:
+        subprocess.run(  # noqa: S603
+            ["git", "-c", "user.name=cpd", "-c", "user.email=cpd@localhost", *args],  # noqa: S607
+            cwd=tmp_path,
+            check=True,
+        )
+
+    git("init", "-q")
+    (tmp_path / "a.cpp").write_text("int a;\n")
+    (tmp_path / "b.cpp").write_text("int b;\n")
+    git("add", "a.cpp", "b.cpp")
+    git("commit", "-q", "-m", "initial")
+    (tmp_path / "a.cpp").write_text("int a = 1;\n")
+    (tmp_path / "c.cpp").write_text("int c;\n")
+    assert collect_changed_files(tmp_path) == ["a.cpp", "c.cpp"]
+
+    git("commit", "-q", "-am", "change")
+    assert collect_changed_files(tmp_path, "HEAD~1") == ["a.cpp", "c.cpp"]
+    assert collect_changed_files(tmp_path) == ["c.cpp"]
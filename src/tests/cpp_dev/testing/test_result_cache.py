@@ -0,0 +1,145 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.builder.remote_cache_server import run_remote_cache_server
+from cpp_dev.testing import result_cache
+from cpp_dev.testing.result_cache import (
+    ResultCacheConfig,
+    compute_file_digest,
+    compute_test_key,
+    load_cached_results,
+    load_file_digests,
+    store_cached_results,
+    store_file_digests,
+)
+from cpp_dev.testing.runner import UnitTest, UnitTestResult
+
+
+def _create_binary(directory: Path, content: bytes = b"binary") -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    binary = directory / "lib_test"
+    binary.write_bytes(content)
+    return binary
+
+
+def _create_result(binary: Path, name: str, *, passed: bool = True) -> UnitTestResult:
+    return UnitTestResult(binary=binary, name=name, passed=passed, duration_ms=5, output="")
+
+
+def test_compute_test_key(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    project_dir = tmp_path / "project"
+    build_dir = project_dir / "build"
+    binary = _create_binary(build_dir)
+    cases = [UnitTest(binary, "Suite.a"), UnitTest(binary, "Suite.b")]
+    key = compute_test_key(cases, project_dir)
+    assert compute_test_key(list(reversed(cases)), project_dir) == key
+    # the same binary at another location shares the key
+    other_cases = [UnitTest(_create_binary(tmp_path / "other"), case.name) for case in cases]
+    assert compute_test_key(other_cases, project_dir) == key
+
+    assert compute_test_key(cases[:1], project_dir) != key
+    monkeypatch.setenv("GTEST_REPEAT", "2")
+    assert compute_test_key(cases, project_dir) != key
+    monkeypatch.delenv("GTEST_REPEAT")
+
+    # shared libraries of the dependencies are found by the rpath of the link flags
+    lib_dir = tmp_path / "deps" / "lib"
+    lib_dir.mkdir(parents=True)
+    (build_dir / "build.ninja").write_text(f"ldflags = -pthread -Wl,-rpath,{lib_dir}\n")
+    (lib_dir / "libdep.so").write_bytes(b"v1")
+    key_with_library = compute_test_key(cases, project_dir)
+    assert key_with_library != key
+    (lib_dir / "libdep.so").write_bytes(b"v2")
+    assert compute_test_key(cases, project_dir) != key_with_library
+
+    binary.write_bytes(b"rebuilt")
+    assert compute_test_key(cases, project_dir) not in (key, key_with_library)
+
+
+def test_compute_test_key_covers_test_data(tmp_path: Path) -> None:
+    project_dir = tmp_path / "project"
+    binary = _create_binary(project_dir / "build")
+    cases = [UnitTest(binary, "Suite.a")]
+    (project_dir / "data").mkdir()
+    (project_dir / "data" / "input.txt").write_text("v1")
+    key = compute_test_key(cases, project_dir)
+
+    # the tests read their data relative to the directory they run in
+    (project_dir / "data" / "input.txt").write_text("v2")
+    changed_key = compute_test_key(cases, project_dir)
+    assert changed_key != key
+    (project_dir / "data" / "extra.txt").write_text("v1")
+    assert compute_test_key(cases, project_dir) != changed_key
+    (project_dir / "data" / "extra.txt").unlink()
+
+    # sources are part of the binary and generated files are no test data
+    (project_dir / "src").mkdir()
+    (project_dir / "src" / "lib.cpp").write_text("int a;\n")
+    (project_dir / "build" / "lib.o").write_bytes(b"object")
+    (project_dir / ".cpd").mkdir()
+    (project_dir / ".cpd" / "state").write_text("state")
+    assert compute_test_key(cases, project_dir) == changed_key
+
+    # the same data in another checkout shares the key
+    other_dir = tmp_path / "other"
+    (other_dir / "data").mkdir(parents=True)
+    (other_dir / "data" / "input.txt").write_text("v2")
+    assert compute_test_key(cases, other_dir) == changed_key
+
+
+def test_file_digests_are_reused_across_runs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cache_dir = tmp_path / "cache"
+    data_file = tmp_path / "input.txt"
+    data_file.write_text("v1")
+    digest = compute_file_digest(data_file)
+    store_file_digests(cache_dir)
+
+    # a new process hashes only the files changed since
+    monkeypatch.setattr(result_cache, "_FILE_DIGESTS", {})
+    load_file_digests(cache_dir)
+    with monkeypatch.context() as context:
+        context.setattr(result_cache.hashlib, "file_digest", None)
+        assert compute_file_digest(data_file) == digest
+    data_file.write_text("v2-changed")
+    assert compute_file_digest(data_file) != digest
+
+
+def test_store_cached_results(tmp_path: Path) -> None:
+    config = ResultCacheConfig(tmp_path / "cache")
+    binary = _create_binary(tmp_path / "build")
+    key = compute_test_key([UnitTest(binary, "Suite.a"), UnitTest(binary, "Suite.b")], tmp_path)
+    assert load_cached_results(config, key, binary) is None
+
+    # only passing runs are cached
+    failed = [_create_result(binary, "Suite.a"), _create_result(binary, "Suite.b", passed=False)]
+    assert not store_cached_results(config, key, failed)
+    assert load_cached_results(config, key, binary) is None
+
+    passed = [_create_result(binary, "Suite.a"), _create_result(binary, "Suite.b")]
+    assert store_cached_results(config, key, passed)
+    other_binary = tmp_path / "other" / "lib_test"
+    cached = load_cached_results(config, key, other_binary)
+    assert cached == [result.model_copy(update={"binary": other_binary}) for result in passed]
+
+    # least-recently used entries are evicted once the cache exceeds its size
+    small_config = ResultCacheConfig(tmp_path / "cache", max_size=1)
+    assert store_cached_results(small_config, "ab" * 32, passed)
+    assert load_cached_results(config, key, binary) is None
+
+
+def test_share_cached_results(tmp_path: Path) -> None:
+    binary = _create_binary(tmp_path / "build")
+    key = compute_test_key([UnitTest(binary, "Suite.a")], tmp_path)
+    with run_remote_cache_server(tmp_path / "storage") as url:
+        config = ResultCacheConfig(tmp_path / "cache", remote_url=url)
+        assert store_cached_results(config, key, [_create_result(binary, "Suite.a")])
+        # another machine with an empty local cache fetches the entry and keeps it locally
+        other_config = ResultCacheConfig(tmp_path / "other_cache", remote_url=url)
+        assert load_cached_results(other_config, key, binary) == [_create_result(binary, "Suite.a")]
+    assert load_cached_results(ResultCacheConfig(tmp_path / "other_cache"), key, binary) is not None
@@ -0,0 +1,155 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import json
+import sys
+from pathlib import Path
+from textwrap import dedent
+
+from cpp_dev.testing.runner import UnitTest, UnitTestResult, list_test_cases, read_test_history, run_tests
+
+# Emulates the command line interface of a gtest binary: listing, filtering and the JSON output
+_FAKE_GTEST = """\
+import json, os, sys, time
+
+TESTS = {
+    "Fast.a": (0.0, None),
+    "Fast.b": (0.0, None),
+    "Slow.c": (0.2, None),
+    "Fail.d": (0.0, "expected 1, got 2"),
+    "Crash.e": (0.0, "crash"),
+    "DISABLED_Off.f": (0.0, None),
+}
+args = dict(arg.split("=", 1) if "=" in arg else (arg, "") for arg in sys.argv[1:])
+if "--gtest_list_tests" in args:
+    for suite in dict.fromkeys(name.split(".")[0] for name in TESTS):
+        print(f"{suite}.")
+        for name in TESTS:
+            if name.startswith(f"{suite}."):
+                print(f"  {name.split('.')[1]}  # GetParam() = 1")
+    sys.exit(0)
+selected = args["--gtest_filter"].split(":")
+suites = {}
+for name in selected:
+    duration, failure = TESTS[name]
+    print(f"[ RUN      ] {name}")
+    if failure == "crash":
+        print("segfault", flush=True)
+        os._exit(139)
+    time.sleep(duration)
+    if failure is not None:
+        print(failure)
+    print(f"[{'  FAILED  ' if failure else '       OK '}] {name} ({int(duration * 1000)} ms)")
+    suite, case = name.split(".")
+    entry = {"name": case, "time": f"{duration}s"}
+    if failure is not None:
+        entry["failures"] = [{"failure": failure}]
+    suites.setdefault(suite, []).append(entry)
+output = args["--gtest_output"].removeprefix("json:")
+testsuites = [{"name": suite, "testsuite": entries} for suite, entries in suites.items()]
+with open(output, "w") as f:
+    json.dump({"testsuites": testsuites}, f)
+sys.exit(1 if any("failures" in e for entries in suites.values() for e in entries) else 0)
+"""
+
+
+def _create_binary(directory: Path, name: str, script: str) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    binary = directory / name
+    binary.write_text(f"#!{sys.executable}\n{script}")
+    binary.chmod(0o755)
+    return binary
+
+
+def test_list_test_cases(tmp_path: Path) -> None:
+    binary = _create_binary(tmp_path, "lib_test", _FAKE_GTEST)
+    assert list_test_cases(binary) == [
+        UnitTest(binary, name) for name in ["Fast.a", "Fast.b", "Slow.c", "Fail.d", "Crash.e"]
+    ]
+
+    plain_binary = _create_binary(tmp_path, "plain_test", "import sys\nsys.exit(0)\n")
+    assert list_test_cases(plain_binary) == [UnitTest(plain_binary, None)]
+
+
+def test_run_tests(tmp_path: Path) -> None:
+    binary = _create_binary(tmp_path / "debug", "lib_test", _FAKE_GTEST)
+    plain_binary = _create_binary(tmp_path / "release", "plain_test", "import sys\nprint('failed')\nsys.exit(1)\n")
+    streamed: list[UnitTestResult] = []
+    cases = [*list_test_cases(binary), *list_test_cases(plain_binary)]
+    report = run_tests(cases, jobs=2, on_result=streamed.append)
+
+    # the results are streamed in the order of the listing
+    assert [result.name for result in streamed] == ["Fast.a", "Fast.b", "Slow.c", "Fail.d", "Crash.e", "plain_test"]
+    assert streamed == report.results
+    assert [result.name for result in report.failed] == ["Fail.d", "Crash.e", "plain_test"]
+    failed = {result.name: result.output for result in report.failed}
+    assert failed["Fail.d"] == "expected 1, got 2"
+    # the crashing test case is found by repeating its batch per test case
+    assert "segfault" in failed["Crash.e"]
+    assert failed["plain_test"].strip() == "failed"
+
+    results = json.loads((tmp_path / "debug" / "lib_test.results.json").read_text())
+    assert (results["tests"], results["failures"]) == (5, 2)
+    assert [suite["name"] for suite in results["testsuites"]] == ["Fast", "Slow", "Fail", "Crash"]
+    assert (tmp_path / "debug" / "lib_test.results.xml").exists()
+
+    history = json.loads((tmp_path / "debug" / "lib_test.history.json").read_text())
+    assert history["durations"]["Slow.c"] == 200
+    assert read_test_history(binary).failed == ["Crash.e", "Fail.d"]
+
+    # test cases not run keep their state
+    run_tests([UnitTest(binary, "Fail.d")], jobs=1)
+    assert read_test_history(binary).failed == ["Crash.e", "Fail.d"]
+
+
+def test_run_tests_schedules_longest_first(tmp_path: Path) -> None:
+    script = dedent(
+        """\
+        import json, sys, time
+        args = dict(arg.split("=", 1) if "=" in arg else (arg, "") for arg in sys.argv[1:])
+        if "--gtest_list_tests" in args:
+            print("Suite.")
+            print("\\n".join(f"  t{idx}" for idx in range(4)))
+            sys.exit(0)
+        with open(sys.argv[0] + ".log", "a") as log:
+            log.write(args["--gtest_filter"] + "\\n")
+        entries = [{"name": name.split(".")[1], "time": "0s"} for name in args["--gtest_filter"].split(":")]
+        with open(args["--gtest_output"].removeprefix("json:"), "w") as f:
+            json.dump({"testsuites": [{"name": "Suite", "testsuite": entries}]}, f)
+        """,
+    )
+    binary = _create_binary(tmp_path, "lib_test", script)
+    (tmp_path / "lib_test.history.json").write_text(json.dumps({"durations": {"Suite.t2": 500, "Suite.t0": 10}}))
+    run_tests(list_test_cases(binary), jobs=1)
+    batches = (tmp_path / "lib_test.log").read_text().splitlines()
+    # t1 and t3 are expected to take the average duration of the recorded test cases
+    assert batches == ["Suite.t2", "Suite.t1", "Suite.t3", "Suite.t0"]
+
+
+def test_run_tests_limits_the_filter_length(tmp_path: Path) -> None:
+    # the test names of all batches exceed the limit of a single command line argument when joined
+    script = dedent(
+        """\
+        import json, sys
+        names = [f"Suite.{'t' * 200}{idx}" for idx in range(4000)]
+        args = dict(arg.split("=", 1) if "=" in arg else (arg, "") for arg in sys.argv[1:])
+        if "--gtest_list_tests" in args:
+            print("Suite.")
+            print("\\n".join(f"  {name.split('.')[1]}" for name in names))
+            sys.exit(0)
+        with open(sys.argv[0] + ".log", "a") as log:
+            log.write(f"{len(args['--gtest_filter'])}\\n")
+        entries = [{"name": name.split(".")[1], "time": "0s"} for name in args["--gtest_filter"].split(":")]
+        with open(args["--gtest_output"].removeprefix("json:"), "w") as f:
+            json.dump({"testsuites": [{"name": "Suite", "testsuite": entries}]}, f)
+        """,
+    )
+    binary = _create_binary(tmp_path, "lib_test", script)
+    report = run_tests(list_test_cases(binary), jobs=1)
+
+    assert len(report.results) == 4000
+    assert not report.failed
+    filter_lengths = [int(length) for length in (tmp_path / "lib_test.log").read_text().splitlines()]
+    assert max(filter_lengths) <= 64 * 1024
@@ -0,0 +1,61 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.common.utils import updated_env
+from cpp_dev.common.version import SemanticVersion
+from cpp_dev.dependency.provider import DependencyIdentifier
+from cpp_dev.project.lockfile import LockedDependencies, LockedPackageDependency, store_lock_file
+from cpp_dev.tool.cache import (
+    collect_locked_dependencies,
+    get_cache_max_size,
+    get_registered_projects,
+    parse_size,
+    register_project,
+)
+
+
+@pytest.mark.parametrize(
+    ("size", "expected"),
+    [
+        ("100", 100),
+        ("1K", 1024),
+        ("20G", 20 * 1024**3),
+        ("2mb", 2 * 1024**2),
+    ],
+)
+def test_parse_size(size: str, expected: int) -> None:
+    assert parse_size(size) == expected
+
+
+def test_parse_size_invalid() -> None:
+    with pytest.raises(ValueError, match="Invalid size"):
+        parse_size("large")
+
+
+def test_get_cache_max_size() -> None:
+    with updated_env(CPD_CACHE_MAX_SIZE="1M"):
+        assert get_cache_max_size() == 1024**2
+
+
+def test_collect_locked_dependencies(tmp_path: Path) -> None:
+    cpd_dir = tmp_path / ".cpd"
+    project_dir = tmp_path / "project"
+    project_dir.mkdir()
+    store_lock_file(
+        project_dir,
+        LockedDependencies(
+            packages=[LockedPackageDependency(repository="official", name="cpd", version=SemanticVersion("1.0.0"))],
+        ),
+    )
+    register_project(cpd_dir, project_dir)
+    register_project(cpd_dir, tmp_path / "removed_project")
+
+    assert get_registered_projects(cpd_dir) == [project_dir.resolve()]
+    assert collect_locked_dependencies(cpd_dir) == {DependencyIdentifier.from_str("official/cpd/1.0.0")}
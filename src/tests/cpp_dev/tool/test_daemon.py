@@ -0,0 +1,113 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import io
+import os
+import socket
+import sys
+import threading
+import time
+from collections.abc import Generator
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.tool.daemon import forward_to_daemon, get_daemon_socket_file, is_daemon_running, serve_daemon, stop_daemon
+
+# Set once the client received the first output of a streaming command
+_STREAMED = threading.Event()
+
+
+def _command_handler(argv: list[str]) -> int:
+    print(f"cwd={Path.cwd()} argv={' '.join(argv)} env={os.environ.get('CPD_TEST_VALUE')}")  # noqa: T201
+    if argv == ["stream"]:
+        # the command only finishes once its first output reached the client
+        if not _STREAMED.wait(timeout=5):
+            return 1
+        print("finished", file=sys.stderr)  # noqa: T201
+    return 3
+
+
+class _StreamedOutput(io.StringIO):
+    def write(self, text: str) -> int:
+        _STREAMED.set()
+        return super().write(text)
+
+
+@pytest.fixture
+def daemon(tmp_path: Path) -> Generator[Path]:
+    cpd_dir = tmp_path / ".cpd"
+    thread = threading.Thread(target=serve_daemon, args=(cpd_dir, _command_handler))
+    thread.start()
+    for _ in range(100):
+        if is_daemon_running(cpd_dir):
+            break
+        time.sleep(0.01)
+    yield cpd_dir
+    stop_daemon(cpd_dir)
+    thread.join(timeout=5)
+
+
+def test_forward_to_daemon(daemon: Path, tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(tmp_path)
+        mp.setenv("CPD_TEST_VALUE", "client")
+        assert forward_to_daemon(daemon, ["version"]) == 3
+    assert capsys.readouterr().out == f"cwd={tmp_path} argv=version env=client\n"
+    # the environment of the daemon is restored after the command
+    assert "CPD_TEST_VALUE" not in os.environ
+
+
+def test_forward_to_daemon_streams_output(daemon: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    stdout = _StreamedOutput()
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(sys, "stdout", stdout)
+        assert forward_to_daemon(daemon, ["stream"]) == 3
+    assert stdout.getvalue().endswith("argv=stream env=None\n")
+    assert capsys.readouterr().err == "finished\n"
+
+
+def test_forward_to_daemon_not_running(tmp_path: Path) -> None:
+    assert forward_to_daemon(tmp_path, ["version"]) is None
+    assert not is_daemon_running(tmp_path)
+    assert not stop_daemon(tmp_path)
+
+
+def test_forward_to_daemon_failing_after_accepting(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    cpd_dir = tmp_path / ".cpd"
+    cpd_dir.mkdir()
+    # the daemon reads the request and exits without a response
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(str(get_daemon_socket_file(cpd_dir)))
+        server.listen()
+
+        def accept_and_close() -> None:
+            connection, _ = server.accept()
+            with connection, connection.makefile("rb") as requests:
+                requests.readline()
+
+        thread = threading.Thread(target=accept_and_close)
+        thread.start()
+        # the command may have been executed partially, so it is not run again locally
+        assert forward_to_daemon(cpd_dir, ["build"]) == 1
+        thread.join(timeout=5)
+    assert "The cpd daemon failed while running the command" in capsys.readouterr().err
+
+
+def test_stop_daemon(daemon: Path) -> None:
+    assert stop_daemon(daemon)
+    for _ in range(100):
+        if not get_daemon_socket_file(daemon).exists():
+            break
+        time.sleep(0.01)
+    assert not get_daemon_socket_file(daemon).exists()
+    assert not is_daemon_running(daemon)
+
+
+def test_is_daemon_running_with_stale_socket(tmp_path: Path) -> None:
+    cpd_dir = tmp_path / ".cpd"
+    cpd_dir.mkdir()
+    get_daemon_socket_file(cpd_dir).write_text("stale")
+    assert not is_daemon_running(cpd_dir)
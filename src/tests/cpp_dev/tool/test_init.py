@@ -4,6 +4,8 @@
 # For a copy, see <https://opensource.org/license/bsd-3-clause>.
 
 
+import fcntl
+import threading
 from pathlib import Path
 from unittest.mock import patch
 
@@ -11,8 +13,9 @@ import pytest
 
 from cpp_dev.common.utils import updated_env
 from cpp_dev.common.version import SemanticVersion
-from cpp_dev.tool.init import assure_cpd_is_initialized, get_conan_home_dir, get_cpd_dir, initialize_cpd, update_cpd
-from cpp_dev.tool.version import get_cpd_version_from_code, write_version_file
+from cpp_dev.tool.init import _compute_config_fingerprint, assure_cpd_is_initialized, initialize_cpd, update_cpd
+from cpp_dev.tool.paths import get_conan_home_dir, get_cpd_dir
+from cpp_dev.tool.version import get_cpd_version_from_code, read_version_file, write_version_file
 
 
 @pytest.fixture(autouse=True)
@@ -42,6 +45,56 @@ def test_assure_cpd_is_initialized(cpd_dir: Path) -> None:
     assert cpd_dir.exists()
 
 
+def test_assure_cpd_is_initialized_fast_path(cpd_dir: Path) -> None:
+    assure_cpd_is_initialized(cpd_dir)
+    with patch("cpp_dev.tool.init.initialize_conan") as initialize_conan:
+        assure_cpd_is_initialized(cpd_dir)
+    initialize_conan.assert_not_called()
+
+
+def test_assure_cpd_is_initialized_reinstalls_changed_config(cpd_dir: Path) -> None:
+    assure_cpd_is_initialized(cpd_dir)
+    with (
+        patch("cpp_dev.tool.init._compute_config_fingerprint", return_value="changed"),
+        patch("cpp_dev.tool.init.initialize_conan") as initialize_conan,
+    ):
+        assure_cpd_is_initialized(cpd_dir)
+        assure_cpd_is_initialized(cpd_dir)
+    initialize_conan.assert_called_once()
+
+
+def test_compute_config_fingerprint(tmp_path: Path) -> None:
+    (tmp_path / "profiles").mkdir()
+    (tmp_path / "profiles" / "default").write_text("[settings]\n")
+    fingerprint = _compute_config_fingerprint(tmp_path)
+    with patch.object(Path, "read_bytes") as read_bytes:
+        assert _compute_config_fingerprint(tmp_path) == fingerprint
+    read_bytes.assert_not_called()
+
+    (tmp_path / "profiles" / "default").write_text("[settings]\nos=Linux\n")
+    assert _compute_config_fingerprint(tmp_path) != fingerprint
+
+
+def test_assure_cpd_is_initialized_waits_for_concurrent_initialization(cpd_dir: Path) -> None:
+    initialize_cpd(cpd_dir)
+    stamp = (cpd_dir / "setup.stamp").read_text()
+    (cpd_dir / "setup.stamp").unlink()
+
+    with (
+        (cpd_dir / ".init_lock").open("a") as lock_file,
+        patch("cpp_dev.tool.init.initialize_conan") as initialize_conan,
+    ):
+        # simulate another process holding the init lock while initializing cpd
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        waiter = threading.Thread(target=assure_cpd_is_initialized, args=(cpd_dir,))
+        waiter.start()
+        (cpd_dir / "setup.stamp").write_text(stamp)
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        waiter.join(timeout=10)
+        assert not waiter.is_alive()
+    initialize_conan.assert_not_called()
+
+
 def test_initialize_cpd(cpd_dir: Path) -> None:
     initialize_cpd(cpd_dir)
 
@@ -61,8 +114,20 @@ def test_update_cpd_ok(cpd_dir: Path) -> None:
     update_cpd(cpd_dir)
 
 
-def test_update_cpd_not_ok(cpd_dir: Path) -> None:
+def test_update_cpd_from_older_version(cpd_dir: Path) -> None:
     initialize_cpd(cpd_dir)
+    conan_dir = get_conan_home_dir(cpd_dir)
+    (conan_dir / "p" / "cached_package").mkdir(parents=True)
     write_version_file(cpd_dir, SemanticVersion("0.0.0"))
+
+    update_cpd(cpd_dir)
+    assert read_version_file(cpd_dir) == get_cpd_version_from_code()
+    # the package cache is kept during updates
+    assert (conan_dir / "p" / "cached_package").exists()
+
+
+def test_update_cpd_not_ok(cpd_dir: Path) -> None:
+    initialize_cpd(cpd_dir)
+    write_version_file(cpd_dir, SemanticVersion("99.0.0"))
     with pytest.raises(RuntimeError):
         update_cpd(cpd_dir)
@@ -0,0 +1,86 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from cpp_dev.common.version import SemanticVersion
+from cpp_dev.tool.migration import Migration, get_pending_migrations, migrate_cpd_home
+from cpp_dev.tool.paths import get_store_dir
+from cpp_dev.tool.store import add_tree, install_tree, load_manifest
+from cpp_dev.tool.version import read_version_file
+
+
+def _create_migrations(applied: list[str]) -> list[Migration]:
+    def create_migration(version: str) -> Migration:
+        return Migration(SemanticVersion(version), f"step {version}", lambda _: applied.append(version))
+
+    return [create_migration(version) for version in ["0.3.0", "0.1.0", "0.2.0"]]
+
+
+def test_get_pending_migrations() -> None:
+    with patch("cpp_dev.tool.migration._MIGRATIONS", _create_migrations([])):
+        pending = get_pending_migrations(SemanticVersion("0.1.0"), SemanticVersion("0.3.0"))
+    assert [str(migration.version) for migration in pending] == ["0.2.0", "0.3.0"]
+
+
+def test_migrate_cpd_home(tmp_path: Path) -> None:
+    applied: list[str] = []
+    with patch("cpp_dev.tool.migration._MIGRATIONS", _create_migrations(applied)):
+        migrate_cpd_home(tmp_path, SemanticVersion("0.0.1"), SemanticVersion("0.2.5"))
+        assert applied == ["0.1.0", "0.2.0"]
+        assert read_version_file(tmp_path) == SemanticVersion("0.2.5")
+
+        migrate_cpd_home(tmp_path, read_version_file(tmp_path), SemanticVersion("0.3.0"))
+        assert applied == ["0.1.0", "0.2.0", "0.3.0"]
+
+
+def test_migrate_cpd_home_resumes_after_failure(tmp_path: Path) -> None:
+    def fail(_: Path) -> None:
+        raise RuntimeError("migration failed")
+
+    migrations = [
+        Migration(SemanticVersion("0.1.0"), "ok", lambda _: None),
+        Migration(SemanticVersion("0.2.0"), "failing", fail),
+    ]
+    with (
+        patch("cpp_dev.tool.migration._MIGRATIONS", migrations),
+        pytest.raises(RuntimeError, match="migration failed"),
+    ):
+        migrate_cpd_home(tmp_path, SemanticVersion("0.0.1"), SemanticVersion("0.2.0"))
+    assert read_version_file(tmp_path) == SemanticVersion("0.1.0")
+
+
+def test_migrate_cpd_home_downgrade(tmp_path: Path) -> None:
+    with pytest.raises(RuntimeError, match="Downgrades are not supported"):
+        migrate_cpd_home(tmp_path, SemanticVersion("0.2.0"), SemanticVersion("0.1.0"))
+
+
+def test_migrate_cpd_home_relinks_package_store(tmp_path: Path) -> None:
+    cpd_dir = tmp_path / "cpd"
+    store_dir = get_store_dir(cpd_dir)
+    for name in ["old", "new"]:
+        package_dir = tmp_path / name
+        package_dir.mkdir()
+        (package_dir / f"{name}.hpp").write_text(f"// {name}")
+        install_tree(store_dir, f"{name}/1.0.0", package_dir, tmp_path / "project" / name)
+    # manifests of older versions do not record the source directory
+    old_manifest = add_tree(store_dir, "old/1.0.0", tmp_path / "old")
+    old_manifest_file = next(
+        manifest_file
+        for manifest_file in (store_dir / "manifests").glob("*.json")
+        if "old/1.0.0" in manifest_file.read_text()
+    )
+    old_manifest_file.write_text(old_manifest.model_copy(update={"source_dir": None}).model_dump_json())
+
+    migrate_cpd_home(cpd_dir, SemanticVersion("0.0.1"), SemanticVersion("0.0.2"))
+
+    assert load_manifest(store_dir, "old/1.0.0") is None
+    assert load_manifest(store_dir, "new/1.0.0") is not None
+    assert len(list((store_dir / "blobs").glob("*/*"))) == 1
+    # the materialized tree keeps its files
+    assert (tmp_path / "project" / "old" / "old.hpp").read_text() == "// old"
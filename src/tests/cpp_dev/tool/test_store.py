@@ -0,0 +1,141 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from cpp_dev.tool.store import (
+    add_tree,
+    collect_store_garbage,
+    install_tree,
+    load_manifest,
+    materialize_tree,
+    verify_store,
+)
+
+
+@pytest.fixture
+def package_dir(tmp_path: Path) -> Path:
+    package_dir = tmp_path / "package"
+    (package_dir / "include").mkdir(parents=True)
+    (package_dir / "bin").mkdir()
+    (package_dir / "include" / "a.hpp").write_text("#pragma once")
+    (package_dir / "include" / "b.hpp").write_text("#pragma once")
+    (package_dir / "bin" / "tool").write_text("#!/bin/sh")
+    (package_dir / "bin" / "tool").chmod(0o755)
+    (package_dir / "bin" / "tool-link").symlink_to("tool")
+    return package_dir
+
+
+def test_add_tree_deduplicates_content(tmp_path: Path, package_dir: Path) -> None:
+    store_dir = tmp_path / "store"
+    manifest = add_tree(store_dir, "pkg/1.0.0", package_dir)
+
+    assert len(manifest.entries) == 4
+    assert len(list((store_dir / "blobs").glob("*/*"))) == 2
+    assert load_manifest(store_dir, "pkg/1.0.0") == manifest
+    assert load_manifest(store_dir, "pkg/2.0.0") is None
+
+
+def test_add_tree_links_blobs_to_source_files(tmp_path: Path, package_dir: Path) -> None:
+    store_dir = tmp_path / "store"
+    add_tree(store_dir, "pkg/1.0.0", package_dir)
+
+    source_file = package_dir / "bin" / "tool"
+    assert any(source_file.samefile(blob_file) for blob_file in (store_dir / "blobs").glob("*/*"))
+
+
+def test_install_tree_uses_hardlinks(tmp_path: Path, package_dir: Path) -> None:
+    store_dir = tmp_path / "store"
+    install_tree(store_dir, "pkg/1.0.0", package_dir, tmp_path / "project1")
+    install_tree(store_dir, "pkg/1.0.0", package_dir, tmp_path / "project2")
+
+    header1 = tmp_path / "project1" / "include" / "a.hpp"
+    header2 = tmp_path / "project2" / "include" / "b.hpp"
+    assert header1.read_text() == "#pragma once"
+    assert header1.samefile(header2)
+    assert os.access(tmp_path / "project2" / "bin" / "tool", os.X_OK)
+    assert (tmp_path / "project2" / "bin" / "tool-link").readlink() == Path("tool")
+
+
+def test_materialize_tree_is_idempotent(tmp_path: Path, package_dir: Path) -> None:
+    store_dir = tmp_path / "store"
+    manifest = add_tree(store_dir, "pkg/1.0.0", package_dir)
+    materialize_tree(store_dir, manifest, tmp_path / "project")
+    materialize_tree(store_dir, manifest, tmp_path / "project")
+    assert (tmp_path / "project" / "include" / "a.hpp").exists()
+
+
+def test_materialize_tree_removes_stale_files(tmp_path: Path, package_dir: Path) -> None:
+    store_dir = tmp_path / "store"
+    target_dir = tmp_path / "project"
+    install_tree(store_dir, "pkg/1.0.0", package_dir, target_dir)
+
+    # the next version drops a header and the tool directory, and turns a header into a directory
+    (package_dir / "include" / "b.hpp").unlink()
+    (package_dir / "include" / "a.hpp").unlink()
+    (package_dir / "include" / "a.hpp").mkdir()
+    (package_dir / "include" / "a.hpp" / "c.hpp").write_text("#pragma once")
+    (package_dir / "bin" / "tool-link").unlink()
+    (package_dir / "bin" / "tool").unlink()
+    (package_dir / "bin").rmdir()
+    install_tree(store_dir, "pkg/2.0.0", package_dir, target_dir)
+
+    assert sorted(path.relative_to(target_dir).as_posix() for path in target_dir.rglob("*")) == [
+        "include",
+        "include/a.hpp",
+        "include/a.hpp/c.hpp",
+    ]
+
+
+def test_add_tree_concurrently(tmp_path: Path, package_dir: Path) -> None:
+    store_dir = tmp_path / "store"
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        manifests = list(executor.map(lambda _: add_tree(store_dir, "pkg/1.0.0", package_dir), range(8)))
+    assert all(manifest == manifests[0] for manifest in manifests)
+    assert verify_store(store_dir) == []
+
+
+def test_verify_store_detects_corruption(tmp_path: Path, package_dir: Path) -> None:
+    store_dir = tmp_path / "store"
+    add_tree(store_dir, "pkg/1.0.0", package_dir)
+    blob_file = next(blob for blob in (store_dir / "blobs").glob("*/*") if not blob.name.endswith(".x"))
+    blob_file.chmod(0o644)
+    blob_file.write_text("corrupted")
+
+    corrupted = verify_store(store_dir, remove_corrupted=True)
+    assert len(corrupted) == 1
+    assert not blob_file.exists()
+    assert load_manifest(store_dir, "pkg/1.0.0") is None
+    assert verify_store(store_dir) == []
+
+
+def test_collect_store_garbage(tmp_path: Path, package_dir: Path) -> None:
+    store_dir = tmp_path / "store"
+    evicted_package_dir = tmp_path / "evicted"
+    shutil.copytree(package_dir, evicted_package_dir, symlinks=True)
+    (evicted_package_dir / "lib.a").write_text("archive")
+    add_tree(store_dir, "pkg/1.0.0", package_dir)
+    add_tree(store_dir, "pkg/2.0.0", evicted_package_dir)
+    install_tree(store_dir, "pkg/2.0.0", evicted_package_dir, tmp_path / "project")
+
+    assert collect_store_garbage(store_dir).removed_manifests == 0
+    shutil.rmtree(evicted_package_dir)
+    result = collect_store_garbage(store_dir)
+
+    assert result.removed_manifests == 1
+    assert result.removed_blobs == 1
+    # the removed blob is still used by the project
+    assert result.reclaimed_bytes == 0
+    assert (tmp_path / "project" / "lib.a").read_text() == "archive"
+    assert load_manifest(store_dir, "pkg/2.0.0") is None
+    assert load_manifest(store_dir, "pkg/1.0.0") is not None
+    assert len(list((store_dir / "blobs").glob("*/*"))) == 2
+    assert verify_store(store_dir) == []
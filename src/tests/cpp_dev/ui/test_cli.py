@@ -0,0 +1,86 @@
+# Copyright (c) 2024 Andi Hellmund. All rights reserved.
+
+# This work is licensed under the terms of the BSD-3-Clause license.
+# For a copy, see <https://opensource.org/license/bsd-3-clause>.
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Modules that must not be loaded by lightweight commands: each of them adds a noticeable startup cost.
+_HEAVY_MODULES = [
+    "pydantic",
+    "yaml",
+    "distro",
+    "filelock",
+    "conan",
+    "cpp_dev.dependency",
+    "cpp_dev.project",
+    "cpp_dev.ui.project",
+]
+
+
+def _collect_imported_modules(argv: list[str], cpd_home: Path, setup: str = "") -> set[str]:
+    """Run a cpd command in a fresh interpreter and collect the loaded modules.
+
+    The loaded modules are taken from sys.modules as they include the modules imported by importlib.
+    The startup time itself is not asserted as it depends too much on the machine running the tests.
+    """
+    code = "\n".join(
+        [
+            setup,
+            "import sys",
+            "from cpp_dev.ui.cli import run_cli",
+            "try:",
+            f"    run_cli({argv!r})",
+            "finally:",
+            "    print('\\n'.join(sys.modules), file=sys.stderr)",
+        ],
+    )
+    env = {
+        **os.environ,
+        "CPD_HOME": str(cpd_home),
+        "CPD_NO_DAEMON": "1",
+        "PYTHONPATH": os.pathsep.join(sys.path),
+    }
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=False,
+    )
+    return set(result.stderr.splitlines())
+
+
+def _assert_no_heavy_imports(modules: set[str]) -> None:
+    for module in modules:
+        assert not any(module == heavy or module.startswith(f"{heavy}.") for heavy in _HEAVY_MODULES), module
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["version"],
+        # the parser is set up the same way for shell completion, which exits before executing any command
+        ["--help"],
+        ["daemon", "stop"],
+    ],
+)
+def test_lightweight_command_startup(tmp_path: Path, argv: list[str]) -> None:
+    modules = _collect_imported_modules(argv, tmp_path)
+    assert "cpp_dev.ui.cli" in modules
+    _assert_no_heavy_imports(modules)
+
+
+def test_command_imports_only_its_implementation(tmp_path: Path) -> None:
+    modules = _collect_imported_modules(
+        ["store", "verify"],
+        tmp_path,
+        setup="from unittest.mock import patch\npatch('cpp_dev.ui.cli.assert_supported_os').start()",
+    )
+    assert "cpp_dev.ui.packages" in modules
+    assert "cpp_dev.ui.project" not in modules